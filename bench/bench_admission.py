@@ -0,0 +1,88 @@
+"""
+VRAM admission: blind posting vs estimated-peak admission.
+
+Fake GPUs shaped like GPU_CONFIG (a 32GB 5090, 24GB 3090s, one of them
+sharing its card with Chatterbox) that really run out of memory: each
+fake knows the true peak of a prompt (the estimate times --truth) and
+fails it with ComfyUI's OOM error at the sampler if it doesn't fit. A
+shot list of mixed LTX sizes goes through the scheduler with admission
+off and on; counts OOMs, failed jobs, downscales and deferrals.
+
+Usage:
+    python bench/bench_admission.py
+    python bench/bench_admission.py --jobs 40 --truth 1.15 --chatterbox-gb 8
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import admission, templates
+from pipeline.fake_comfy import FakeComfy
+from pipeline.scheduler import Backend, Scheduler
+
+SIZES = [(768, 512, 65), (768, 512, 97), (1024, 576, 97), (1280, 736, 97), (1280, 736, 161)]
+
+
+def shots(n, seed=0):
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        w, h, frames = rng.choice(SIZES)
+        out.append(templates.get("ltx_t2v").instantiate(prompt=f"shot {i}", seed=i + 1, width=w, height=h,
+                                                        frames=frames))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=24)
+    parser.add_argument("--workers", type=int, default=3, help="24GB worker GPUs")
+    parser.add_argument("--truth", type=float, default=1.1, help="real peak / uncalibrated estimate")
+    parser.add_argument("--chatterbox-gb", type=float, default=6.0, help="VRAM Chatterbox holds on one worker")
+    parser.add_argument("--exec-time", type=float, default=0.3, help="seconds per prompt that fits")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ("blind", "admission"):
+        admission.CALIBRATION.factors.clear()
+        fakes = []
+        backends = []
+        for i in range(args.workers + 1):
+            vram, other = (32, 0.0) if i == 0 else (24, args.chatterbox_gb if i == args.workers else 0.0)
+            fake = FakeComfy(exec_time=args.exec_time, vram_total=vram * 1024**3, vram_other=other,
+                             vram_use=lambda p: admission.raw_estimate(p) * args.truth).start()
+            fakes.append(fake)
+            backends.append(Backend(f"gpu{i}", fake.url, role="primary" if i == 0 else "worker", vram_gb=vram))
+        sched = Scheduler(backends, refresh=0.2, admit=mode == "admission").start()
+        start = time.time()
+        jobs = [sched.submit(wf, label=f"shot {i}") for i, wf in enumerate(shots(args.jobs))]
+        ok = failed = 0
+        for job in jobs:
+            try:
+                job.result(timeout=120)
+                ok += 1
+            except Exception:
+                failed += 1
+        elapsed = time.time() - start
+        ooms = sum(f.ooms for f in fakes)
+        results[mode] = {"ok": ok, "failed": failed, "ooms": ooms,
+                         "downscaled": sched.downscaled, "deferred": sum(b.deferred for b in backends),
+                         "seconds": round(elapsed, 2)}
+        sched.close()
+        for f in fakes:
+            f.stop()
+
+    for mode, r in results.items():
+        print(f"  {mode:<10} {r['ok']:>3} ok  {r['failed']:>3} failed  {r['ooms']:>3} OOMs  "
+              f"{r['downscaled']:>3} downscaled  {r['deferred']:>3} deferred  {r['seconds']}s")
+    print(json.dumps({"jobs": args.jobs, "workers": args.workers, "truth": args.truth,
+                      "chatterbox_gb": args.chatterbox_gb, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Model-affinity ordering: model loads and wall time for a mixed shot list.
+
+Interleaves text_to_image / text_to_video / text_to_audio jobs (the
+worst case for ComfyUI's model cache) and runs them against fake
+servers that charge a fixed time per model swapped in.
+
+Usage:
+    python bench/bench_affinity.py
+    python bench/bench_affinity.py --scenes 30 --load-time 0.05
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+import dispatcher
+import factory
+from pipeline.fake_comfy import FakeComfy
+from pipeline.scheduler import Scheduler
+
+
+def shot_list(scenes):
+    wfs = []
+    for i in range(scenes):
+        wfs.append(factory.build_text_to_image(f"keyframe {i}", seed=i + 1))
+        wfs.append(factory.build_text_to_video(f"scene {i}", seed=i + 1))
+        wfs.append(factory.build_text_to_audio(f"ambience {i}", seed=i + 1))
+    return wfs
+
+
+def run_single(wfs, exec_time, load_time, group):
+    with FakeComfy(exec_time=exec_time, model_load_time=load_time) as fake:
+        factory.COMFY = fake.url
+        start = time.time()
+        for job in factory.gather(wfs, group_models=group):
+            job.result()
+        return {"wall_s": round(time.time() - start, 3), "model_loads": fake.model_loads}
+
+
+def run_pool(wfs, exec_time, load_time, pin):
+    fakes = {i: FakeComfy(exec_time=exec_time, model_load_time=load_time).start() for i in range(4)}
+    config = {i: dict(dispatcher.GPU_CONFIG[i + 1], comfyui=f.url) for i, f in fakes.items()}
+    sched = Scheduler(dispatcher.make_backends(config), refresh=0.2, pin_families=pin).start()
+    start = time.time()
+    for job in [sched.submit(wf) for wf in wfs]:
+        job.result()
+    out = {"wall_s": round(time.time() - start, 3),
+           "model_loads": sum(f.model_loads for f in fakes.values()),
+           "swaps_avoided": sched.swaps_avoided()}
+    sched.close()
+    for f in fakes.values():
+        f.stop()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenes", type=int, default=20)
+    parser.add_argument("--exec-time", type=float, default=0.01)
+    parser.add_argument("--load-time", type=float, default=0.02, help="seconds per model swapped in")
+    args = parser.parse_args()
+
+    wfs = shot_list(args.scenes)
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = {
+            "single_arrival_order": run_single(wfs, args.exec_time, args.load_time, False),
+            "single_grouped": run_single(wfs, args.exec_time, args.load_time, True),
+            "pool4_unpinned": run_pool(wfs, args.exec_time, args.load_time, False),
+            "pool4_pinned": run_pool(wfs, args.exec_time, args.load_time, True),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
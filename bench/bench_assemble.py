@@ -0,0 +1,125 @@
+"""
+Assembly: stream-copy concat vs re-encoding the whole timeline.
+
+Generates synthetic text_to_video-shaped clips locally (h264, 24fps,
+768x512, 65 frames) plus a music bed, then times three ways of building
+the same 60-clip timeline:
+
+    reencode   concat demuxer into libx264, every frame decoded and encoded
+    copy       assemble(): stream copy, audio mixed in
+    edited     assemble() with a few trims, fades and crossfades, so only
+               those segments are re-encoded (in parallel)
+
+Needs ffmpeg/ffprobe on PATH (or FFMPEG/FFPROBE set).
+
+Usage:
+    python bench/bench_assemble.py
+    python bench/bench_assemble.py --clips 60 --edits 6 --keep
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import assemble
+from pipeline.assemble import Clip, Track
+
+
+def make_clips(folder, n, frames, width, height):
+    """n distinct h264 clips, encoded the way ComfyUI's SaveVideo does (libx264, yuv420p)."""
+    def one(i):
+        path = os.path.join(folder, f"t2v_{i + 1}_00001_.mp4")
+        subprocess.run([assemble.FFMPEG, "-y", "-v", "error", "-f", "lavfi",
+                        "-i", f"testsrc2=size={width}x{height}:rate=24,hue=h={i * 37 % 360}",
+                        "-frames:v", str(frames), "-c:v", "libx264", "-preset", "veryfast",
+                        "-pix_fmt", "yuv420p", path], check=True)
+        return path
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+        return list(pool.map(one, range(n)))
+
+
+def make_audio(folder, seconds):
+    path = os.path.join(folder, "audio_1_00001_.flac")
+    subprocess.run([assemble.FFMPEG, "-y", "-v", "error", "-f", "lavfi",
+                    "-i", f"sine=frequency=220:duration={seconds}", path], check=True)
+    return path
+
+
+def run_reencode(clips, music, out):
+    start = time.time()
+    listfile = assemble._concat_list(clips, out + ".txt")
+    subprocess.run([assemble.FFMPEG, "-y", "-v", "error", "-f", "concat", "-safe", "0", "-i", listfile,
+                    "-i", music, "-map", "0:v", "-map", "1:a", "-c:v", "libx264", "-preset", assemble.PRESET,
+                    "-crf", str(assemble.CRF), "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", out], check=True)
+    return {"mode": "reencode", "seconds": round(time.time() - start, 2)}
+
+
+def run_assemble(mode, timeline, music, out):
+    start = time.time()
+    _, segments = assemble.plan(timeline)
+    assemble.assemble(timeline, out, audio=[Track(music)])
+    return {"mode": mode, "seconds": round(time.time() - start, 2),
+            "copied": sum(len(c) for kind, c in segments if kind == "copy"),
+            "reencoded": sum(len(c) for kind, c in segments if kind == "encode")}
+
+
+def edited(clips, edits):
+    """Timeline with `edits` clips trimmed/faded/crossfaded, spread evenly."""
+    timeline = list(clips)
+    step = max(len(clips) // max(edits, 1), 1)
+    for n, i in enumerate(range(step // 2, len(clips), step)):
+        if n >= edits:
+            break
+        kind = n % 3
+        if kind == 0:
+            timeline[i] = Clip(clips[i], start=0.25, end=2.0)
+        elif kind == 1:
+            timeline[i] = Clip(clips[i], fade_in=0.5)
+        else:
+            timeline[i] = Clip(clips[i], crossfade=0.5)
+    return timeline
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clips", type=int, default=60)
+    parser.add_argument("--frames", type=int, default=65)
+    parser.add_argument("--size", default="768x512")
+    parser.add_argument("--edits", type=int, default=6, help="trims/fades/crossfades in the edited run")
+    parser.add_argument("--keep", action="store_true", help="keep the generated files")
+    args = parser.parse_args()
+    width, height = map(int, args.size.split("x"))
+
+    tmp = tempfile.mkdtemp(prefix="bench_assemble_")
+    try:
+        print(f"  making {args.clips} clips...")
+        clips = make_clips(tmp, args.clips, args.frames, width, height)
+        music = make_audio(tmp, args.clips * args.frames / 24)
+        results = [
+            run_reencode(clips, music, os.path.join(tmp, "reencode.mp4")),
+            run_assemble("copy", clips, music, os.path.join(tmp, "copy.mp4")),
+            run_assemble("edited", edited(clips, args.edits), music, os.path.join(tmp, "edited.mp4")),
+        ]
+    finally:
+        if args.keep:
+            print(f"  files in {tmp}")
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    base = results[0]["seconds"]
+    for r in results:
+        speedup = f"{base / r['seconds']:.1f}x" if r["seconds"] else "-"
+        print(f"  {r['mode']:<9} {r['seconds']:>7}s  {speedup:>6}")
+    print(json.dumps({"clips": args.clips, "frames": args.frames, "size": args.size,
+                      "edits": args.edits, "cpus": os.cpu_count(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
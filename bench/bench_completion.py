@@ -0,0 +1,99 @@
+"""
+Completion latency: websocket engine vs the old 5s /history poll.
+
+Runs image_to_video-sized jobs against the fake ComfyUI and reports how
+long after the server finished each job the client noticed.
+
+Usage:
+    python bench/bench_completion.py
+    python bench/bench_completion.py --jobs 20 --exec-time 0.5 --poll 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import transport
+from pipeline.completion import CompletionEngine
+from pipeline.fake_comfy import FakeComfy
+
+WORKFLOW = {
+    "1": {"inputs": {"text": "boat"}, "class_type": "CLIPTextEncode"},
+    "2": {"inputs": {"images": ["1", 0], "filename_prefix": "bench"}, "class_type": "SaveImage"},
+}
+
+
+def run_poll(fake, jobs, poll):
+    """The pre-engine factory.queue() loop."""
+    lags = []
+    for _ in range(jobs):
+        pid = transport.post_json(f"{fake.url}/prompt", {"prompt": WORKFLOW})["prompt_id"]
+        while True:
+            time.sleep(poll)
+            hist = transport.get_json(f"{fake.url}/history/{pid}")
+            if pid in hist:
+                seen = time.time()
+                break
+        lags.append(seen - fake.done_times[pid])
+    return lags
+
+
+def run_ws(fake, jobs, drop_every=0):
+    engine = CompletionEngine(fake.url).start()
+    lags = []
+    for i in range(jobs):
+        if drop_every and i and i % drop_every == 0:
+            fake.drop_sockets()
+        pid = transport.post_json(f"{fake.url}/prompt",
+                                  {"prompt": WORKFLOW, "client_id": engine.client_id})["prompt_id"]
+        engine.wait(pid, 60)
+        lags.append(time.time() - fake.done_times[pid])
+    engine.close()
+    return lags
+
+
+def summary(lags):
+    lags = sorted(lags)
+    return {
+        "jobs": len(lags),
+        "mean_ms": round(statistics.mean(lags) * 1000, 2),
+        "p50_ms": round(lags[len(lags) // 2] * 1000, 2),
+        "max_ms": round(lags[-1] * 1000, 2),
+    }
+
+
+class TimedFake(FakeComfy):
+    """Records when each prompt's history entry landed."""
+
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self.done_times = {}
+
+    def send(self, event, data, client_id=None):
+        if event == "executing" and data.get("node") is None:
+            self.done_times[data["prompt_id"]] = time.time()
+        super().send(event, data, client_id)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=10)
+    parser.add_argument("--exec-time", type=float, default=0.2)
+    parser.add_argument("--poll", type=float, default=5.0, help="legacy poll interval")
+    args = parser.parse_args()
+
+    with TimedFake(exec_time=args.exec_time) as fake:
+        results = {
+            "ws": summary(run_ws(fake, args.jobs)),
+            "ws_with_drops": summary(run_ws(fake, args.jobs, drop_every=3)),
+            f"poll_{args.poll:g}s": summary(run_poll(fake, args.jobs, args.poll)),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
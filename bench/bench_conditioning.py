@@ -0,0 +1,83 @@
+"""
+Prompt encoding: plain CLIPTextEncode vs the CachedCLIPTextEncode node.
+
+A 100-scene batch the way shot lists actually arrive: 25 shots sharing
+a style prefix, each rendered as 4 takes (new seed, same text), with a
+Flux keyframe every 10 scenes. Every LTX job also encodes the same
+negative prompt. The fake ComfyUI charges --encode-time per text encode
+and reuses encodes the way ComfyUI does (previous prompt only) or, with
+the node installed, from its LRU.
+
+Usage:
+    python bench/bench_conditioning.py
+    python bench/bench_conditioning.py --scenes 100 --encode-time 0.4
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import factory
+from pipeline import conditioning
+from pipeline.cache import ResultCache
+from pipeline.fake_comfy import FakeComfy
+
+STYLE = "cinematic 35mm, golden hour, shallow depth of field, "
+
+
+def batch(scenes, takes):
+    """[(kind, prompt, seed)] in arrival order: takes of a shot come in a row, keyframes in between."""
+    items = []
+    for i in range(scenes):
+        shot, take = divmod(i, takes)
+        if i and i % 10 == 0:
+            items.append(("t2i", STYLE + f"keyframe {i // 10}", 1000 + i))
+        items.append(("t2v", STYLE + f"yacht scene {shot}", 1 + i))
+    return items
+
+
+def run(mode, items, encode_time, exec_time):
+    custom = [conditioning.NODE] if mode == "cached" else ()
+    fake = FakeComfy(exec_time=exec_time, encode_time=encode_time, custom_nodes=custom).start()
+    factory.COMFY = fake.url
+    conditioning._support.clear()
+    start = time.time()
+    try:
+        for kind, prompt, seed in items:
+            build = factory.build_text_to_video if kind == "t2v" else factory.build_text_to_image
+            factory.submit(build(prompt, seed=seed), use_cache=False).result(60)
+        return {"mode": mode, "seconds": round(time.time() - start, 2), "encodes": fake.encodes,
+                "encode_s": round(fake.encode_seconds, 2), **(conditioning.server_stats(fake.url) or {})}
+    finally:
+        fake.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenes", type=int, default=100)
+    parser.add_argument("--takes", type=int, default=4)
+    parser.add_argument("--encode-time", type=float, default=0.25, help="seconds per T5/CLIP encode")
+    parser.add_argument("--exec-time", type=float, default=0.0)
+    args = parser.parse_args()
+
+    factory.CACHE = ResultCache(tempfile.mkdtemp(prefix="bench_conditioning_"))
+    factory.JOURNAL = None
+    items = batch(args.scenes, args.takes)
+    results = [run(mode, items, args.encode_time, args.exec_time) for mode in ("plain", "cached")]
+    plain, cached = results
+    for r in results:
+        print(f"  {r['mode']:<7} {r['encodes']:>4} encodes  {r['encode_s']:>6}s encoding  {r['seconds']:>6}s total")
+    saved = plain["encode_s"] - cached["encode_s"]
+    print(f"  saved {saved:.1f}s of encoding per {args.scenes} scenes "
+          f"({plain['encodes'] - cached['encodes']} encodes skipped)")
+    print(json.dumps({"scenes": args.scenes, "jobs": len(items), "takes": args.takes,
+                      "encode_time": args.encode_time, "encode_s_saved": round(saved, 2),
+                      "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
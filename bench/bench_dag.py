@@ -0,0 +1,131 @@
+"""
+Scene pipeline: stage-by-stage batch vs the dependency-graph executor.
+
+Fake GPUs laid out like ARCHITECTURE.md (one control card for keyframes,
+worker cards for video and audio) behind one Scheduler. "staged" runs
+every keyframe, then every video + audio, then assembles once - what a
+batch script does. "pipelined" is factory.produce(): each scene's video
+starts when its keyframe lands and the rough cut grows as scenes finish.
+Assembly is simulated (--cut-time per clip) since the fakes serve
+synthetic bytes, not mp4s.
+
+Usage:
+    python bench/bench_dag.py
+    python bench/bench_dag.py --scenes 24 --workers 4 --keyframe 1.0 --video 3.0 --audio 0.8
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import factory
+from pipeline.cache import ResultCache
+from pipeline.fake_comfy import FakeComfy
+from pipeline.retrieve import Retriever
+from pipeline.scheduler import Backend, Scheduler
+
+
+def exec_time(times):
+    def t(prompt):
+        classes = {n.get("class_type") for n in prompt.values()}
+        if "SaveVideo" in classes:
+            return times["video"]
+        if "SaveAudio" in classes:
+            return times["audio"]
+        return times["keyframe"]
+    return t
+
+
+def fake_cut(cut_time):
+    def assemble(timeline, output, audio=(), project=None, workers=None):
+        time.sleep(cut_time * len(timeline))
+        return output
+    return assemble
+
+
+def shots(n):
+    return [{"prompt": f"yacht scene {i}", "audio": f"waves {i}", "seed": i + 1} for i in range(n)]
+
+
+def run_staged(sched, items, project, cut_time):
+    """Every keyframe, then every video + audio, then one assembly."""
+    start = time.time()
+    marks = {}
+    kfs = [factory._with_files(sched.submit(factory.build_text_to_image(s["prompt"], s["seed"]), role="control"),
+                               project) for s in items]
+    kfs = [f.result() for f in kfs]
+    marks["keyframes"] = time.time() - start
+    videos = [factory._with_files(sched.submit(factory.build_image_to_video(
+        factory._keyframe_input(kf, sched, project), s["prompt"], s["seed"]), role="worker"), project)
+        for kf, s in zip(kfs, items)]
+    audios = [factory._with_files(sched.submit(factory.build_text_to_audio(s["audio"], 65 / 24, s["seed"]),
+                                               role="worker"), project) for s in items]
+    for f in videos + audios:
+        f.result()
+    marks["scenes"] = time.time() - start
+    time.sleep(cut_time * len(items))
+    return {"mode": "staged", "seconds": round(time.time() - start, 2),
+            **{f"{k}_done_s": round(v, 2) for k, v in marks.items()}}
+
+
+def run_pipelined(sched, items, project):
+    start = time.time()
+    r = factory.produce(items, project=project, scheduler=sched)
+    return {"mode": "pipelined", "seconds": round(time.time() - start, 2),
+            "critical_by_stage": r["report"]["critical_by_stage"], "stages": r["report"]["stages"]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenes", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4, help="worker GPUs (3090s)")
+    parser.add_argument("--keyframe", type=float, default=0.6, help="seconds per keyframe")
+    parser.add_argument("--video", type=float, default=2.0, help="seconds per scene video")
+    parser.add_argument("--audio", type=float, default=0.5, help="seconds per audio track")
+    parser.add_argument("--cut-time", type=float, default=0.02, help="assembly seconds per clip")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_dag_")
+    factory.CACHE = ResultCache(os.path.join(tmp, "cache"))
+    factory.JOURNAL = None
+    factory.Retriever = lambda server, project: Retriever(server, project, root=tmp)
+    factory._assemble.assemble = fake_cut(args.cut_time)
+    factory._assemble.probe = lambda path: {"duration": 65 / 24}
+    times = {"keyframe": args.keyframe, "video": args.video, "audio": args.audio}
+
+    results = []
+    try:
+        for mode in ("staged", "pipelined"):
+            fakes = [FakeComfy(exec_time=exec_time(times), artifact_bytes=4096).start()
+                     for _ in range(args.workers + 1)]
+            backends = [Backend("gpu5", fakes[0].url, role="control", vram_gb=16)]
+            backends += [Backend(f"gpu{i}", f.url, role="worker") for i, f in enumerate(fakes[1:], 1)]
+            sched = Scheduler(backends).start()
+            factory._retrievers.clear()
+            items = shots(args.scenes)
+            try:
+                if mode == "staged":
+                    results.append(run_staged(sched, items, f"{mode}", args.cut_time))
+                else:
+                    results.append(run_pipelined(sched, items, f"{mode}"))
+            finally:
+                sched.close()
+                for f in fakes:
+                    f.stop()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    staged, pipelined = results
+    print(f"  staged    {staged['seconds']:>6}s  (keyframes done at {staged['keyframes_done_s']}s, "
+          f"scenes at {staged['scenes_done_s']}s)")
+    print(f"  pipelined {pipelined['seconds']:>6}s  ({staged['seconds'] / pipelined['seconds']:.2f}x)")
+    print(json.dumps({"scenes": args.scenes, "workers": args.workers, "times": times, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Priority classes: interactive previews vs a deep queue of bulk renders.
+
+One fake GPU gets --bulk hero renders up front, then an interactive
+preview every --every seconds. "fifo" is the old behaviour - everything
+normal priority, posted as fast as the server takes it (a watermark so
+high it never holds anything back), so previews land at the back of
+ComfyUI's queue. "priority" marks the renders bulk and the previews
+interactive. Reports preview latency (submit -> result) and the bulk
+makespan, which should barely move.
+
+Usage:
+    python bench/bench_priority.py
+    python bench/bench_priority.py --bulk 40 --previews 8 --exec-time 0.2
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import templates
+from pipeline.fake_comfy import FakeComfy
+from pipeline.scheduler import Backend, Scheduler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bulk", type=int, default=30, help="hero renders queued up front")
+    parser.add_argument("--previews", type=int, default=6)
+    parser.add_argument("--every", type=float, default=0.5, help="seconds between previews")
+    parser.add_argument("--exec-time", type=float, default=0.2, help="seconds per bulk render")
+    args = parser.parse_args()
+
+    # previews are a quarter of a render
+    exec_time = lambda p: args.exec_time / 4 if "preview" in json.dumps(p) else args.exec_time
+    results = {}
+    for mode in ("fifo", "priority"):
+        with FakeComfy(exec_time=exec_time) as fake:
+            watermark = 10**6 if mode == "fifo" else 1
+            backend = Backend("gpu0", fake.url, max_inflight=10**6 if mode == "fifo" else 2, watermark=watermark)
+            sched = Scheduler([backend], refresh=0.2, admit=False).start()
+            start = time.time()
+            bulk = [sched.submit(templates.get("ltx_t2v").instantiate(prompt=f"hero {i}", seed=i + 1),
+                                 label=f"hero {i}", priority="normal" if mode == "fifo" else "bulk")
+                    for i in range(args.bulk)]
+            previews = []
+            for i in range(args.previews):
+                time.sleep(args.every)
+                wf = templates.get("ltx_t2v").instantiate(prompt=f"preview {i}", seed=1000 + i,
+                                                          width=384, height=256)
+                previews.append(sched.submit(wf, label=f"preview {i}",
+                                             priority="normal" if mode == "fifo" else "interactive"))
+            latency = []
+            for job in previews:
+                job.result(600)
+                latency.append(job.finished - job.submitted)
+            for job in bulk:
+                job.result(600)
+            results[mode] = {"preview_mean_s": round(statistics.mean(latency), 3),
+                             "preview_max_s": round(max(latency), 3),
+                             "bulk_makespan_s": round(max(j.finished for j in bulk) - start, 2)}
+            sched.close()
+
+    for mode, r in results.items():
+        print(f"  {mode:<9} preview mean {r['preview_mean_s']:>6}s  max {r['preview_max_s']:>6}s  "
+              f"bulk done in {r['bulk_makespan_s']}s")
+    print(json.dumps({"bulk": args.bulk, "previews": args.previews, "exec_time": args.exec_time,
+                      "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
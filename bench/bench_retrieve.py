@@ -0,0 +1,106 @@
+"""
+Artifact retrieval: stream outputs as each prompt finishes vs fetch after the batch.
+
+Fake ComfyUI runs in its own process and serves big synthetic files
+over /view. "after" waits for the whole batch and then downloads every
+file (the old copy-by-hand flow, scripted); "streaming" is
+factory.gather(project=...), which downloads each job's files while the
+next ones generate. Peak RSS shows memory stays flat however big the
+files are.
+
+Usage:
+    python bench/bench_retrieve.py
+    python bench/bench_retrieve.py --jobs 8 --exec-time 1.0 --artifact-mb 256
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import factory
+from pipeline import transport
+from pipeline.cache import ResultCache
+from pipeline.retrieve import Retriever
+
+
+def start_server(exec_time, artifact_mb):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    proc = subprocess.Popen([sys.executable, "-m", "pipeline.fake_comfy", "--port", str(port),
+                             "--exec-time", str(exec_time), "--artifact-mb", str(artifact_mb)],
+                            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            transport.get(f"{url}/system_stats", retries=0)
+            return proc, url
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise Exception("fake ComfyUI didn't start")
+
+
+def workflows(n, tag):
+    return [factory.build_text_to_video(f"{tag} shot {i}", seed=i + 1) for i in range(n)]
+
+
+def run_after(url, root, n):
+    factory.COMFY = url
+    start = time.time()
+    outputs = [job.result() for job in factory.gather(workflows(n, "after"))]
+    generated = time.time() - start
+    r = Retriever(url, "after", root=root)
+    for out in outputs:
+        r.fetch(out).result()
+    r.close()
+    return {"mode": "after", "seconds": round(time.time() - start, 2),
+            "generation_s": round(generated, 2), **r.stats()}
+
+
+def run_streaming(url, root, n):
+    factory.COMFY = url
+    factory._retrievers.clear()
+    factory.Retriever = lambda server, project: Retriever(server, project, root=root)
+    start = time.time()
+    files = sum(len(job.artifacts) for job in factory.gather(workflows(n, "stream"), project="stream"))
+    r = factory._retrievers[(url, "stream")]
+    return {"mode": "streaming", "seconds": round(time.time() - start, 2), "downloaded": files, **r.stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--exec-time", type=float, default=1.0)
+    parser.add_argument("--artifact-mb", type=float, default=256)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_retrieve_")
+    factory.CACHE = ResultCache(os.path.join(tmp, "cache"))
+    factory.JOURNAL = None
+    proc, url = start_server(args.exec_time, args.artifact_mb)
+    try:
+        results = [run_after(url, tmp, args.jobs), run_streaming(url, tmp, args.jobs)]
+    finally:
+        proc.kill()
+        shutil.rmtree(tmp, ignore_errors=True)
+    for r in results:
+        print(f"  {r['mode']:<10} {r['seconds']:>6}s  {r['files']} files  {r['bytes'] / 1e9:.2f}GB  "
+              f"{r['mb_per_s']} MB/s per stream")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"  peak RSS {peak:.0f}MB for {args.jobs} x {args.artifact_mb:.0f}MB files")
+    print(json.dumps({"jobs": args.jobs, "artifact_mb": args.artifact_mb, "exec_time": args.exec_time,
+                      "peak_rss_mb": round(peak), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Multi-GPU scheduler against one fake ComfyUI per GPU in GPU_CONFIG.
+
+Reports makespan for the same shot list on the single-URL path vs the
+pool, how jobs spread across backends, how many were stolen, and what
+happens when a backend dies mid-batch.
+
+Usage:
+    python bench/bench_scheduler.py
+    python bench/bench_scheduler.py --jobs 60 --exec-time 0.1
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+import dispatcher
+from pipeline.fake_comfy import FakeComfy
+from pipeline.scheduler import Scheduler
+
+WORKFLOW = {
+    "1": {"inputs": {"text": "scene"}, "class_type": "CLIPTextEncode"},
+    "2": {"inputs": {"images": ["1", 0], "filename_prefix": "bench"}, "class_type": "SaveImage"},
+}
+
+
+def fake_pool(exec_time, slow=None):
+    """One fake per GPU; the 'slow' GPU index runs 4x slower (an older card, a hog)."""
+    fakes, config = {}, {}
+    for idx, gpu in dispatcher.GPU_CONFIG.items():
+        t = exec_time * (4 if idx == slow else 1)
+        fakes[idx] = FakeComfy(exec_time=t, gpu_name=gpu["name"], vram_total=gpu["vram_gb"] * 1024**3).start()
+        config[idx] = dict(gpu, comfyui=fakes[idx].url)
+    return fakes, config
+
+
+def run(config, jobs, role=None, kill=None, fakes=None):
+    sched = Scheduler(dispatcher.make_backends(config), refresh=0.2).start()
+    start = time.time()
+    handles = [sched.submit(WORKFLOW, role=role) for _ in range(jobs)]
+    failed = 0
+    for i, job in enumerate(handles):
+        if kill is not None and i == jobs // 4:
+            fakes[kill].stop()
+        try:
+            job.result(120)
+        except Exception:
+            failed += 1
+    took = time.time() - start
+    stats = sched.stats()
+    sched.close()
+    return {
+        "makespan_s": round(took, 3),
+        "jobs_per_s": round(jobs / took, 2),
+        "failed": failed,
+        "per_backend": {k: v["completed"] for k, v in stats.items()},
+        "stolen": sum(v["stolen"] for v in stats.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=48)
+    parser.add_argument("--exec-time", type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = {}
+    fakes, config = fake_pool(args.exec_time)
+    results["single_backend"] = run({0: config[0]}, args.jobs)
+    results["pool"] = run(config, args.jobs)
+    results["pool_workers_only"] = run(config, args.jobs, role="worker")
+    for f in fakes.values():
+        f.stop()
+
+    fakes, config = fake_pool(args.exec_time, slow=1)
+    results["pool_one_slow_gpu"] = run(config, args.jobs)
+    results["pool_gpu2_dies"] = run(config, args.jobs, kill=2, fakes=fakes)
+    for idx, f in fakes.items():
+        if idx != 2:
+            f.stop()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Sweeps: batched latents vs one prompt per variant.
+
+Fake ComfyUI with a batch-aware cost model: every prompt pays a fixed
+overhead (text encode, model patching, scheduling) and sampling grows
+sublinearly with batch size, the way a GPU that isn't saturated at
+batch 1 behaves. Runs the same sweep with max_batch=1 (the old
+text_to_video-in-a-loop) and with the VRAM-aware batch limit, and
+compares variants per GPU-second.
+
+Usage:
+    python bench/bench_sweep.py
+    python bench/bench_sweep.py --seeds 8 --cfg 1.0 3.0 --vram-gb 32 --scale 0.8
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import factory
+from pipeline.cache import ResultCache
+from pipeline.fake_comfy import FakeComfy, batch_size
+
+
+def cost(overhead, sample, decode, scale):
+    """exec_time(prompt): overhead + sample * n**scale + decode * n."""
+    def t(prompt):
+        n = batch_size(prompt)
+        return overhead + sample * n ** scale + decode * n
+    return t
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seeds", type=int, default=8)
+    parser.add_argument("--cfg", type=float, nargs="+", default=[1.0, 3.0])
+    parser.add_argument("--vram-gb", type=float, default=32)
+    parser.add_argument("--overhead", type=float, default=0.15, help="per-prompt seconds")
+    parser.add_argument("--sample", type=float, default=0.5, help="sampling seconds at batch 1")
+    parser.add_argument("--decode", type=float, default=0.05, help="VAE decode seconds per variant")
+    parser.add_argument("--scale", type=float, default=0.75, help="sampling cost grows as batch**scale")
+    args = parser.parse_args()
+
+    factory.JOURNAL = None
+    results = {}
+    for mode, max_batch in (("loop", 1), ("batched", None)):
+        factory.CACHE = ResultCache(tempfile.mkdtemp(prefix="bench_sweep_"))
+        with FakeComfy(exec_time=cost(args.overhead, args.sample, args.decode, args.scale),
+                       vram_total=int(args.vram_gb * 1024**3)) as fake:
+            factory.COMFY = fake.url
+            variants, report = factory.sweep("yacht at sunset", seeds=list(range(1, args.seeds + 1)),
+                                             cfg=args.cfg, max_batch=max_batch)
+            assert all(v["outputs"] for v in variants)
+            results[mode] = report
+
+    loop, batched = results["loop"], results["batched"]
+    for mode, r in results.items():
+        print(f"  {mode:<8} {r['prompts']:>3} prompts  {r['gpu_s']:>6} GPU-s  "
+              f"{r['variants_per_gpu_s']} variants/GPU-s  (batch <= {r['batch_limit']})")
+    gain = batched["variants_per_gpu_s"] / loop["variants_per_gpu_s"] if loop["variants_per_gpu_s"] else 0
+    print(f"  batched throughput {gain:.2f}x per GPU-second")
+    print(json.dumps({"seeds": args.seeds, "cfg": args.cfg, "vram_gb": args.vram_gb,
+                      "cost": {"overhead": args.overhead, "sample": args.sample, "decode": args.decode,
+                               "scale": args.scale},
+                      "throughput_gain": round(gain, 2), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
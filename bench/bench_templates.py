@@ -0,0 +1,83 @@
+"""
+Per-job graph build + serialization cost: dict literal vs compiled template.
+
+The literal is the text_to_video() graph as factory.py used to build it
+on every call. Reports microseconds per job over a batch of prompts.
+
+Usage:
+    python bench/bench_templates.py
+    python bench/bench_templates.py --jobs 10000 --repeat 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import templates
+
+
+def literal_t2v(prompt, seed, frames=65, width=768, height=512):
+    return {
+        "1": {"inputs": {"clip_name": "t5xxl_fp16.safetensors", "type": "ltxv"}, "class_type": "CLIPLoader"},
+        "2": {"inputs": {"ckpt_name": "ltxv-13b-0.9.8-distilled-fp8.safetensors"}, "class_type": "CheckpointLoaderSimple"},
+        "3": {"inputs": {"max_shift": 2.05, "base_shift": 0.95, "model": ["2", 0]}, "class_type": "ModelSamplingLTXV"},
+        "4": {"inputs": {"text": prompt, "clip": ["1", 0]}, "class_type": "CLIPTextEncode"},
+        "5": {"inputs": {"text": "low quality, blurry, distorted", "clip": ["1", 0]}, "class_type": "CLIPTextEncode"},
+        "6": {"inputs": {"frame_rate": 24.0, "positive": ["4", 0], "negative": ["5", 0]}, "class_type": "LTXVConditioning"},
+        "7": {"inputs": {"width": width, "height": height, "length": frames, "batch_size": 1}, "class_type": "EmptyLTXVLatentVideo"},
+        "8": {"inputs": {"sampler_name": "euler"}, "class_type": "KSamplerSelect"},
+        "9": {"inputs": {"scheduler": "linear_quadratic", "steps": 25, "denoise": 1.0, "model": ["3", 0]}, "class_type": "BasicScheduler"},
+        "10": {"inputs": {"noise_seed": seed}, "class_type": "RandomNoise"},
+        "11": {"inputs": {"cfg": 1.0, "model": ["3", 0], "positive": ["6", 0], "negative": ["6", 1]}, "class_type": "CFGGuider"},
+        "12": {"inputs": {"noise": ["10", 0], "guider": ["11", 0], "sampler": ["8", 0], "sigmas": ["9", 0], "latent_image": ["7", 0]}, "class_type": "SamplerCustomAdvanced"},
+        "13": {"inputs": {"samples": ["12", 0], "vae": ["2", 2]}, "class_type": "VAEDecode"},
+        "14": {"inputs": {"images": ["13", 0], "fps": 24.0}, "class_type": "CreateVideo"},
+        "15": {"inputs": {"video": ["14", 0], "filename_prefix": f"t2v_{seed}", "format": "mp4", "codec": "h264"}, "class_type": "SaveVideo"}
+    }
+
+
+def timed(fn, jobs, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(jobs):
+            fn(i)
+        best = min(best, time.perf_counter() - start)
+    return round(best / jobs * 1e6, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    t2v = templates.get("ltx_t2v")
+    load_ms = round((time.perf_counter() - start) * 1000, 2)
+    prompts = [f"scene {i}: a boat sailing on calm ocean water at golden hour" for i in range(args.jobs)]
+
+    # Same graph either way
+    assert literal_t2v(prompts[0], 1) == t2v.instantiate(prompt=prompts[0], seed=1, filename_prefix="t2v_1")
+    assert json.loads(t2v.dumps(prompt=prompts[0], seed=1)) == t2v.instantiate(prompt=prompts[0], seed=1)
+
+    n, r = args.jobs, args.repeat
+    results = {
+        "jobs": n,
+        "template_load_ms": load_ms,
+        "us_per_job": {
+            "literal_build": timed(lambda i: literal_t2v(prompts[i], i), n, r),
+            "template_build": timed(lambda i: t2v.instantiate(prompt=prompts[i], seed=i, filename_prefix=f"t2v_{i}"), n, r),
+            "literal_build+json": timed(lambda i: json.dumps(literal_t2v(prompts[i], i)), n, r),
+            "template_build+json": timed(lambda i: json.dumps(t2v.instantiate(prompt=prompts[i], seed=i, filename_prefix=f"t2v_{i}")), n, r),
+            "template_dumps": timed(lambda i: t2v.dumps(prompt=prompts[i], seed=i, filename_prefix=f"t2v_{i}"), n, r),
+        },
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Status polling throughput: pooled keep-alive transport vs urlopen per call.
+
+N client threads (one per in-flight job) hammer a stub ComfyUI with the
+same calls the pipeline makes while waiting - GET /queue and
+GET /history/{id} - for a fixed time. Reports requests/s, latency
+percentiles and how many TCP connections each approach opened.
+
+The stub runs on asyncio in its own process, like the real aiohttp
+server, and the client threads are spread over --procs processes, so we
+measure HTTP cost rather than one GIL.
+
+Usage:
+    python bench/bench_transport.py
+    python bench/bench_transport.py --jobs 100 200 --seconds 5 --procs 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import transport
+
+WORKFLOW = {
+    "1": {"inputs": {"text": "boat"}, "class_type": "CLIPTextEncode"},
+    "2": {"inputs": {"images": ["1", 0], "filename_prefix": "bench"}, "class_type": "SaveImage"},
+}
+
+
+def urlopen_get(url):
+    """What comfyui_api.py / dispatcher.py used to do: new connection every call."""
+    with urllib.request.urlopen(urllib.request.Request(url), timeout=10) as resp:
+        return json.loads(resp.read().decode())
+
+
+def serve(port):
+    """
+    Minimal ComfyUI stand-in on asyncio - one event loop, no thread per
+    connection, like the real (aiohttp) server. Knows /prompt, /queue,
+    /history/{id} and /system_stats.
+    """
+    import asyncio
+    import uuid
+
+    pending = []
+
+    def reply(obj, code=200):
+        body = json.dumps(obj).encode()
+        head = (f"HTTP/1.1 {code} OK\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n").encode()
+        return head + body
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path, _ = line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b""):
+                        break
+                    k, _, v = h.decode().partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                n = int(headers.get("content-length", 0))
+                body = await reader.readexactly(n) if n else b""
+                if method == "POST" and path == "/prompt":
+                    pid = str(uuid.uuid4())
+                    pending.append([len(pending), pid, json.loads(body)["prompt"], {}, []])
+                    out = reply({"prompt_id": pid, "number": len(pending), "node_errors": {}})
+                elif path == "/queue":
+                    out = reply({"queue_running": pending[:1], "queue_pending": pending[1:20]})
+                elif path.startswith("/history/"):
+                    out = reply({})
+                elif path == "/system_stats":
+                    out = reply({"system": {}, "devices": []})
+                else:
+                    out = reply({"error": "not found"}, 404)
+                writer.write(out)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        writer.close()
+
+    async def main():
+        server = await asyncio.start_server(handle, "127.0.0.1", port, backlog=128)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def start_server():
+    """Stub server in its own process, so it doesn't share our GIL."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    proc = multiprocessing.Process(target=serve, args=(port,), daemon=True)
+    proc.start()
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            transport.get(f"{url}/system_stats", retries=0)
+            return proc, url
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise Exception("stub server didn't start")
+
+
+def client(args):
+    """One client process: `jobs` threads polling for `seconds`. Returns (latencies, errors, conns)."""
+    url, jobs, seconds, mode = args
+    if mode == "pooled":
+        pool = transport.Transport()
+        get = pool.get_json
+    else:
+        get = urlopen_get
+    pids = [transport.post_json(f"{url}/prompt", {"prompt": WORKFLOW})["prompt_id"] for _ in range(jobs)]
+    lat = [[] for _ in range(jobs)]
+    errors = [0]
+    stop = time.time() + seconds
+
+    def worker(i):
+        urls = (f"{url}/queue", f"{url}/history/{pids[i]}")
+        n = 0
+        while time.time() < stop:
+            t = time.perf_counter()
+            try:
+                get(urls[n % 2])
+            except Exception:
+                errors[0] += 1
+                continue
+            lat[i].append(time.perf_counter() - t)
+            n += 1
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(jobs)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    all_lat = [x for l in lat for x in l]
+    conns = pool.stats()["connections"] if mode == "pooled" else len(all_lat)
+    return all_lat, errors[0], conns
+
+
+def run(url, jobs, seconds, mode, procs):
+    shares = [jobs // procs + (1 if i < jobs % procs else 0) for i in range(procs)]
+    shares = [n for n in shares if n]
+    with multiprocessing.Pool(len(shares)) as mp:
+        parts = mp.map(client, [(url, n, seconds, mode) for n in shares])
+    all_lat = sorted(x for l, _, _ in parts for x in l)
+    q = statistics.quantiles(all_lat, n=100) if len(all_lat) > 1 else [0] * 99
+    return {
+        "jobs": jobs,
+        "client": mode,
+        "requests": len(all_lat),
+        "req_per_s": round(len(all_lat) / seconds),
+        "p50_ms": round(q[49] * 1000, 2),
+        "p99_ms": round(q[98] * 1000, 2),
+        "errors": sum(e for _, e, _ in parts),
+        "connections": sum(c for _, _, c in parts),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 10, 100, 200])
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--procs", type=int, default=4, help="client processes")
+    args = parser.parse_args()
+
+    results = []
+    proc, url = start_server()
+    try:
+        for jobs in args.jobs:
+            for mode in ("urlopen", "pooled"):
+                r = run(url, jobs, args.seconds, mode, args.procs)
+                results.append(r)
+                print(f"  {jobs:>4} jobs  {mode:<8} {r['req_per_s']:>7} req/s  "
+                      f"p50 {r['p50_ms']:>7}ms  p99 {r['p99_ms']:>8}ms  "
+                      f"conns {r['connections']:>6}  errors {r['errors']}")
+    finally:
+        proc.kill()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Orchestration benchmark suite - the client side only, on a CPU box.
+
+Everything runs against fake ComfyUI servers (pipeline/fake_comfy.py:
+/prompt, /queue, /history, /view, /upload/image, /system_stats, /ws)
+with fixed synthetic execution times and a seeded failure rate, so the
+GPU is out of the picture and what's left is our own overhead:
+
+    build       graph-building cost of the build_* functions
+    submit      factory.submit() -> result: per-job overhead, HTTP requests per job
+    fetch       submit with a project: outputs streamed through /view
+    upload      keyframes pushed to every worker with /upload/image
+    dispatch    dispatcher.dispatch() over a pool of fakes: routing cost, makespan vs ideal
+    assemble    assemble.plan() + stream-copy concat (skipped without ffmpeg)
+
+each at 1, 10, 100, 1000 jobs in flight. Results are one JSON document;
+--compare against an earlier one flags every metric that got worse by
+more than --tolerance and exits 1, for catching regressions.
+
+Usage:
+    python bench/suite.py --out bench/results.json
+    python bench/suite.py --levels 1 10 100 --only submit dispatch
+    python bench/suite.py --compare bench/results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import factory
+from pipeline import assemble, metrics, uploads
+from pipeline.fake_comfy import FakeComfy
+from pipeline.journal import Journal
+from pipeline.retrieve import Retriever
+
+LEVELS = (1, 10, 100, 1000)
+# Which way is better, for --compare. Anything not listed is informational.
+LOWER = {"build_us", "submit_ms", "ms_per_job", "requests_per_job", "overhead_ms", "route_us",
+         "makespan_s", "plan_ms", "seconds_per_clip", "failed_unexpected"}
+HIGHER = {"jobs_per_s", "efficiency", "mb_per_s", "clips_per_s"}
+
+
+def _quiet():
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def _reset(tmp):
+    factory.CACHE = None
+    factory.JOURNAL = None
+    factory.PROJECT = None
+    factory._retrievers.clear()
+    factory.Retriever = lambda server, project: Retriever(server, project, root=tmp)
+    metrics.RECORDER = metrics.Recorder(trace=None)
+
+
+def bench_build(n, args, tmp):
+    builders = (lambda i: factory.build_text_to_video(f"shot {i}", seed=i + 1),
+                lambda i: factory.build_text_to_image(f"shot {i}", seed=i + 1),
+                lambda i: factory.build_text_to_audio(f"shot {i}", 4, seed=i + 1))
+    for build in builders:
+        build(0)            # templates compile on first use - not what we're timing
+    start = time.perf_counter()
+    for i in range(n):
+        builders[i % 3](i)
+    took = time.perf_counter() - start
+    return {"graphs": n, "build_us": round(took / n * 1e6, 1)}
+
+
+def bench_submit(n, args, tmp, project=None):
+    _reset(tmp)
+    with FakeComfy(exec_time=args.exec_time, fail_rate=args.fail_rate, seed=args.seed,
+                   artifact_bytes=args.artifact_kb * 1024) as fake:
+        factory.COMFY = fake.url
+        wfs = [factory.build_text_to_image(f"shot {i}", seed=i + 1) for i in range(n)]
+        before = fake.requests
+        start = time.perf_counter()
+        jobs = [factory.submit(wf, label=f"shot {i}", project=project) for i, wf in enumerate(wfs)]
+        submitted = time.perf_counter()
+        failed = 0
+        for job in jobs:
+            try:
+                job.result(timeout=600)
+            except Exception:
+                failed += 1
+        done = time.perf_counter()
+        requests = fake.requests - before
+        expected = sum(1 for h in fake.history.values() if h["status"]["status_str"] == "error")
+    wall = done - start
+    gpu = n * args.exec_time
+    out = {"jobs": n, "submit_ms": round((submitted - start) / n * 1000, 3),
+           "ms_per_job": round(wall / n * 1000, 3), "jobs_per_s": round(n / wall, 1),
+           "overhead_ms": round(max(0.0, wall - gpu) / n * 1000, 3),
+           "requests_per_job": round(requests / n, 2), "failed": failed,
+           "failed_unexpected": failed - expected}
+    if project:
+        nbytes = sum(tr.download_bytes for tr in metrics.RECORDER.traces())
+        out["mb_per_s"] = round(nbytes / 1e6 / wall, 1)
+    return out
+
+
+def bench_fetch(n, args, tmp):
+    return bench_submit(n, args, tmp, project="bench")
+
+
+def bench_upload(n, args, tmp, workers=4):
+    fakes = [FakeComfy(exec_time=0).start() for _ in range(workers)]
+    data = os.urandom(args.artifact_kb * 1024)
+    try:
+        start = time.perf_counter()
+        for i in range(n):
+            for f in fakes:
+                uploads.upload_image(f.url, f"kf_{i}.png", data)
+        took = time.perf_counter() - start
+    finally:
+        for f in fakes:
+            f.stop()
+    return {"images": n, "workers": workers, "ms_per_job": round(took / n * 1000, 3),
+            "mb_per_s": round(n * workers * len(data) / 1e6 / took, 1)}
+
+
+def bench_dispatch(n, args, tmp, workers=4):
+    import dispatcher
+    _reset(tmp)
+    fakes = [FakeComfy(exec_time=args.exec_time, fail_rate=args.fail_rate, seed=args.seed + i).start()
+             for i in range(workers)]
+    dispatcher.GPU_CONFIG = {i: {"name": f"fake {i}", "role": "worker", "vram_gb": 24, "service": None,
+                                 "comfyui": f.url} for i, f in enumerate(fakes)}
+    dispatcher._scheduler = None
+    metrics.RECORDER.trace = Journal(os.path.join(tmp, "journal.jsonl"))
+    try:
+        kinds = (factory.build_text_to_video, factory.build_text_to_image)
+        wfs = [kinds[i % 2](f"shot {i}", seed=i + 1) for i in range(n)]
+        sched = dispatcher.get_scheduler()
+        start = time.perf_counter()
+        jobs = [dispatcher.dispatch(wf, label=f"shot {i}") for i, wf in enumerate(wfs)]
+        routed = time.perf_counter()
+        failed = 0
+        for job in jobs:
+            try:
+                job.result(timeout=600)
+            except Exception:
+                failed += 1
+        wall = time.perf_counter() - start
+        swaps = sum(s["swaps"] for s in sched.stats().values())
+        expected = sum(1 for f in fakes for h in f.history.values() if h["status"]["status_str"] == "error")
+    finally:
+        if dispatcher._scheduler is not None:
+            dispatcher._scheduler.close()
+            dispatcher._scheduler = None
+        metrics.RECORDER.trace.close()
+        for f in fakes:
+            f.stop()
+    ideal = n * args.exec_time / workers
+    return {"jobs": n, "workers": workers, "route_us": round((routed - start) / n * 1e6, 1),
+            "makespan_s": round(wall, 3), "ideal_s": round(ideal, 3),
+            "efficiency": round(ideal / wall, 3) if wall else 0.0, "jobs_per_s": round(n / wall, 1),
+            "swaps": swaps, "failed": failed, "failed_unexpected": failed - expected}
+
+
+def bench_assemble(n, args, tmp):
+    if not shutil.which(assemble.FFMPEG) or not shutil.which(assemble.FFPROBE):
+        return {"skipped": "ffmpeg/ffprobe not found"}
+    n = min(n, args.max_clips)
+    src = os.path.join(tmp, "clip.mp4")
+    if not os.path.exists(src):
+        subprocess.run([assemble.FFMPEG, "-loglevel", "error", "-y", "-f", "lavfi", "-i",
+                        "testsrc=size=320x192:rate=24", "-frames:v", "65", "-c:v", "libx264",
+                        "-pix_fmt", "yuv420p", src], check=True)
+    clips = []
+    for i in range(n):
+        dst = os.path.join(tmp, f"clip_{i}.mp4")
+        if not os.path.exists(dst):
+            shutil.copy(src, dst)
+        clips.append(dst)
+    start = time.perf_counter()
+    assemble.plan(clips)
+    planned = time.perf_counter()
+    with _quiet():
+        assemble.assemble(clips, os.path.join(tmp, f"cut_{n}.mp4"))
+    took = time.perf_counter() - start
+    return {"clips": n, "plan_ms": round((planned - start) * 1000, 2),
+            "seconds_per_clip": round(took / n, 4), "clips_per_s": round(n / took, 1)}
+
+
+BENCHES = {"build": bench_build, "submit": bench_submit, "fetch": bench_fetch, "upload": bench_upload,
+           "dispatch": bench_dispatch, "assemble": bench_assemble}
+
+
+def compare(old, new, tolerance):
+    """Metrics that got worse by more than tolerance: [(bench, level, metric, old, new)]."""
+    worse = []
+    for name, levels in new["results"].items():
+        for level, res in levels.items():
+            prev = old.get("results", {}).get(name, {}).get(level, {})
+            for metric, value in res.items():
+                was = prev.get(metric)
+                if not isinstance(value, (int, float)) or not isinstance(was, (int, float)):
+                    continue
+                if metric in LOWER and value > was * (1 + tolerance) and value - was > 1e-3:
+                    worse.append((name, level, metric, was, value))
+                elif metric in HIGHER and value < was * (1 - tolerance):
+                    worse.append((name, level, metric, was, value))
+    return worse
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--levels", type=int, nargs="+", default=list(LEVELS), help="jobs in flight")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHES), help="run just these")
+    parser.add_argument("--exec-time", type=float, default=0.001, help="fake GPU seconds per prompt")
+    parser.add_argument("--fail-rate", type=float, default=0.02, help="share of prompts the fakes fail")
+    parser.add_argument("--artifact-kb", type=int, default=256, help="size of each output / upload")
+    parser.add_argument("--max-clips", type=int, default=100, help="cap for the assemble bench")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON here too")
+    parser.add_argument("--compare", help="earlier results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging")
+    args = parser.parse_args()
+
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        rev = None
+    doc = {"suite": "orchestration", "git": rev, "python": platform.python_version(),
+           "machine": platform.machine(), "cpus": os.cpu_count(), "time": time.time(),
+           "params": {"exec_time": args.exec_time, "fail_rate": args.fail_rate,
+                      "artifact_kb": args.artifact_kb, "seed": args.seed},
+           "results": {}}
+    tmp = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        for name in args.only or list(BENCHES):
+            doc["results"][name] = {}
+            for n in args.levels:
+                with _quiet():
+                    res = BENCHES[name](n, args, tmp)
+                doc["results"][name][str(n)] = res
+                shown = "  ".join(f"{k}={v}" for k, v in res.items())
+                print(f"  {name:<9} {n:>5}  {shown}", file=sys.stderr)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    text = json.dumps(doc, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            worse = compare(json.load(f), doc, args.tolerance)
+        for name, level, metric, was, now in worse:
+            print(f"  REGRESSION {name} @ {level}: {metric} {was} -> {now}", file=sys.stderr)
+        if worse:
+            sys.exit(1)
+        print(f"  no regressions beyond {args.tolerance:.0%}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+CachedCLIPTextEncode - CLIPTextEncode that remembers what it encoded.
+
+ComfyUI's own cache only keeps the previous prompt's node outputs, so the
+same negative prompt is pushed through T5-XXL again after every Flux job
+in a mixed shot list. This node keeps an LRU of conditioning keyed on
+(text encoder, text) for the life of the server process.
+
+The client fills `encoder` with the loader's settings (see
+pipeline/conditioning.py), because the CLIP object itself is rebuilt
+whenever ComfyUI drops the loader's output. Patched CLIPs (LoRA hooks)
+bypass the cache.
+
+Install: copy this folder into ComfyUI/custom_nodes/ (setup_comfyui.py
+does it) and restart. GET /prompt_cache/stats shows hits and misses.
+"""
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = 128       # T5-XXL conditioning is ~4MB each, kept on the CPU
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+STATS = {"hits": 0, "misses": 0, "bypassed": 0}
+
+
+def _encode(clip, text):
+    tokens = clip.tokenize(text)
+    if hasattr(clip, "encode_from_tokens_scheduled"):
+        return clip.encode_from_tokens_scheduled(tokens)
+    cond, pooled = clip.encode_from_tokens(tokens, return_pooled=True)
+    return [[cond, {"pooled_output": pooled}]]
+
+
+class CachedCLIPTextEncode:
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "text": ("STRING", {"multiline": True, "dynamicPrompts": True}),
+                "clip": ("CLIP",),
+            },
+            "optional": {
+                "encoder": ("STRING", {"default": ""}),
+            },
+        }
+
+    RETURN_TYPES = ("CONDITIONING",)
+    FUNCTION = "encode"
+    CATEGORY = "conditioning"
+
+    def encode(self, clip, text, encoder=""):
+        if not encoder or getattr(clip.patcher, "patches", None):
+            STATS["bypassed"] += 1
+            return (_encode(clip, text),)
+        key = (encoder, text)
+        with _lock:
+            cond = _cache.get(key)
+            if cond is not None:
+                _cache.move_to_end(key)
+                STATS["hits"] += 1
+                return (cond,)
+        cond = _encode(clip, text)
+        with _lock:
+            _cache[key] = cond
+            while len(_cache) > MAX_ENTRIES:
+                _cache.popitem(last=False)
+            STATS["misses"] += 1
+        return (cond,)
+
+
+NODE_CLASS_MAPPINGS = {"CachedCLIPTextEncode": CachedCLIPTextEncode}
+NODE_DISPLAY_NAME_MAPPINGS = {"CachedCLIPTextEncode": "CLIP Text Encode (cached)"}
+
+try:
+    from aiohttp import web
+    from server import PromptServer
+
+    @PromptServer.instance.routes.get("/prompt_cache/stats")
+    async def _stats(request):
+        with _lock:
+            return web.json_response({**STATS, "entries": len(_cache)})
+except Exception:
+    pass    # imported outside ComfyUI
@@ -4,112 +4,799 @@ One script. Images, Videos, Audio. Done.
 """
 import json
 import time
-import requests
 import random
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future
+from fractions import Fraction
+from pathlib import Path
+
+from pipeline.completion import get_engine
+from pipeline.cache import ResultCache, workflow_key
+from pipeline.journal import Journal
+from pipeline.assemble import Clip, Track
+from pipeline.retrieve import PROJECTS_DIR, Retriever, artifacts
+from pipeline import (admission, affinity, assemble as _assemble, conditioning, dag, jobs, journal, longform,
+                      metrics, sweep as _sweep, templates, transport, tts, uploads, vace, validation)
 
 COMFY = "http://localhost:8188"
+# Chatterbox TTS (GPU 4) - text_to_speech() voiceovers
+CHATTERBOX = "http://localhost:8880"
 
-def queue(workflow):
-    """Queue workflow, wait for completion, return output."""
-    r = requests.post(f"{COMFY}/prompt", json={"prompt": workflow}, timeout=10)
-    if r.status_code != 200:
-        raise Exception(f"Queue failed: {r.text[:200]}")
-    
+# Same graph (ignoring filename_prefix) = same outputs, straight from disk.
+# Set to None to always regenerate.
+CACHE = ResultCache()
+
+# Every queued prompt is logged to jobs/journal.jsonl. Rerun a batch
+# after a crash and jobs still on the GPU are picked up, not requeued.
+# Set to None to turn off.
+JOURNAL = Journal()
+
+# Project name to download every output into (projects/{PROJECT}/scenes|audio).
+# None leaves files on the ComfyUI box; pass project= per call to override.
+PROJECT = None
+_retrievers = {}
+_retrievers_lock = threading.Lock()
+
+# Encode each prompt text once per server instead of once per job, on
+# servers with the CachedCLIPTextEncode node (custom_nodes/). Others get
+# plain CLIPTextEncode, so this is safe to leave on.
+PROMPT_CACHE = True
+
+# Check each job's estimated peak VRAM against COMFY's /system_stats before
+# posting (pipeline/admission.py): too big for the card -> downscaled, card
+# busy with other processes -> the Job still comes back at once and is posted
+# when there's room, or fails after ADMIT_WAIT seconds. None = post blindly.
+ADMIT_WAIT = 300
+
+# Check each graph against COMFY's node definitions and model files before
+# posting (pipeline/validation.py, cached /object_info + /models): a wrong
+# checkpoint name fails here, not minutes into the queue. False = post unchecked.
+VALIDATE = True
+
+_recovered = set()
+_recover_lock = threading.Lock()
+
+def resume(server=None):
+    """Reconcile the journal with what the server actually has. Runs once per server."""
+    server = server or COMFY
+    with _recover_lock:
+        if JOURNAL is None or server in _recovered:
+            return None
+        _recovered.add(server)
+        if not JOURNAL.in_flight(server):
+            return None
+        r = JOURNAL.recover(server)
+    print(f"  Journal: {r['done']} finished while we were away, {r['running']} still running, "
+          f"{r['lost']} lost (will rerun), {r['error']} failed")
+    return r
+
+def _resume(workflow, key, label):
+    """Job for this workflow left over from an earlier run, or None."""
+    resume()
+    entry = JOURNAL.get(key)
+    if entry is None or entry.get("server") != COMFY:
+        return None
+    if entry["status"] == journal.DONE:
+        # Only a job that finished while we were away (the interrupted batch being rerun).
+        # Anything else finished is the result cache's call - CACHE = None means regenerate.
+        if not JOURNAL.claim(key):
+            return None
+        done = Future()
+        done.set_result(entry["outputs"])
+        job = jobs.Job(entry["pid"], done, workflow, label)
+        job.cached = True
+        job.cache_key = key
+        return job
+    if entry["status"] in (journal.SUBMITTED, journal.RUNNING):
+        job = jobs.Job(entry["pid"], get_engine(COMFY).adopt(entry["pid"]), workflow, label)
+        job.cache_key = key
+        JOURNAL.watch(job, key)
+        return job
+    return None     # failed or lost - run it again
+
+def submit(workflow, label="", use_cache=True, project=None):
+    """Queue workflow and return a Job right away (see pipeline/jobs.py).
+
+    With a project (or PROJECT set), the Job finishes once its output
+    files are in projects/{project}/ - job.artifacts lists them.
+    """
+    project = project or PROJECT
+    key = None
+    if (CACHE is not None or JOURNAL is not None) and use_cache:
+        key = workflow_key(workflow)
+    job = None
+    if CACHE is not None and key:
+        hit = CACHE.get(workflow, key)
+        if hit:
+            done = Future()
+            done.set_result(hit["outputs"])
+            job = jobs.Job(hit.get("prompt_id") or key, done, workflow, label)
+            job.cached = True
+            job.cache_key = key
+            job.artifacts = [a["path"] for a in hit["artifacts"]]
+            if job.artifacts or not project:
+                metrics.RECORDER.cache_hit()
+                return job
+    if job is None and JOURNAL is not None and key:
+        job = _resume(workflow, key, label)
+
+    deferred = False
+    if job is None:
+        # only now that it's really going to the GPU - a cache hit never touches the server
+        workflow, need = _admit(workflow, label)
+        if VALIDATE:
+            validation.check(workflow, COMFY, label)
+        if _fits(COMFY, need):
+            job = _post(workflow, key, label, COMFY)
+        else:
+            job = _defer(workflow, key, label, need)
+            deferred = True
+    if project:
+        job = _fetching(job, project)
+    if job.trace is not None or deferred:
+        job.add_done_callback(metrics.RECORDER.job_done)     # after the download, so it's in the trace
+    if key and CACHE is not None:
+        job.add_done_callback(_remember)
+    return job
+
+def _post(workflow, key, label, server):
+    """POST workflow to server's /prompt. Job tracking it."""
+    engine = get_engine(server)
+    r = transport.post(f"{server}/prompt", json={"prompt": workflow, "client_id": engine.client_id}, timeout=10)
+    if r.status != 200:
+        raise validation.rejection(r.status, r.text, label)
     prompt_id = r.json()['prompt_id']
-    print(f"  Queued: {prompt_id[:8]}...", end="", flush=True)
-    
-    for i in range(120):
-        time.sleep(5)
-        hist = requests.get(f"{COMFY}/history/{prompt_id}").json()
-        if prompt_id in hist:
-            status = hist[prompt_id]['status']['status_str']
-            if status == 'success':
-                print(f" Done ({i*5}s)")
-                return hist[prompt_id]['outputs']
-            elif status == 'error':
-                msgs = hist[prompt_id]['status'].get('messages', [])
-                err = [m for m in msgs if m[0] == 'execution_error']
-                if err:
-                    raise Exception(err[0][1].get('exception_message', 'Unknown error'))
-                raise Exception("Workflow failed")
-        print(".", end="", flush=True)
-    raise Exception("Timeout")
+    # Resolved by the websocket the moment ComfyUI finishes, not on a 5s poll.
+    job = jobs.Job(prompt_id, engine.track(prompt_id), workflow, label)
+    job.cache_key = key
+    metrics.RECORDER.watch(engine)
+    job.trace = metrics.RECORDER.start(prompt_id, workflow, label, server, submitted=job.submitted)
+    if JOURNAL is not None:
+        JOURNAL.watch(job, key or workflow_key(workflow), server)
+    return job
+
+def _admit(workflow, label=""):
+    """(workflow as it should be posted to COMFY, GB it needs): downscaled if the card
+    can't hold it. The GB is None when there's nothing to wait for (no stats, ADMIT_WAIT None)."""
+    if ADMIT_WAIT is None:
+        return workflow, None
+    cap = admission.server_capacity(COMFY)
+    if cap is None:
+        return workflow, None   # no stats (old server, CPU) - let ComfyUI decide
+    total, _ = cap
+    need = admission.estimate(workflow)
+    if need > total - admission.HEADROOM_GB:
+        smaller = admission.downscale(workflow, total - admission.HEADROOM_GB)
+        if smaller is None:
+            raise Exception(f"{label or 'Job'} needs ~{need:.1f}GB VRAM, {COMFY} has {total:.1f}GB")
+        print(f"[ADMIT] {label or 'job'} needs ~{need:.1f}GB of {total:.1f}GB - downscaled to "
+              f"~{admission.estimate(smaller):.1f}GB")
+        workflow, need = smaller, admission.estimate(smaller)
+    return workflow, need
+
+def _room(server):
+    """GB server can give a job right now, None if it can't tell."""
+    cap = admission.server_capacity(server)
+    return None if cap is None else cap[0] - cap[1] - admission.HEADROOM_GB
+
+def _fits(server, need):
+    room = _room(server) if need is not None else None
+    return room is None or need <= room
+
+# Jobs waiting for VRAM other processes (Chatterbox, a notebook) hold: submit()
+# returns their Job at once and one thread posts them, oldest first, when there's room.
+_deferred = []
+_deferred_cond = threading.Condition()
+_deferrer = None
+
+def _defer(workflow, key, label, need):
+    """Job that is posted once COMFY has need GB free; fails after ADMIT_WAIT seconds without."""
+    global _deferrer
+    job = jobs.Job(None, Future(), workflow, label)
+    job.cache_key = key
+    print(f"[ADMIT] {label or 'job'} waiting for VRAM: needs ~{need:.1f}GB, "
+          f"{COMFY} has ~{_room(COMFY) or 0:.1f}GB to spare")
+    with _deferred_cond:
+        _deferred.append((job, key, need, COMFY, time.time() + ADMIT_WAIT))
+        if _deferrer is None:
+            _deferrer = threading.Thread(target=_admit_loop, name="factory-admit", daemon=True)
+            _deferrer.start()
+        _deferred_cond.notify()
+    return job
+
+def _admit_loop():
+    while True:
+        with _deferred_cond:
+            while not _deferred:
+                _deferred_cond.wait()
+            waiting = list(_deferred)
+        rooms = {}
+        for entry in waiting:
+            job, key, need, server, deadline = entry
+            if server not in rooms:
+                rooms[server] = _room(server)
+            room = rooms[server]
+            if room is not None and need > room and time.time() < deadline:
+                continue
+            with _deferred_cond:
+                _deferred.remove(entry)
+            if room is not None and need > room:
+                job.future.set_exception(Exception(
+                    f"{job.label or 'Job'} waited {ADMIT_WAIT}s for ~{need:.1f}GB VRAM on {server}, "
+                    f"other processes never left more than {room:.1f}GB"))
+                continue
+            if room is not None:
+                rooms[server] = room - need      # the next one waits for this one to load
+            try:
+                posted = _post(job.workflow, key, job.label, server)
+            except Exception as e:
+                job.future.set_exception(e)
+                continue
+            job.prompt_id, job.trace = posted.prompt_id, posted.trace
+            posted.future.add_done_callback(lambda f, job=job: _forward(f, job.future))
+        time.sleep(2)
+
+def _forward(src, dst):
+    """Settle Future dst the way src settled."""
+    if src.exception() is not None:
+        dst.set_exception(src.exception())
+    else:
+        dst.set_result(src.result())
+
+def _fetching(job, project):
+    """Same job, but done only once its files are downloaded into the project."""
+    fetcher = _retriever(project)
+    outer = Future()
+    wrapped = jobs.Job(job.prompt_id, outer, job.workflow, job.label)
+    wrapped.cached = job.cached
+    wrapped.cache_key = job.cache_key
+    wrapped.submitted = job.submitted
+    wrapped.trace = job.trace
+    started = []
+
+    def fetched(f):
+        if f.exception() is not None:
+            outer.set_exception(f.exception())
+            return
+        wrapped.artifacts = [str(p) for p in f.result()]
+        _downloaded(job.prompt_id, started[0], f.result())
+        outer.set_result(job.result())
+
+    def finished(j):
+        wrapped.prompt_id, wrapped.trace = j.prompt_id, j.trace     # a deferred job only has them now
+        if j.exception() is not None:
+            outer.set_exception(j.exception())
+            return
+        started.append(time.time())
+        fetcher.fetch(j.result()).add_done_callback(fetched)
+
+    job.add_done_callback(finished)
+    return wrapped
+
+def _downloaded(prompt_id, started, paths):
+    nbytes = sum(Path(p).stat().st_size for p in paths if Path(p).exists())
+    metrics.RECORDER.downloaded(prompt_id, time.time() - started, nbytes)
+
+def _retriever(project, server=None):
+    server = server or COMFY
+    with _retrievers_lock:
+        r = _retrievers.get((server, project))
+        if r is None:
+            r = _retrievers[(server, project)] = Retriever(server, project)
+        return r
+
+def _remember(job):
+    """Store a finished job's outputs (and downloaded files) in the result cache."""
+    if job.exception() is None:
+        CACHE.put(job.workflow, job.result(), artifacts=job.artifacts, prompt_id=job.prompt_id, key=job.cache_key,
+                  server=COMFY)
+
+def queue(workflow, timeout=600, use_cache=True, project=None):
+    """Queue workflow, wait for completion, return output."""
+    job = submit(workflow, use_cache=use_cache, project=project)
+    if job.cached and job.done():
+        print(f"  Cached: {job.prompt_id[:8]}... (no GPU)")
+        return job.result()
+    print(f"  Queued: {job.prompt_id[:8] if job.prompt_id else 'waiting for VRAM'}...", end="", flush=True)
+    try:
+        outputs = job.result(timeout)
+    except TimeoutError:
+        raise Exception("Timeout") from None
+    tr = job.trace
+    if tr is not None and tr.execution is not None:
+        print(f" Done ({tr.execution:.1f}s on the GPU, {tr.queue_wait:.1f}s queued)")
+    else:
+        print(f" Done ({job.elapsed:.1f}s)")
+    if job.artifacts:
+        print(f"  Saved: {', '.join(Path(p).name for p in job.artifacts)}")
+    return outputs
+
+def gather(workflows, window=None, timeout=None, group_models=True, project=None):
+    """Submit many workflows back-to-back, yield Jobs as they finish.
+
+    workflows: dicts, (label, dict) tuples, or affinity.Item for a
+    priority/deadline. Build them with the build_* functions below.
+    group_models runs jobs that share checkpoints back to back so
+    ComfyUI isn't reloading models between every prompt. job.index is
+    always the position in the list you passed in. With a project, each
+    job's files stream into projects/{project}/ while the rest generate.
+    """
+    def _submit(wf, label=""):
+        return submit(wf, label=label, project=project)
+
+    items, report = affinity.order(workflows) if group_models else (None, None)
+    if items is None:
+        yield from jobs.gather(_submit, workflows, window, timeout)
+        return
+    if report["avoided"]:
+        print(f"  Model swaps: {report['swaps']} (arrival order: {report['fifo_swaps']})")
+    refs = [it.ref for it in items]
+    for job in jobs.gather(_submit, [(it.label, it.workflow) for it in items], window, timeout):
+        job.index = refs[job.index]
+        yield job
+
+as_completed = jobs.as_completed
+
+def _encodes(workflow):
+    """Use the server's prompt-encoding cache if it has one."""
+    return conditioning.for_backend(workflow, COMFY) if PROMPT_CACHE else workflow
+
+def build_text_to_video(prompt, seed=None, frames=65, width=768, height=512):
+    """Workflow dict for text_to_video(). At most one /object_info lookup per server."""
+    seed = seed or random.randint(0, 2**32)
+    return _encodes(templates.get("ltx_t2v").instantiate(
+        prompt=prompt, seed=seed, frames=frames, width=width, height=height, filename_prefix=f"t2v_{seed}"))
+
+def text_to_video_async(prompt, seed=None, frames=65, width=768, height=512):
+    """text_to_video() without the wait - returns a Job."""
+    print(f"[TEXT->VIDEO] {prompt[:50]}...")
+    return submit(build_text_to_video(prompt, seed, frames, width, height), label=prompt[:50])
 
 def text_to_video(prompt, seed=None, frames=65, width=768, height=512):
     """Generate video from text prompt. TESTED WORKING."""
-    seed = seed or random.randint(0, 2**32)
     print(f"[TEXT->VIDEO] {prompt[:50]}...")
-    workflow = {
-        "1": {"inputs": {"clip_name": "t5xxl_fp16.safetensors", "type": "ltxv"}, "class_type": "CLIPLoader"},
-        "2": {"inputs": {"ckpt_name": "ltxv-13b-0.9.8-distilled-fp8.safetensors"}, "class_type": "CheckpointLoaderSimple"},
-        "3": {"inputs": {"max_shift": 2.05, "base_shift": 0.95, "model": ["2", 0]}, "class_type": "ModelSamplingLTXV"},
-        "4": {"inputs": {"text": prompt, "clip": ["1", 0]}, "class_type": "CLIPTextEncode"},
-        "5": {"inputs": {"text": "low quality, blurry, distorted", "clip": ["1", 0]}, "class_type": "CLIPTextEncode"},
-        "6": {"inputs": {"frame_rate": 24.0, "positive": ["4", 0], "negative": ["5", 0]}, "class_type": "LTXVConditioning"},
-        "7": {"inputs": {"width": width, "height": height, "length": frames, "batch_size": 1}, "class_type": "EmptyLTXVLatentVideo"},
-        "8": {"inputs": {"sampler_name": "euler"}, "class_type": "KSamplerSelect"},
-        "9": {"inputs": {"scheduler": "linear_quadratic", "steps": 25, "denoise": 1.0, "model": ["3", 0]}, "class_type": "BasicScheduler"},
-        "10": {"inputs": {"noise_seed": seed}, "class_type": "RandomNoise"},
-        "11": {"inputs": {"cfg": 1.0, "model": ["3", 0], "positive": ["6", 0], "negative": ["6", 1]}, "class_type": "CFGGuider"},
-        "12": {"inputs": {"noise": ["10", 0], "guider": ["11", 0], "sampler": ["8", 0], "sigmas": ["9", 0], "latent_image": ["7", 0]}, "class_type": "SamplerCustomAdvanced"},
-        "13": {"inputs": {"samples": ["12", 0], "vae": ["2", 2]}, "class_type": "VAEDecode"},
-        "14": {"inputs": {"images": ["13", 0], "fps": 24.0}, "class_type": "CreateVideo"},
-        "15": {"inputs": {"video": ["14", 0], "filename_prefix": f"t2v_{seed}", "format": "mp4", "codec": "h264"}, "class_type": "SaveVideo"}
-    }
-    return queue(workflow)
+    return queue(build_text_to_video(prompt, seed, frames, width, height))
 
-def image_to_video(image_path, prompt, seed=None, frames=65):
-    """Generate video from image + prompt. TESTED WORKING."""
+def build_preview(prompt, seed=None, frames=65, width=384, height=256, steps=8):
+    """Workflow dict for preview(): half-size, 8 steps, latent saved for refine()."""
+    seed = seed or random.randint(0, 2**32)
+    return _encodes(templates.get("ltx_t2v_preview").instantiate(
+        prompt=prompt, seed=seed, frames=frames, width=width, height=height, steps=steps,
+        filename_prefix=f"preview_{seed}", latent_prefix=f"latents/preview_{seed}"))
+
+def preview_async(prompt, seed=None, frames=65, width=384, height=256, steps=8):
+    """preview() without the wait - returns a Job."""
+    print(f"[PREVIEW] {prompt[:50]}...")
+    return submit(build_preview(prompt, seed, frames, width, height, steps), label=prompt[:50])
+
+def preview(prompt, seed=None, frames=65, width=384, height=256, steps=8):
+    """Quick low-res draft of text_to_video (~1/10 the GPU). Returns the finished Job - refine(job) if it's a keeper."""
+    job = preview_async(prompt, seed, frames, width, height, steps)
+    print(f"  Queued: {job.prompt_id[:8] if job.prompt_id else 'waiting for VRAM'}...", end="", flush=True)
+    job.result(600)
+    print(f" Done ({job.elapsed:.1f}s)")
+    return job
+
+def build_refine(job, steps=8, strength=0.45):
+    """Workflow dict for refine(): 2x latent upscale of a preview, then a short denoise at full size.
+
+    Runs on the server that rendered the preview (its latent is read from output/).
+    """
+    latents = [r for r in artifacts(job.result(), include_temp=True) if r["filename"].endswith(".latent")]
+    if not latents:
+        raise Exception("refine() needs a preview() job - this one saved no latent")
+    src = job.workflow
+    seed = src["10"]["inputs"]["noise_seed"]
+    return _encodes(templates.get("ltx_refine").instantiate(
+        prompt=src["4"]["inputs"]["text"], negative=src["5"]["inputs"]["text"],
+        latent=uploads.view_ref(latents[0]), seed=seed, steps=steps, strength=strength,
+        filename_prefix=f"t2v_{seed}_refined"))
+
+def refine_async(job, steps=8, strength=0.45):
+    """refine() without the wait - returns a Job."""
+    print(f"[REFINE] {job.label or job.prompt_id[:8]}...")
+    return submit(build_refine(job, steps, strength), label=job.label)
+
+def refine(job, steps=8, strength=0.45):
+    """Turn an approved preview into the full 768x512 clip without starting from noise."""
+    print(f"[REFINE] {job.label or job.prompt_id[:8]}...")
+    return queue(build_refine(job, steps, strength))
+
+def build_image_to_video(image_path, prompt, seed=None, frames=65):
+    """Workflow dict for image_to_video(). At most one /object_info lookup per server."""
     seed = seed or random.randint(0, 2**32)
+    return _encodes(templates.get("ltx_i2v").instantiate(
+        image=image_path, prompt=prompt, seed=seed, frames=frames, filename_prefix=f"i2v_{seed}"))
+
+def image_to_video_async(image_path, prompt, seed=None, frames=65):
+    """image_to_video() without the wait - returns a Job."""
     print(f"[IMAGE->VIDEO] {image_path} | {prompt[:30]}...")
-    workflow = {
-        "1": {"inputs": {"clip_name": "t5xxl_fp16.safetensors", "type": "ltxv"}, "class_type": "CLIPLoader"},
-        "2": {"inputs": {"ckpt_name": "ltxv-13b-0.9.8-distilled-fp8.safetensors"}, "class_type": "CheckpointLoaderSimple"},
-        "3": {"inputs": {"max_shift": 2.05, "base_shift": 0.95, "model": ["2", 0]}, "class_type": "ModelSamplingLTXV"},
-        "4": {"inputs": {"text": prompt, "clip": ["1", 0]}, "class_type": "CLIPTextEncode"},
-        "5": {"inputs": {"text": "low quality, blurry, distorted", "clip": ["1", 0]}, "class_type": "CLIPTextEncode"},
-        "6": {"inputs": {"frame_rate": 24.0, "positive": ["4", 0], "negative": ["5", 0]}, "class_type": "LTXVConditioning"},
-        "20": {"inputs": {"image": image_path}, "class_type": "LoadImage"},
-        "21": {"inputs": {"positive": ["6", 0], "negative": ["6", 1], "vae": ["2", 2], "image": ["20", 0], "width": 768, "height": 512, "length": frames, "batch_size": 1, "strength": 0.9}, "class_type": "LTXVImgToVideo"},
-        "8": {"inputs": {"sampler_name": "euler"}, "class_type": "KSamplerSelect"},
-        "9": {"inputs": {"scheduler": "linear_quadratic", "steps": 25, "denoise": 1.0, "model": ["3", 0]}, "class_type": "BasicScheduler"},
-        "10": {"inputs": {"noise_seed": seed}, "class_type": "RandomNoise"},
-        "11": {"inputs": {"cfg": 1.0, "model": ["3", 0], "positive": ["21", 0], "negative": ["21", 1]}, "class_type": "CFGGuider"},
-        "12": {"inputs": {"noise": ["10", 0], "guider": ["11", 0], "sampler": ["8", 0], "sigmas": ["9", 0], "latent_image": ["21", 2]}, "class_type": "SamplerCustomAdvanced"},
-        "13": {"inputs": {"samples": ["12", 0], "vae": ["2", 2]}, "class_type": "VAEDecode"},
-        "14": {"inputs": {"images": ["13", 0], "fps": 24.0}, "class_type": "CreateVideo"},
-        "15": {"inputs": {"video": ["14", 0], "filename_prefix": f"i2v_{seed}", "format": "mp4", "codec": "h264"}, "class_type": "SaveVideo"}
-    }
-    return queue(workflow)
+    return submit(build_image_to_video(_input_image(image_path), prompt, seed, frames), label=prompt[:50])
+
+def image_to_video(image_path, prompt, seed=None, frames=65):
+    """Generate video from image + prompt. TESTED WORKING.
+
+    image_path: a local file (uploaded to COMFY unless it already has it) or a name in its input folder.
+    """
+    print(f"[IMAGE->VIDEO] {image_path} | {prompt[:30]}...")
+    return queue(build_image_to_video(_input_image(image_path), prompt, seed, frames))
+
+def build_text_to_image(prompt, seed=None, width=1024, height=576):
+    """Workflow dict for text_to_image(). At most one /object_info lookup per server."""
+    seed = seed or random.randint(0, 2**32)
+    return _encodes(templates.get("flux_t2i").instantiate(
+        prompt=prompt, seed=seed, width=width, height=height, filename_prefix=f"img_{seed}"))
+
+def text_to_image_async(prompt, seed=None, width=1024, height=576):
+    """text_to_image() without the wait - returns a Job."""
+    print(f"[TEXT->IMAGE] {prompt[:50]}...")
+    return submit(build_text_to_image(prompt, seed, width, height), label=prompt[:50])
 
 def text_to_image(prompt, seed=None, width=1024, height=576):
     """Generate image from text using Flux. TESTED WORKING."""
-    seed = seed or random.randint(0, 2**32)
     print(f"[TEXT->IMAGE] {prompt[:50]}...")
-    workflow = {
-        "1": {"inputs": {"unet_name": "flux1-dev-kontext_fp8_scaled.safetensors", "weight_dtype": "default"}, "class_type": "UNETLoader"},
-        "2": {"inputs": {"clip_name1": "clip_l.safetensors", "clip_name2": "t5xxl_fp16.safetensors", "type": "flux"}, "class_type": "DualCLIPLoader"},
-        "3": {"inputs": {"vae_name": "ae.safetensors"}, "class_type": "VAELoader"},
-        "4": {"inputs": {"text": prompt, "clip": ["2", 0]}, "class_type": "CLIPTextEncode"},
-        "5": {"inputs": {"text": "", "clip": ["2", 0]}, "class_type": "CLIPTextEncode"},
-        "6": {"inputs": {"width": width, "height": height, "batch_size": 1}, "class_type": "EmptySD3LatentImage"},
-        "7": {"inputs": {"model": ["1", 0], "positive": ["4", 0], "negative": ["5", 0], "latent_image": ["6", 0], "seed": seed, "steps": 20, "cfg": 3.5, "sampler_name": "euler", "scheduler": "simple", "denoise": 1.0}, "class_type": "KSampler"},
-        "8": {"inputs": {"samples": ["7", 0], "vae": ["3", 0]}, "class_type": "VAEDecode"},
-        "9": {"inputs": {"images": ["8", 0], "filename_prefix": f"img_{seed}"}, "class_type": "SaveImage"}
-    }
-    return queue(workflow)
+    return queue(build_text_to_image(prompt, seed, width, height))
+
+def build_text_to_audio(prompt, duration=8, seed=None):
+    """Workflow dict for text_to_audio(). No server calls."""
+    seed = seed or random.randint(0, 2**32)
+    return templates.get("mmaudio_t2a").instantiate(
+        prompt=prompt, duration=duration, seed=seed, filename_prefix=f"audio_{seed}")
+
+def text_to_audio_async(prompt, duration=8, seed=None):
+    """text_to_audio() without the wait - returns a Job."""
+    print(f"[TEXT->AUDIO] {prompt[:50]}...")
+    return submit(build_text_to_audio(prompt, duration, seed), label=prompt[:50])
 
 def text_to_audio(prompt, duration=8, seed=None):
     """Generate audio from text prompt using MMAudio."""
-    seed = seed or random.randint(0, 2**32)
     print(f"[TEXT->AUDIO] {prompt[:50]}...")
-    workflow = {
-        "1": {"inputs": {"mmaudio_model": "mmaudio_large_44k_v2_fp16.safetensors", "base_precision": "fp16"}, "class_type": "MMAudioModelLoader"},
-        "2": {"inputs": {"vae_model": "mmaudio_vae_44k_fp16.safetensors", "synchformer_model": "mmaudio_synchformer_fp16.safetensors", "clip_model": "apple_DFN5B-CLIP-ViT-H-14-384_fp16.safetensors", "mode": "44k", "precision": "fp16"}, "class_type": "MMAudioFeatureUtilsLoader"},
-        "3": {"inputs": {"mmaudio_model": ["1", 0], "feature_utils": ["2", 0], "duration": duration, "steps": 25, "cfg": 4.5, "seed": seed, "prompt": prompt, "negative_prompt": "noise, static, distortion", "mask_away_clip": False, "force_offload": True}, "class_type": "MMAudioSampler"},
-        "4": {"inputs": {"audio": ["3", 0], "filename_prefix": f"audio_{seed}"}, "class_type": "SaveAudio"}
-    }
-    return queue(workflow)
+    return queue(build_text_to_audio(prompt, duration, seed))
+
+def text_to_speech(script, voice=None, project=None, output=None, pause=tts.PAUSE, **params):
+    """Voiceover for a script with Chatterbox: sentences synthesized in parallel, cached, one WAV.
+
+    params go to /generate as they are (exaggeration, cfg_weight, ...).
+    Default output is projects/{project}/audio/voiceover_<hash>.wav, or
+    cache/tts/tracks/ without a project. Returns the Path - use it as an
+    assemble() audio track.
+    """
+    project = project or PROJECT
+    if output is None:
+        name = f"voiceover_{tts.SYNTH.key(script, voice, pause=pause, **params)[:12]}.wav"
+        output = (PROJECTS_DIR / project / "audio" if project else tts.SYNTH.root / "tracks") / name
+    lines = tts.sentences(script)
+    print(f"[TEXT->SPEECH] {len(lines)} sentences: {script[:50]}...")
+    started = time.time()
+    path = tts.speak(CHATTERBOX, script, output, voice, pause, **params)
+    print(f"[TEXT->SPEECH] {path} ({time.time() - started:.1f}s, cache {tts.SYNTH.stats()})")
+    return path
+
+def text_to_speech_async(script, voice=None, project=None, output=None, pause=tts.PAUSE, **params):
+    """text_to_speech() without the wait - returns a Future of the Path. Start it beside the video jobs."""
+    out = Future()
+
+    def run():
+        try:
+            out.set_result(text_to_speech(script, voice, project, output, pause, **params))
+        except Exception as e:
+            out.set_exception(e)
+    threading.Thread(target=run, name="tts", daemon=True).start()
+    return out
+
+def assemble(timeline, output=None, audio=(), project=None):
+    """Join finished clips into one mp4, audio tracks mixed in. Stream copy except trims/fades/crossfades.
+
+    timeline: Jobs / outputs / paths, or Clip(source, start=, end=, fade_in=, fade_out=, crossfade=).
+    audio: text_to_audio / text_to_speech results or Track(source, start=, volume=).
+    Default output is projects/{project}/final.mp4.
+    """
+    project = project or PROJECT
+    if output is None:
+        if project is None:
+            raise Exception("assemble() needs output= or a project")
+        output = PROJECTS_DIR / project / "final.mp4"
+    print(f"[ASSEMBLE] {len(timeline)} clips, {len(audio)} audio tracks...")
+    return _assemble.assemble(timeline, output, audio, project=project)
+
+# sweep(): template per kind
+SWEEP_KINDS = {"video": "ltx_t2v", "image": "flux_t2i", "i2v": "ltx_i2v"}
+
+def sweep(prompt, seeds=4, cfg=None, steps=None, strength=None, kind="video", image=None,
+          width=None, height=None, frames=None, max_batch=None, timeout=1800):
+    """Variations of one shot: seeds x cfg x steps x strength, batched where they can share a prompt.
+
+    seeds: how many (int) or which (list). cfg/steps/strength: a value or a list to sweep.
+    kind: "video" (text_to_video), "image" (text_to_image) or "i2v" (needs image=).
+    Variants differing only by seed share one batched latent, up to what fits
+    in VRAM (max_batch to cap it, 1 = the old one-prompt-per-seed loop).
+    Returns (variants, report): each variant is its settings plus seed,
+    batch_index and outputs; report has prompts and GPU-seconds per variant.
+    """
+    name = SWEEP_KINDS[kind]
+    seeds = [random.randint(1, 2**32) for _ in range(seeds)] if isinstance(seeds, int) else list(seeds)
+    fixed = {"prompt": prompt, "width": width, "height": height}
+    if kind != "image":
+        fixed["frames"] = frames
+    if kind == "i2v":
+        fixed["image"] = _input_image(image)
+    template = templates.get(name)
+    limit = _sweep.batch_limit(COMFY, lambda n: template.instantiate(**fixed, seed=seeds[0], batch=n))
+    limit = min(limit, max_batch or limit)
+
+    axes = {k: v for k, v in {"cfg": cfg, "steps": steps, "strength": strength}.items() if v is not None}
+    batches = _sweep.pack(_sweep.grid(seed=seeds, **axes), limit)
+    print(f"[SWEEP] {prompt[:40]}... {sum(map(len, batches))} variants in {len(batches)} prompts (batch <= {limit})")
+    started = time.time()
+    pending = []
+    for b in batches:
+        wf = template.instantiate(**fixed, **b.params, seed=b.seed, batch=len(b),
+                                  filename_prefix=f"sweep_{b.seed}_{len(pending)}")
+        wf = _encodes(_sweep.batched(wf, len(b)))
+        pending.append((b, wf, submit(wf, label=f"sweep {b.seed} x{len(b)}")))
+
+    variants, gpu_s = [], 0.0
+    for b, wf, job in pending:
+        outputs = job.result(timeout)
+        if not job.cached:
+            gpu_s += _sweep.gpu_seconds(COMFY, job.prompt_id) or job.elapsed
+        for k, (v, out) in enumerate(zip(b, _sweep.split(wf, outputs, len(b)))):
+            variants.append({**b.params, "seed": b.seed, "batch_index": k, "asked_seed": v["seed"], "outputs": out})
+    report = {"variants": len(variants), "prompts": len(batches), "batch_limit": limit,
+              "wall_s": round(time.time() - started, 2), "gpu_s": round(gpu_s, 2),
+              "gpu_s_per_variant": round(gpu_s / len(variants), 2) if variants else 0.0,
+              "variants_per_gpu_s": round(len(variants) / gpu_s, 3) if gpu_s else 0.0}
+    print(f"  {report['variants']} variants, {report['gpu_s']} GPU-s ({report['gpu_s_per_variant']}s each)")
+    return variants, report
+
+# produce(): how many jobs of each stage may be on the servers at once
+STAGE_LIMITS = {"keyframe": 2, "video": 4, "audio": 2, "speech": 2, "assemble": 1, "chunk": 1, "fetch": 4}
+# ...and which GPUs run each stage when produce() gets a Scheduler (dispatcher.py GPU_CONFIG roles)
+STAGE_ROLES = {"keyframe": "control", "video": "worker", "audio": "worker", "chunk": "worker", "edit": "worker"}
+
+def produce(shots, project=None, limits=None, scheduler=None, timeout=None):
+    """Shot list -> scenes -> video, every stage overlapped (pipeline/dag.py).
+
+    Each scene's image_to_video starts the moment its keyframe lands, its
+    text_to_audio and text_to_speech run beside it, and with a project the rough cut
+    (projects/{project}/rough_cut.mp4, then final.mp4) is re-assembled
+    as scenes finish in order.
+
+    shots: prompts, or dicts with prompt, keyframe (image prompt, default
+    prompt), audio (prompt, default none), voiceover (narration text,
+    default none), voice, seed, frames.
+    scheduler: spread stages over GPUs by STAGE_ROLES instead of COMFY.
+    Returns {"final", "scenes", "failed", "report"}.
+    """
+    project = project or PROJECT
+    shots = [_shot(s) for s in shots]
+    g = dag.Graph({**STAGE_LIMITS, **(limits or {})})
+    print(f"[PRODUCE] {len(shots)} scenes" + (f" -> projects/{project}/" if project else ""))
+
+    def run(stage, workflow, label):
+        if scheduler is None:
+            job = submit(workflow, label=label)
+        else:
+            job = scheduler.submit(workflow, role=STAGE_ROLES.get(stage), label=label)
+        return _with_files(job, project)
+
+    videos, audios, speeches, cuts = [], [], [], []
+    for i, shot in enumerate(shots):
+        kf = g.add(f"keyframe:{i}", "keyframe", lambda shot=shot, i=i: run(
+            "keyframe", build_text_to_image(shot["keyframe"], shot["seed"]), f"keyframe {i}"))
+        videos.append(g.add(f"video:{i}", "video", lambda kf, shot=shot, i=i: run(
+            "video", build_image_to_video(_keyframe_input(kf, scheduler, project), shot["prompt"],
+                                          shot["seed"], shot["frames"]), f"scene {i}"), deps=[kf]))
+        audios.append(shot["audio"] and g.add(f"audio:{i}", "audio", lambda shot=shot, i=i: run(
+            "audio", build_text_to_audio(shot["audio"], shot["frames"] / 24, shot["seed"]), f"audio {i}")))
+        speeches.append(shot["voiceover"] and g.add(f"speech:{i}", "speech", lambda shot=shot: text_to_speech_async(
+            shot["voiceover"], shot["voice"], project)))
+        if project:
+            deps = [videos[i]] + [t for t in (audios[i], speeches[i]) if t] + cuts[-1:]
+            cuts.append(g.add(f"cut:{i}", "assemble", lambda *_, i=i: _cut(videos, audios, speeches, i, project),
+                              deps=deps))
+
+    g.run(timeout)
+    report = g.report()
+    dag.print_report(report)
+    scene_files = [{"video": v.result and v.result["files"], "audio": a and a.result and a.result["files"],
+                    "voiceover": sp and sp.result and str(sp.result)}
+                   for v, a, sp in zip(videos, audios, speeches)]
+    final = cuts[-1].result if cuts and cuts[-1].error is None else None
+    return {"final": final, "scenes": scene_files, "failed": g.failed(), "report": report}
+
+def long_video(prompt, duration=30, seed=None, image=None, chunk=97, overlap=9, project=None,
+               scheduler=None, timeout=None):
+    """One continuous shot of any length: overlapping LTX chunks, each started from the
+    previous chunk's last frames, crossfaded together (pipeline/longform.py).
+
+    prompt: one prompt, or a list (one per chunk, the last one repeats).
+    image: optional first frame (local file, or ComfyUI input name). chunk/overlap in frames (8k+1).
+    Written to projects/{project}/long_{seed}.mp4; project defaults to PROJECT or long_{seed}.
+    """
+    seed = seed or random.randint(1, 2**32)
+    project = project or PROJECT or f"long_{seed}"
+    prompts = [prompt] if isinstance(prompt, str) else list(prompt)
+    frames = longform.chunk_frames(duration, chunk, overlap)
+    output = PROJECTS_DIR / project / f"long_{seed}.mp4"
+    if image is not None and Path(image).is_file():
+        image = uploads.upload_all([b.url for b in scheduler.backends if b.role == STAGE_ROLES["chunk"]], image) \
+            if scheduler is not None else _input_image(image)
+    print(f"[LONG VIDEO] {prompts[0][:40]}... {duration}s = {len(frames)} chunks of {chunk} frames")
+    g = dag.Graph(STAGE_LIMITS)
+
+    def render(k, prev=None):
+        text = prompts[min(k, len(prompts) - 1)]
+        if prev is not None:
+            start = _keyframe_input(prev, scheduler, project, longform.tail_ref(prev["outputs"]))
+        else:
+            start = image
+        if start is None:
+            wf = templates.get("ltx_t2v").instantiate(prompt=text, seed=seed, frames=frames[k],
+                                                      filename_prefix=f"long_{seed}_{k:03d}")
+        else:
+            wf = templates.get("ltx_i2v").instantiate(image=start, prompt=text, seed=seed + k, frames=frames[k],
+                                                      strength=1.0, filename_prefix=f"long_{seed}_{k:03d}")
+        wf = _encodes(longform.with_tail(wf, overlap, frames[k], f"tails/long_{seed}_{k:03d}"))
+        job = submit(wf, label=f"long {seed} {k + 1}/{len(frames)}") if scheduler is None else \
+            scheduler.submit(wf, role=STAGE_ROLES["chunk"], label=f"long {seed} {k + 1}/{len(frames)}")
+        return _with_files(job, None)       # the next chunk only needs the tail, not the download
+
+    def fetch(r):
+        ref = longform.video_ref(r["outputs"])
+        return _retriever(project, r["server"]).fetch({"video": {"images": [ref]}})
+
+    chunks, fetches = [], []
+    for k in range(len(frames)):
+        fn = (lambda k=k: render(k)) if k == 0 else (lambda prev, k=k: render(k, prev))
+        chunks.append(g.add(f"chunk:{k}", "chunk", fn, deps=chunks[-1:]))
+        fetches.append(g.add(f"fetch:{k}", "fetch", fetch, deps=[chunks[k]]))
+    g.add("stitch", "assemble", lambda *paths: _stitch(paths, frames, overlap, duration, output), deps=fetches)
+    g.run(timeout)
+    dag.print_report(g.report())
+    failed = g.failed()
+    if failed:
+        raise Exception(f"long_video: {len(failed)} steps failed - first: {next(iter(failed.values()))}")
+    return output
+
+def edit_video(clip, edits, seed=None, steps=20, context=vace.CONTEXT, project=None, output=None,
+               scheduler=None, timeout=None):
+    """Re-render parts of an existing clip with Wan 2.2 VACE; everything else is stream-copied.
+
+    clip: path or Job (with project=). edits: [{"start", "end" (seconds) or "frames": (a, b),
+    "prompt", optional "negative", "strength"}]. Only the edited frames plus `context`
+    frames either side go through the GPU (pipeline/vace.py).
+    Written to output, default projects/{project}/{clip}_edited.mp4.
+    """
+    src = _assemble.resolve(clip, project)
+    info = _assemble.probe(src)
+    total, _ = vace.frame_index(src)
+    wins = vace.windows(edits, info["fps"], total, context)
+    width, height = vace.render_size(info["width"], info["height"])
+    seed = seed or random.randint(1, 2**32)
+    project = project or PROJECT or f"edit_{src.stem}"
+    output = Path(output) if output else PROJECTS_DIR / project / f"{src.stem}_edited.mp4"
+    rendered = sum(w.frames for w in wins)
+    print(f"[EDIT VIDEO] {src.name}: {len(wins)} windows, {rendered} of {total} frames to render")
+    if scheduler is not None:
+        servers = [b.url for b in scheduler.backends if b.role == STAGE_ROLES["edit"]]
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    work = Path(tempfile.mkdtemp(prefix=".edit_", dir=output.parent))
+    try:
+        pending = []
+        for k, win in enumerate(wins):
+            control, mask = vace.prepare(src, win, info["fps"], width, height, work, f"w{k:02d}")
+            if scheduler is None:
+                names = [uploads.upload(COMFY, control), uploads.upload(COMFY, mask)]
+            else:
+                names = [uploads.upload_all(servers, control), uploads.upload_all(servers, mask)]
+            wf = _encodes(templates.get("wan_vace_edit").instantiate(
+                prompt=win.prompt, negative=win.negative, control=names[0], mask=names[1], seed=seed + k,
+                frames=win.frames, width=width, height=height, strength=float(win.strength), steps=steps,
+                switch=steps // 2, fps=float(Fraction(info["fps"])), filename_prefix=f"vace_{seed}_{k:02d}"))
+            label = f"edit {src.stem} {k + 1}/{len(wins)}"
+            job = submit(wf, label=label) if scheduler is None else \
+                scheduler.submit(wf, role=STAGE_ROLES["edit"], label=label)
+            pending.append((win, _with_files(job, project)))
+        renders = [(win, f.result(timeout)["files"][0]) for win, f in pending]
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    output, report = vace.splice(src, renders, info["fps"], output)
+    print(f"  Edited {report['edited']} frames ({report['rendered']} rendered, "
+          f"{report['copied']}/{report['frames']} stream-copied) -> {output}")
+    return output
+
+def _stitch(paths, frames, overlap, duration, output):
+    fade = overlap / longform.FPS
+    extra = (sum(frames) - overlap * (len(frames) - 1)) / longform.FPS - duration
+    timeline = []
+    for k, files in enumerate(paths):
+        last = k == len(paths) - 1
+        end = frames[k] / longform.FPS - extra if last and extra > 0 else None
+        timeline.append(_assemble.Clip(files[0], end=end, crossfade=fade if k else 0.0))
+    return _assemble.assemble(timeline, output)
+
+def _shot(shot):
+    if isinstance(shot, str):
+        shot = {"prompt": shot}
+    return {"prompt": shot["prompt"], "keyframe": shot.get("keyframe") or shot["prompt"],
+            "audio": shot.get("audio"), "voiceover": shot.get("voiceover"), "voice": shot.get("voice"),
+            "seed": shot.get("seed") or random.randint(1, 2**32),
+            "frames": shot.get("frames", 65)}
+
+def _with_files(job, project):
+    """Future -> {"outputs", "files", "server"} once job is done (and its files downloaded)."""
+    out = Future()
+
+    def finished(j):
+        if j.exception() is not None:
+            out.set_exception(j.exception())
+            return
+        backend = getattr(j, "backend", None)
+        server = backend.url if backend is not None else COMFY
+        result = {"outputs": j.result(), "files": [], "server": server}
+        if not project:
+            out.set_result(result)
+            return
+
+        started = time.time()
+
+        def fetched(f):
+            if f.exception() is not None:
+                out.set_exception(f.exception())
+                return
+            result["files"] = [str(p) for p in f.result()]
+            _downloaded(j.prompt_id, started, result["files"])
+            out.set_result(result)
+        _retriever(project, server).fetch(result["outputs"]).add_done_callback(fetched)
+
+    job.add_done_callback(finished)
+    return out
+
+def _keyframe_input(kf, scheduler, project, ref=None):
+    """LoadImage name for a finished keyframe (or ref, another image it saved) on the server that will animate it."""
+    if ref is None:
+        refs = [r for r in artifacts(kf["outputs"]) if r["type"] == "output"]
+        if not refs:
+            raise Exception("keyframe job saved no image")
+        ref = refs[0]
+    if scheduler is None:
+        return uploads.view_ref(ref)        # same server - read it straight from output/
+    local = [f for f in kf["files"] if Path(f).name == ref["filename"]]
+    if local:
+        source = local[0]                   # streamed from disk
+    else:
+        source = transport.get(f"{kf['server']}/view", params=ref).raise_for_status().content
+    # Don't know which worker gets the video yet - give the keyframe to all of them
+    return uploads.upload_all([b.url for b in scheduler.backends if b.role == STAGE_ROLES["video"]],
+                              source, ref["filename"])
+
+def _input_image(image, server=None):
+    """LoadImage name for image: a local file is uploaded to server (default COMFY) once per
+    content hash; anything else is taken as a name already in its input folder."""
+    if image is not None and Path(image).is_file():
+        return uploads.upload(server or COMFY, image)
+    return image
+
+def _cut(videos, audios, speeches, i, project):
+    """Assemble scenes 0..i, unless scene i+1 is already done and will cut again."""
+    last = i == len(videos) - 1
+    if not last and videos[i + 1].done and all(not t[i + 1] or t[i + 1].done for t in (audios, speeches)):
+        return None
+    clips, tracks, at = [], [], 0.0
+    for v, a, sp in zip(videos[:i + 1], audios[:i + 1], speeches[:i + 1]):
+        clip = v.result["files"][0]
+        clips.append(clip)
+        if a:
+            tracks.append(Track(a.result["files"][0], start=at))
+        if sp:
+            tracks.append(Track(sp.result, start=at))
+        at += _assemble.probe(clip)["duration"]
+    name = "final.mp4" if last else "rough_cut.mp4"
+    return _assemble.assemble(clips, PROJECTS_DIR / project / name, tracks)
 
 if __name__ == "__main__":
     print("=" * 50)
@@ -0,0 +1,6 @@
+"""
+Video factory engine - the plumbing behind factory.py.
+
+factory.py stays the one file you call. The modules in here do the
+talking to ComfyUI so factory.py doesn't have to.
+"""
@@ -0,0 +1,269 @@
+"""
+VRAM admission control - only post a job to a GPU that can hold it.
+
+estimate(workflow) is the job's peak VRAM in GB, from the model files
+its loaders name and the size of its latent (width x height x frames x
+batch). ComfyUI offloads between stages, so the peak is the biggest
+stage - text encode, sample, decode - not the sum of everything loaded.
+Likewise a graph with two diffusion models (Wan 2.2's high/low-noise
+experts) only holds one at a time, so sampling counts the bigger one.
+
+The estimates are calibrated per model family from what the servers
+actually use: while one of our jobs runs alone on a backend, the
+scheduler reads /system_stats and feeds the reading to observe(). An
+OOM raises the family's factor at once; lower readings pull it down
+slowly, since an OOM costs minutes and a smaller batch costs seconds.
+
+capacity() is what a card can give a job right now: its total minus
+whatever other processes hold (Chatterbox on GPU 4, a stray notebook).
+A job that doesn't fit a card even when nothing else is on it gets
+downscale()d; one that only doesn't fit right now waits.
+
+Usage:
+    gb = estimate(workflow)                             # calibrated peak
+    total, other = capacity(system_stats)
+    if not fits(workflow, total, other):
+        workflow = downscale(workflow, total - HEADROOM_GB)
+"""
+import math
+import threading
+import time
+
+from pipeline import transport
+from pipeline.affinity import family, model_set
+
+# Weights of known model files: (substrings that must all match, GB). First match wins.
+WEIGHTS_GB = (
+    (("ltxv-13b", "fp8"), 15.0),
+    (("ltxv-13b",), 26.0),
+    (("ltxv-2b",), 6.0),
+    (("ltxv-spatial-upscaler",), 1.0),
+    (("t5xxl", "fp8"), 4.9),
+    (("t5xxl",), 9.5),
+    (("umt5",), 6.7),
+    (("clip_l",), 0.25),
+    (("flux1", "fp8"), 11.9),
+    (("flux1",), 23.8),
+    (("wan2.2", "fp8"), 14.3),
+    (("hunyuanvideo", "fp8"), 8.3),
+    (("hunyuanvideo",), 16.7),
+    (("mmaudio_large",), 2.1),
+    (("dfn5b",), 2.0),
+    (("synchformer",), 0.5),
+    (("vae",), 0.5),
+    (("ae.",), 0.35),
+)
+DEFAULT_WEIGHTS_GB = 4.0        # unknown file: assume something sizeable
+
+# Loaders whose weights are only needed for one stage; everything else samples.
+LOADER_STAGE = {
+    "CLIPLoader": "encode",
+    "DualCLIPLoader": "encode",
+    "CLIPVisionLoader": "encode",
+    "VAELoader": "decode",
+    "HyVideoVAELoader": "decode",
+}
+
+# Latent nodes: class -> (width, height, frames, batch) input names, and the
+# activation GB of one batch item at a reference width * height * frames.
+LATENT_NODES = {
+    "EmptyLTXVLatentVideo": (("width", "height", "length", "batch_size"), 3.0, 768 * 512 * 65),
+    "LTXVImgToVideo": (("width", "height", "length", "batch_size"), 3.0, 768 * 512 * 65),
+    "EmptyHunyuanLatentVideo": (("width", "height", "length", "batch_size"), 4.0, 512 * 320 * 85),
+    "HyVideoSampler": (("width", "height", "num_frames", None), 4.0, 512 * 320 * 85),
+    "WanVaceToVideo": (("width", "height", "length", "batch_size"), 4.0, 832 * 480 * 81),
+    "EmptySD3LatentImage": (("width", "height", None, "batch_size"), 1.0, 1024 * 576),
+    "EmptyLatentImage": (("width", "height", None, "batch_size"), 1.0, 1024 * 576),
+}
+DEFAULT_ACTIVATION_GB = 3.0     # sampling a latent we can't size (LoadLatent -> upsampler)
+DECODE_SHARE = 0.5              # VAE decode peak, relative to sampling activations
+HEADROOM_GB = 1.5               # fragmentation, the odd unestimated node
+CONTEXT_GB = 0.5                # ComfyUI's CUDA context, outside torch's pool
+CAPACITY_TTL = 2.0              # seconds a server_capacity() reading is reused
+MIN_FACTOR, MAX_FACTOR = 0.5, 2.0
+OOM_STEP = 1.15
+ALIGN = 32                      # LTX wants width/height divisible by 32
+MIN_SIDE = 256
+
+
+def weights_gb(filename):
+    name = filename.lower()
+    for parts, gb in WEIGHTS_GB:
+        if all(p in name for p in parts):
+            return gb
+    return DEFAULT_WEIGHTS_GB
+
+
+def activation_gb(workflow):
+    """Sampling activations for the workflow's latent, 0 if it samples nothing."""
+    total = 0.0
+    for node in workflow.values():
+        spec = LATENT_NODES.get(node.get("class_type"))
+        if spec is None:
+            continue
+        names, gb, ref = spec
+        inputs = node.get("inputs", {})
+        w, h, frames, batch = (inputs.get(n, 1) if n else 1 for n in names)
+        if not all(isinstance(v, (int, float)) for v in (w, h, frames, batch)):
+            return DEFAULT_ACTIVATION_GB * (batch if isinstance(batch, int) else 1)
+        total = max(total, gb * w * h * frames * batch / ref)
+    if total == 0 and any(n.get("class_type") in ("SamplerCustomAdvanced", "KSampler") for n in workflow.values()):
+        return DEFAULT_ACTIVATION_GB
+    return total
+
+
+def _stages(workflow):
+    """GB of weights each stage needs loaded."""
+    stages = {"encode": 0.0, "sample": 0.0, "decode": 0.0}
+    unets = [0.0]
+    for cls, filename in model_set(workflow):
+        if cls == "UNETLoader":
+            unets.append(weights_gb(filename))     # one expert sampled at a time
+        else:
+            stages[LOADER_STAGE.get(cls, "sample")] += weights_gb(filename)
+    stages["sample"] += max(unets)
+    return stages
+
+
+def raw_estimate(workflow):
+    """Peak GB before calibration: the biggest of encode, sample and decode."""
+    stages = _stages(workflow)
+    act = activation_gb(workflow)
+    return max(stages["encode"], stages["sample"] + act, stages["decode"] + act * DECODE_SHARE)
+
+
+def estimate(workflow, calibration=None):
+    """Calibrated peak VRAM of workflow in GB."""
+    calibration = CALIBRATION if calibration is None else calibration
+    return raw_estimate(workflow) * calibration.factor(family(workflow))
+
+
+class Calibration:
+    """Per-family correction factors learned from observed VRAM use."""
+
+    __slots__ = ("factors", "_lock")
+
+    def __init__(self):
+        self.factors = {}
+        self._lock = threading.Lock()
+
+    def factor(self, fam):
+        return self.factors.get(fam, 1.0)
+
+    def observe(self, workflow, used_gb):
+        """A job of this family peaked at used_gb."""
+        raw = raw_estimate(workflow)
+        if raw <= 0 or used_gb <= 0:
+            return
+        fam, ratio = family(workflow), used_gb / raw
+        with self._lock:
+            f = self.factors.get(fam, 1.0)
+            # Up at once, down slowly: a sample between peaks reads low.
+            f = ratio if ratio > f else f + 0.1 * (ratio - f)
+            self.factors[fam] = min(MAX_FACTOR, max(MIN_FACTOR, f))
+
+    def oom(self, workflow, estimated_gb):
+        """A job admitted at estimated_gb ran out of memory: the family needs more than that.
+
+        Relative to what the job was admitted with, so a burst of OOMs
+        from the same underestimate raises the factor once, not per job.
+        """
+        raw = raw_estimate(workflow)
+        if raw <= 0:
+            return
+        fam = family(workflow)
+        with self._lock:
+            f = max(self.factors.get(fam, 1.0), estimated_gb / raw * OOM_STEP)
+            self.factors[fam] = min(MAX_FACTOR, f)
+
+
+CALIBRATION = Calibration()
+_capacity = {}                  # server -> (monotonic time, capacity or None)
+_capacity_lock = threading.Lock()
+
+
+def is_oom(message):
+    text = str(message).lower()
+    return "out of memory" in text or "allocation on device" in text
+
+
+def capacity(stats):
+    """(total GB, GB held by other processes) from a /system_stats reply. None if it has no GPU."""
+    try:
+        dev = stats["devices"][0]
+        total = dev["vram_total"] / 1024**3
+    except (KeyError, IndexError, TypeError):
+        return None
+    # vram_free counts torch's cached-but-unused memory as free; take it
+    # out to get the device's free memory, then what's neither free nor ours.
+    torch_total = dev.get("torch_vram_total", 0) / 1024**3
+    device_free = (dev.get("vram_free", 0) - dev.get("torch_vram_free", 0)) / 1024**3
+    return total, max(0.0, total - device_free - torch_total)
+
+
+def used_gb(stats):
+    """VRAM ComfyUI itself holds right now."""
+    dev = stats["devices"][0]
+    if dev.get("torch_vram_total"):
+        return dev["torch_vram_total"] / 1024**3
+    return (dev["vram_total"] - dev["vram_free"]) / 1024**3
+
+
+def server_capacity(server, max_age=None):
+    """capacity() of a live server, None if it can't be read. A reading is reused
+    for max_age seconds (CAPACITY_TTL), so a burst of submits costs one /system_stats."""
+    server = server.rstrip("/")
+    max_age = CAPACITY_TTL if max_age is None else max_age
+    now = time.monotonic()
+    with _capacity_lock:
+        hit = _capacity.get(server)
+    if hit is not None and now - hit[0] < max_age:
+        return hit[1]
+    try:
+        cap = capacity(transport.get_json(f"{server}/system_stats", retries=0))
+    except (OSError, transport.HTTPError, ValueError):
+        cap = None
+    with _capacity_lock:
+        _capacity[server] = (now, cap)
+    return cap
+
+
+def fits(workflow, total_gb, other_gb=0.0, calibration=None):
+    return estimate(workflow, calibration) <= total_gb - other_gb - HEADROOM_GB
+
+
+def downscale(workflow, limit_gb, calibration=None):
+    """Copy of workflow with its latent shrunk (aspect kept) to peak under limit_gb, or None.
+
+    Only width and height change - frame counts and batch sizes are
+    load-bearing for other code (chunk tails, batched sweeps).
+    """
+    calibration = CALIBRATION if calibration is None else calibration
+    fac = calibration.factor(family(workflow))
+    act = activation_gb(workflow)
+    stages = _stages(workflow)
+    room = limit_gb / fac - stages["sample"]      # what's left for activations
+    if act <= 0 or room <= 0 or stages["encode"] * fac > limit_gb:
+        return None
+    scale = math.sqrt(room / act)
+    while True:
+        out = _scaled(workflow, scale)
+        if estimate(out, calibration) <= limit_gb:
+            return out
+        if out == _scaled(workflow, scale * 0.9):
+            return None         # every side is already at MIN_SIDE
+        scale *= 0.9
+
+
+def _scaled(workflow, scale):
+    out = {}
+    for nid, node in workflow.items():
+        spec = LATENT_NODES.get(node.get("class_type"))
+        inputs = node.get("inputs", {})
+        if spec is None or not isinstance(inputs.get("width"), int) or not isinstance(inputs.get("height"), int):
+            out[nid] = node
+            continue
+        w = max(MIN_SIDE, int(inputs["width"] * scale) // ALIGN * ALIGN)
+        h = max(MIN_SIDE, int(inputs["height"] * scale) // ALIGN * ALIGN)
+        out[nid] = {**node, "inputs": {**inputs, "width": w, "height": h}}
+    return out
@@ -0,0 +1,209 @@
+"""
+Model-affinity ordering - run jobs that share checkpoints back to back.
+
+A shot list that alternates Flux keyframes, LTX clips and MMAudio tracks
+makes ComfyUI evict and reload multi-GB models on nearly every prompt.
+We read each workflow's loader nodes, group jobs by the models they
+need, and pick the next job to run so the loaded set changes as rarely
+as possible - without letting priorities or deadlines slip.
+
+Pick order for the next job:
+    1. anything whose deadline is about to be missed (earliest first)
+    2. otherwise only the highest priority present is considered - with
+       aging, a job gains a point per `age` seconds waited, up to age_cap
+    3. anything that has waited longer than max_wait (oldest first)
+    4. a job that uses the models already loaded (oldest first)
+    5. the biggest group sharing one model set, so the swap pays off
+
+Priorities are ints (higher first) or one of the PRIORITY classes.
+
+Usage:
+    ordered, report = order(workflows)
+    print(report)   # {"swaps": 3, "fifo_swaps": 27, "avoided": 24}
+"""
+import time
+
+# class_type -> the inputs that name a model file
+LOADER_NODES = {
+    "CheckpointLoaderSimple": ("ckpt_name",),
+    "UNETLoader": ("unet_name",),
+    "CLIPLoader": ("clip_name",),
+    "DualCLIPLoader": ("clip_name1", "clip_name2"),
+    "VAELoader": ("vae_name",),
+    "MMAudioModelLoader": ("mmaudio_model",),
+    "MMAudioFeatureUtilsLoader": ("vae_model", "synchformer_model", "clip_model"),
+    "HyVideoModelLoader": ("model",),
+    "HyVideoVAELoader": ("model_name",),
+    "CLIPVisionLoader": ("clip_name",),
+    "LoadFluxIPAdapter": ("ipadatper", "clip_vision"),
+    "LatentUpscaleModelLoader": ("model_name",),
+    "LoraLoaderModelOnly": ("lora_name",),
+}
+
+# Loaders whose model names the family (the big one that dominates swap cost)
+PRIMARY_LOADERS = ("CheckpointLoaderSimple", "UNETLoader", "HyVideoModelLoader", "MMAudioModelLoader")
+
+# Rough seconds per job by family, from STATUS.md. Only used to keep
+# deadlines honest when planning an order ahead of time.
+RUNTIME_HINTS = {
+    "ltxv": 35,
+    "flux": 105,
+    "mmaudio": 30,
+    "hunyuan": 120,
+}
+DEFAULT_RUNTIME = 60
+
+# Named priority classes. Ten points apart so aging (a point per `age`
+# seconds) takes a while to close the gap.
+PRIORITY = {"interactive": 10, "normal": 0, "bulk": -10}
+
+
+def priority_value(priority):
+    """int for a priority class name (or an int, unchanged)."""
+    if isinstance(priority, str):
+        if priority not in PRIORITY:
+            raise Exception(f"Unknown priority {priority!r} - use one of {', '.join(PRIORITY)} or an int")
+        return PRIORITY[priority]
+    return int(priority or 0)
+
+
+def model_set(workflow):
+    """frozenset of (class_type, filename) for every model the workflow loads."""
+    models = set()
+    for node in workflow.values():
+        names = LOADER_NODES.get(node.get("class_type"))
+        if not names:
+            continue
+        inputs = node.get("inputs", {})
+        for name in names:
+            value = inputs.get(name)
+            if isinstance(value, str):
+                models.add((node["class_type"], value))
+    return frozenset(models)
+
+
+def family(workflow):
+    """Short name for the workflow's main model, e.g. 'ltxv-13b-0.9.8-distilled-fp8'."""
+    models = model_set(workflow)
+    for loader in PRIMARY_LOADERS:
+        for cls, name in sorted(models):
+            if cls == loader:
+                return name.rsplit(".", 1)[0]
+    if models:
+        return "+".join(sorted(n.rsplit(".", 1)[0] for _, n in models))
+    return "none"
+
+
+def runtime_hint(fam):
+    for key, secs in RUNTIME_HINTS.items():
+        if key in fam.lower():
+            return secs
+    return DEFAULT_RUNTIME
+
+
+class Item:
+    """A job waiting to run: workflow plus what ordering needs to know."""
+
+    __slots__ = ("workflow", "label", "priority", "deadline", "submitted", "models", "family", "runtime", "ref")
+
+    def __init__(self, workflow, label="", priority=0, deadline=None, submitted=None, runtime=None, ref=None):
+        self.workflow = workflow
+        self.label = label
+        self.priority = priority_value(priority)
+        self.deadline = deadline
+        self.submitted = time.time() if submitted is None else submitted
+        self.models = model_set(workflow)
+        self.family = family(workflow)
+        self.runtime = runtime or runtime_hint(self.family)
+        self.ref = ref
+
+    def __repr__(self):
+        return f"<Item {self.label or self.family} p={self.priority}>"
+
+
+def effective_priority(item, now, age=None, age_cap=PRIORITY["normal"]):
+    """item.priority plus a point per `age` seconds waited - aging never lifts it past age_cap."""
+    if not age:
+        return item.priority
+    aged = item.priority + int((now - item.submitted) // age)
+    return max(item.priority, min(aged, age_cap))
+
+
+def pick(pending, loaded=frozenset(), now=None, max_wait=600, slack=1.5, age=None, age_cap=PRIORITY["normal"]):
+    """Index into pending of the job to run next on a backend holding `loaded`."""
+    if not pending:
+        return None
+    now = time.time() if now is None else now
+
+    # 1. deadlines at risk beat everything
+    urgent = [(it.deadline, i) for i, it in enumerate(pending)
+              if it.deadline is not None and it.deadline - now <= it.runtime * slack]
+    if urgent:
+        return min(urgent)[1]
+
+    # 2. only the top priority class competes (bulk work ages into it)
+    prios = [effective_priority(it, now, age, age_cap) for it in pending]
+    top = max(prios)
+    cands = [i for i, p in enumerate(prios) if p == top]
+
+    # 3. don't starve a lonely model family forever
+    if max_wait is not None:
+        oldest = min(cands, key=lambda i: pending[i].submitted)
+        if now - pending[oldest].submitted > max_wait:
+            return oldest
+
+    # 4. reuse what's loaded
+    warm = [i for i in cands if pending[i].models and pending[i].models <= loaded]
+    if warm:
+        return min(warm, key=lambda i: pending[i].submitted)
+
+    # 5. swap to the biggest group
+    groups = {}
+    for i in cands:
+        groups.setdefault(pending[i].models, []).append(i)
+    best = max(groups.values(), key=lambda g: (len(g), -min(pending[i].submitted for i in g)))
+    return min(best, key=lambda i: pending[i].submitted)
+
+
+def count_swaps(items, loaded=frozenset()):
+    """How many times the loaded model set changes running items in this order."""
+    swaps = 0
+    for it in items:
+        if it.models and not it.models <= loaded:
+            swaps += 1
+            loaded = it.models
+    return swaps
+
+
+def order(workflows, loaded=frozenset(), now=None, max_wait=None):
+    """
+    Plan a run order for a known batch. Returns (items, report).
+
+    workflows: dicts, (label, dict) tuples or Items. The clock is
+    advanced by each job's runtime hint, so deadlines are checked
+    against when a job would actually start. max_wait is off by default:
+    the whole batch is wanted, so nothing is really starving.
+    """
+    now = time.time() if now is None else now
+    items = []
+    for i, wf in enumerate(workflows):
+        if isinstance(wf, Item):
+            if wf.ref is None:
+                wf.ref = i
+            items.append(wf)
+            continue
+        label, wf = wf if isinstance(wf, tuple) else ("", wf)
+        # tiny offsets keep arrival order as the tie-breaker
+        items.append(Item(wf, label=label, submitted=now + i * 1e-6, ref=i))
+
+    pending = list(items)
+    out = []
+    current, clock = loaded, now
+    while pending:
+        it = pending.pop(pick(pending, current, now=clock, max_wait=max_wait))
+        out.append(it)
+        if it.models and not it.models <= current:
+            current = it.models
+        clock += it.runtime
+    fifo, planned = count_swaps(items, loaded), count_swaps(out, loaded)
+    return out, {"swaps": planned, "fifo_swaps": fifo, "avoided": fifo - planned}
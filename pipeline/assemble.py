@@ -0,0 +1,314 @@
+"""
+Assembly - join finished scenes into one video and lay the audio under it.
+
+Every text_to_video clip is h264 at 24fps with the same settings, so
+most of a timeline is joined with the concat demuxer and -c copy: no
+decode, no quality loss, seconds for an hour of footage. Only clips
+that need it are re-encoded:
+
+    - a trim (start/end), which has to land on an exact frame
+    - a fade in/out, or a crossfade with the clip before it
+    - a clip whose codec/size/fps/pix_fmt differs from the rest
+
+Each of those becomes a segment encoded to match the rest of the
+timeline, all segments in parallel. A crossfade is a short segment of
+its own (the end of one clip blended into the start of the next) and
+the rest of both clips are encoded separately, so no ffmpeg call opens
+more than two clips however long the timeline is.
+The final pass concats copied clips and encoded segments, and mixes
+text_to_audio tracks in (audio is always encoded, to AAC - it's cheap).
+
+Sources can be paths, Jobs run with project= (job.artifacts), or
+/history outputs dicts with project= so they can be found under
+projects/{project}/.
+
+Usage:
+    timeline = [job1, Clip(job2, end=2.0), Clip(job3, crossfade=0.5), job4]
+    assemble(timeline, "projects/yacht/final.mp4", audio=[Track(music), Track(vo, start=3.0)])
+"""
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from pipeline.retrieve import AUDIO_EXTS, artifacts, destination
+
+FFMPEG = os.environ.get("FFMPEG", "ffmpeg")
+FFPROBE = os.environ.get("FFPROBE", "ffprobe")
+
+# Encoder used to match a timeline's codec when a segment is re-encoded
+ENCODERS = {"h264": "libx264", "hevc": "libx265"}
+PRESET = "medium"
+CRF = 18
+AUDIO_BITRATE = "192k"
+
+_probes = {}    # (path, size, mtime) -> probe()
+
+
+class AssemblyError(Exception):
+    pass
+
+
+class Clip:
+    """One scene on the timeline. start/end trim it (seconds into the source),
+    crossfade blends it over the end of the previous clip."""
+
+    __slots__ = ("source", "start", "end", "fade_in", "fade_out", "crossfade")
+
+    def __init__(self, source, start=0.0, end=None, fade_in=0.0, fade_out=0.0, crossfade=0.0):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.fade_in = fade_in
+        self.fade_out = fade_out
+        self.crossfade = crossfade
+
+    @property
+    def trimmed(self):
+        return bool(self.start) or self.end is not None
+
+    def __repr__(self):
+        return f"<Clip {self.source}>"
+
+
+class Track:
+    """An audio file placed at `start` seconds on the timeline."""
+
+    __slots__ = ("source", "start", "volume")
+
+    def __init__(self, source, start=0.0, volume=1.0):
+        self.source = source
+        self.start = start
+        self.volume = volume
+
+    def __repr__(self):
+        return f"<Track {self.source} @{self.start}s>"
+
+
+# --- sources ---
+
+def resolve(source, project=None, audio=False):
+    """Local Path for a clip/track source: path, Job, or /history outputs dict."""
+    if isinstance(source, (str, Path)):
+        paths = [Path(source)]
+    elif hasattr(source, "artifacts"):
+        paths = [Path(p) for p in source.artifacts]
+        if not paths:
+            raise AssemblyError(f"{source!r} has no local files - run it with project= so they're downloaded")
+    elif isinstance(source, dict):
+        if project is None:
+            raise AssemblyError("outputs dicts need project= to find the downloaded files")
+        paths = [destination(ref, project) for ref in artifacts(source)]
+    else:
+        raise AssemblyError(f"don't know how to find a file for {source!r}")
+    paths = [p for p in paths if (p.suffix.lower() in AUDIO_EXTS) == audio]
+    if not paths:
+        raise AssemblyError(f"no {'audio' if audio else 'video'} file in {source!r}")
+    if not paths[0].exists():
+        raise AssemblyError(f"{paths[0]} not found")
+    return paths[0]
+
+
+def _run(cmd):
+    try:
+        r = subprocess.run(cmd, capture_output=True, text=True)
+    except FileNotFoundError:
+        raise AssemblyError(f"{cmd[0]} not found - install ffmpeg or set FFMPEG/FFPROBE") from None
+    if r.returncode != 0:
+        tail = "\n".join(r.stderr.strip().splitlines()[-5:])
+        raise AssemblyError(f"{Path(cmd[0]).name} failed:\n{tail}")
+    return r.stdout
+
+
+def probe(path):
+    """{codec, profile, width, height, pix_fmt, fps, time_base, duration} of the first video stream."""
+    path = Path(path)
+    st = path.stat()
+    key = (str(path.resolve()), st.st_size, st.st_mtime)
+    if key in _probes:
+        return _probes[key]
+    out = json.loads(_run([FFPROBE, "-v", "error", "-select_streams", "v:0",
+                           "-show_entries", "stream=codec_name,profile,width,height,pix_fmt,r_frame_rate,time_base,duration"
+                           ":format=duration", "-of", "json", str(path)]))
+    if not out.get("streams"):
+        raise AssemblyError(f"{path}: no video stream")
+    s = out["streams"][0]
+    info = {
+        "codec": s["codec_name"],
+        "profile": s.get("profile"),
+        "width": s["width"],
+        "height": s["height"],
+        "pix_fmt": s.get("pix_fmt"),
+        "fps": s["r_frame_rate"],
+        "time_base": s["time_base"],
+        "duration": float(s.get("duration") or out["format"]["duration"]),
+    }
+    _probes[key] = info
+    return info
+
+
+def _shape(info):
+    """What has to match for two clips to be joined by stream copy."""
+    return (info["codec"], info["profile"], info["width"], info["height"], info["pix_fmt"], info["fps"], info["time_base"])
+
+
+# --- planning ---
+
+def plan(timeline, project=None):
+    """Split a timeline into copy/encode segments.
+
+    Returns (target, segments): target is the probe() shape everything is
+    matched to; each segment is ("copy", [clip]) or ("encode", [clips]).
+    """
+    clips = [c if isinstance(c, Clip) else Clip(c) for c in timeline]
+    if not clips:
+        raise AssemblyError("empty timeline")
+    clips = [Clip(resolve(c.source, project), c.start, c.end, c.fade_in, c.fade_out, c.crossfade) for c in clips]
+    infos = [probe(c.source) for c in clips]
+    shape = Counter(_shape(i) for i in infos).most_common(1)[0][0]
+    target = next(i for i in infos if _shape(i) == shape)
+    if target["codec"] not in ENCODERS:
+        raise AssemblyError(f"can't match {target['codec']} clips when re-encoding (have {', '.join(ENCODERS)})")
+
+    segments = []
+    for i, (c, info) in enumerate(zip(clips, infos)):
+        if c.crossfade and i == 0:
+            raise AssemblyError("the first clip has nothing to crossfade from")
+        head = c.crossfade
+        tail = clips[i + 1].crossfade if i + 1 < len(clips) else 0.0
+        if head:
+            # the overlap is its own short segment: end of the previous clip blended into our start
+            prev = clips[i - 1]
+            end = prev.start + _length(prev)
+            segments.append(("encode", [Clip(prev.source, end - head, end),
+                                        Clip(c.source, c.start, c.start + head, crossfade=head)]))
+        if head or tail:
+            length = _length(c)
+            if head + tail > length + 1e-6:
+                raise AssemblyError(f"{c.source}: crossfades ({head}s + {tail}s) longer than the clip ({length:.2f}s)")
+            if head + tail < length - 1e-6:
+                segments.append(("encode", [Clip(c.source, c.start + head, c.start + length - tail,
+                                                 c.fade_in, c.fade_out)]))
+        elif c.trimmed or c.fade_in or c.fade_out or _shape(info) != shape:
+            segments.append(("encode", [c]))
+        else:
+            segments.append(("copy", [c]))
+    return target, segments
+
+
+# --- ffmpeg ---
+
+def _length(c):
+    """Seconds of c on the timeline, after trimming."""
+    end = probe(c.source)["duration"] if c.end is None else c.end
+    if end <= c.start:
+        raise AssemblyError(f"{c.source}: trim {c.start}-{end}s leaves nothing")
+    return end - c.start
+
+
+def _encode(clips, target, out, threads):
+    """Render one segment (trims, fades, crossfades) to match the copied clips."""
+    w, h, fps = target["width"], target["height"], target["fps"]
+    cmd = [FFMPEG, "-y", "-v", "error"]
+    chains = []
+    for n, c in enumerate(clips):
+        if c.start:
+            cmd += ["-ss", f"{c.start:.3f}"]
+        if c.end is not None:
+            cmd += ["-t", f"{c.end - c.start:.3f}"]
+        cmd += ["-i", str(c.source)]
+        length = _length(c)
+        f = (f"[{n}:v]fps={fps},scale={w}:{h}:force_original_aspect_ratio=decrease,"
+             f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,setsar=1,format={target['pix_fmt']},settb=AVTB")
+        if c.fade_in:
+            f += f",fade=t=in:st=0:d={c.fade_in}"
+        if c.fade_out:
+            f += f",fade=t=out:st={length - c.fade_out:.3f}:d={c.fade_out}"
+        chains.append(f + f"[v{n}]")
+
+    # xfade chain: each crossfade starts where the joined-so-far video ends, minus the overlap
+    last, total = "v0", _length(clips[0])
+    for n, c in enumerate(clips[1:], 1):
+        total -= c.crossfade
+        chains.append(f"[{last}][v{n}]xfade=transition=fade:duration={c.crossfade}:offset={total:.3f}[x{n}]")
+        last, total = f"x{n}", total + _length(c)
+
+    num, _, den = fps.partition("/")
+    frames = round(total * int(num) / int(den or 1))     # exact, so long timelines don't drift
+    cmd += ["-filter_complex", ";".join(chains), "-map", f"[{last}]", "-an", "-frames:v", str(frames),
+            "-c:v", ENCODERS[target["codec"]], "-preset", PRESET, "-crf", str(CRF),
+            "-pix_fmt", target["pix_fmt"], "-r", fps, "-threads", str(threads),
+            "-video_track_timescale", target["time_base"].split("/")[1], str(out)]
+    if target["codec"] == "h264" and target["profile"]:
+        profile = target["profile"].lower().replace("constrained ", "")
+        if profile in ("baseline", "main", "high"):
+            cmd[-1:-1] = ["-profile:v", profile]
+    _run(cmd)
+    return out
+
+
+def _concat_list(paths, out):
+    lines = ["ffconcat version 1.0"]
+    for p in paths:
+        lines.append("file '" + str(Path(p).resolve()).replace("'", "'\\''") + "'")
+    Path(out).write_text("\n".join(lines) + "\n")
+    return out
+
+
+def _mux(listfile, tracks, duration, out):
+    """Concat by stream copy, mix the audio tracks in, write out."""
+    cmd = [FFMPEG, "-y", "-v", "error", "-f", "concat", "-safe", "0", "-i", str(listfile)]
+    for t in tracks:
+        cmd += ["-i", str(t.source)]
+    cmd += ["-map", "0:v", "-c:v", "copy"]
+    if tracks:
+        chains = []
+        for n, t in enumerate(tracks, 1):
+            delay = int(t.start * 1000)
+            chains.append(f"[{n}:a]adelay={delay}:all=1,volume={t.volume}[a{n}]")
+        labels = "".join(f"[a{n}]" for n in range(1, len(tracks) + 1))
+        chains.append(f"{labels}amix=inputs={len(tracks)}:duration=longest:normalize=0[aout]")
+        cmd += ["-filter_complex", ";".join(chains), "-map", "[aout]", "-c:a", "aac", "-b:a", AUDIO_BITRATE]
+    cmd += ["-t", f"{duration:.3f}", "-movflags", "+faststart", "-f", "mp4", str(out)]
+    _run(cmd)
+
+
+def assemble(timeline, output, audio=(), project=None, workers=None):
+    """Join a timeline of clips into output (mp4) with audio tracks mixed in. Returns the Path.
+
+    timeline: Clips, or bare sources (paths, Jobs, outputs dicts) for plain cuts.
+    audio: Tracks, or bare sources placed at 0s.
+    """
+    started = time.time()
+    output = Path(output)
+    target, segments = plan(timeline, project)
+    tracks = [t if isinstance(t, Track) else Track(t) for t in audio]
+    tracks = [Track(resolve(t.source, project, audio=True), t.start, t.volume) for t in tracks]
+
+    encodes = [clips for kind, clips in segments if kind == "encode"]
+    workers = workers or min(4, os.cpu_count() or 1)
+    threads = max(1, (os.cpu_count() or 1) // min(workers, max(len(encodes), 1)))
+    output.parent.mkdir(parents=True, exist_ok=True)
+    work = Path(tempfile.mkdtemp(prefix=".assemble_", dir=output.parent))
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="encode") as pool:
+            rendered = {id(clips): pool.submit(_encode, clips, target, work / f"seg_{n:04d}.mp4", threads)
+                        for n, clips in enumerate(encodes)}
+            parts = [clips[0].source if kind == "copy" else rendered[id(clips)].result()
+                     for kind, clips in segments]
+        duration = sum(_length(c) - c.crossfade for _, clips in segments for c in clips)
+        part = output.with_name(output.name + ".part")
+        _mux(_concat_list(parts, work / "concat.txt"), tracks, duration, part)
+        os.replace(part, output)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    copied = sum(len(clips) for kind, clips in segments if kind == "copy")
+    print(f"  Assembled: {output.name} ({duration:.1f}s) - {copied} clips copied, "
+          f"{len(encodes)} segments re-encoded, {len(tracks)} audio tracks, {time.time() - started:.1f}s")
+    return output
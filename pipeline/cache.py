@@ -0,0 +1,239 @@
+"""
+Result cache - same graph in, same outputs out, no GPU time.
+
+Keyed on a hash of the canonical workflow: sorted keys, no `_meta`, no
+`filename_prefix` (cosmetic - it only names the file), cached text
+encodes counted as plain ones. Two calls with the same prompt, seed,
+frames and resolution hit the same entry.
+
+Each entry is one JSON file under cache/results/ holding the outputs
+dict ComfyUI returned plus any local artifact paths. On a hit every
+artifact is checked to still exist with the recorded size; if not the
+entry is dropped and it counts as a miss. An entry with no local files
+(no project) is checked on the server instead: a HEAD /view per output,
+so a cleared output folder can't hand back dead refs - and one that
+recorded no server can't be checked, so it isn't kept. Least recently used entries
+are evicted past max_entries or max_bytes (artifact bytes included).
+
+Usage:
+    cache = ResultCache()
+    outputs = cache.get(workflow)           # None on a miss
+    cache.put(workflow, outputs, artifacts=["projects/x/scenes/a.mp4"])
+    cache.stats()                           # hits, misses, evictions, ...
+"""
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from pipeline import transport
+from pipeline.conditioning import to_plain
+from pipeline.retrieve import artifacts as output_refs
+
+DEFAULT_DIR = Path(__file__).resolve().parent.parent / "cache" / "results"
+
+# Inputs that never change what gets generated
+COSMETIC_INPUTS = ("filename_prefix",)
+
+
+def canonical(workflow):
+    """The workflow with cosmetic fields stripped, as a stable JSON string."""
+    clean = {}
+    for nid, node in to_plain(workflow).items():
+        node = {k: v for k, v in node.items() if k != "_meta"}
+        inputs = node.get("inputs")
+        if inputs:
+            node["inputs"] = {k: v for k, v in inputs.items() if k not in COSMETIC_INPUTS}
+        clean[str(nid)] = node
+    return json.dumps(clean, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def workflow_key(workflow):
+    """sha256 of canonical(workflow)."""
+    return hashlib.sha256(canonical(workflow).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Persistent LRU of workflow -> outputs (+ artifact paths) on disk."""
+
+    def __init__(self, root=DEFAULT_DIR, max_entries=5000, max_bytes=50 * 1024**3):
+        self.root = Path(root)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = None          # key -> [last_used, bytes]
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def _path(self, key):
+        return self.root / f"{key}.json"
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        if not self.root.exists():
+            return
+        for p in self.root.glob("*.json"):
+            try:
+                entry = json.loads(p.read_text())
+                st = p.stat()
+            except (OSError, ValueError):
+                continue
+            self._index[p.stem] = [st.st_mtime, st.st_size + entry.get("artifact_bytes", 0)]
+
+    # --- lookup ---
+
+    def get(self, workflow, key=None):
+        """Stored entry dict ({outputs, artifacts, prompt_id, ...}) or None."""
+        key = key or workflow_key(workflow)
+        with self._lock:
+            self._load_index()
+            if key not in self._index:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                entry = json.loads(path.read_text())
+            except (OSError, ValueError):
+                entry = None
+            if entry is None or not self._intact(entry):
+                self._drop(key)
+                self.stale += 1
+                self.misses += 1
+                return None
+        if not entry.get("artifacts") and not self._on_server(entry):
+            with self._lock:
+                self._drop(key)
+                self.stale += 1
+                self.misses += 1
+            return None
+        with self._lock:
+            now = time.time()
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+            self._index[key][0] = now
+            self.hits += 1
+            return entry
+
+    def _intact(self, entry):
+        for art in entry.get("artifacts", []):
+            try:
+                if os.path.getsize(art["path"]) != art["bytes"]:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def _on_server(self, entry):
+        """Every output file of an entry without local copies is still on its server (HEAD /view)."""
+        refs = output_refs(entry.get("outputs") or {})
+        server = entry.get("server")
+        if not refs:
+            return True
+        if not server:
+            return False
+        for ref in refs:
+            try:
+                r = transport.request("HEAD", f"{server}/view", params=ref, retries=0)
+            except OSError:
+                return False
+            if r.status != 200:
+                return False
+        return True
+
+    # --- store ---
+
+    def put(self, workflow, outputs, artifacts=(), prompt_id=None, key=None, server=None):
+        """Remember outputs for this workflow. artifacts: local file paths; server: where the outputs live."""
+        key = key or workflow_key(workflow)
+        arts = []
+        for path in artifacts:
+            try:
+                arts.append({"path": str(path), "bytes": os.path.getsize(path)})
+            except OSError:
+                continue
+        entry = {
+            "key": key,
+            "prompt_id": prompt_id,
+            "server": server,
+            "created": time.time(),
+            "outputs": copy.deepcopy(outputs),
+            "artifacts": arts,
+            "artifact_bytes": sum(a["bytes"] for a in arts),
+        }
+        data = json.dumps(entry)
+        with self._lock:
+            self._load_index()
+            self.root.mkdir(parents=True, exist_ok=True)
+            path = self._path(key)
+            tmp = path.with_suffix(f".tmp{threading.get_ident()}")
+            tmp.write_text(data)
+            os.replace(tmp, path)
+            self._index[key] = [time.time(), len(data) + entry["artifact_bytes"]]
+            self._evict()
+        return key
+
+    def add_artifacts(self, key, paths):
+        """Attach downloaded files to an existing entry."""
+        with self._lock:
+            path = self._path(key)
+            try:
+                entry = json.loads(path.read_text())
+            except (OSError, ValueError):
+                return
+        known = {a["path"] for a in entry["artifacts"]}
+        paths = [a["path"] for a in entry["artifacts"]] + [str(p) for p in paths if str(p) not in known]
+        self.put(None, entry["outputs"], paths, entry.get("prompt_id"), key=key, server=entry.get("server"))
+
+    def _evict(self):
+        total = sum(size for _, size in self._index.values())
+        if len(self._index) <= self.max_entries and total <= self.max_bytes:
+            return
+        for key, (_, size) in sorted(self._index.items(), key=lambda kv: kv[1][0]):
+            if len(self._index) <= self.max_entries and total <= self.max_bytes:
+                break
+            self._drop(key)
+            total -= size
+            self.evictions += 1
+
+    def _drop(self, key):
+        # Only the index entry goes; artifacts belong to the project tree.
+        self._index.pop(key, None)
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def invalidate(self, workflow=None, key=None):
+        key = key or workflow_key(workflow)
+        with self._lock:
+            self._load_index()
+            self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._load_index()
+            for key in list(self._index):
+                self._drop(key)
+
+    def stats(self):
+        with self._lock:
+            self._load_index()
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._index),
+                "bytes": sum(size for _, size in self._index.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,304 @@
+"""
+Completion engine - one WebSocket per server, one Future per prompt.
+
+ComfyUI pushes execution events over /ws?clientId=. We subscribe once
+and resolve the matching Future the moment a prompt finishes, instead
+of sleeping between GET /history calls.
+
+If the socket drops, pending prompts fall back to /history polling with
+an exponential interval (fast at first, backing off to max_poll) until
+the socket is back.
+
+Usage:
+    engine = CompletionEngine("http://localhost:8188")
+    r = transport.post(f"{url}/prompt", json={"prompt": wf, "client_id": engine.client_id})
+    outputs = engine.wait(r.json()["prompt_id"])
+"""
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from pipeline import transport, ws
+
+
+class WorkflowError(Exception):
+    """ComfyUI ran the prompt and it failed."""
+
+
+def history_result(entry):
+    """Turn one /history entry into ('success', outputs) / ('error', msg) / (None, None)."""
+    status = entry.get("status", {})
+    state = status.get("status_str")
+    if state == "success" or (state is None and status.get("completed")):
+        return "success", entry.get("outputs", {})
+    if state == "error":
+        msgs = status.get("messages", [])
+        err = [m for m in msgs if m[0] == "execution_error"]
+        if err:
+            return "error", err[0][1].get("exception_message", "Unknown error")
+        return "error", "Workflow failed"
+    return None, None
+
+
+class CompletionEngine:
+    """Tracks prompts on one ComfyUI server and resolves them as they finish."""
+
+    def __init__(self, server, client_id=None, min_poll=0.1, max_poll=5.0, history_timeout=10):
+        self.server = server.rstrip("/")
+        self.client_id = client_id or uuid.uuid4().hex
+        self.min_poll = min_poll
+        self.max_poll = max_poll
+        self.history_timeout = history_timeout
+
+        self._lock = threading.Lock()
+        self._pending = {}                  # prompt_id -> Future
+        self._early = OrderedDict()         # prompt_id -> (kind, payload) seen before track()
+        self._recheck = set()               # finished on the socket, not yet in /history
+        self._foreign = set()               # queued under another client_id - no socket events
+        self._catchup = False
+        self._listeners = []
+        self._connected = threading.Event()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._ws = None
+        self._threads = []
+        self._fetcher = ThreadPoolExecutor(max_workers=4, thread_name_prefix="comfy-hist")
+        self.reconnects = 0
+
+    # --- lifecycle ---
+
+    def start(self):
+        """Start the socket reader and the fallback poller. Safe to call twice."""
+        if self._threads:
+            return self
+        for target, name in ((self._read_loop, "ws"), (self._poll_loop, "poll")):
+            t = threading.Thread(target=target, name=f"comfy-{name}-{self.client_id[:6]}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        # Give the socket a moment so the first prompt is tracked live.
+        self._connected.wait(2)
+        return self
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        sock = self._ws
+        if sock:
+            sock.close()
+        self._fetcher.shutdown(wait=False)
+
+    @property
+    def connected(self):
+        return self._connected.is_set()
+
+    def add_listener(self, fn):
+        """fn(event_dict) is called for every WebSocket message (from the reader thread)."""
+        self._listeners.append(fn)
+
+    # --- tracking ---
+
+    def track(self, prompt_id):
+        """Future that resolves to the prompt's outputs dict."""
+        with self._lock:
+            fut = self._pending.get(prompt_id)
+            if fut is not None:
+                return fut
+            fut = Future()
+            early = self._early.pop(prompt_id, None)
+            if early is None:
+                self._pending[prompt_id] = fut
+        if early is not None:
+            self._finish(fut, prompt_id, *early)
+        elif not self.connected:
+            self._wake.set()
+        return fut
+
+    def adopt(self, prompt_id):
+        """
+        Future for a prompt queued by someone else (e.g. before a restart).
+        ComfyUI only sends events to the client that queued it, so these
+        are watched through /history.
+        """
+        with self._lock:
+            fut = self._pending.get(prompt_id)
+            if fut is not None:
+                return fut
+            fut = self._pending[prompt_id] = Future()
+            self._foreign.add(prompt_id)
+        self._wake.set()
+        return fut
+
+    def forget(self, prompt_id):
+        """Stop tracking a prompt that will never finish (deleted from the queue). Its Future stays unresolved."""
+        with self._lock:
+            self._pending.pop(prompt_id, None)
+            self._recheck.discard(prompt_id)
+            self._foreign.discard(prompt_id)
+
+    def wait(self, prompt_id, timeout=600):
+        """Block until prompt_id finishes. Returns outputs or raises WorkflowError."""
+        fut = self.track(prompt_id)
+        try:
+            return fut.result(timeout)
+        except TimeoutError:
+            raise TimeoutError(f"Timeout waiting for {prompt_id}") from None
+
+    def pending(self):
+        with self._lock:
+            return list(self._pending)
+
+    # --- resolution ---
+
+    def _resolve(self, prompt_id, kind, payload):
+        with self._lock:
+            fut = self._pending.pop(prompt_id, None)
+            if fut is None:
+                # Finished before anyone tracked it (fast or cached prompts).
+                self._early[prompt_id] = (kind, payload)
+                while len(self._early) > 1024:
+                    self._early.popitem(last=False)
+                return
+        if kind == "done":
+            # Keep the socket reader free; fetch outputs on a worker.
+            self._fetcher.submit(self._finish, fut, prompt_id, kind, payload)
+        else:
+            self._finish(fut, prompt_id, kind, payload)
+
+    def _finish(self, fut, prompt_id, kind, payload):
+        if kind == "error":
+            fut.set_exception(WorkflowError(payload))
+            return
+        if kind == "done":
+            # The socket only told us it's over; /history has the outputs.
+            try:
+                kind, payload = self._fetch_history(prompt_id)
+            except Exception as e:
+                fut.set_exception(e)
+                return
+            if kind is None:
+                # Rare race: finished on the socket, not yet in history.
+                with self._lock:
+                    self._pending[prompt_id] = fut
+                    self._recheck.add(prompt_id)
+                self._wake.set()
+                return
+            if kind == "error":
+                fut.set_exception(WorkflowError(payload))
+                return
+        fut.set_result(payload)
+
+    def _fetch_history(self, prompt_id):
+        hist = transport.get_json(f"{self.server}/history/{prompt_id}", timeout=self.history_timeout)
+        if prompt_id not in hist:
+            return None, None
+        return history_result(hist[prompt_id])
+
+    # --- socket ---
+
+    def _ws_url(self):
+        base = self.server.replace("http://", "ws://")
+        return f"{base}/ws?clientId={self.client_id}"
+
+    def _read_loop(self):
+        backoff = self.min_poll
+        while not self._stop.is_set():
+            try:
+                self._ws = ws.connect(self._ws_url())
+            except (OSError, ws.ConnectionClosed):
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, self.max_poll)
+                continue
+            backoff = self.min_poll
+            self._connected.set()
+            # Anything that finished while we were away is only in /history.
+            self._catchup = True
+            self._wake.set()
+            try:
+                while not self._stop.is_set():
+                    self._on_message(self._ws.recv())
+            except (OSError, ws.ConnectionClosed, ValueError):
+                pass
+            finally:
+                self._connected.clear()
+                self._ws.close()
+                self._ws = None
+                if not self._stop.is_set():
+                    self.reconnects += 1
+                    self._wake.set()
+
+    def _on_message(self, text):
+        try:
+            msg = json.loads(text)
+        except ValueError:
+            return
+        for fn in self._listeners:
+            try:
+                fn(msg)
+            except Exception:
+                pass
+        kind = msg.get("type")
+        data = msg.get("data") or {}
+        prompt_id = data.get("prompt_id")
+        if not prompt_id:
+            return
+        if kind == "executing" and data.get("node") is None:
+            # Sent after the history entry is written, so /history is
+            # guaranteed to have the outputs. execution_success comes a
+            # moment earlier, before the history write.
+            self._resolve(prompt_id, "done", None)
+        elif kind == "execution_error":
+            self._resolve(prompt_id, "error", data.get("exception_message", "Unknown error"))
+        elif kind == "execution_interrupted":
+            self._resolve(prompt_id, "error", "Interrupted")
+
+    # --- fallback polling ---
+
+    def _poll_loop(self):
+        interval = self.min_poll
+        while not self._stop.is_set():
+            idle = self.connected and not self._recheck and not self._foreign and not self._catchup
+            self._wake.wait(None if idle else interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            if self.connected and not self._catchup:
+                with self._lock:
+                    ids = list(self._recheck | self._foreign)
+            else:
+                self._catchup = False
+                ids = self.pending()
+            if not ids:
+                interval = self.min_poll
+                continue
+            progressed = False
+            for prompt_id in ids:
+                try:
+                    kind, payload = self._fetch_history(prompt_id)
+                except Exception:
+                    continue
+                if kind is None:
+                    continue
+                with self._lock:
+                    fut = self._pending.pop(prompt_id, None)
+                    self._recheck.discard(prompt_id)
+                    self._foreign.discard(prompt_id)
+                if fut is not None:
+                    self._finish(fut, prompt_id, kind, payload)
+                    progressed = True
+            interval = self.min_poll if progressed else min(interval * 2, self.max_poll)
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(server):
+    """Shared, started engine for a server URL."""
+    server = server.rstrip("/")
+    with _engines_lock:
+        engine = _engines.get(server)
+        if engine is None:
+            engine = _engines[server] = CompletionEngine(server).start()
+        return engine
@@ -0,0 +1,110 @@
+"""
+Prompt-encoding cache - encode each text once per backend, not once per job.
+
+Every LTX job pushes the same negative prompt through T5-XXL, and shot
+lists reuse the same styled prompts across takes. ComfyUI only reuses a
+node's output from the previous prompt, so any other model in between
+(a Flux keyframe, an MMAudio track) throws it away.
+
+On backends with the CachedCLIPTextEncode node (custom_nodes/
+videofactory_prompt_cache) every CLIPTextEncode is swapped for it, with
+the loader's settings as the cache key. Backends without it get plain
+CLIPTextEncode, so one graph is safe to send anywhere.
+
+T5 encodings aren't prefix-separable, so "style prefix + scene" is
+cached as a whole text: retakes and repeated shots hit, new scenes don't.
+
+Usage:
+    wf = for_backend(wf, "http://localhost:8188")
+    server_stats("http://localhost:8188")      # {"hits": .., "misses": .., "entries": ..}
+"""
+import threading
+import time
+
+from pipeline import transport
+
+NODE = "CachedCLIPTextEncode"
+PLAIN = "CLIPTextEncode"
+
+# Loaders whose output feeds CLIPTextEncode.clip, and the inputs that pick the encoder
+CLIP_LOADERS = {
+    "CLIPLoader": ("clip_name", "type"),
+    "DualCLIPLoader": ("clip_name1", "clip_name2", "type"),
+    "TripleCLIPLoader": ("clip_name1", "clip_name2", "clip_name3"),
+    "CheckpointLoaderSimple": ("ckpt_name",),
+}
+
+RECHECK_AFTER = 60      # seconds before asking an unreachable server again
+
+_support = {}           # server -> (supported, checked_at)
+_lock = threading.Lock()
+
+
+def encoder_key(graph, clip_link):
+    """'CLIPLoader:t5xxl_fp16.safetensors:ltxv' for the loader a clip input points at, or None."""
+    if not (isinstance(clip_link, list) and len(clip_link) == 2):
+        return None
+    loader = graph.get(clip_link[0])
+    if loader is None or loader.get("class_type") not in CLIP_LOADERS:
+        return None
+    inputs = loader.get("inputs", {})
+    values = [inputs.get(name) for name in CLIP_LOADERS[loader["class_type"]]]
+    if not all(isinstance(v, str) for v in values if v is not None):
+        return None     # driven by another node - can't key on it
+    return ":".join([loader["class_type"]] + [str(v) for v in values if v is not None])
+
+
+def to_cached(graph):
+    """Graph with every keyable CLIPTextEncode swapped for the cached node."""
+    out = None
+    for nid, node in graph.items():
+        if node.get("class_type") != PLAIN:
+            continue
+        key = encoder_key(graph, node.get("inputs", {}).get("clip"))
+        if key is None:
+            continue
+        out = out or dict(graph)
+        out[nid] = {**node, "class_type": NODE, "inputs": {**node["inputs"], "encoder": key}}
+    return out or graph
+
+
+def to_plain(graph):
+    """Undo to_cached() for servers without the node."""
+    out = None
+    for nid, node in graph.items():
+        if node.get("class_type") != NODE:
+            continue
+        out = out or dict(graph)
+        inputs = {k: v for k, v in node.get("inputs", {}).items() if k != "encoder"}
+        out[nid] = {**node, "class_type": PLAIN, "inputs": inputs}
+    return out or graph
+
+
+def supported(server):
+    """Does this server have CachedCLIPTextEncode? Asked once, remembered."""
+    server = server.rstrip("/")
+    with _lock:
+        known = _support.get(server)
+    if known is not None and (known[0] is not None or time.time() - known[1] < RECHECK_AFTER):
+        return bool(known[0])
+    try:
+        info = transport.get_json(f"{server}/object_info/{NODE}", retries=0)
+        ok = NODE in info
+    except (OSError, transport.HTTPError, ValueError):
+        ok = None       # server down - plain graphs for now, ask again later
+    with _lock:
+        _support[server] = (ok, time.time())
+    return bool(ok)
+
+
+def for_backend(graph, server):
+    """The graph in the form this server can run, cached encodes where possible."""
+    return to_cached(graph) if supported(server) else to_plain(graph)
+
+
+def server_stats(server):
+    """Hit/miss counters from the node's /prompt_cache/stats route, or None."""
+    try:
+        return transport.get_json(f"{server.rstrip('/')}/prompt_cache/stats", retries=0)
+    except (OSError, transport.HTTPError, ValueError):
+        return None
@@ -0,0 +1,230 @@
+"""
+UI-format workflows (what "Save" in the ComfyUI editor writes) -> API-format graphs.
+
+A UI export is a list of nodes with positional `widgets_values` plus a
+separate `links` table; /prompt wants {node_id: {class_type, inputs}}.
+Which widget value belongs to which input is only known from the node's
+definition, so conversion reads the server's /object_info (the on-disk
+snapshot in pipeline/schema.py, fetched once). Like the editor's own
+"Save (API)":
+
+    - widget values are matched to the definition's inputs in order,
+      skipping the seed "control after generate" value and image upload
+      buttons; dict-style widgets_values (VHS) are matched by name
+    - links become [source_id, output_slot], followed through Reroutes
+      and bypassed nodes; a PrimitiveNode's value is inlined
+    - Notes and muted nodes are dropped
+
+Converted graphs are memoized under cache/converted/, one entry per
+file keyed by its size/mtime and sha256 plus the snapshot digest: a
+repeat load() of an unchanged file reads the small API graph back and
+neither parses the UI export nor touches /object_info. API-format files
+are returned as they are.
+
+Usage:
+    graph = load("workflows/ltx_video_gen.json", "http://localhost:8188")
+    graph = convert(json.load(f), schema.object_info(server))      # no memo
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from pipeline import schema
+from pipeline.templates import is_api_format
+
+DEFAULT_DIR = Path(__file__).resolve().parent.parent / "cache" / "converted"
+
+VIRTUAL = {"Note", "MarkdownNote", "Reroute", "PrimitiveNode"}
+WIDGET_TYPES = {"INT", "FLOAT", "STRING", "BOOLEAN", "COMBO"}
+SEED_CONTROL = {"fixed", "increment", "decrement", "randomize"}
+MUTED, BYPASSED = 2, 4
+
+
+class ConvertError(ValueError):
+    pass
+
+
+def is_ui_format(graph):
+    return isinstance(graph, dict) and isinstance(graph.get("nodes"), list) and "links" in graph
+
+
+def _links(ui):
+    """link id -> (source node id, source slot). Old exports use lists, newer ones dicts."""
+    out = {}
+    for link in ui.get("links") or ():
+        if isinstance(link, dict):
+            out[link["id"]] = (link["origin_id"], link["origin_slot"])
+        else:
+            out[link[0]] = (link[1], link[2])
+    return out
+
+
+def _inputs(definition):
+    """[(name, type, options)] of a node definition, in widget order."""
+    spec = definition.get("input", {})
+    order = definition.get("input_order") or {}
+    out = []
+    for group in ("required", "optional"):
+        section = spec.get(group) or {}
+        for name in order.get(group) or list(section):
+            if name not in section:
+                continue
+            entry = section[name]
+            kind = entry[0] if entry else None
+            opts = entry[1] if len(entry) > 1 and isinstance(entry[1], dict) else {}
+            out.append((name, kind, opts))
+    return out
+
+
+def _is_widget(kind, opts):
+    if opts.get("forceInput"):
+        return False
+    return isinstance(kind, list) or kind in WIDGET_TYPES
+
+
+def _widget_values(node, definition):
+    """{input name: value} from the node's widgets_values."""
+    values = node.get("widgets_values")
+    widgets = [(n, k, o) for n, k, o in _inputs(definition) if _is_widget(k, o)]
+    if isinstance(values, dict):
+        return {n: values[n] for n, _, _ in widgets if n in values}
+    values = list(values or ())
+    out, i = {}, 0
+    for name, kind, opts in widgets:
+        if i < len(values):
+            out[name] = values[i]
+            i += 1
+        elif "default" in opts:
+            out[name] = opts["default"]
+        if kind == "INT" and i < len(values) and values[i] in SEED_CONTROL and \
+                (opts.get("control_after_generate") or name in ("seed", "noise_seed")):
+            i += 1      # "control after generate" - a frontend widget, never sent
+        if any(opts.get(k) for k in ("image_upload", "video_upload", "audio_upload")) and i < len(values) \
+                and isinstance(values[i], str) and values[i] in ("image", "video", "audio"):
+            i += 1      # the upload button's placeholder value
+    return out
+
+
+def convert(ui, object_info):
+    """API-format graph for a UI export. object_info: {class_type: definition} from the server."""
+    if not is_ui_format(ui):
+        raise ConvertError("not a UI-format workflow (no nodes/links)")
+    if (ui.get("definitions") or {}).get("subgraphs"):
+        raise ConvertError("workflows with subgraphs aren't supported - unpack them in the editor first")
+    nodes = {n["id"]: n for n in ui["nodes"]}
+    links = _links(ui)
+    missing = sorted({n["type"] for n in nodes.values() if n["type"] not in VIRTUAL
+                      and n.get("mode", 0) not in (MUTED, BYPASSED) and n["type"] not in object_info})
+    if missing:
+        raise ConvertError(f"node types the server doesn't have: {', '.join(missing)}")
+
+    def source(link_id, seen=()):
+        """[node id, slot] (or an inlined value, or None) that link_id really comes from."""
+        if link_id is None or link_id not in links:
+            return None
+        nid, slot = links[link_id]
+        node = nodes.get(nid)
+        if node is None or nid in seen:
+            return None
+        seen = seen + (nid,)
+        if node["type"] == "Reroute":
+            return source((node.get("inputs") or [{}])[0].get("link"), seen)
+        if node["type"] == "PrimitiveNode":
+            vals = node.get("widgets_values") or [None]
+            return ("value", vals[0])
+        mode = node.get("mode", 0)
+        if mode == MUTED:
+            return None
+        if mode == BYPASSED:
+            # passes through the input of the same type, preferring the same slot
+            kind = ((node.get("outputs") or [])[slot:slot + 1] or [{}])[0].get("type")
+            ins = [i for i in node.get("inputs") or () if i.get("link") is not None and i.get("type") == kind]
+            ins.sort(key=lambda i: node["inputs"].index(i) != slot)
+            return source(ins[0]["link"], seen) if ins else None
+        return [str(nid), slot]
+
+    graph = {}
+    for nid, node in sorted(nodes.items(), key=lambda kv: kv[1].get("order", 0)):
+        if node["type"] in VIRTUAL or node.get("mode", 0) in (MUTED, BYPASSED):
+            continue
+        inputs = _widget_values(node, object_info[node["type"]])
+        for inp in node.get("inputs") or ():
+            src = source(inp.get("link"))
+            if src is None:
+                continue
+            inputs[inp["name"]] = src[1] if isinstance(src, tuple) else src
+        graph[str(nid)] = {"class_type": node["type"], "inputs": inputs,
+                           "_meta": {"title": node.get("title") or node["type"]}}
+    if not graph:
+        raise ConvertError("nothing to run - every node is a note, muted or bypassed")
+    return graph
+
+
+class Converter:
+    """load() with converted graphs memoized on disk."""
+
+    __slots__ = ("root", "schemas", "hits", "misses", "_lock")
+
+    def __init__(self, root=DEFAULT_DIR, schemas=None):
+        self.root = Path(root)
+        self.schemas = schemas or schema.CACHE
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _entry_path(self, path):
+        return self.root / (hashlib.sha256(str(path).encode()).hexdigest()[:32] + ".json")
+
+    def load(self, path, server):
+        """API-format graph for the workflow file at path, converted for server if it's a UI export."""
+        path = Path(path).resolve()
+        st = path.stat()
+        stored = self._entry_path(path)
+        entry = None
+        try:
+            entry = json.loads(stored.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            pass
+        known = self.schemas.digest(server)
+        if entry and entry["schema"] == known and entry["server"] == server.rstrip("/") \
+                and (entry["size"], entry["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+            with self._lock:
+                self.hits += 1
+            return entry["graph"]
+
+        raw = path.read_bytes()
+        sha = hashlib.sha256(raw).hexdigest()
+        if entry and entry["schema"] == known and entry["server"] == server.rstrip("/") and entry["sha256"] == sha:
+            graph = entry["graph"]          # touched, not changed
+            with self._lock:
+                self.hits += 1
+        else:
+            ui = json.loads(raw)
+            if is_api_format(ui):
+                return ui
+            nodes = self.schemas.object_info(server)
+            if any(n.get("type") not in nodes and n.get("type") not in VIRTUAL for n in ui.get("nodes") or ()):
+                nodes = self.schemas.object_info(server, refresh=True)      # new custom nodes?
+            graph = convert(ui, nodes)
+            with self._lock:
+                self.misses += 1
+        entry = {"path": str(path), "server": server.rstrip("/"), "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                 "sha256": sha, "schema": self.schemas.digest(server), "graph": graph}
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = stored.with_name(f"{stored.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(entry, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, stored)
+        return graph
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+CONVERTER = Converter()
+
+
+def load(path, server):
+    return CONVERTER.load(path, server)
@@ -0,0 +1,236 @@
+"""
+Dependency-graph executor - start each step the moment its inputs exist.
+
+Running a shot list stage by stage (every keyframe, then every video,
+then audio, then assembly) leaves GPUs idle at each boundary: the video
+workers wait for the slowest keyframe, assembly waits for the last clip.
+Here every task names the tasks it needs and starts as soon as they're
+done, so scene 1's video is rendering while scene 9's keyframe is.
+
+Each task belongs to a stage with a concurrency limit (how many of its
+jobs may be on the servers at once), so one stage can't flood ComfyUI's
+queue and starve the others. A task's fn gets its dependencies' results
+and returns a Job, a Future, or a plain value.
+
+report() shows where the batch spent its time: per stage, how long
+tasks ran and how long they sat ready but held back by their stage
+limit, and the critical path - the chain of tasks that decided when
+the batch finished.
+
+Usage:
+    g = Graph(limits={"keyframe": 2, "video": 4})
+    kf = g.add("keyframe:0", "keyframe", lambda: text_to_image_async(p))
+    g.add("video:0", "video", lambda img: image_to_video_async(name_of(img), p), deps=[kf])
+    results = g.run()
+    print_report(g.report())
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Task:
+    """One step: fn(*dep_results) -> Job | Future | value."""
+
+    __slots__ = ("name", "stage", "fn", "deps", "dependents", "ready_at", "started_at", "finished_at",
+                 "result", "error")
+
+    def __init__(self, name, stage, fn, deps=()):
+        self.name = name
+        self.stage = stage
+        self.fn = fn
+        self.deps = list(deps)
+        self.dependents = []
+        self.ready_at = None        # every dep finished
+        self.started_at = None      # got a slot in its stage, fn called
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+    @property
+    def done(self):
+        return self.finished_at is not None
+
+    def __repr__(self):
+        return f"<Task {self.name} [{self.stage}]>"
+
+
+class Graph:
+    """Tasks plus per-stage concurrency limits. run() once."""
+
+    def __init__(self, limits=None, default_limit=4, workers=16):
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit
+        self.tasks = {}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dag")
+        self._lock = threading.Lock()
+        self._ready = {}            # stage -> deque of tasks waiting for a slot
+        self._running = {}          # stage -> tasks holding a slot
+        self._left = 0
+        self._all_done = threading.Event()
+        self.started = None
+        self.finished = None
+
+    def add(self, name, stage, fn, deps=()):
+        if name in self.tasks:
+            raise ValueError(f"duplicate task {name}")
+        task = Task(name, stage, fn, [self.tasks[d] if isinstance(d, str) else d for d in deps])
+        for d in task.deps:
+            d.dependents.append(task)
+        self.tasks[name] = task
+        return task
+
+    def limit(self, stage):
+        return self.limits.get(stage, self.default_limit)
+
+    # --- running ---
+
+    def run(self, timeout=None):
+        """Run everything; returns {name: result} of the tasks that succeeded.
+
+        Failed tasks (and everything downstream of them) are in failed().
+        """
+        self.started = time.time()
+        with self._lock:
+            self._left = len(self.tasks)
+            if not self._left:
+                self._all_done.set()
+            roots = [t for t in self.tasks.values() if not t.deps]
+            for t in roots:
+                self._make_ready(t, self.started)
+            stages = {t.stage for t in roots}
+        for stage in stages:
+            self._pump(stage)
+        if not self._all_done.wait(timeout):
+            raise TimeoutError(f"{self._left} of {len(self.tasks)} tasks not done after {timeout}s")
+        self._pool.shutdown(wait=True)
+        self.finished = max((t.finished_at for t in self.tasks.values()), default=self.started)
+        return {t.name: t.result for t in self.tasks.values() if t.error is None}
+
+    def failed(self):
+        return {t.name: t.error for t in self.tasks.values() if t.error is not None}
+
+    def _make_ready(self, task, now):
+        task.ready_at = now
+        self._ready.setdefault(task.stage, deque()).append(task)
+
+    def _pump(self, stage):
+        """Start as many ready tasks of this stage as its limit allows."""
+        with self._lock:
+            ready = self._ready.get(stage)
+            running = self._running.setdefault(stage, set())
+            starting = []
+            while ready and len(running) < self.limit(stage):
+                task = ready.popleft()
+                running.add(task)
+                task.started_at = time.time()
+                starting.append(task)
+        for task in starting:
+            self._pool.submit(self._start, task)
+
+    def _start(self, task):
+        try:
+            out = task.fn(*[d.result for d in task.deps])
+        except Exception as e:
+            self._finish(task, None, e)
+            return
+        if hasattr(out, "add_done_callback") and hasattr(out, "exception"):
+            # Job or Future: both call back with something that has result()/exception()
+            out.add_done_callback(lambda f: self._finish(task, *_outcome(f)))
+        else:
+            self._finish(task, out, None)
+
+    def _finish(self, task, result, error):
+        now = time.time()
+        stages = {task.stage}
+        with self._lock:
+            task.result, task.error, task.finished_at = result, error, now
+            self._running[task.stage].discard(task)
+            self._left -= 1
+            for t in self._settle(task, now):
+                stages.add(t.stage)
+            if self._left == 0:
+                self._all_done.set()
+        for stage in stages:
+            self._pump(stage)
+
+    def _settle(self, task, now):
+        """Dependents that can start (or must fail) now task is done."""
+        touched = []
+        for t in task.dependents:
+            if t.done or t.ready_at is not None or not all(d.done for d in t.deps):
+                continue
+            bad = next((d for d in t.deps if d.error is not None), None)
+            if bad is None:
+                self._make_ready(t, now)
+                touched.append(t)
+                continue
+            # never runs - fail it and everything below it
+            t.ready_at = t.started_at = t.finished_at = now
+            t.error = Exception(f"{bad.name} failed: {bad.error}")
+            self._left -= 1
+            touched += self._settle(t, now)
+        return touched
+
+    # --- where the time went ---
+
+    def critical_path(self):
+        """Tasks from the first start to the last finish, each one gated by the one before."""
+        done = [t for t in self.tasks.values() if t.finished_at is not None]
+        if not done:
+            return []
+        path = [max(done, key=lambda t: t.finished_at)]
+        while path[-1].deps:
+            path.append(max(path[-1].deps, key=lambda d: d.finished_at))
+        return path[::-1]
+
+    def report(self):
+        stages = {}
+        for t in self.tasks.values():
+            if t.started_at is None:
+                continue
+            s = stages.setdefault(t.stage, {"tasks": 0, "failed": 0, "limit": self.limit(t.stage),
+                                            "run_s": 0.0, "slot_wait_s": 0.0, "max_slot_wait_s": 0.0})
+            s["tasks"] += 1
+            s["failed"] += t.error is not None
+            s["run_s"] += t.finished_at - t.started_at
+            wait = t.started_at - t.ready_at
+            s["slot_wait_s"] += wait
+            s["max_slot_wait_s"] = max(s["max_slot_wait_s"], wait)
+        for s in stages.values():
+            for k in ("run_s", "slot_wait_s", "max_slot_wait_s"):
+                s[k] = round(s[k], 2)
+
+        path = []
+        for t in self.critical_path():
+            path.append({"task": t.name, "stage": t.stage,
+                         "ready_s": round(t.ready_at - self.started, 2),
+                         "slot_wait_s": round(t.started_at - t.ready_at, 2),
+                         "run_s": round(t.finished_at - t.started_at, 2)})
+        by_stage = {}
+        for p in path:
+            b = by_stage.setdefault(p["stage"], {"run_s": 0.0, "slot_wait_s": 0.0})
+            b["run_s"] = round(b["run_s"] + p["run_s"], 2)
+            b["slot_wait_s"] = round(b["slot_wait_s"] + p["slot_wait_s"], 2)
+        end = self.finished or time.time()
+        return {"wall_s": round(end - self.started, 2) if self.started else 0.0,
+                "tasks": len(self.tasks), "failed": len(self.failed()),
+                "stages": stages, "critical_path": path, "critical_by_stage": by_stage}
+
+
+def _outcome(f):
+    err = f.exception()
+    return (None, err) if err is not None else (f.result(), None)
+
+
+def print_report(r):
+    print(f"  {r['tasks']} tasks in {r['wall_s']}s ({r['failed']} failed)")
+    for stage, s in r["stages"].items():
+        print(f"    {stage:<10} {s['tasks']:>3} tasks  limit {s['limit']:<3} ran {s['run_s']:>7}s  "
+              f"held back {s['slot_wait_s']:>6}s (max {s['max_slot_wait_s']}s)")
+    print("  critical path:")
+    for stage, b in r["critical_by_stage"].items():
+        print(f"    {stage:<10} {b['run_s']:>7}s running  {b['slot_wait_s']:>6}s waiting for a slot")
+    for p in r["critical_path"]:
+        print(f"      {p['ready_s']:>7}s  {p['task']:<16} waited {p['slot_wait_s']}s, ran {p['run_s']}s")
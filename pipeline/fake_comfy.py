@@ -0,0 +1,619 @@
+"""
+Fake ComfyUI server - same HTTP/WebSocket surface, no GPU.
+
+Runs prompts one at a time like the real thing (front=True jumps the
+queue, POST /queue deletes), sleeping a synthetic execution time instead
+of sampling, and emits the same websocket events
+(execution_start, executing, executed, execution_success / execution_error,
+executing node=None). Good enough to test and benchmark everything in
+this repo that talks to ComfyUI.
+
+Text encodes cost encode_time each, reused the way ComfyUI reuses them:
+from the previous prompt only, or from an LRU when CachedCLIPTextEncode
+is in custom_nodes.
+
+Output files are synthetic: /view serves deterministic bytes for every
+file a finished prompt reported (artifact_bytes each, Range supported),
+generated on the fly so multi-GB "videos" cost no memory. Files sent to
+/upload/image are kept and served back with type=input; HEAD /view
+answers without a body.
+
+Usage:
+    python -m pipeline.fake_comfy --port 8188 --exec-time 2.0
+
+    with FakeComfy(exec_time=0.05) as fake:
+        factory.COMFY = fake.url
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import random
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from pipeline import ws
+from pipeline.affinity import model_set
+from pipeline.conditioning import NODE as CACHED_ENCODE, encoder_key
+
+OUTPUT_NODES = {
+    "SaveImage": ("images", "png"),
+    "PreviewImage": ("images", "png"),
+    "SaveVideo": ("images", "mp4"),
+    "SaveAnimatedWEBP": ("images", "webp"),
+    "SaveAudio": ("audio", "flac"),
+    "SaveLatent": ("latents", "latent"),
+}
+
+
+class FakeComfy:
+    """
+    In-process fake ComfyUI. exec_time may be a float or fn(prompt) -> seconds,
+    artifact_bytes an int or fn(filename) -> size. view_fail_rate cuts that
+    share of /view downloads off halfway. custom_nodes: extra node classes
+    this server claims to have (e.g. "CachedCLIPTextEncode").
+    vram_use: fn(prompt) -> peak GB the prompt really needs; more than
+    the card has free fails it with ComfyUI's OOM error. vram_other: GB
+    held by other processes on the card. object_info: node definitions
+    for /object_info to serve ({class_type: definition}); models: model
+    files for /models ({folder: [filename]}). Left None, /object_info only
+    answers per-class lookups and /models is a 404, like an old ComfyUI.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, exec_time=0.05, fail_rate=0.0,
+                 seed=0, gpu_name="Fake GPU", vram_total=24 * 1024**3, model_load_time=0.0,
+                 artifact_bytes=64 * 1024, view_fail_rate=0.0, encode_time=0.0, custom_nodes=(),
+                 vram_use=None, vram_other=0.0, object_info=None, models=None):
+        self.exec_time = exec_time
+        self.object_info = object_info
+        self.models = models
+        self.encode_time = encode_time
+        self.custom_nodes = set(custom_nodes)
+        self.encodes = 0                    # text encodes actually run
+        self.encode_seconds = 0.0
+        self._prev_encodes = set()          # ComfyUI's own cache: last prompt only
+        self._encode_lru = OrderedDict()    # CachedCLIPTextEncode
+        self.encode_stats = {"hits": 0, "misses": 0, "bypassed": 0}
+        self.fail_rate = fail_rate
+        self.artifact_bytes = artifact_bytes
+        self.view_fail_rate = view_fail_rate
+        self.files = {}                     # (type, subfolder, filename) -> size
+        self.uploads = {}                   # "subfolder/name" -> bytes, from /upload/image
+        self.model_load_time = model_load_time  # seconds per model not already loaded
+        self.loaded = frozenset()
+        self.model_loads = 0
+        self.gpu_name = gpu_name
+        self.vram_total = vram_total
+        self.vram_use = vram_use
+        self.vram_other = vram_other
+        self.vram_free = vram_total - int(vram_other * 1024**3)
+        self.torch_vram = 0                 # what the running prompt holds
+        self.ooms = 0
+        self._rng = random.Random(seed)
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._pending = []                  # [number, prompt_id, prompt, extra, outputs]
+        self._running = None
+        self.history = {}
+        self._sockets = {}                  # client_id -> [socket]
+        self._conns = set()                 # open HTTP keep-alive connections
+        self._sock_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.requests = 0                   # HTTP requests served, for benchmarks
+
+        fake = self
+
+        class Handler(_Handler):
+            server_ref = fake
+
+        self.httpd = _Server((host, port), Handler)
+        self._threads = []
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        for target in (self.httpd.serve_forever, self._worker):
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        self.drop_sockets()
+        with self._sock_lock:
+            conns, self._conns = list(self._conns), set()
+        for c in conns:
+            try:
+                c.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- websocket fan-out ---
+
+    def drop_sockets(self):
+        """Close every websocket, like a ComfyUI restart or a flaky proxy."""
+        with self._sock_lock:
+            socks = [s for group in self._sockets.values() for s in group]
+            self._sockets.clear()
+        for s in socks:
+            try:
+                s.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _add_socket(self, client_id, sock):
+        with self._sock_lock:
+            self._sockets.setdefault(client_id, []).append(sock)
+
+    def _remove_socket(self, client_id, sock):
+        with self._sock_lock:
+            group = self._sockets.get(client_id, [])
+            if sock in group:
+                group.remove(sock)
+
+    def send(self, event, data, client_id=None):
+        """Send to one client, or broadcast when client_id is None (as ComfyUI does)."""
+        text = json.dumps({"type": event, "data": data}).encode()
+        with self._sock_lock:
+            if client_id is None:
+                targets = [s for group in self._sockets.values() for s in group]
+            else:
+                targets = list(self._sockets.get(client_id, []))
+        for s in targets:
+            try:
+                ws.write_frame(s, ws.OP_TEXT, text)
+            except OSError:
+                self._remove_socket(client_id, s)
+
+    # --- queue ---
+
+    def submit(self, prompt, client_id=None, extra=None, front=False):
+        prompt_id = str(uuid.uuid4())
+        number = next(self._counter)
+        if front:
+            number = -number        # ComfyUI's trick: negative numbers sort first
+        extra = dict(extra or {})
+        if client_id:
+            extra["client_id"] = client_id
+        outputs = [nid for nid, node in prompt.items() if node.get("class_type") in OUTPUT_NODES]
+        with self._cond:
+            if front:
+                self._pending.insert(0, [number, prompt_id, prompt, extra, outputs])
+            else:
+                self._pending.append([number, prompt_id, prompt, extra, outputs])
+            self._cond.notify()
+        return prompt_id, number
+
+    def delete(self, prompt_ids=None):
+        """POST /queue: drop pending prompts (all of them if prompt_ids is None). Running ones stay."""
+        with self._cond:
+            keep = [] if prompt_ids is None else [p for p in self._pending if p[1] not in prompt_ids]
+            removed = len(self._pending) - len(keep)
+            self._pending[:] = keep
+        return removed
+
+    def queue_state(self):
+        with self._cond:
+            running = [self._running] if self._running else []
+            return {"queue_running": list(running), "queue_pending": list(self._pending)}
+
+    def _duration(self, prompt):
+        t = self.exec_time
+        return t(prompt) if callable(t) else t
+
+    def _worker(self):
+        while not self._stop.is_set():
+            with self._cond:
+                while not self._pending and not self._stop.is_set():
+                    self._cond.wait()
+                if self._stop.is_set():
+                    return
+                item = self._pending.pop(0)
+                self._running = item
+            try:
+                self._execute(item)
+            finally:
+                with self._cond:
+                    self._running = None
+
+    def _execute(self, item):
+        number, prompt_id, prompt, extra, output_ids = item
+        cid = extra.get("client_id")
+        started = time.time()
+        self.send("execution_start", {"prompt_id": prompt_id, "timestamp": int(started * 1000)}, cid)
+
+        models = model_set(prompt)
+        if models and not models <= self.loaded:
+            # ComfyUI evicts what doesn't fit; the fake just swaps the whole set.
+            fresh = len(models - self.loaded)
+            self.model_loads += fresh
+            self.loaded = models
+            if self.model_load_time:
+                time.sleep(self.model_load_time * fresh)
+
+        nodes = list(prompt)
+        per_node = self._duration(prompt) / max(len(nodes), 1)
+        fail_at, fail_msg = None, "Synthetic failure"
+        if self.fail_rate and self._rng.random() < self.fail_rate:
+            fail_at = self._rng.choice(nodes) if nodes else None
+        peak = self.vram_use(prompt) if self.vram_use else 0
+        if peak:
+            if peak > self.vram_total / 1024**3 - self.vram_other:
+                self.ooms += 1
+                fail_at = next((nid for nid in nodes if "Sampler" in prompt[nid].get("class_type", "")), nodes[0])
+                fail_msg = "Allocation on device 0 would exceed allowed memory. (out of memory)"
+            else:
+                self.torch_vram = int(peak * 1024**3)
+                self.vram_free = self.vram_total - int(self.vram_other * 1024**3) - self.torch_vram
+
+        outputs, messages = {}, [["execution_start", {"prompt_id": prompt_id, "timestamp": int(started * 1000)}]]
+        status = "success"
+        encoded = set()
+        for nid in nodes:
+            self.send("executing", {"node": nid, "display_node": nid, "prompt_id": prompt_id}, cid)
+            if per_node:
+                time.sleep(per_node)
+            node = prompt[nid]
+            if node.get("class_type") in ("CLIPTextEncode", CACHED_ENCODE):
+                self._text_encode(prompt, node, encoded)
+            if nid == fail_at:
+                err = {"prompt_id": prompt_id, "node_id": nid, "node_type": node.get("class_type"),
+                       "exception_message": fail_msg, "exception_type": "RuntimeError",
+                       "traceback": [], "executed": []}
+                self.send("execution_error", err, cid)
+                messages.append(["execution_error", err])
+                status = "error"
+                break
+            if nid in output_ids:
+                out = self._make_output(nid, node, prompt_id, batch_size(prompt))
+                outputs[nid] = out
+                self.send("executed", {"node": nid, "display_node": nid, "output": out,
+                                       "prompt_id": prompt_id}, cid)
+        if status == "success":
+            finished = {"prompt_id": prompt_id, "timestamp": int(time.time() * 1000)}
+            self.send("execution_success", finished, cid)
+            messages.append(["execution_success", finished])
+        self._prev_encodes = encoded
+        self.torch_vram = 0
+        self.vram_free = self.vram_total - int(self.vram_other * 1024**3)
+        self.history[prompt_id] = {
+            "prompt": [number, prompt_id, prompt, extra, output_ids],
+            "outputs": outputs,
+            "status": {"status_str": status, "completed": status == "success", "messages": messages},
+            "meta": {},
+        }
+        self.send("executing", {"node": None, "prompt_id": prompt_id}, cid)
+
+    def _text_encode(self, prompt, node, encoded):
+        inputs = node.get("inputs", {})
+        key = (encoder_key(prompt, inputs.get("clip")), inputs.get("text"))
+        encoded.add(key)
+        cached = node["class_type"] == CACHED_ENCODE
+        if cached:
+            if key in self._encode_lru:
+                self._encode_lru.move_to_end(key)
+                self.encode_stats["hits"] += 1
+                return
+            self.encode_stats["misses"] += 1
+        if key in self._prev_encodes:
+            return
+        self.encodes += 1
+        if self.encode_time:
+            time.sleep(self.encode_time)
+        self.encode_seconds += self.encode_time
+        if cached:
+            self._encode_lru[key] = True
+            while len(self._encode_lru) > 128:
+                self._encode_lru.popitem(last=False)
+
+    def _make_output(self, nid, node, prompt_id, batch=1):
+        key, ext = OUTPUT_NODES[node["class_type"]]
+        prefix = node.get("inputs", {}).get("filename_prefix", "ComfyUI")
+        subfolder, _, prefix = prefix.rpartition("/")   # "latents/x" saves x_00001_ in latents/, like ComfyUI
+        count = batch if key == "images" and ext == "png" else 1    # one image file per batch item
+        entries = []
+        for i in range(1, count + 1):
+            entry = {"filename": f"{prefix}_{prompt_id[:8]}_{i:05d}_.{ext}", "subfolder": subfolder, "type": "output"}
+            size = self.artifact_bytes(entry["filename"]) if callable(self.artifact_bytes) else self.artifact_bytes
+            self.files[(entry["type"], entry["subfolder"], entry["filename"])] = size
+            entries.append(entry)
+        out = {key: entries}
+        if node["class_type"] == "SaveVideo":
+            out["animated"] = [True]
+        return out
+
+    def view_size(self, filename, subfolder="", kind="output"):
+        """Size of what /view would serve, None if there's no such file."""
+        if kind == "input":
+            data = self.uploads.get(f"{subfolder}/{filename}" if subfolder else filename)
+            return None if data is None else len(data)
+        return self.files.get((kind, subfolder, filename))
+
+    def file_bytes(self, filename, start=0, end=None, chunk=64 * 1024):
+        """Yield the synthetic content of an output file, [start, end)."""
+        key = next((k for k in self.files if k[2] == filename), None)
+        size = self.files[key] if key else 0
+        end = size if end is None else min(end, size)
+        block = hashlib.sha256(filename.encode()).digest() * (chunk // 32)
+        pos = start
+        while pos < end:
+            off = pos % len(block)
+            piece = block[off:off + min(end - pos, len(block) - off)]
+            yield piece
+            pos += len(piece)
+
+    def system_stats(self):
+        return {
+            "system": {"os": "posix", "comfyui_version": "fake", "python_version": "3"},
+            "devices": [{"name": self.gpu_name, "type": "cuda", "index": 0,
+                         "vram_total": self.vram_total, "vram_free": self.vram_free,
+                         "torch_vram_total": self.torch_vram, "torch_vram_free": 0}],
+        }
+
+
+def batch_size(prompt):
+    """Largest latent batch in the graph (EmptyLatent*/LTXVImgToVideo batch_size)."""
+    sizes = [n.get("inputs", {}).get("batch_size") for n in prompt.values()]
+    return max([b for b in sizes if isinstance(b, int)], default=1)
+
+
+def _multipart(content_type, body):
+    """{field: (filename, bytes)} from a multipart/form-data body."""
+    msg = BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    if not msg.is_multipart():
+        return {}
+    fields = {}
+    for part in msg.get_payload():
+        name = part.get_param("name", header="content-disposition")
+        if name:
+            fields[name] = (part.get_filename() or "", part.get_payload(decode=True) or b"")
+    return fields
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128        # like aiohttp; the default 5 drops connects under load
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True      # aiohttp does too; else 40ms stalls on keep-alive
+    server_ref = None
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server_ref._sock_lock:
+            self.server_ref._conns.add(self.connection)
+
+    def finish(self):
+        with self.server_ref._sock_lock:
+            self.server_ref._conns.discard(self.connection)
+        super().finish()
+
+    def _json(self, obj, code=200):
+        body = json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(n) if n else b""
+
+    def do_GET(self):
+        fake = self.server_ref
+        fake.requests += 1
+        u = urlparse(self.path)
+        path = u.path
+        if path == "/ws":
+            return self._websocket(parse_qs(u.query).get("clientId", [None])[0])
+        if path == "/system_stats":
+            return self._json(fake.system_stats())
+        if path == "/queue":
+            return self._json(fake.queue_state())
+        if path == "/history":
+            return self._json(dict(fake.history))
+        if path.startswith("/history/"):
+            pid = path[len("/history/"):]
+            entry = fake.history.get(pid)
+            return self._json({pid: entry} if entry else {})
+        if path.startswith("/object_info"):
+            cls = path[len("/object_info/"):]
+            if fake.object_info is not None:
+                info = fake.object_info if not cls else \
+                    {cls: fake.object_info[cls]} if cls in fake.object_info else {}
+                return self._json(info)
+            known = cls and (cls in fake.custom_nodes or cls not in (CACHED_ENCODE,))
+            return self._json({cls: {"name": cls, "input": {}, "output": []}} if known else {})
+        if path.startswith("/models") and fake.models is not None:
+            folder = path[len("/models/"):]
+            if not folder:
+                return self._json(sorted(fake.models))
+            if folder in fake.models:
+                return self._json(list(fake.models[folder]))
+        if path == "/prompt_cache/stats" and CACHED_ENCODE in fake.custom_nodes:
+            return self._json({**fake.encode_stats, "entries": len(fake._encode_lru)})
+        if path == "/view":
+            q = {k: v[0] for k, v in parse_qs(u.query).items()}
+            return self._view(q.get("filename", ""), q.get("subfolder", ""), q.get("type", "output"))
+        self._json({"error": "not found"}, 404)
+
+    def do_HEAD(self):
+        fake = self.server_ref
+        fake.requests += 1
+        u = urlparse(self.path)
+        if u.path != "/view":
+            return self._head(404)
+        q = {k: v[0] for k, v in parse_qs(u.query).items()}
+        size = fake.view_size(q.get("filename", ""), q.get("subfolder", ""), q.get("type", "output"))
+        return self._head(404) if size is None else self._head(200, size)
+
+    def _head(self, code, size=0):
+        self.send_response(code)
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+
+    def _view(self, filename, subfolder, kind):
+        fake = self.server_ref
+        size = fake.view_size(filename, subfolder, kind)
+        if size is None:
+            return self._json({"error": "not found"}, 404)
+        if kind == "input":
+            data = fake.uploads[f"{subfolder}/{filename}" if subfolder else filename]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        start = 0
+        rng = self.headers.get("Range", "")
+        if rng.startswith("bytes=") and rng[6:].split("-")[0].isdigit():
+            start = min(int(rng[6:].split("-")[0]), size)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(size - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        cut = size
+        if fake.view_fail_rate and fake._rng.random() < fake.view_fail_rate:
+            cut = start + (size - start) // 2
+        for chunk in fake.file_bytes(filename, start, cut):
+            self.wfile.write(chunk)
+        if cut < size:
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+
+    def do_POST(self):
+        fake = self.server_ref
+        fake.requests += 1
+        path = urlparse(self.path).path
+        body = self._body()     # always drain it, or keep-alive desyncs
+        if path == "/prompt":
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                return self._json({"error": {"type": "invalid_json", "message": "bad json"}}, 400)
+            prompt = payload.get("prompt")
+            if not isinstance(prompt, dict) or not prompt:
+                return self._json({"error": {"type": "invalid_prompt", "message": "no prompt",
+                                             "details": "", "extra_info": {}}, "node_errors": {}}, 400)
+            if fake.object_info is not None:
+                unknown = next((n.get("class_type") for n in prompt.values()
+                                if n.get("class_type") not in fake.object_info), None)
+                if unknown is not None:
+                    return self._json({"error": {"type": "invalid_prompt", "message":
+                                                 f"Cannot execute because node {unknown} does not exist.",
+                                                 "details": f"Node ID '#{unknown}'", "extra_info": {}},
+                                       "node_errors": {}}, 400)
+            pid, number = fake.submit(prompt, payload.get("client_id"), payload.get("extra_data"),
+                                      front=bool(payload.get("front")))
+            return self._json({"prompt_id": pid, "number": number, "node_errors": {}})
+        if path == "/queue":
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                return self._json({"error": "bad json"}, 400)
+            if payload.get("clear"):
+                fake.delete()
+            if "delete" in payload:
+                fake.delete(set(payload["delete"]))
+            return self._json({})
+        if path == "/upload/image":
+            fields = _multipart(self.headers.get("Content-Type", ""), body)
+            if "image" not in fields:
+                return self._json({"error": "no image"}, 400)
+            filename, data = fields["image"]
+            subfolder = (fields.get("subfolder") or ("", b""))[1].decode()
+            fake.uploads[f"{subfolder}/{filename}" if subfolder else filename] = data
+            return self._json({"name": filename, "subfolder": subfolder, "type": "input"})
+        self._json({"error": "not found"}, 404)
+
+    def _websocket(self, client_id):
+        key = self.headers.get("Sec-WebSocket-Key")
+        if not key:
+            return self._json({"error": "expected websocket"}, 400)
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", ws.accept_key(key))
+        self.end_headers()
+        self.wfile.flush()
+        fake = self.server_ref
+        sock = self.connection
+        client_id = client_id or uuid.uuid4().hex
+        fake._add_socket(client_id, sock)
+        try:
+            ws.write_frame(sock, ws.OP_TEXT, json.dumps({
+                "type": "status",
+                "data": {"status": {"exec_info": {"queue_remaining": len(fake.queue_state()["queue_pending"])}},
+                         "sid": client_id},
+            }).encode())
+            reader = ws.Reader(sock)
+            while True:
+                _, opcode, payload = ws.read_frame(reader)
+                if opcode == ws.OP_CLOSE:
+                    break
+                if opcode == ws.OP_PING:
+                    ws.write_frame(sock, ws.OP_PONG, payload)
+        except (OSError, ws.ConnectionClosed):
+            pass
+        finally:
+            fake._remove_socket(client_id, sock)
+            self.close_connection = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake ComfyUI server (no GPU)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8188)
+    parser.add_argument("--exec-time", type=float, default=1.0, help="seconds per prompt")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--model-load-time", type=float, default=0.0, help="seconds per model swapped in")
+    parser.add_argument("--artifact-mb", type=float, default=0.0625, help="size of each output file served by /view")
+    parser.add_argument("--encode-time", type=float, default=0.0, help="seconds per text encode")
+    parser.add_argument("--prompt-cache", action="store_true", help="pretend CachedCLIPTextEncode is installed")
+    args = parser.parse_args()
+
+    fake = FakeComfy(args.host, args.port, exec_time=args.exec_time, fail_rate=args.fail_rate,
+                     model_load_time=args.model_load_time,
+                     artifact_bytes=int(args.artifact_mb * 1024 * 1024), encode_time=args.encode_time,
+                     custom_nodes=[CACHED_ENCODE] if args.prompt_cache else ()).start()
+    print(f"Fake ComfyUI on {fake.url} (exec {args.exec_time}s, fail {args.fail_rate:.0%})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
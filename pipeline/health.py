@@ -0,0 +1,279 @@
+"""
+Fleet health monitor - one background poller for every GPU and service.
+
+Checking the fleet used to mean nvidia-smi, then /system_stats, /queue
+and Chatterbox /health one after another, each with its own timeout, so
+one dead service could hold a status call for half a minute. The
+Monitor polls every target at once on a fixed cadence (`interval`) and
+never waits longer than `timeout` for a round: a target that hasn't
+answered by then counts as a miss. nvidia-smi (telemetry) runs in the
+same round.
+
+Each target keeps a ring buffer of its last `ring` Samples (GPU
+utilization, VRAM, queue depth, liveness, latency); snapshot() is the
+latest round as one immutable dict, swapped in whole, so the Scheduler
+and the CLI read it in O(1) without touching the network.
+
+Every target has a circuit Breaker: `fails` misses in a row open it -
+the target is out of rotation and isn't polled again until `cooldown`
+seconds later, when one probe goes out (half-open). `recover` good
+probes close it again. The Scheduler reports failed posts too, so a
+backend that drops connections trips without waiting for a poll.
+
+Usage:
+    mon = Monitor([Target("gpu0", "http://localhost:8188", gpu=0),
+                   Target("tts", "http://localhost:8880", kind="http", path="/health")],
+                  telemetry=nvidia_smi).start()
+    mon.snapshot()["gpu0"].healthy         # latest round, O(1)
+    mon.history("gpu0", seconds=60)        # Samples, oldest first
+    Scheduler(backends, monitor=mon)       # reads the snapshot instead of polling itself
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from pipeline import transport
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class Target:
+    """Something to poll: a ComfyUI ("comfyui": /queue + /system_stats) or a plain health URL ("http")."""
+
+    __slots__ = ("name", "url", "kind", "path", "gpu")
+
+    def __init__(self, name, url, kind="comfyui", path="/health", gpu=None):
+        self.name = name
+        self.url = url.rstrip("/")
+        self.kind = kind
+        self.path = path
+        self.gpu = gpu
+
+    def __repr__(self):
+        return f"<Target {self.name} {self.kind} {self.url}>"
+
+
+class Sample:
+    """One poll of one target."""
+
+    __slots__ = ("time", "ok", "latency", "error", "running", "pending", "queue", "stats",
+                 "vram_total_gb", "vram_free_gb", "gpu_util", "gpu_used_mb", "gpu_total_mb")
+
+    def __init__(self, ok, latency=0.0, error=None, queue=None, stats=None, gpu=None):
+        self.time = time.time()
+        self.ok = ok
+        self.latency = latency
+        self.error = error
+        self.queue = queue          # raw /queue, for the Scheduler's prompt ids
+        self.stats = stats          # raw /system_stats, for VRAM admission
+        self.running = len(queue.get("queue_running", [])) if queue else 0
+        self.pending = len(queue.get("queue_pending", [])) if queue else 0
+        dev = (stats or {}).get("devices") or [{}]
+        self.vram_total_gb = dev[0].get("vram_total", 0) / 1024**3 if stats else None
+        self.vram_free_gb = dev[0].get("vram_free", 0) / 1024**3 if stats else None
+        gpu = gpu or {}
+        self.gpu_util = gpu.get("utilization")
+        self.gpu_used_mb = gpu.get("memory_used_mb")
+        self.gpu_total_mb = gpu.get("memory_total_mb")
+
+    def __repr__(self):
+        state = "ok" if self.ok else f"down ({self.error})"
+        return f"<Sample {state} {self.running}+{self.pending} queued {self.latency * 1000:.0f}ms>"
+
+
+class Breaker:
+    """closed -> open after `fails` misses in a row -> half-open after `cooldown` -> closed after `recover` hits."""
+
+    __slots__ = ("fails", "cooldown", "recover", "state", "misses", "hits", "opened", "trips")
+
+    def __init__(self, fails=3, cooldown=30.0, recover=1):
+        self.fails = fails
+        self.cooldown = cooldown
+        self.recover = recover
+        self.state = CLOSED
+        self.misses = 0
+        self.hits = 0
+        self.opened = 0.0
+        self.trips = 0
+
+    def allow(self, now):
+        """Poll (or use) the target now? An open breaker lets one probe through per cooldown."""
+        if self.state == OPEN and now - self.opened >= self.cooldown:
+            self.state = HALF_OPEN
+            self.hits = 0
+        return self.state != OPEN
+
+    def record(self, ok, now):
+        if ok:
+            self.misses = 0
+            if self.state == HALF_OPEN:
+                self.hits += 1
+                if self.hits >= self.recover:
+                    self.state = CLOSED
+            return
+        self.misses += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.misses >= self.fails):
+            if self.state == CLOSED:
+                self.trips += 1
+            self.state = OPEN
+            self.opened = now
+
+
+class Status:
+    """A target in the latest snapshot: its last Sample and breaker state."""
+
+    __slots__ = ("target", "sample", "breaker", "healthy", "since")
+
+    def __init__(self, target, sample, breaker, since):
+        self.target = target
+        self.sample = sample            # last Sample taken (None before the first poll)
+        self.breaker = breaker          # CLOSED / OPEN / HALF_OPEN
+        self.healthy = sample is not None and sample.ok and breaker != OPEN
+        self.since = since              # when healthy last flipped
+
+    def __repr__(self):
+        return f"<Status {self.target.name} {'up' if self.healthy else 'down'} [{self.breaker}] {self.sample!r}>"
+
+
+class Monitor:
+    """Polls every Target concurrently every `interval` seconds; see the module docstring."""
+
+    def __init__(self, targets, interval=2.0, timeout=5.0, ring=300, telemetry=None,
+                 fails=3, cooldown=30.0, recover=1):
+        self.targets = {t.name: t for t in targets}
+        self.interval = interval
+        self.timeout = timeout          # longest a round waits for any one answer
+        self.telemetry = telemetry      # fn() -> {gpu index: {"utilization", "memory_used_mb", ...}}, e.g. nvidia-smi
+        self.rounds = 0
+        self._urls = {t.url: t.name for t in targets}
+        self._rings = {name: deque(maxlen=ring) for name in self.targets}
+        self._breakers = {name: Breaker(fails, cooldown, recover) for name in self.targets}
+        self._since = {name: time.time() for name in self.targets}
+        self._snapshot = {name: Status(t, None, CLOSED, self._since[name]) for name, t in self.targets.items()}
+        self._gpus = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=len(self.targets) + 1, thread_name_prefix="health")
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- reading ---
+
+    def snapshot(self):
+        """{target name: Status} from the latest round. Never blocks; don't modify it."""
+        return self._snapshot
+
+    def status(self, key):
+        """Status of one target, by name or URL. None if there's no such target."""
+        snap = self._snapshot
+        return snap.get(key) or snap.get(self._urls.get(key.rstrip("/")))
+
+    def gpus(self):
+        """Latest telemetry: {gpu index: {...}} (empty if none)."""
+        return self._gpus
+
+    def history(self, key, seconds=None):
+        """key's Samples, oldest first - all of them, or the last `seconds` worth."""
+        name = key if key in self._rings else self._urls.get(key.rstrip("/"))
+        with self._lock:
+            samples = list(self._rings.get(name, ()))
+        if seconds is not None:
+            cutoff = time.time() - seconds
+            samples = [s for s in samples if s.time >= cutoff]
+        return samples
+
+    def failed(self, key, error=None):
+        """A caller couldn't reach key (e.g. a /prompt post failed) - counts against its breaker."""
+        name = key if key in self.targets else self._urls.get(key.rstrip("/"))
+        if name is None:
+            return
+        with self._lock:
+            breaker = self._breakers[name]
+            breaker.record(False, time.time())
+            if breaker.state == OPEN:
+                self._publish(name, Sample(False, error=str(error or "request failed")))
+
+    # --- polling ---
+
+    def _poll(self, target):
+        started = time.perf_counter()
+        timeout = min(self.timeout, transport.endpoint_timeout(target.path if target.kind != "comfyui" else "/queue"))
+        try:
+            if target.kind == "comfyui":
+                queue = transport.get_json(f"{target.url}/queue", timeout=timeout, retries=0)
+                stats = transport.get_json(f"{target.url}/system_stats", timeout=timeout, retries=0)
+                return Sample(True, time.perf_counter() - started, queue=queue, stats=stats)
+            transport.get(f"{target.url}{target.path}", timeout=timeout, retries=0).raise_for_status()
+            return Sample(True, time.perf_counter() - started)
+        except (OSError, transport.HTTPError, ValueError) as e:
+            return Sample(False, time.perf_counter() - started, error=str(e)[:200])
+
+    def poll(self):
+        """One round now: every target whose breaker allows it, and telemetry, at once. Returns the snapshot."""
+        now = time.time()
+        with self._lock:
+            due = [t for name, t in self.targets.items() if self._breakers[name].allow(now)]
+        futures = {self._pool.submit(self._poll, t): t for t in due}
+        tele = self._pool.submit(self.telemetry) if self.telemetry is not None else None
+        done, _ = wait(list(futures) + ([tele] if tele else []), timeout=self.timeout + 0.5)
+        gpus = self._gpus
+        if tele is not None and tele in done and tele.exception() is None:
+            gpus = tele.result() or {}
+        now = time.time()
+        with self._lock:
+            for fut, t in futures.items():
+                sample = fut.result() if fut in done else Sample(False, self.timeout, error="no answer in time")
+                g = gpus.get(t.gpu) if t.gpu is not None else None
+                if g:
+                    sample.gpu_util = g.get("utilization")
+                    sample.gpu_used_mb = g.get("memory_used_mb")
+                    sample.gpu_total_mb = g.get("memory_total_mb")
+                self._breakers[t.name].record(sample.ok, now)
+                self._rings[t.name].append(sample)
+                self._publish(t.name, sample)
+            self._gpus = gpus
+            self.rounds += 1
+        return self._snapshot
+
+    def _publish(self, name, sample):
+        """New snapshot with name's Status replaced. Lock held."""
+        old = self._snapshot[name]
+        status = Status(self.targets[name], sample, self._breakers[name].state, old.since)
+        if status.healthy != old.healthy:
+            status.since = self._since[name] = time.time()
+        snap = dict(self._snapshot)
+        snap[name] = status
+        self._snapshot = snap           # one reference swap - readers see the old round or the new one
+
+    # --- lifecycle ---
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="health-monitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def _loop(self):
+        while not self._stop.is_set():
+            started = time.time()
+            try:
+                self.poll()
+            except Exception as e:      # a bad round mustn't kill the monitor
+                print(f"[HEALTH] poll failed: {e}")
+            self._stop.wait(max(0.0, self.interval - (time.time() - started)))
+
+    def close(self):
+        self._stop.set()
+        self._pool.shutdown(wait=False)
+
+    def stats(self):
+        """{name: {"healthy", "breaker", "trips", "uptime" (share of ring samples ok), "latency_ms"}}."""
+        with self._lock:
+            out = {}
+            for name, ring in self._rings.items():
+                ok = [s for s in ring if s.ok]
+                st = self._snapshot[name]
+                out[name] = {"healthy": st.healthy, "breaker": st.breaker, "trips": self._breakers[name].trips,
+                             "uptime": round(len(ok) / len(ring), 3) if ring else None,
+                             "latency_ms": round(sum(s.latency for s in ok) / len(ok) * 1000, 1) if ok else None}
+            return out
@@ -0,0 +1,130 @@
+"""
+Job handles - submit now, collect later.
+
+A Job wraps the Future the completion engine resolves for one prompt.
+gather() submits a whole shot list back-to-back so ComfyUI's queue never
+runs dry, and hands jobs back in the order they finish.
+
+Usage:
+    jobs = [text_to_video_async(p) for p in prompts]
+    for job in as_completed(jobs):
+        print(job.label, job.result())
+
+    # asyncio works too - a Job is awaitable
+    outputs = await text_to_image_async("yacht at sunset")
+"""
+import asyncio
+import queue as _queue
+import time
+from concurrent.futures import Future
+
+
+class Job:
+    """One queued prompt. result() blocks, done() doesn't, await works."""
+
+    def __init__(self, prompt_id, future, workflow=None, label="", index=None):
+        self.prompt_id = prompt_id
+        self.future = future
+        self.workflow = workflow
+        self.label = label
+        self.index = index
+        self.submitted = time.time()
+        self.finished = None
+        self.cached = False         # served from the result cache, never hit the GPU
+        self.cache_key = None
+        self.artifacts = []         # local file paths, once downloaded
+        self.trace = None           # metrics.Trace, for prompts that reached a server
+        future.add_done_callback(self._stamp)
+
+    def _stamp(self, _):
+        self.finished = time.time()
+
+    def result(self, timeout=None):
+        """Outputs dict. Raises the workflow's error if it failed."""
+        return self.future.result(timeout)
+
+    def exception(self, timeout=None):
+        return self.future.exception(timeout)
+
+    def done(self):
+        return self.future.done()
+
+    def add_done_callback(self, fn):
+        """fn(job) runs when the prompt finishes (possibly right away)."""
+        self.future.add_done_callback(lambda _: fn(self))
+
+    @property
+    def elapsed(self):
+        end = self.finished or time.time()
+        return end - self.submitted
+
+    def __await__(self):
+        return asyncio.wrap_future(self.future).__await__()
+
+    def __repr__(self):
+        state = "done" if self.done() else "pending"
+        return f"<Job {self.label or (self.prompt_id or 'unposted')[:8]} {state}>"
+
+
+def as_completed(jobs, timeout=None):
+    """Yield jobs as they finish, whichever order that is."""
+    jobs = list(jobs)
+    finished = _queue.Queue()
+    for job in jobs:
+        job.add_done_callback(finished.put)
+    deadline = None if timeout is None else time.time() + timeout
+    for _ in jobs:
+        wait = None if deadline is None else max(0, deadline - time.time())
+        try:
+            yield finished.get(timeout=wait)
+        except _queue.Empty:
+            raise TimeoutError(f"{len(jobs)} jobs not finished in {timeout}s") from None
+
+
+def gather(submit, workflows, window=None, timeout=None):
+    """
+    Submit every workflow and yield Jobs in completion order.
+
+    submit(workflow, label) -> Job. With window=None everything is queued
+    up front; with window=N at most N prompts sit on the server at once and
+    a new one goes in as soon as one finishes. Failed jobs are yielded
+    too, including ones submit() refused (validation, /prompt rejected) -
+    call job.result() to get the outputs or the error.
+    """
+    workflows = list(workflows)
+    finished = _queue.Queue()
+    window = window or len(workflows)
+    deadline = None if timeout is None else time.time() + timeout
+    next_i = 0
+    inflight = 0
+
+    def launch():
+        nonlocal next_i, inflight
+        wf = workflows[next_i]
+        label = ""
+        if isinstance(wf, tuple):
+            label, wf = wf
+        try:
+            job = submit(wf, label)
+        except Exception as e:
+            refused = Future()
+            refused.set_exception(e)
+            job = Job(None, refused, wf, label)
+        job.index = next_i
+        job.label = job.label or label
+        job.add_done_callback(finished.put)
+        next_i += 1
+        inflight += 1
+
+    while next_i < len(workflows) and inflight < window:
+        launch()
+    while inflight:
+        wait = None if deadline is None else max(0, deadline - time.time())
+        try:
+            job = finished.get(timeout=wait)
+        except _queue.Empty:
+            raise TimeoutError(f"gather: {inflight} jobs still running after {timeout}s") from None
+        inflight -= 1
+        if next_i < len(workflows):
+            launch()
+        yield job
@@ -0,0 +1,250 @@
+"""
+Job journal - an append-only log of every prompt we queue, so a crash
+mid-batch doesn't throw away work that's still running on the GPU.
+
+One JSON line per event in jobs/journal.jsonl:
+    {"ev": "submit", "key": <workflow hash>, "pid": <prompt_id>, "server": url, "t": ...}
+    {"ev": "done",   "key": ..., "pid": ..., "outputs": {...}}
+    {"ev": "error",  "key": ..., "pid": ..., "msg": "..."}
+    {"ev": "lost",   "key": ..., "pid": ...}     # server forgot it (restart)
+
+Per-job timings (pipeline/metrics.py) can go to jobs/trace.jsonl beside
+it - one line per finished prompt, never compacted or read back here.
+
+Jobs are identified by the hash of their workflow (cache.workflow_key),
+so rerunning the same batch script finds its own jobs again. Writes are
+a single buffered line + flush - no fsync, so a process crash loses
+nothing but a power cut can lose the last few lines.
+
+On restart, recover() asks each server's /queue and /history about
+every job the journal thinks is in flight: finished ones are recorded
+(and can be claimed once by the rerun), queued/running ones can be
+reattached to, vanished ones are marked lost and will be resubmitted.
+Jobs that finished while we were watching are the result cache's
+business, not the journal's.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from pipeline import transport
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / "jobs" / "journal.jsonl"
+
+SUBMITTED, RUNNING, DONE, ERROR, LOST = "submitted", "running", "done", "error", "lost"
+
+
+class Journal:
+    """Append-only job log with an in-memory view of each job's latest state."""
+
+    def __init__(self, path=DEFAULT_PATH, compact_ratio=4):
+        self.path = Path(path)
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()
+        self._state = None          # key -> entry dict
+        self._recovered = set()     # keys recover() found finished while we were away, not yet claimed
+        self._fh = None
+        self._lines = 0
+        self.trace_path = self.path.with_name("trace.jsonl")
+        self._trace_fh = None
+
+    # --- load ---
+
+    def _load(self):
+        if self._state is not None:
+            return
+        self._state = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._lines += 1
+                    try:
+                        self._apply(json.loads(line))
+                    except ValueError:
+                        continue    # torn last line from a crash
+            if self._lines > self.compact_ratio * max(len(self._state), 1) and self._lines > 1000:
+                self._rewrite()
+
+    def _apply(self, rec):
+        key = rec.get("key")
+        if not key:
+            return
+        ev = rec.get("ev")
+        entry = self._state.setdefault(key, {"key": key})
+        if ev == "submit":
+            entry.update(status=SUBMITTED, pid=rec.get("pid"), server=rec.get("server"),
+                         label=rec.get("label", ""), submitted=rec.get("t"))
+            entry.pop("outputs", None)
+            entry.pop("msg", None)
+        elif ev == "done":
+            entry.update(status=DONE, outputs=rec.get("outputs", {}), finished=rec.get("t"))
+        elif ev == "error":
+            entry.update(status=ERROR, msg=rec.get("msg", ""), finished=rec.get("t"))
+        elif ev == "running":
+            entry["status"] = RUNNING
+        elif ev == "lost":
+            entry["status"] = LOST
+
+    def _rewrite(self):
+        """Compact the file down to one submit (+ outcome) per job."""
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for e in self._state.values():
+                for rec in _entry_records(e):
+                    f.write(json.dumps(rec, separators=(",", ":")) + "\n")
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+        os.replace(tmp, self.path)
+        self._lines = sum(len(_entry_records(e)) for e in self._state.values())
+
+    # --- write ---
+
+    def _write(self, rec):
+        rec["t"] = rec.get("t") or time.time()
+        with self._lock:
+            self._load()
+            if self._fh is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._fh = open(self.path, "a", encoding="utf-8", buffering=1 << 16)
+            self._fh.write(json.dumps(rec, separators=(",", ":")) + "\n")
+            self._fh.flush()
+            self._lines += 1
+            self._apply(rec)
+
+    def submitted(self, key, prompt_id, server, label=""):
+        self._write({"ev": "submit", "key": key, "pid": prompt_id, "server": server, "label": label})
+
+    def done(self, key, prompt_id, outputs):
+        self._write({"ev": "done", "key": key, "pid": prompt_id, "outputs": outputs})
+
+    def error(self, key, prompt_id, msg):
+        self._write({"ev": "error", "key": key, "pid": prompt_id, "msg": str(msg)[:500]})
+
+    def running(self, key, prompt_id):
+        self._write({"ev": "running", "key": key, "pid": prompt_id})
+
+    def lost(self, key, prompt_id):
+        self._write({"ev": "lost", "key": key, "pid": prompt_id})
+
+    def trace(self, rec):
+        """Append one finished job's metrics.Trace dict to trace.jsonl."""
+        with self._lock:
+            if self._trace_fh is None:
+                self.trace_path.parent.mkdir(parents=True, exist_ok=True)
+                self._trace_fh = open(self.trace_path, "a", encoding="utf-8", buffering=1 << 16)
+            self._trace_fh.write(json.dumps(rec, separators=(",", ":")) + "\n")
+            self._trace_fh.flush()
+
+    def watch(self, job, key, server=None):
+        """Journal a Job's outcome. With server, it's freshly queued - log that too."""
+        if server is not None:
+            self.submitted(key, job.prompt_id, server, job.label)
+        job.add_done_callback(lambda j: self._outcome(key, j))
+
+    def _outcome(self, key, job):
+        if job.exception() is None:
+            self.done(key, job.prompt_id, job.result())
+        else:
+            self.error(key, job.prompt_id, job.exception())
+
+    def close(self):
+        with self._lock:
+            if self._fh:
+                self._fh.close()
+                self._fh = None
+            if self._trace_fh:
+                self._trace_fh.close()
+                self._trace_fh = None
+
+    # --- read ---
+
+    def get(self, key):
+        with self._lock:
+            self._load()
+            e = self._state.get(key)
+            return dict(e) if e else None
+
+    def claim(self, key):
+        """True (once) if recover() found key finished while we were away - its outputs can stand in for a rerun."""
+        with self._lock:
+            if key in self._recovered:
+                self._recovered.discard(key)
+                return True
+            return False
+
+    def in_flight(self, server=None):
+        """Entries queued but never seen finishing."""
+        with self._lock:
+            self._load()
+            return [dict(e) for e in self._state.values()
+                    if e.get("status") in (SUBMITTED, RUNNING) and (server is None or e.get("server") == server)]
+
+    def summary(self):
+        with self._lock:
+            self._load()
+            counts = {}
+            for e in self._state.values():
+                counts[e.get("status")] = counts.get(e.get("status"), 0) + 1
+            return counts
+
+    # --- crash recovery ---
+
+    def recover(self, server, timeout=10):
+        """
+        Reconcile in-flight jobs for one server with what it actually has.
+        Returns {"done": n, "error": n, "running": n, "lost": n}.
+        """
+        entries = self.in_flight(server)
+        result = {DONE: 0, ERROR: 0, RUNNING: 0, LOST: 0}
+        if not entries:
+            return result
+        from pipeline.completion import history_result
+        try:
+            q = transport.get_json(f"{server}/queue", timeout=timeout)
+        except (OSError, transport.HTTPError, ValueError):
+            return result        # server down - leave them be, try again later
+        queued = {item[1] for item in q.get("queue_running", []) + q.get("queue_pending", [])}
+        for e in entries:
+            pid, key = e["pid"], e["key"]
+            if pid in queued:
+                if e["status"] != RUNNING:
+                    self.running(key, pid)
+                result[RUNNING] += 1
+                continue
+            try:
+                hist = transport.get_json(f"{server}/history/{pid}", timeout=timeout)
+            except (OSError, transport.HTTPError, ValueError):
+                continue
+            kind, payload = history_result(hist[pid]) if pid in hist else (None, None)
+            if kind == "success":
+                self.done(key, pid, payload)
+                with self._lock:
+                    self._recovered.add(key)
+                result[DONE] += 1
+            elif kind == "error":
+                self.error(key, pid, payload)
+                result[ERROR] += 1
+            else:
+                self.lost(key, pid)
+                result[LOST] += 1
+        return result
+
+
+def _entry_records(e):
+    recs = []
+    if e.get("pid"):
+        recs.append({"ev": "submit", "key": e["key"], "pid": e["pid"], "server": e.get("server"),
+                     "label": e.get("label", ""), "t": e.get("submitted")})
+    status = e.get("status")
+    if status == DONE:
+        recs.append({"ev": "done", "key": e["key"], "pid": e.get("pid"), "outputs": e.get("outputs", {}),
+                     "t": e.get("finished")})
+    elif status == ERROR:
+        recs.append({"ev": "error", "key": e["key"], "pid": e.get("pid"), "msg": e.get("msg", ""),
+                     "t": e.get("finished")})
+    elif status in (RUNNING, LOST):
+        recs.append({"ev": status, "key": e["key"], "pid": e.get("pid")})
+    return recs
@@ -0,0 +1,85 @@
+"""
+Long-form video - one shot longer than a single LTX prompt can render.
+
+The target duration is split into equal chunks that overlap by a few
+frames. Every chunk saves its last `overlap` frames as a lossless
+animated WebP; the next chunk loads them (LoadImage returns every frame
+of an animated file) into LTXVImgToVideo, so it starts from exactly
+where the previous one ended. Chunks are stitched by crossfading over
+the overlap (pipeline/assemble.py).
+
+Memory doesn't grow with duration: every prompt is one chunk, the
+client only handles file names, and stitching never opens more than two
+clips at once.
+
+Usage:
+    frames = chunk_frames(30, chunk=97, overlap=9)       # [97, 97, ..., 57]
+    wf = with_tail(wf, overlap=9, frames=97, prefix="tails/long_42_0")
+    ref = tail_ref(outputs)                             # for the next chunk's LoadImage
+"""
+import math
+
+FPS = 24
+
+
+def _valid(frames):
+    return frames >= 1 and frames % 8 == 1     # LTX wants 8k+1 frames
+
+
+def chunk_frames(duration, chunk=97, overlap=9, fps=FPS):
+    """Frame count of every chunk needed for duration seconds.
+
+    The last chunk is shrunk to the smallest valid length that still
+    covers the end; stitch() trims whatever is left over.
+    """
+    if not _valid(chunk) or not _valid(overlap):
+        raise ValueError(f"chunk and overlap must be 8k+1 frames (got {chunk}, {overlap})")
+    if overlap >= chunk:
+        raise ValueError(f"overlap ({overlap}) must be shorter than a chunk ({chunk})")
+    total = max(1, round(duration * fps))
+    if total <= chunk:
+        return [max(9, 8 * math.ceil((total - 1) / 8) + 1)]
+    step = chunk - overlap
+    count = 1 + math.ceil((total - chunk) / step)
+    left = total - chunk - (count - 2) * step      # new frames the last chunk must add
+    last = 8 * math.ceil((left + overlap - 1) / 8) + 1
+    return [chunk] * (count - 1) + [max(last, overlap + 8)]
+
+
+def _decode_node(graph):
+    """VAEDecode feeding the graph's SaveVideo."""
+    for node in graph.values():
+        if node["class_type"] == "SaveVideo":
+            create = graph[node["inputs"]["video"][0]]
+            return create["inputs"]["images"][0]
+    raise ValueError("graph has no SaveVideo")
+
+
+def with_tail(graph, overlap, frames, prefix):
+    """graph plus nodes that save its last `overlap` frames as an animated WebP."""
+    decode = _decode_node(graph)
+    base = max(int(nid) for nid in graph if nid.isdigit()) + 1
+    out = dict(graph)
+    out[str(base)] = {"class_type": "ImageFromBatch",
+                      "inputs": {"image": [decode, 0], "batch_index": frames - overlap, "length": overlap}}
+    out[str(base + 1)] = {"class_type": "SaveAnimatedWEBP",
+                          "inputs": {"images": [str(base), 0], "filename_prefix": prefix, "fps": float(FPS),
+                                     "lossless": True, "quality": 100, "method": "default"}}
+    return out
+
+
+def tail_ref(outputs):
+    """{filename, subfolder, type} of the tail WebP in a chunk's outputs."""
+    for node_out in outputs.values():
+        for item in node_out.get("images", []):
+            if isinstance(item, dict) and item.get("filename", "").endswith(".webp"):
+                return item
+    raise ValueError("chunk saved no tail frames")
+
+
+def video_ref(outputs):
+    for node_out in outputs.values():
+        for item in node_out.get("images", []):
+            if isinstance(item, dict) and item.get("filename", "").endswith(".mp4"):
+                return item
+    raise ValueError("chunk saved no video")
@@ -0,0 +1,364 @@
+"""
+Job metrics - where each job's time went.
+
+Every prompt we queue gets a Trace: when it was submitted, when ComfyUI
+started it (queue wait), how long each node ran (from the websocket's
+"executing" events - a node runs until the next one starts), when it
+finished, and how long its downloads took and how big they were.
+
+The Recorder listens on each server's CompletionEngine, so nothing is
+polled. Finished traces roll up into Prometheus counters and histograms
+(per workflow kind and per GPU), stay in memory for percentiles, and
+can be appended to jobs/trace.jsonl through the Journal.
+
+Usage:
+    metrics.RECORDER.trace = factory.JOURNAL         # optional JSONL trace
+    metrics.RECORDER.percentiles("execution", by="kind")
+    # {"video/ltxv-13b-0.9.8-distilled-fp8": {"n": 40, "p50": 34.2, "p90": 37.9, "p99": 41.0}}
+    print(metrics.RECORDER.prometheus())
+    metrics.serve(9464)                               # GET /metrics for Prometheus
+
+    r = Recorder.load("jobs/trace.jsonl")             # percentiles from past runs
+"""
+import json
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pipeline.affinity import family
+
+# Histogram buckets in seconds: previews finish in a few, hero shots take minutes.
+BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+PERCENTILES = (50, 90, 99)
+
+OUTPUT_KINDS = {
+    "SaveVideo": "video",
+    "VHS_VideoCombine": "video",
+    "SaveAnimatedWEBP": "video",
+    "SaveImage": "image",
+    "SaveAudio": "audio",
+    "SaveLatent": "latent",
+}
+
+
+def kind(workflow):
+    """Workflow type for grouping: "<output>/<main model>", e.g. "video/ltxv-13b-0.9.8-distilled-fp8"."""
+    outs = {OUTPUT_KINDS.get(n.get("class_type")) for n in (workflow or {}).values()} - {None}
+    out = "video" if "video" in outs else next(iter(sorted(outs)), "other")
+    return f"{out}/{family(workflow or {})}"
+
+
+class Trace:
+    """Timeline of one prompt. Times are client-side epoch seconds."""
+
+    __slots__ = ("prompt_id", "label", "kind", "server", "gpu", "classes", "submitted", "started", "ended",
+                 "nodes", "cached_nodes", "status", "error", "download_s", "download_bytes", "_node", "_node_t")
+
+    def __init__(self, prompt_id, workflow=None, label="", server=None, gpu=None, submitted=None):
+        self.prompt_id = prompt_id
+        self.label = label
+        self.kind = kind(workflow) if workflow is not None else "other"
+        self.server = server
+        self.gpu = gpu or server
+        self.classes = {nid: n.get("class_type") for nid, n in (workflow or {}).items()}
+        self.submitted = submitted or time.time()
+        self.started = None
+        self.ended = None
+        self.nodes = []                 # [node id, class_type, seconds] in execution order
+        self.cached_nodes = []
+        self.status = "queued"
+        self.error = None
+        self.download_s = 0.0
+        self.download_bytes = 0
+        self._node = None
+        self._node_t = None
+
+    @property
+    def queue_wait(self):
+        return self.started - self.submitted if self.started else None
+
+    @property
+    def execution(self):
+        return self.ended - self.started if self.started and self.ended else None
+
+    @property
+    def total(self):
+        return self.ended - self.submitted if self.ended else None
+
+    def _close_node(self, t):
+        if self._node is not None:
+            self.nodes.append([self._node, self.classes.get(self._node), round(t - self._node_t, 4)])
+            self._node = None
+
+    def event(self, ev, data, t):
+        if ev == "execution_start":
+            self.started = t
+            self.status = "running"
+        elif ev == "execution_cached":
+            self.cached_nodes = list(data.get("nodes") or [])
+        elif ev == "executing":
+            self._close_node(t)
+            if data.get("node") is None:
+                self.ended = self.ended or t
+            else:
+                self._node, self._node_t = data["node"], t
+                self.started = self.started or t
+        elif ev in ("execution_success", "execution_error", "execution_interrupted"):
+            self._close_node(t)
+            self.ended = t
+            if ev != "execution_success":
+                self.status = "error"
+                self.error = data.get("exception_message") or ev
+
+    def to_dict(self):
+        return {"pid": self.prompt_id, "label": self.label, "kind": self.kind, "server": self.server,
+                "gpu": self.gpu, "status": self.status, "error": self.error, "submitted": self.submitted,
+                "started": self.started, "ended": self.ended, "queue_wait": _r(self.queue_wait),
+                "execution": _r(self.execution), "total": _r(self.total), "nodes": self.nodes,
+                "cached_nodes": self.cached_nodes, "download_s": _r(self.download_s),
+                "download_bytes": self.download_bytes}
+
+    @classmethod
+    def from_dict(cls, d):
+        t = cls(d.get("pid"), label=d.get("label", ""), server=d.get("server"), gpu=d.get("gpu"),
+                submitted=d.get("submitted"))
+        t.kind = d.get("kind", "other")
+        t.started, t.ended = d.get("started"), d.get("ended")
+        t.nodes, t.cached_nodes = d.get("nodes", []), d.get("cached_nodes", [])
+        t.status, t.error = d.get("status", "done"), d.get("error")
+        t.download_s, t.download_bytes = d.get("download_s") or 0.0, d.get("download_bytes", 0)
+        return t
+
+
+def _r(x):
+    return round(x, 3) if x is not None else None
+
+
+class Recorder:
+    """Collects Traces from CompletionEngine events and rolls them up."""
+
+    def __init__(self, keep=10000, trace=None):
+        self.trace = trace              # a Journal: finished traces go to its trace.jsonl
+        self._lock = threading.Lock()
+        self._live = {}                 # prompt_id -> Trace, not finished yet
+        self._early = OrderedDict()     # prompt_id -> [(kind, data, t)] seen before start()
+        self._done = deque(maxlen=keep)
+        self._by_pid = {}               # prompt_id -> Trace, for late downloads
+        self._engines = set()
+        self._counters = {}             # (name, labels) -> value
+        self._hists = {}                # (name, labels) -> [bucket counts..., sum, count]
+
+    # --- feeding ---
+
+    def watch(self, engine):
+        """Listen to a CompletionEngine's websocket events (once per engine)."""
+        with self._lock:
+            if id(engine) in self._engines:
+                return
+            self._engines.add(id(engine))
+        engine.add_listener(self.on_event)
+
+    def start(self, prompt_id, workflow=None, label="", server=None, gpu=None, submitted=None):
+        """A prompt was queued. Returns its Trace."""
+        tr = Trace(prompt_id, workflow, label, server, gpu, submitted)
+        with self._lock:
+            self._live[prompt_id] = tr
+            for ev, data, t in self._early.pop(prompt_id, ()):
+                tr.event(ev, data, t)
+        return tr
+
+    def on_event(self, msg):
+        data = msg.get("data") or {}
+        pid = data.get("prompt_id")
+        if not pid:
+            return
+        t = time.time()
+        with self._lock:
+            tr = self._live.get(pid)
+            if tr is not None:
+                tr.event(msg.get("type"), data, t)
+                return
+            # Fast prompts can start before /prompt has answered us.
+            self._early.setdefault(pid, []).append((msg.get("type"), data, t))
+            while len(self._early) > 256:
+                self._early.popitem(last=False)
+
+    def drop(self, prompt_id):
+        """Forget a prompt that never ran (taken back off the queue) - not counted anywhere."""
+        with self._lock:
+            self._live.pop(prompt_id, None)
+
+    def finish(self, prompt_id, error=None):
+        """The prompt's Future resolved. Rolls the trace up and writes it out."""
+        with self._lock:
+            tr = self._live.pop(prompt_id, None)
+            if tr is None:
+                return None
+            now = time.time()
+            tr.ended = tr.ended or now      # resolved by /history polling: no start, no nodes
+            tr._close_node(tr.ended)
+            if error is not None:
+                tr.status, tr.error = "error", tr.error or str(error)[:300]
+            elif tr.status != "error":
+                tr.status = "done"
+            self._done.append(tr)
+            self._by_pid[prompt_id] = tr
+            while len(self._by_pid) > self._done.maxlen:
+                self._by_pid.pop(next(iter(self._by_pid)))
+            labels = (("kind", tr.kind), ("gpu", tr.gpu))
+            self._count("videofactory_jobs_total", labels + (("status", tr.status),))
+            self._observe("videofactory_queue_wait_seconds", labels, tr.queue_wait)
+            self._observe("videofactory_execution_seconds", labels, tr.execution)
+            for _, cls, secs in tr.nodes:
+                self._count("videofactory_node_seconds_total", (("class_type", cls),), secs)
+                self._count("videofactory_node_runs_total", (("class_type", cls),))
+            self._count("videofactory_nodes_cached_total", (("kind", tr.kind),), len(tr.cached_nodes))
+        if self.trace is not None:
+            self.trace.trace(tr.to_dict())
+        return tr
+
+    def job_done(self, job):
+        """Job done-callback: finish(job.prompt_id, its error)."""
+        self.finish(job.prompt_id, job.exception())
+
+    def downloaded(self, prompt_id, seconds, nbytes, gpu=None):
+        """Files of prompt_id were fetched (before or after it finished)."""
+        with self._lock:
+            tr = self._live.get(prompt_id) or self._by_pid.get(prompt_id)
+            if tr is not None:
+                tr.download_s += seconds
+                tr.download_bytes += nbytes
+                gpu = tr.gpu
+            labels = (("gpu", gpu or "unknown"),)
+            self._observe("videofactory_download_seconds", labels, seconds)
+            self._count("videofactory_download_bytes_total", labels, nbytes)
+
+    def cache_hit(self):
+        with self._lock:
+            self._count("videofactory_cache_hits_total", ())
+
+    def _count(self, name, labels, value=1):
+        self._counters[(name, labels)] = self._counters.get((name, labels), 0) + value
+
+    def _observe(self, name, labels, value):
+        if value is None:
+            return
+        h = self._hists.setdefault((name, labels), [0] * (len(BUCKETS) + 2))
+        for i, b in enumerate(BUCKETS):
+            if value <= b:
+                h[i] += 1
+        h[-2] += value
+        h[-1] += 1
+
+    # --- reading ---
+
+    def traces(self):
+        with self._lock:
+            return list(self._done)
+
+    def percentiles(self, metric="execution", by="kind", qs=PERCENTILES):
+        """{group: {"n", "p50", ...}} of a Trace property (queue_wait, execution, total, download_s)."""
+        groups = {}
+        for tr in self.traces():
+            value = getattr(tr, metric)
+            if metric.startswith("download") and not tr.download_bytes:
+                continue        # nothing fetched for this one
+            if value is not None and tr.status == "done":
+                groups.setdefault(getattr(tr, by), []).append(value)
+        out = {}
+        for key, values in sorted(groups.items(), key=lambda kv: str(kv[0])):
+            values.sort()
+            out[key] = {"n": len(values), **{f"p{q}": round(_rank(values, q), 3) for q in qs}}
+        return out
+
+    def node_times(self):
+        """{class_type: (runs, mean seconds)} over the kept traces - what's slow inside a workflow."""
+        totals = {}
+        for tr in self.traces():
+            for _, cls, secs in tr.nodes:
+                n, s = totals.get(cls, (0, 0.0))
+                totals[cls] = (n + 1, s + secs)
+        return {cls: (n, round(s / n, 3)) for cls, (n, s) in sorted(totals.items(), key=lambda kv: -kv[1][1])}
+
+    def prometheus(self):
+        """Everything in Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            hists = sorted(self._hists.items())
+            live = len(self._live)
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_labels(labels)} {_num(value)}")
+        for (name, labels), h in hists:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            for b, count in zip(BUCKETS, h):
+                lines.append(f"{name}_bucket{_labels(labels + (('le', _num(b)),))} {count}")
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {h[-1]}")
+            lines.append(f"{name}_sum{_labels(labels)} {_num(h[-2])}")
+            lines.append(f"{name}_count{_labels(labels)} {h[-1]}")
+        lines.append("# TYPE videofactory_jobs_in_flight gauge")
+        lines.append(f"videofactory_jobs_in_flight {live}")
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def load(cls, path, keep=100000):
+        """Recorder holding the traces in a trace.jsonl, for percentiles over past runs."""
+        r = cls(keep=keep)
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    r._done.append(Trace.from_dict(json.loads(line)))
+                except (ValueError, AttributeError):
+                    continue
+        return r
+
+
+def _rank(values, q):
+    """Nearest-rank percentile of sorted values."""
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels) + "}"
+
+
+def _num(x):
+    return str(int(x)) if float(x).is_integer() else repr(round(float(x), 6))
+
+
+RECORDER = Recorder()
+
+
+def serve(port=9464, recorder=None, host="0.0.0.0"):
+    """Serve GET /metrics on a daemon thread. Returns the server (call .shutdown() to stop)."""
+    recorder = recorder or RECORDER
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = recorder.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=httpd.serve_forever, name="metrics", daemon=True).start()
+    return httpd
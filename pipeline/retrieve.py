@@ -0,0 +1,266 @@
+"""
+Artifact retrieval - pull finished outputs off the ComfyUI box over /view.
+
+SaveVideo/SaveImage/SaveAudio write inside the container, and /history
+only tells us file names. As soon as a prompt finishes, every file it
+reported is streamed to projects/{project}/scenes/ (video, images) or
+projects/{project}/audio/ in fixed-size chunks, so a 5GB render never
+sits in memory. Downloads run on their own small pool, alongside
+whatever the GPU is generating next.
+
+Each file lands as name.part first. It is checked against Content-Length
+(and a Digest: sha-256= header if the server sends one), hashed again
+from disk, then renamed into place. Interrupted downloads resume with a
+Range request. Size and sha256 of every file go in
+projects/{project}/manifest.json, and files already there are skipped.
+
+Usage:
+    r = Retriever("http://localhost:8188", "yacht_promo")
+    paths = r.fetch(outputs).result()       # [Path(...scenes/t2v_42_00001_.mp4)]
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from pipeline import transport
+
+PROJECTS_DIR = Path(__file__).resolve().parent.parent / "projects"
+
+AUDIO_EXTS = (".wav", ".flac", ".mp3", ".ogg", ".m4a", ".opus", ".aac")
+
+
+class DownloadError(Exception):
+    pass
+
+
+def artifacts(outputs, include_temp=False):
+    """Every file in a /history outputs dict: [{filename, subfolder, type}]."""
+    refs = []
+    for node_out in outputs.values():
+        for items in node_out.values():
+            if not isinstance(items, list):
+                continue
+            for item in items:
+                if not isinstance(item, dict) or "filename" not in item:
+                    continue
+                kind = item.get("type", "output")
+                if kind == "temp" and not include_temp:
+                    continue        # PreviewImage scratch files
+                refs.append({"filename": item["filename"], "subfolder": item.get("subfolder", ""), "type": kind})
+    return refs
+
+
+def destination(ref, project, root=PROJECTS_DIR):
+    folder = "audio" if Path(ref["filename"]).suffix.lower() in AUDIO_EXTS else "scenes"
+    return Path(root) / project / folder / ref["subfolder"] / ref["filename"]
+
+
+def _sha256_file(path, chunk_size):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h
+
+
+def _digest_header(headers):
+    """sha256 hex from an RFC 3230 'Digest: sha-256=<base64>' header, if any."""
+    for part in (headers.get("Digest") or "").split(","):
+        algo, _, value = part.strip().partition("=")
+        if algo.lower() == "sha-256" and value:
+            try:
+                return base64.b64decode(value).hex()
+            except ValueError:
+                return None
+    return None
+
+
+class _Manifest:
+    """One project's manifest.json, shared by every Retriever writing into that project."""
+
+    __slots__ = ("path", "entries", "lock")
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = None
+        self.lock = threading.Lock()
+
+    def _read(self):
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, rel):
+        with self.lock:
+            if self.entries is None:
+                self.entries = self._read()
+            return self.entries.get(rel)
+
+    def record(self, rel, entry):
+        with self.lock:
+            # another process may have added files since we last read it
+            merged = self._read()
+            merged.update(self.entries or {})
+            merged[rel] = entry
+            self.entries = merged
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps(merged, indent=1))
+            os.replace(tmp, self.path)
+
+
+_manifests = {}         # manifest path -> _Manifest
+_manifests_lock = threading.Lock()
+
+
+def _manifest_for(path):
+    with _manifests_lock:
+        m = _manifests.get(path)
+        if m is None:
+            m = _manifests[path] = _Manifest(path)
+        return m
+
+
+class Retriever:
+    """Streams a server's output files into one project folder."""
+
+    def __init__(self, server, project, root=PROJECTS_DIR, workers=4, chunk_size=1 << 20,
+                 retries=3, verify=True):
+        self.server = server.rstrip("/")
+        self.project = project
+        self.root = Path(root)
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.verify = verify
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch")
+        self._lock = threading.Lock()
+        self._manifest = _manifest_for(self.manifest_path.resolve())
+        self.files = 0
+        self.bytes = 0
+        self.skipped = 0
+        self.resumed = 0
+        self.seconds = 0.0
+
+    # --- manifest ---
+
+    @property
+    def manifest_path(self):
+        return self.root / self.project / "manifest.json"
+
+    def _record(self, rel, size, digest, ref):
+        self._manifest.record(rel, {"bytes": size, "sha256": digest, "source": ref, "fetched": time.time()})
+
+    # --- downloads ---
+
+    def fetch(self, outputs):
+        """Future -> list of local Paths for every file in outputs, in order."""
+        refs = artifacts(outputs)
+        result = Future()
+        if not refs:
+            result.set_result([])
+            return result
+        paths = [None] * len(refs)
+        left = [len(refs)]
+
+        def one_done(i, f):
+            err = f.exception()
+            with self._lock:
+                if result.done():
+                    return
+                if err is not None:
+                    result.set_exception(err)
+                    return
+                paths[i] = f.result()
+                left[0] -= 1
+                finished = left[0] == 0
+            if finished:
+                result.set_result(paths)
+
+        for i, ref in enumerate(refs):
+            self._pool.submit(self.download, ref).add_done_callback(lambda f, i=i: one_done(i, f))
+        return result
+
+    def download(self, ref):
+        """Stream one file to its project path. Blocking; returns the Path."""
+        dest = destination(ref, self.project, self.root)
+        rel = dest.relative_to(self.root / self.project).as_posix()
+        known = self._manifest.get(rel)
+        if known and dest.exists() and dest.stat().st_size == known["bytes"]:
+            self.skipped += 1
+            return dest
+
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        part = dest.with_name(dest.name + ".part")
+        started = time.time()
+        delay = 0.5
+        for attempt in range(self.retries + 1):
+            try:
+                size, h, expected = self._stream(ref, part)
+                break
+            except (OSError, transport.HTTPError, DownloadError) as e:
+                if isinstance(e, transport.HTTPError) and e.status == 404:
+                    raise DownloadError(f"{ref['filename']}: not on the server") from e
+                if attempt >= self.retries:
+                    raise DownloadError(f"{ref['filename']}: {e}") from e
+                time.sleep(delay)
+                delay = min(delay * 2, 5)
+
+        digest = h.hexdigest()
+        if expected and expected != digest:
+            part.unlink(missing_ok=True)
+            raise DownloadError(f"{ref['filename']}: checksum mismatch (server {expected[:12]}, got {digest[:12]})")
+        if self.verify and _sha256_file(part, self.chunk_size).hexdigest() != digest:
+            part.unlink(missing_ok=True)
+            raise DownloadError(f"{ref['filename']}: file on disk doesn't match what was received")
+        os.replace(part, dest)
+        self._record(rel, size, digest, ref)
+        with self._lock:
+            self.files += 1
+            self.bytes += size
+            self.seconds += time.time() - started
+        return dest
+
+    def _stream(self, ref, part):
+        """Fill part from /view, resuming what's there. Returns (size, sha256, server_sha)."""
+        have = part.stat().st_size if part.exists() else 0
+        h = _sha256_file(part, self.chunk_size) if have else hashlib.sha256()
+        headers = {"Range": f"bytes={have}-"} if have else None
+        with transport.stream("GET", f"{self.server}/view", params=ref, headers=headers) as r:
+            r.raise_for_status()
+            if have and r.status == 206:
+                self.resumed += 1
+            elif have:
+                have, h = 0, hashlib.sha256()      # server ignored the Range
+            length = r.headers.get("Content-Length")
+            total = have + int(length) if length is not None else None
+            with open(part, "ab" if have else "wb") as f:
+                for chunk in r.iter_content(self.chunk_size):
+                    f.write(chunk)
+                    h.update(chunk)
+                    have += len(chunk)
+            expected = _digest_header(r.headers)
+        if total is not None and have != total:
+            raise DownloadError(f"got {have} of {total} bytes")
+        return have, h, expected
+
+    def stats(self):
+        with self._lock:
+            return {
+                "files": self.files,
+                "bytes": self.bytes,
+                "skipped": self.skipped,
+                "resumed": self.resumed,
+                "mb_per_s": round(self.bytes / 1e6 / self.seconds, 1) if self.seconds else 0.0,
+            }
+
+    def close(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,713 @@
+"""
+Multi-GPU scheduler - one ComfyUI per GPU, jobs routed to whoever fits.
+
+Each Backend is one ComfyUI endpoint with a role (primary / worker /
+control), its VRAM and an in-flight limit. Jobs wait client-side in a
+per-backend queue and are only posted when that backend has a free slot,
+so the GPU always has its next prompt ready but nothing piles up
+server-side where we can't move it. A backend that runs dry steals from
+the tail of the longest compatible queue.
+
+Model affinity (pipeline/affinity.py): each model family is pinned to
+one backend while that backend isn't overloaded, and each backend picks
+its next job to match the models it already has loaded, within priority
+and deadline limits. stats() reports the swaps that saved.
+
+Priorities: interactive / normal / bulk (affinity.PRIORITY) or any int.
+A backend is only given more work while ComfyUI's own pending queue is
+under its watermark, so jobs wait here - where priority, aging and
+affinity still apply - not in ComfyUI's FIFO. Waiting jobs age a point
+per `age` seconds, up to normal, so bulk renders can't starve. An
+interactive job never waits behind a deep server queue: it skips the
+watermark, takes a spare slot if the backend is full, and is posted
+with front=True so it runs next. cancel() and deprioritize() take jobs
+that haven't started back off ComfyUI's queue (POST /queue delete); if
+the server goes quiet after the delete, the job is requeued anyway and
+the original's result is used should it turn up in /history after all.
+
+VRAM admission (pipeline/admission.py): a job only goes to a card that
+could hold its estimated peak, and is only posted once the card has
+that much free of other processes - until then it waits in the queue.
+A job too big for every card is downscaled; one that OOMs anyway
+raises its family's estimate and is retried. The refresh loop samples
+/system_stats (and nvidia-smi through telemetry) to calibrate.
+
+Validation (pipeline/validation.py): submit() checks the graph against
+a backend's cached node definitions and fails the job at once if it
+can't run. Each backend's model files are refreshed from /models, and
+a job only goes to a backend that has every model it loads.
+
+Health (pipeline/health.py): given a Monitor, the refresh loop reads
+its latest snapshot - queue, /system_stats, nvidia-smi - instead of
+polling each backend itself, and a backend whose circuit breaker is
+open is offline. Failed posts count against the breaker.
+
+Usage:
+    sched = Scheduler([
+        Backend("gpu0", "http://localhost:8188", role="primary", vram_gb=32),
+        Backend("gpu1", "http://localhost:8189", role="worker", vram_gb=24),
+    ]).start()
+    job = sched.submit(workflow, role="worker")
+    outputs = job.result()
+
+    preview = sched.submit(draft, priority="interactive")     # ahead of everything queued
+    sched.cancel_all("bulk")                                  # drop bulk work that hasn't started
+"""
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+from pipeline import admission, affinity, conditioning, metrics, transport, validation
+from pipeline.completion import CompletionEngine
+from pipeline.jobs import Job
+
+
+class Backend:
+    """One ComfyUI server on one GPU."""
+
+    def __init__(self, name, url, role="worker", vram_gb=24, max_inflight=2, gpu=None, watermark=1):
+        self.name = name
+        self.url = url.rstrip("/")
+        self.role = role
+        self.vram_gb = vram_gb
+        self.max_inflight = max_inflight
+        self.watermark = watermark      # most prompts we let wait in ComfyUI's queue
+        self.gpu = gpu
+        self.queue = deque()            # jobs routed here, not yet posted
+        self.inflight = 0               # slots taken: being posted or running
+        self.running = set()            # posted jobs waiting on a result
+        self.server_pending = 0         # from GET /queue (everyone's work)
+        self.server_running = 0
+        self.external = 0               # of those, prompts that aren't ours (other clients, the UI)
+        self.online = True
+        self.misses = 0                 # consecutive failed /queue refreshes
+        self.engine = None
+        self.completed = 0
+        self.failed = 0
+        self.stolen = 0
+        self.loaded = frozenset()       # models the last posted job used
+        self.families = set()           # model families pinned here
+        self.swaps = 0
+        self.fifo_loaded = frozenset()  # what arrival order would have loaded
+        self.fifo_swaps = 0
+        self.total_gb = None            # from /system_stats (else vram_gb)
+        self.other_gb = 0.0             # held by other processes on the card
+        self.deferred = 0               # times a queued job had to wait for VRAM
+        self.models = None              # model files on the server (validation.available), None = unknown
+
+    def accepts(self, job):
+        if job.roles and self.role not in job.roles:
+            return False
+        if job.model_files and self.models is not None and not job.model_files <= self.models:
+            return False
+        if job.need_gb and job.need_gb > (self.total_gb or self.vram_gb) - admission.HEADROOM_GB:
+            return False
+        return self.vram_gb >= (job.vram_gb or 0)
+
+    def admits(self, job):
+        """Fits in what the card has free right now."""
+        return not job.need_gb or job.need_gb <= self.room()
+
+    def room(self):
+        return (self.total_gb or self.vram_gb) - self.other_gb - admission.HEADROOM_GB
+
+    def load(self):
+        """Jobs ahead of a new arrival, per slot."""
+        return (self.inflight + len(self.queue) + self.external) / self.max_inflight
+
+    def free_slots(self):
+        return self.max_inflight - self.inflight
+
+    def backlog(self):
+        """Prompts waiting in ComfyUI's queue (all but the one running), ours included."""
+        return max(0, self.external + self.inflight - 1)
+
+    def releasable(self):
+        """Room to post ordinary work: a free slot, and the server queue under the watermark."""
+        return self.free_slots() > 0 and self.backlog() < self.watermark
+
+    def __repr__(self):
+        return f"<Backend {self.name} {self.role} {self.vram_gb}GB {self.url}>"
+
+
+class Scheduler:
+    """Routes jobs over a pool of Backends by role, VRAM and live queue depth."""
+
+    def __init__(self, backends, refresh=2.0, submit_timeout=10, max_retries=2, dead_after=3,
+                 pin_families=True, spill=2.0, max_wait=600, admit=True, telemetry=None, age=60,
+                 urgent_slots=1, validate=True, monitor=None):
+        self.backends = list(backends)
+        self.monitor = monitor          # health.Monitor to read load and liveness from (None = poll here)
+        self.validate = validate        # check graphs and route by model files (see module docstring)
+        self.age = age                  # seconds of waiting worth one priority point (None = no aging)
+        self.urgent_slots = urgent_slots    # extra in-flight slots interactive jobs may use
+        self.admit = admit              # VRAM admission control (see module docstring)
+        self.telemetry = telemetry      # fn() -> {gpu index: {"memory_used_mb", "memory_total_mb"}}, e.g. nvidia-smi
+        self.downscaled = 0
+        self.pin_families = pin_families
+        self.spill = spill              # extra load a pinned backend takes before work spills over
+        self.max_wait = max_wait        # seconds before affinity yields to age
+        self._pins = {}                 # family -> Backend
+        self.dead_after = dead_after    # missed refreshes before in-flight work is rerun
+        self.refresh = refresh
+        self.submit_timeout = submit_timeout
+        self.max_retries = max_retries
+        self._cond = threading.Condition()
+        self._unrouted = deque()        # nothing online can take these yet
+        self._unconfirmed = {}          # prompt_id -> (job, backend) pulled back without the server confirming it
+        self._stop = threading.Event()
+        self._threads = []
+
+    # --- lifecycle ---
+
+    def start(self):
+        if self._threads:
+            return self
+        if self.monitor is not None and not self.monitor.rounds:
+            self.monitor.poll()
+        self.refresh_backends()
+        for target, name in ((self._dispatch_loop, "dispatch"), (self._refresh_loop, "refresh")):
+            t = threading.Thread(target=target, name=f"sched-{name}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def close(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for b in self.backends:
+            if b.engine:
+                b.engine.close()
+
+    # --- public ---
+
+    def submit(self, workflow, role=None, vram_gb=0, label="", priority="normal", deadline=None):
+        """Queue a workflow on the pool.
+
+        role: one role name or a list of them. priority: "interactive",
+        "normal", "bulk" or an int, higher runs sooner. deadline: epoch
+        seconds the job should start by.
+        """
+        job = Job(None, Future(), workflow, label)
+        job.roles = [role] if isinstance(role, str) else list(role or [])
+        job.vram_gb = vram_gb
+        job.item = affinity.Item(workflow, label, priority, deadline, ref=job)
+        job.backend = None
+        job.attempts = 0
+        job.need_gb = admission.estimate(workflow) if self.admit else 0
+        job.peak_gb = 0.0
+        job.waiting = False
+        job.model_files = frozenset()
+        if self.validate:
+            job.model_files = frozenset(n.replace("\\", "/") for _, n in job.item.models)
+            errors = self._problems(job)
+            if errors:
+                job.future.set_exception(validation.ValidationError(errors, label))
+                return job
+        with self._cond:
+            self._place(job)
+            self._cond.notify_all()
+        return job
+
+    def stats(self):
+        with self._cond:
+            return {b.name: {"url": b.url, "role": b.role, "online": b.online,
+                             "queued": len(b.queue), "inflight": b.inflight,
+                             "server_pending": b.server_pending, "backlog": b.backlog(),
+                             "completed": b.completed,
+                             "failed": b.failed, "stolen": b.stolen,
+                             "families": sorted(b.families), "swaps": b.swaps,
+                             "swaps_avoided": b.fifo_swaps - b.swaps, "deferred": b.deferred,
+                             "room_gb": round(b.room(), 1), "other_gb": round(b.other_gb, 1)}
+                    for b in self.backends}
+
+    def swaps_avoided(self):
+        """Model reloads saved versus running every backend's jobs in arrival order."""
+        with self._cond:
+            return sum(b.fifo_swaps - b.swaps for b in self.backends)
+
+    def pending(self):
+        with self._cond:
+            return len(self._unrouted) + sum(len(b.queue) + b.inflight for b in self.backends)
+
+    def cancel(self, job):
+        """Drop a job that hasn't started - from our queue, or from ComfyUI's with /queue delete.
+
+        Its result() then raises CancelledError. False if it's already
+        running or finished.
+        """
+        if not self._unqueue(job):
+            return False
+        return job.future.cancel()
+
+    def cancel_all(self, priority="bulk"):
+        """cancel() every job at or below priority that hasn't started. Returns how many."""
+        limit = affinity.priority_value(priority)
+        with self._cond:
+            jobs = [j for j in self._jobs() if j.item.priority <= limit]
+        return sum(1 for j in jobs if self.cancel(j))
+
+    def deprioritize(self, job, priority="bulk"):
+        """Lower a job that hasn't started; one already posted is taken back off ComfyUI's queue
+        so it waits here behind everything more urgent. False if it's already running."""
+        if not self._unqueue(job):
+            return False
+        job.item.priority = affinity.priority_value(priority)
+        with self._cond:
+            self._place(job)
+            self._cond.notify_all()
+        return True
+
+    def _problems(self, job):
+        """What's wrong with the job's graph, checked against the first backend that could take it."""
+        b = next((b for b in self.backends if b.online and (not job.roles or b.role in job.roles)), None)
+        if b is None:
+            return []
+        # models are a routing question here - another backend may have them
+        return validation.problems(conditioning.to_plain(job.workflow), b.url, models=False)
+
+    def _lacking(self, job):
+        """Models no backend the job may use has, if that's why nothing accepts it. [] otherwise."""
+        cards = [b for b in self.backends if not job.roles or b.role in job.roles]
+        if not cards or not job.model_files or any(b.models is None for b in cards):
+            return []
+        missing = [job.model_files - b.models for b in cards]
+        if not all(missing):
+            return []
+        return sorted(min(missing, key=len))
+
+    def _jobs(self):
+        """Every job not finished yet. Lock held."""
+        out = list(self._unrouted)
+        for b in self.backends:
+            out.extend(b.queue)
+            out.extend(b.running)
+        return [j for j in out if not j.future.done()]
+
+    def _unqueue(self, job):
+        """Take a job that hasn't started out of the pool. True if it was still waiting."""
+        with self._cond:
+            if job.future.done():
+                return False
+            if job in self._unrouted:
+                self._unrouted.remove(job)
+                return True
+            for b in self.backends:
+                if job in b.queue:
+                    b.queue.remove(job)
+                    return True
+            b, pid = job.backend, job.prompt_id
+            if b is None or pid is None or job not in b.running:
+                return False        # being posted right now
+        pulled = self._pull_back(b, pid)
+        if pulled is False:
+            return False
+        with self._cond:
+            if job not in b.running or job.prompt_id != pid:
+                return False
+            b.running.discard(job)
+            b.inflight -= 1
+            job.backend = None
+            job.prompt_id = None
+            job.attempts -= 1       # never ran - doesn't count against retries
+            if pulled is None:
+                self._unconfirmed[pid] = (job, b)
+            self._cond.notify_all()
+        if pulled:
+            b.engine.forget(pid)
+            metrics.RECORDER.drop(pid)
+        else:
+            job.future.add_done_callback(lambda f, job=job: self._settled(job))
+        return True
+
+    def _pull_back(self, b, pid):
+        """Delete pid from b's pending queue. True if it was still waiting there; False if it
+        wasn't, or the delete didn't go through; None if the delete went out but b couldn't say."""
+        try:
+            transport.post(f"{b.url}/queue", json={"delete": [pid]}, timeout=self.submit_timeout).raise_for_status()
+        except (OSError, transport.HTTPError, ValueError):
+            return False
+        try:
+            q = transport.get_json(f"{b.url}/queue", retries=0)
+            if any(len(item) > 1 and item[1] == pid
+                   for item in q.get("queue_running", []) + q.get("queue_pending", [])):
+                return False        # already running
+            # Gone from the queue: deleted, unless it finished in the meantime.
+            return not transport.get_json(f"{b.url}/history/{pid}", retries=0)
+        except (OSError, transport.HTTPError, ValueError):
+            return None     # most likely deleted; if it runs after all, _done keeps its result
+
+    # --- routing ---
+
+    def route(self, job):
+        """Backend for the job: its family's pinned backend, else the least loaded. None if none fit."""
+        fits = [b for b in self.backends if b.online and b.accepts(job)]
+        if not fits:
+            return None
+        # Cards with the VRAM free right now first; ties go to the smaller
+        # card so the big one stays free for big jobs.
+        key = lambda b: (not b.admits(job), b.load(), b.vram_gb)
+        if not self.pin_families:
+            return min(fits, key=key)
+        fam = job.item.family
+        pinned = self._pins.get(fam)
+        lightest = min(fits, key=key)
+        if pinned in fits and pinned.load() <= lightest.load() + self.spill:
+            return pinned
+        if pinned is not None and pinned in fits:
+            return lightest         # spill: pinned card is swamped
+        unpinned = [b for b in fits if not b.families]
+        chosen = min(unpinned, key=key) if unpinned else lightest
+        if pinned is None or not pinned.online:
+            self._pins[fam] = chosen
+            chosen.families.add(fam)
+        return chosen
+
+    def _place(self, job):
+        b = self.route(job)
+        if b is None and not any(c.accepts(job) for c in self.backends):
+            lacking = self._lacking(job)
+            if lacking:
+                job.future.set_exception(validation.ValidationError(
+                    [f"no backend (roles={job.roles or 'any'}) has model file {name!r}" for name in lacking],
+                    job.label))
+                return
+            if not self._downscale(job):
+                job.future.set_exception(Exception(
+                    f"No backend can run this job (roles={job.roles or 'any'}, vram={job.vram_gb}GB, "
+                    f"needs ~{job.need_gb:.1f}GB)"))
+                return
+            b = self.route(job)
+        if b is None:
+            self._unrouted.append(job)
+            return
+        self._enqueue(b, job)
+
+    def _downscale(self, job):
+        """Shrink a job no card can hold to fit the biggest card it's allowed on."""
+        if not job.need_gb:
+            return False
+        cards = [b for b in self.backends if not job.roles or b.role in job.roles]
+        if not cards:
+            return False
+        limit = max((b.total_gb or b.vram_gb) for b in cards) - admission.HEADROOM_GB
+        smaller = admission.downscale(job.workflow, limit)
+        if smaller is None:
+            return False
+        print(f"[ADMIT] {job.label or 'job'} needs ~{job.need_gb:.1f}GB, no card has that - "
+              f"downscaled to ~{admission.estimate(smaller):.1f}GB")
+        job.workflow = smaller
+        job.need_gb = admission.estimate(smaller)
+        self.downscaled += 1
+        return True
+
+    def _enqueue(self, b, job):
+        b.queue.append(job)
+        self._arrived(b, job)
+
+    def _arrived(self, b, job):
+        """Track the swaps b would have made running jobs in arrival order."""
+        models = job.item.models
+        if models and not models <= b.fifo_loaded:
+            b.fifo_swaps += 1
+            b.fifo_loaded = models
+
+    def _pop(self, b, urgent=False):
+        """Next job for b: affinity.pick over the queued jobs that fit its free VRAM. None if none do.
+
+        urgent: interactive jobs only.
+        """
+        fit = [i for i, j in enumerate(b.queue) if b.admits(j) and (not urgent or self._urgent(j))]
+        for j in b.queue:
+            if not j.waiting and not b.admits(j):
+                j.waiting = True
+                b.deferred += 1
+        if not fit:
+            return None
+        i = fit[affinity.pick([b.queue[i].item for i in fit], b.loaded, max_wait=self.max_wait, age=self.age)]
+        job = b.queue[i]
+        del b.queue[i]
+        job.waiting = False
+        return job
+
+    def _urgent(self, job):
+        return job.item.priority >= affinity.PRIORITY["interactive"]
+
+    def _steal(self, thief, urgent=False):
+        """Take a job for an idle backend from the tail of the busiest queue."""
+        victims = sorted((b for b in self.backends if b is not thief and b.queue),
+                         key=lambda b: len(b.queue), reverse=True)
+        for victim in victims:
+            # Only steal if the job would otherwise wait behind a full victim.
+            if not urgent and victim.releasable() and victim.free_slots() >= len(victim.queue):
+                continue
+            # Prefer work that matches what the thief already has loaded.
+            tail = range(len(victim.queue) - 1, -1, -1)
+            ok = [i for i in tail if thief.accepts(victim.queue[i]) and thief.admits(victim.queue[i])
+                  and (not urgent or self._urgent(victim.queue[i]))]
+            if not ok:
+                continue
+            warm = [i for i in ok if victim.queue[i].item.models <= thief.loaded]
+            i = (warm or ok)[0]
+            job = victim.queue[i]
+            del victim.queue[i]
+            thief.stolen += 1
+            self._arrived(thief, job)
+            return job
+        return None
+
+    def _next_batch(self):
+        """(backend, job) pairs to post now. Called with the lock held."""
+        batch = []
+        for _ in range(len(self._unrouted)):
+            job = self._unrouted.popleft()
+            self._place(job)
+        for b in self.backends:
+            if not b.online:
+                continue
+            while True:
+                if b.releasable():
+                    job = (self._pop(b) if b.queue else None) or self._steal(b)
+                elif b.free_slots() + self.urgent_slots > 0:
+                    # Full, or its server queue is deep: only interactive work gets in.
+                    job = (self._pop(b, urgent=True) if b.queue else None) or self._steal(b, urgent=True)
+                else:
+                    break
+                if job is None:
+                    break
+                models = job.item.models
+                if models and not models <= b.loaded:
+                    b.swaps += 1
+                    b.loaded = models
+                b.inflight += 1
+                job.backend = b
+                batch.append((b, job))
+        return batch
+
+    # --- posting ---
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set():
+            with self._cond:
+                batch = self._next_batch()
+                if not batch:
+                    self._cond.wait(self.refresh)
+                    continue
+            for b, job in batch:
+                self._post(b, job)
+
+    def _post(self, b, job):
+        job.attempts += 1
+        try:
+            # Cached text encodes only where the node is installed
+            workflow = conditioning.for_backend(job.workflow, b.url)
+            payload = {"prompt": workflow, "client_id": b.engine.client_id}
+            if self._urgent(job):
+                payload["front"] = True     # ahead of whatever is already in ComfyUI's queue
+            r = transport.post(f"{b.url}/prompt", json=payload, timeout=self.submit_timeout)
+        except ValueError as e:         # graph won't serialise; HTTP errors are r.status below
+            self._unposted(b, job, f"Queue failed on {b.name}: {e}")
+            return
+        except OSError as e:
+            if self.monitor is not None:
+                self.monitor.failed(b.url, e)
+            with self._cond:
+                b.inflight -= 1
+                b.online = False
+                self._retry(job, f"Queue failed on {b.name}: {e}")
+                self._evacuate(b)
+                self._cond.notify_all()
+            return
+        if r.status != 200:
+            with self._cond:
+                b.inflight -= 1
+                b.failed += 1
+                self._cond.notify_all()
+            job.future.set_exception(validation.rejection(r.status, r.text, job.label))
+            return
+        try:
+            prompt_id = r.json()["prompt_id"]
+        except (ValueError, KeyError, TypeError):
+            self._unposted(b, job, f"{b.name} answered /prompt with {r.text[:200]!r}")
+            return
+        job.trace = metrics.RECORDER.start(prompt_id, job.workflow, job.label, b.url, gpu=b.name,
+                                           submitted=job.submitted)
+        with self._cond:
+            job.prompt_id = prompt_id
+            b.running.add(job)
+        inner = b.engine.track(prompt_id)
+        inner.add_done_callback(lambda f, b=b, job=job, pid=prompt_id: self._done(b, job, pid, f))
+
+    def _unposted(self, b, job, reason):
+        """b answered the post but gave no prompt id - free the slot and retry just this job."""
+        with self._cond:
+            b.inflight -= 1
+            b.failed += 1
+            self._retry(job, reason)
+            self._cond.notify_all()
+
+    def _done(self, b, job, prompt_id, inner):
+        metrics.RECORDER.finish(prompt_id, inner.exception())
+        if self._ran_anyway(job, prompt_id, inner):
+            self._unqueue(job)      # drop the requeued copy, unless it's already running too
+            job.future.set_result(inner.result())
+            return
+        with self._cond:
+            if job not in b.running or job.prompt_id != prompt_id:
+                return      # reclaimed from a dead backend and rerun elsewhere
+            b.running.discard(job)
+            b.inflight -= 1
+            err = inner.exception()
+            if err is None:
+                b.completed += 1
+                if job.peak_gb:
+                    admission.CALIBRATION.observe(job.workflow, job.peak_gb)
+            else:
+                b.failed += 1
+            if err is not None and self.admit and admission.is_oom(err):
+                # Estimate was too low: learn from it and try again where it fits.
+                admission.CALIBRATION.oom(job.workflow, job.need_gb)
+                job.need_gb = admission.estimate(job.workflow)
+                self._retry(job, f"Out of memory on {b.name}: {err}")
+                self._cond.notify_all()
+                return
+            self._cond.notify_all()
+        if job.future.done():
+            return      # an unconfirmed pull-back's original answered first
+        if err is not None:
+            job.future.set_exception(err)
+        else:
+            job.future.set_result(inner.result())
+
+    def _ran_anyway(self, job, prompt_id, inner):
+        """A prompt _pull_back couldn't confirm deleted finished after all, and its result is still wanted."""
+        with self._cond:
+            pulled = self._unconfirmed.pop(prompt_id, None)
+            return (pulled is not None and pulled[0] is job and inner.exception() is None
+                    and not job.future.done())
+
+    def _settled(self, job):
+        """job has its answer: stop watching any pulled-back prompt of it that was really deleted."""
+        with self._cond:
+            stale = [(pid, b) for pid, (j, b) in self._unconfirmed.items() if j is job]
+            for pid, _ in stale:
+                del self._unconfirmed[pid]
+        for pid, b in stale:
+            b.engine.forget(pid)
+            metrics.RECORDER.drop(pid)
+
+    def _retry(self, job, reason):
+        """Put a job back in the pool, or fail it if it's used up its attempts."""
+        job.backend = None
+        job.prompt_id = None
+        if job.attempts > self.max_retries:
+            job.future.set_exception(Exception(reason))
+        else:
+            self._place(job)
+
+    def _evacuate(self, b):
+        """Move everything parked on a dead backend back into the pool."""
+        for fam in b.families:
+            if self._pins.get(fam) is b:
+                del self._pins[fam]
+        b.families.clear()
+        orphans = list(b.queue)
+        b.queue.clear()
+        for job in orphans:
+            self._place(job)
+
+    def _reclaim(self, b):
+        """Backend is gone with our prompts on it - rerun them elsewhere."""
+        for job in list(b.running):
+            b.running.discard(job)
+            b.inflight -= 1
+            self._retry(job, f"{b.name} went offline while running the job")
+        self._evacuate(b)
+
+    # --- live load ---
+
+    def refresh_backends(self):
+        """Pull /queue (and /system_stats) from every backend concurrently; update load, VRAM and liveness."""
+        if self.monitor is not None:
+            gpus = self.monitor.gpus()
+            for b in self.backends:
+                self._refresh_one(b, gpus.get(b.gpu))
+            with self._cond:
+                self._cond.notify_all()
+            return
+        gpus = {}
+        if self.admit and self.telemetry is not None:
+            try:
+                gpus = self.telemetry() or {}
+            except Exception:
+                gpus = {}
+        threads = [threading.Thread(target=self._refresh_one, args=(b, gpus.get(b.gpu)), daemon=True)
+                   for b in self.backends]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _poll(self, b):
+        """(/queue, /system_stats or None) for b - from the monitor's snapshot if there is one. None if it's down."""
+        if self.monitor is not None:
+            st = self.monitor.status(b.url)
+            if st is not None:
+                return (st.sample.queue, st.sample.stats if self.admit else None) if st.healthy else None
+        try:
+            q = transport.get_json(f"{b.url}/queue", timeout=min(self.refresh, 5), retries=0)
+            stats = None
+            if self.admit:
+                stats = transport.get_json(f"{b.url}/system_stats", timeout=min(self.refresh, 5), retries=0)
+        except (OSError, transport.HTTPError, ValueError):
+            return None
+        return q, stats
+
+    def _refresh_one(self, b, gpu=None):
+        polled = self._poll(b)
+        if polled is None:
+            with self._cond:
+                b.online = False
+                b.misses += 1
+                if b.misses == self.dead_after:
+                    self._reclaim(b)
+            return
+        q, stats = polled
+        if b.engine is None:
+            b.engine = CompletionEngine(b.url).start()
+            metrics.RECORDER.watch(b.engine)
+        models = validation.available(b.url) if self.validate else None     # refetched every schema.TTL
+        with self._cond:
+            queued = q.get("queue_running", []) + q.get("queue_pending", [])
+            ours = {j.prompt_id for j in b.running}
+            b.server_pending = len(q.get("queue_pending", []))
+            b.server_running = len(q.get("queue_running", []))
+            b.external = sum(1 for item in queued if len(item) > 1 and item[1] not in ours)
+            b.models = models
+            b.online = True
+            b.misses = 0
+            if stats is not None:
+                self._vram(b, q, stats, gpu)
+
+    def _vram(self, b, q, stats, gpu):
+        """Update b's free VRAM and, if one of ours is running alone, that job's peak. Lock held."""
+        cap = admission.capacity(stats)
+        if cap is None:
+            return
+        b.total_gb, b.other_gb = cap
+        if gpu:
+            # nvidia-smi sees every process; trust whichever reading leaves less room
+            smi_other = gpu["memory_used_mb"] / 1024 - admission.used_gb(stats) - admission.CONTEXT_GB
+            b.other_gb = max(b.other_gb, smi_other)
+        running = [item[1] for item in q.get("queue_running", []) if len(item) > 1]
+        if len(running) == 1:
+            job = next((j for j in b.running if j.prompt_id == running[0]), None)
+            if job is not None:
+                job.peak_gb = max(job.peak_gb, admission.used_gb(stats))
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh):
+            self.refresh_backends()
@@ -0,0 +1,187 @@
+"""
+Node definitions - each server's /object_info and /models, kept on disk.
+
+/object_info lists every node class a server has: inputs in widget
+order, types, defaults, combo choices. It runs to a few MB, so it's
+fetched once per server and written under cache/object_info/; later
+processes read that copy instead of asking again. A copy older than
+`ttl` seconds is fetched again on next use (the old one is kept if the
+server doesn't answer); so is one that doesn't know a class a workflow
+uses (refresh=True - new custom nodes).
+
+models() is the same for the model files: GET /models for the folders,
+then /models/{folder} for each, cached with the same ttl.
+
+Each snapshot carries a sha256 digest, kept in a small index next to
+the snapshots, so anything built from one (converted workflows) can
+tell whether it's still current without loading the snapshot itself.
+
+Usage:
+    nodes = object_info("http://localhost:8188")     # {class_type: definition}
+    digest("http://localhost:8188")                  # of the snapshot on disk, None if there isn't one
+    models("http://localhost:8188")                  # {"checkpoints": ["ltxv-13b....safetensors", ...], ...}
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from pipeline import transport
+
+DEFAULT_DIR = Path(__file__).resolve().parent.parent / "cache" / "object_info"
+TTL = 300       # seconds a snapshot is trusted before it's fetched again
+
+
+def server_key(server):
+    """Filesystem-safe name for a server URL: http://gpu1:8188 -> gpu1_8188."""
+    parts = urlsplit(server if "//" in server else f"http://{server}")
+    return (parts.netloc or parts.path).replace(":", "_").replace("/", "_")
+
+
+class SchemaCache:
+    """/object_info and /models per server, in memory and under root."""
+
+    __slots__ = ("root", "ttl", "nodes", "listings", "fetches", "_checked", "_index", "_lock")
+
+    def __init__(self, root=DEFAULT_DIR, ttl=TTL):
+        self.root = Path(root)
+        self.ttl = ttl
+        self.nodes = {}         # server -> {class_type: definition}
+        self.listings = {}      # server -> {folder: [filename]}
+        self.fetches = 0
+        self._checked = {}      # (server, "nodes" | "models") -> when last fetched, or tried
+        self._index = None      # server -> {"file", "digest", "fetched", "classes", "models", "models_fetched"}
+        self._lock = threading.Lock()
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                self._index = json.loads((self.root / "index.json").read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f"index.json.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps(self._index, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.root / "index.json")
+
+    def _fresh(self, server, kind):
+        when = self._checked.get((server, kind))
+        return when is not None and (self.ttl is None or time.time() - when < self.ttl)
+
+    def digest(self, server):
+        """sha256 of server's snapshot, from the index alone. None if there's no snapshot."""
+        server = server.rstrip("/")
+        with self._lock:
+            entry = self._load_index().get(server)
+        return entry.get("digest") if entry else None
+
+    def object_info(self, server, refresh=False):
+        """{class_type: definition} for server - memory, then disk, then GET /object_info."""
+        server = server.rstrip("/")
+        with self._lock:
+            nodes = self.nodes.get(server)
+            entry = self._load_index().get(server)
+        if nodes is None and entry and "file" in entry:
+            try:
+                nodes = json.loads((self.root / entry["file"]).read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                nodes = None        # snapshot gone or torn - fetch a new one
+            if nodes is not None:
+                with self._lock:
+                    self.nodes[server] = nodes
+                    self._checked.setdefault((server, "nodes"), entry["fetched"])
+        if nodes is not None and not refresh and self._fresh(server, "nodes"):
+            return nodes
+        try:
+            return self.refresh(server)
+        except (OSError, transport.HTTPError, ValueError):
+            if nodes is None or refresh:
+                raise
+            with self._lock:
+                self._checked[(server, "nodes")] = time.time()     # ask again in ttl, not every call
+            return nodes            # stale beats nothing while the server is down
+
+    def refresh(self, server):
+        """Fetch server's /object_info now and replace the snapshot."""
+        server = server.rstrip("/")
+        raw = transport.get(f"{server}/object_info").raise_for_status().content
+        nodes = json.loads(raw)
+        if not isinstance(nodes, dict):
+            raise ValueError(f"{server}/object_info: expected a dict of node classes, got {type(nodes).__name__}")
+        now = time.time()
+        with self._lock:
+            self.fetches += 1
+            self.nodes[server] = nodes
+            self._checked[(server, "nodes")] = now
+        if not nodes:
+            return nodes            # nothing worth keeping (a stub server)
+        name = f"{server_key(server)}.json"
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f"{name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp.write_bytes(raw)
+        os.replace(tmp, self.root / name)
+        with self._lock:
+            entry = self._load_index().setdefault(server, {})
+            entry.update(file=name, digest=hashlib.sha256(raw).hexdigest(), fetched=now, classes=len(nodes))
+            self._save_index()
+        return nodes
+
+    def models(self, server, refresh=False):
+        """{folder: [filename]} from /models, None if the server can't say (old ComfyUI, offline)."""
+        server = server.rstrip("/")
+        with self._lock:
+            listing = self.listings.get(server)
+            entry = self._load_index().get(server)
+            if listing is None and entry and "models" in entry:
+                listing = self.listings[server] = entry["models"]
+                self._checked.setdefault((server, "models"), entry["models_fetched"])
+            if not refresh and self._fresh(server, "models"):
+                return listing
+            self._checked[(server, "models")] = time.time()
+        try:
+            folders = transport.get_json(f"{server}/models", retries=0)
+            fresh = {f: transport.get_json(f"{server}/models/{f}", retries=0) for f in folders}
+        except (OSError, transport.HTTPError, ValueError):
+            return listing
+        with self._lock:
+            self.fetches += 1
+            self.listings[server] = fresh
+            entry = self._load_index().setdefault(server, {})
+            entry.update(models=fresh, models_fetched=time.time())
+            self._save_index()
+        return fresh
+
+    def forget(self, server=None):
+        """Drop the in-memory copies (all servers if None) so the next use reads or fetches again."""
+        with self._lock:
+            if server is None:
+                self.nodes.clear()
+                self.listings.clear()
+                self._checked.clear()
+            else:
+                server = server.rstrip("/")
+                self.nodes.pop(server, None)
+                self.listings.pop(server, None)
+                self._checked.pop((server, "nodes"), None)
+                self._checked.pop((server, "models"), None)
+
+
+CACHE = SchemaCache()
+
+
+def object_info(server, refresh=False):
+    return CACHE.object_info(server, refresh)
+
+
+def digest(server):
+    return CACHE.digest(server)
+
+
+def models(server, refresh=False):
+    return CACHE.models(server, refresh)
@@ -0,0 +1,151 @@
+"""
+Parameter sweeps - many variants of one shot, packed into batched latents.
+
+Trying 8 seeds with text_to_video in a loop is 8 prompts: 8 model
+passes at batch 1, 8 text encodes, 8 round trips. Variants that differ
+only in seed can share one prompt instead: the empty latent gets
+batch_size=N, the sampler denoises all N at once, and the decoded batch
+is split back into one output per variant. cfg/steps/strength change
+the sampler itself, so each combination of those is its own batch.
+
+How many variants fit in one batch comes from the server's VRAM
+(/system_stats) and admission.estimate() of the batched graph - the
+same estimate every job is admitted with - see batch_limit().
+
+ComfyUI draws a whole batch's noise from one seed, so a batched variant
+is reproduced by (seed, batch_index), not by a seed of its own.
+
+Usage:
+    variants = grid(seed=[1, 2, 3, 4], cfg=[1.0, 3.0])     # 8 variants
+    for batch in pack(variants, limit=4):                  # 2 prompts
+        wf = batched(template.instantiate(**batch.params, seed=batch.seed, batch=len(batch)), len(batch))
+        ...
+        per_variant = split(wf, outputs, len(batch))
+"""
+import itertools
+
+from pipeline import admission, transport
+
+MAX_BATCH = 8
+
+
+class Batch(list):
+    """Variants sharing everything but the noise: one prompt."""
+
+    def __init__(self, params, variants):
+        super().__init__(variants)
+        self.params = params            # sampler settings common to the batch (no seed)
+
+    @property
+    def seed(self):
+        return self[0]["seed"]
+
+
+def grid(**axes):
+    """Every combination of the list-valued axes; scalars are held fixed."""
+    names = list(axes)
+    values = [v if isinstance(v, (list, tuple)) else [v] for v in axes.values()]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def pack(variants, limit):
+    """Group variants that differ only by seed into Batches of at most limit, in order.
+
+    Batches in a group are evened out (8 at limit 5 -> 4 + 4, not 5 + 3).
+    """
+    groups = {}
+    for v in variants:
+        params = {k: val for k, val in v.items() if k != "seed"}
+        groups.setdefault(tuple(sorted(params.items())), (params, []))[1].append(v)
+    batches = []
+    for params, members in groups.values():
+        count = -(-len(members) // max(limit, 1))
+        size, extra = divmod(len(members), count)
+        i = 0
+        for c in range(count):
+            n = size + (c < extra)
+            batches.append(Batch(params, members[i:i + n]))
+            i += n
+    return batches
+
+
+def batch_limit(server, build, vram_gb=None):
+    """Variants per prompt that fit on this server: the largest n whose build(n) -
+    the graph at batch_size n - admission.estimate()s under the card. 1 when unsure."""
+    if vram_gb is None:
+        cap = admission.server_capacity(server)
+        if cap is None:
+            return 1
+        vram_gb = cap[0]
+    room = vram_gb - admission.HEADROOM_GB
+    n = 1
+    while n < MAX_BATCH and admission.estimate(build(n + 1)) <= room:
+        n += 1
+    return n
+
+
+def _decode_chain(graph):
+    """(VAEDecode id, CreateVideo id, SaveVideo id) of a video graph, or None for images."""
+    save = next((nid for nid, n in graph.items() if n["class_type"] == "SaveVideo"), None)
+    if save is None:
+        return None
+    create = graph[save]["inputs"]["video"][0]
+    decode = graph[create]["inputs"]["images"][0]
+    if graph[decode]["class_type"] != "VAEDecode" or graph[create]["class_type"] != "CreateVideo":
+        return None
+    return decode, create, save
+
+
+def batched(graph, n):
+    """Graph whose video output is split into n SaveVideo nodes, one per batch item.
+
+    Images need nothing: SaveImage already writes one file per item.
+    Set the latent's batch_size first (template param "batch").
+    """
+    chain = _decode_chain(graph)
+    if n <= 1 or chain is None:
+        return graph
+    decode, create, save = chain
+    out = {nid: node for nid, node in graph.items() if nid not in chain}
+    base = max(int(nid) for nid in graph if nid.isdigit()) + 1
+    prefix = graph[save]["inputs"]["filename_prefix"]
+    for k in range(n):
+        ids = [str(base + k * 4 + j) for j in range(4)]
+        out[ids[0]] = {"class_type": "LatentFromBatch",
+                       "inputs": {"samples": graph[decode]["inputs"]["samples"], "batch_index": k, "length": 1}}
+        out[ids[1]] = {"class_type": "VAEDecode", "inputs": {**graph[decode]["inputs"], "samples": [ids[0], 0]}}
+        out[ids[2]] = {"class_type": "CreateVideo", "inputs": {**graph[create]["inputs"], "images": [ids[1], 0]}}
+        out[ids[3]] = {"class_type": "SaveVideo",
+                       "inputs": {**graph[save]["inputs"], "video": [ids[2], 0], "filename_prefix": f"{prefix}_b{k}"}}
+    return out
+
+
+def split(graph, outputs, n):
+    """Per-variant outputs dicts, in batch order, from a batched prompt's outputs."""
+    if n <= 1:
+        return [outputs]
+    saves = [nid for nid, node in graph.items() if node["class_type"] == "SaveVideo"]
+    if len(saves) == n:
+        return [{nid: outputs.get(nid, {})} for nid in sorted(saves, key=int)]
+    per = [{} for _ in range(n)]
+    for nid, node_out in outputs.items():
+        for key, items in node_out.items():
+            if isinstance(items, list) and len(items) == n:
+                for k in range(n):
+                    per[k].setdefault(nid, {})[key] = [items[k]]
+    return per
+
+
+def gpu_seconds(server, prompt_id):
+    """How long the prompt ran on the GPU, from /history's execution timestamps."""
+    try:
+        hist = transport.get_json(f"{server.rstrip('/')}/history/{prompt_id}")
+    except (OSError, transport.HTTPError, ValueError):
+        return None
+    stamps = {}
+    for kind, data in hist.get(prompt_id, {}).get("status", {}).get("messages", []):
+        if "timestamp" in data:
+            stamps[kind] = data["timestamp"]
+    if "execution_start" not in stamps or "execution_success" not in stamps:
+        return None
+    return (stamps["execution_success"] - stamps["execution_start"]) / 1000
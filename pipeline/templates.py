@@ -0,0 +1,307 @@
+"""
+Compiled workflow templates - load the graphs once, patch per job.
+
+Every API-format graph in workflows/ and workflows/templates/ is loaded
+and validated the first time it's asked for. A template knows which
+node inputs each parameter (prompt, seed, frames, width, height,
+strength, steps, ...) lives in, so a job is a copy of the handful of
+nodes that change - the rest of the graph is shared with the template.
+
+Serialization is precompiled the same way: untouched nodes are kept as
+JSON fragments and only patched nodes are encoded per job.
+
+Usage:
+    t2v = get("ltx_t2v")
+    workflow = t2v.instantiate(prompt="boat at sunset", seed=42, frames=97)
+    body = t2v.dumps(prompt="boat at sunset", seed=42)   # JSON string, same graph
+
+Instances share untouched nodes with the template - treat them as
+read-only, or copy.deepcopy() before editing by hand.
+"""
+import json
+import threading
+from pathlib import Path
+
+WORKFLOWS_DIR = Path(__file__).resolve().parent.parent / "workflows"
+
+
+class TemplateError(ValueError):
+    pass
+
+
+class Param:
+    """A typed knob on a template, bound to one or more (node_id, input) slots."""
+
+    __slots__ = ("name", "type", "targets", "minimum")
+
+    def __init__(self, name, type, targets, minimum=None):
+        self.name = name
+        self.type = type
+        self.targets = tuple(targets)
+        self.minimum = minimum
+
+    def check(self, value):
+        # ints are fine where a float is expected; bools never are
+        types = (int, float) if self.type is float else (self.type,)
+        if not isinstance(value, types) or isinstance(value, bool):
+            raise TemplateError(f"{self.name} must be {self.type.__name__}, got {type(value).__name__}")
+        if self.minimum is not None and value < self.minimum:
+            raise TemplateError(f"{self.name} must be >= {self.minimum}, got {value}")
+        return value
+
+    def __repr__(self):
+        return f"<Param {self.name}: {self.type.__name__} -> {self.targets}>"
+
+
+def _p(name, type, *targets, minimum=None):
+    return Param(name, type, targets, minimum)
+
+
+# Where each parameter lives, per template (file stem).
+SCHEMAS = {
+    "ltx_t2v": [
+        _p("prompt", str, ("4", "text")),
+        _p("negative", str, ("5", "text")),
+        _p("seed", int, ("10", "noise_seed"), minimum=0),
+        _p("frames", int, ("7", "length"), minimum=1),
+        _p("width", int, ("7", "width"), minimum=64),
+        _p("height", int, ("7", "height"), minimum=64),
+        _p("steps", int, ("9", "steps"), minimum=1),
+        _p("cfg", float, ("11", "cfg"), minimum=0),
+        _p("batch", int, ("7", "batch_size"), minimum=1),
+        _p("filename_prefix", str, ("15", "filename_prefix")),
+    ],
+    "ltx_t2v_preview": [
+        _p("prompt", str, ("4", "text")),
+        _p("negative", str, ("5", "text")),
+        _p("seed", int, ("10", "noise_seed"), minimum=0),
+        _p("frames", int, ("7", "length"), minimum=1),
+        _p("width", int, ("7", "width"), minimum=64),
+        _p("height", int, ("7", "height"), minimum=64),
+        _p("steps", int, ("9", "steps"), minimum=1),
+        _p("filename_prefix", str, ("15", "filename_prefix")),
+        _p("latent_prefix", str, ("16", "filename_prefix")),
+    ],
+    "ltx_refine": [
+        _p("prompt", str, ("4", "text")),
+        _p("negative", str, ("5", "text")),
+        _p("latent", str, ("7", "latent")),
+        _p("seed", int, ("10", "noise_seed"), minimum=0),
+        _p("steps", int, ("9", "steps"), minimum=1),
+        _p("strength", float, ("9", "denoise"), minimum=0),
+        _p("filename_prefix", str, ("15", "filename_prefix")),
+    ],
+    "ltx_i2v": [
+        _p("prompt", str, ("4", "text")),
+        _p("negative", str, ("5", "text")),
+        _p("image", str, ("20", "image")),
+        _p("seed", int, ("10", "noise_seed"), minimum=0),
+        _p("frames", int, ("21", "length"), minimum=1),
+        _p("width", int, ("21", "width"), minimum=64),
+        _p("height", int, ("21", "height"), minimum=64),
+        _p("strength", float, ("21", "strength"), minimum=0),
+        _p("steps", int, ("9", "steps"), minimum=1),
+        _p("cfg", float, ("11", "cfg"), minimum=0),
+        _p("batch", int, ("21", "batch_size"), minimum=1),
+        _p("filename_prefix", str, ("15", "filename_prefix")),
+    ],
+    "wan_vace_edit": [
+        _p("prompt", str, ("5", "text")),
+        _p("negative", str, ("6", "text")),
+        _p("control", str, ("7", "file")),
+        _p("mask", str, ("9", "file")),
+        _p("seed", int, ("15", "noise_seed"), ("16", "noise_seed"), minimum=0),
+        _p("frames", int, ("12", "length"), minimum=1),
+        _p("width", int, ("12", "width"), minimum=64),
+        _p("height", int, ("12", "height"), minimum=64),
+        _p("strength", float, ("12", "strength"), minimum=0),
+        _p("steps", int, ("15", "steps"), ("16", "steps"), minimum=1),
+        _p("switch", int, ("15", "end_at_step"), ("16", "start_at_step"), minimum=0),
+        _p("cfg", float, ("15", "cfg"), ("16", "cfg"), minimum=0),
+        _p("fps", float, ("19", "fps"), minimum=1),
+        _p("filename_prefix", str, ("20", "filename_prefix")),
+    ],
+    "flux_t2i": [
+        _p("prompt", str, ("4", "text")),
+        _p("negative", str, ("5", "text")),
+        _p("seed", int, ("7", "seed"), minimum=0),
+        _p("width", int, ("6", "width"), minimum=64),
+        _p("height", int, ("6", "height"), minimum=64),
+        _p("steps", int, ("7", "steps"), minimum=1),
+        _p("cfg", float, ("7", "cfg"), minimum=0),
+        _p("batch", int, ("6", "batch_size"), minimum=1),
+        _p("strength", float, ("7", "denoise"), minimum=0),
+        _p("filename_prefix", str, ("9", "filename_prefix")),
+    ],
+    "mmaudio_t2a": [
+        _p("prompt", str, ("3", "prompt")),
+        _p("negative", str, ("3", "negative_prompt")),
+        _p("seed", int, ("3", "seed"), minimum=0),
+        _p("duration", float, ("3", "duration"), minimum=0),
+        _p("steps", int, ("3", "steps"), minimum=1),
+        _p("filename_prefix", str, ("4", "filename_prefix")),
+    ],
+    "golden_moment": [
+        _p("prompt", str, ("30", "prompt")),
+        _p("seed", int, ("3", "seed"), minimum=0),
+        _p("frames", int, ("3", "num_frames"), minimum=1),
+        _p("width", int, ("3", "width"), minimum=64),
+        _p("height", int, ("3", "height"), minimum=64),
+        _p("steps", int, ("3", "steps"), minimum=1),
+        _p("strength", float, ("3", "denoise_strength"), minimum=0),
+        _p("filename_prefix", str, ("34", "filename_prefix")),
+    ],
+    "flux_simple": [
+        _p("prompt", str, ("4", "clip_l"), ("4", "t5xxl")),
+        _p("seed", int, ("6", "seed"), minimum=0),
+        _p("width", int, ("5", "width"), minimum=64),
+        _p("height", int, ("5", "height"), minimum=64),
+        _p("steps", int, ("6", "steps"), minimum=1),
+        _p("filename_prefix", str, ("8", "filename_prefix")),
+    ],
+    "ip_adapter_api": [
+        _p("prompt", str, ("8", "clip_l"), ("8", "t5xxl")),
+        _p("image", str, ("5", "image")),
+        _p("seed", int, ("11", "seed"), minimum=0),
+        _p("width", int, ("10", "width"), minimum=64),
+        _p("height", int, ("10", "height"), minimum=64),
+        _p("steps", int, ("11", "steps"), minimum=1),
+        _p("strength", float, ("7", "ip_scale"), minimum=0),
+        _p("filename_prefix", str, ("13", "filename_prefix")),
+    ],
+}
+
+
+def is_api_format(graph):
+    """API graphs are {node_id: {class_type, inputs}}; UI exports have nodes/links."""
+    return (isinstance(graph, dict) and bool(graph) and "nodes" not in graph
+            and all(isinstance(n, dict) and "class_type" in n for n in graph.values()))
+
+
+def validate(graph, name="workflow"):
+    """Raise TemplateError unless every node is well formed and every link resolves."""
+    if not is_api_format(graph):
+        raise TemplateError(f"{name}: not an API-format graph")
+    for nid, node in graph.items():
+        if not isinstance(node.get("class_type"), str):
+            raise TemplateError(f"{name}: node {nid} has no class_type")
+        inputs = node.get("inputs")
+        if not isinstance(inputs, dict):
+            raise TemplateError(f"{name}: node {nid} has no inputs dict")
+        for key, value in inputs.items():
+            if isinstance(value, list) and len(value) == 2 and isinstance(value[0], str):
+                src, idx = value
+                if src not in graph:
+                    raise TemplateError(f"{name}: node {nid}.{key} links to missing node {src}")
+                if not isinstance(idx, int) or idx < 0:
+                    raise TemplateError(f"{name}: node {nid}.{key} has bad output index {idx!r}")
+
+
+class Template:
+    """A validated graph plus its parameter schema."""
+
+    def __init__(self, name, graph, params=(), path=None):
+        validate(graph, name)
+        self.name = name
+        self.path = path
+        self.graph = graph
+        self.params = {p.name: p for p in params}
+        for p in self.params.values():
+            for nid, key in p.targets:
+                if nid not in graph or key not in graph[nid]["inputs"]:
+                    raise TemplateError(f"{name}: param {p.name} targets missing {nid}.{key}")
+        # Precompiled JSON for every node, reused when the node isn't patched.
+        self._frags = {nid: json.dumps(nid) + ":" + json.dumps(node, separators=(",", ":"))
+                       for nid, node in graph.items()}
+
+    def defaults(self):
+        """Current value of every parameter in the base graph."""
+        return {name: self.graph[p.targets[0][0]]["inputs"][p.targets[0][1]]
+                for name, p in self.params.items()}
+
+    def _patches(self, values):
+        patches = {}    # nid -> {input: value}
+        for name, value in values.items():
+            if value is None:
+                continue
+            p = self.params.get(name)
+            if p is None:
+                raise TemplateError(f"{self.name} has no parameter {name!r} (has: {', '.join(self.params)})")
+            value = p.check(value)
+            for nid, key in p.targets:
+                patches.setdefault(nid, {})[key] = value
+        return patches
+
+    def instantiate(self, **values):
+        """New graph with the given parameters set. None means keep the default."""
+        graph = dict(self.graph)
+        for nid, changes in self._patches(values).items():
+            node = dict(graph[nid])
+            node["inputs"] = {**node["inputs"], **changes}
+            graph[nid] = node
+        return graph
+
+    def dumps(self, **values):
+        """JSON for instantiate(**values), encoding only the patched nodes."""
+        patches = self._patches(values)
+        parts = []
+        for nid, frag in self._frags.items():
+            changes = patches.get(nid)
+            if changes is None:
+                parts.append(frag)
+            else:
+                node = dict(self.graph[nid])
+                node["inputs"] = {**node["inputs"], **changes}
+                parts.append(json.dumps(nid) + ":" + json.dumps(node, separators=(",", ":")))
+        return "{" + ",".join(parts) + "}"
+
+    def __repr__(self):
+        return f"<Template {self.name} ({len(self.graph)} nodes) params={list(self.params)}>"
+
+
+_templates = None
+_skipped = {}
+_lock = threading.Lock()
+
+
+def load_all(root=WORKFLOWS_DIR):
+    """Load every API-format graph under root. UI exports are skipped (see skipped())."""
+    templates, skipped = {}, {}
+    for path in sorted(Path(root).rglob("*.json")):
+        try:
+            graph = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            skipped[path.stem] = f"unreadable: {e}"
+            continue
+        if not is_api_format(graph):
+            skipped[path.stem] = "UI-format export"
+            continue
+        templates[path.stem] = Template(path.stem, graph, SCHEMAS.get(path.stem, ()), path)
+    return templates, skipped
+
+
+def _ensure():
+    global _templates, _skipped
+    if _templates is None:
+        with _lock:
+            if _templates is None:
+                _templates, _skipped = load_all()
+    return _templates
+
+
+def get(name):
+    """Template by file stem, e.g. get('ltx_t2v')."""
+    templates = _ensure()
+    if name not in templates:
+        raise TemplateError(f"No template {name!r} (have: {', '.join(sorted(templates))})")
+    return templates[name]
+
+
+def names():
+    return sorted(_ensure())
+
+
+def skipped():
+    """Files in workflows/ that aren't usable as templates, with the reason."""
+    _ensure()
+    return dict(_skipped)
@@ -0,0 +1,390 @@
+"""
+HTTP transport - one pool of keep-alive connections per ComfyUI backend.
+
+urllib.urlopen and bare requests.get open a new TCP connection for every
+call. With a hundred jobs polling /queue and /history that's most of the
+cost. Here each host gets a stack of idle http.client connections that
+are reused, every endpoint gets a sensible timeout, and failures that
+are safe to retry are retried with backoff.
+
+Retry rules:
+    GET/HEAD/DELETE     connection errors, timeouts, 502/503/504
+    POST                only when the request can't have been processed:
+                        connection refused, or a reused keep-alive socket
+                        the server had already closed
+
+Usage:
+    from pipeline import transport
+    q = transport.get_json(f"{url}/queue")
+    r = transport.post(f"{url}/prompt", json={"prompt": wf, "client_id": cid})
+    r.raise_for_status(); r.json()["prompt_id"]
+
+    with transport.stream("GET", f"{url}/view", params={...}) as r:
+        for chunk in r.iter_content(1 << 20): ...
+"""
+import http.client
+import json as _json
+import os
+import random
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlencode, urlsplit
+
+# Seconds per endpoint, matched on path prefix. Anything else gets DEFAULT_TIMEOUT.
+TIMEOUTS = {
+    "/system_stats": 5,
+    "/queue": 5,
+    "/health": 3,
+    "/history": 10,
+    "/prompt": 30,
+    "/object_info": 30,
+    "/upload": 60,
+    "/view": 120,
+}
+DEFAULT_TIMEOUT = 10
+
+RETRY_STATUS = (502, 503, 504)
+IDEMPOTENT = ("GET", "HEAD", "DELETE", "OPTIONS")
+
+
+class TransportError(OSError):
+    """Couldn't get a response (after retries)."""
+
+
+class HTTPError(Exception):
+    """Server answered with a 4xx/5xx."""
+
+    def __init__(self, status, body, url):
+        self.status = status
+        self.body = body
+        self.url = url
+        super().__init__(status, body, url)
+
+    def __str__(self):
+        return f"HTTP {self.status} from {self.url}: {self.body[:200]!r}"
+
+
+class Response:
+    __slots__ = ("status", "headers", "content", "url")
+
+    def __init__(self, status, headers, content, url):
+        self.status = status
+        self.headers = headers
+        self.content = content
+        self.url = url
+
+    @property
+    def ok(self):
+        return self.status < 400
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", "replace")
+
+    def json(self):
+        return _json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise HTTPError(self.status, self.text, self.url)
+        return self
+
+
+class StreamResponse:
+    """Headers now, body in chunks. From Transport.stream()."""
+
+    def __init__(self, resp, url):
+        self.raw = resp
+        self.status = resp.status
+        self.headers = resp.headers
+        self.url = url
+
+    @property
+    def ok(self):
+        return self.status < 400
+
+    def iter_content(self, chunk_size=1 << 20):
+        try:
+            while True:
+                chunk = self.raw.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        except (OSError, http.client.HTTPException) as e:
+            raise TransportError(f"reading {self.url} failed: {e}") from e
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise HTTPError(self.status, self.raw.read(2000).decode("utf-8", "replace"), self.url)
+        return self
+
+
+def endpoint_timeout(path):
+    for prefix, secs in TIMEOUTS.items():
+        if path.startswith(prefix):
+            return secs
+    return DEFAULT_TIMEOUT
+
+
+class _HostPool:
+    """
+    Connections to one host:port, most recently used first. At most
+    max_conns are open at once; callers past that queue up (first come,
+    first served) for the next one freed, rather than piling more sockets
+    and server threads onto the backend.
+    """
+
+    def __init__(self, scheme, host, port, max_conns):
+        self.cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        self.host = host
+        self.port = port
+        self.max_conns = max_conns
+        self.idle = []
+        self.waiters = deque()      # [event, conn-or-None, handed]
+        self.open = 0
+        self.lock = threading.Lock()
+        self.created = 0
+
+    def get(self, timeout):
+        """(connection, reused) - reused means it has served requests before."""
+        with self.lock:
+            if self.idle:
+                conn = self.idle.pop()
+            elif self.open < self.max_conns:
+                self.open += 1
+                self.created += 1
+                conn = None
+            else:
+                waiter = [threading.Event(), None, False]
+                self.waiters.append(waiter)
+                conn = waiter
+        if isinstance(conn, list):
+            conn[0].wait(timeout)
+            with self.lock:
+                if not conn[2]:
+                    self.waiters.remove(conn)
+                    raise TransportError(f"no free connection to {self.host}:{self.port} in {timeout}s")
+            conn = conn[1]
+            if conn is None:
+                with self.lock:
+                    self.created += 1
+        if conn is None:
+            return self.cls(self.host, self.port, timeout=timeout), False
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def _hand_off(self, conn):
+        # caller holds the lock
+        waiter = self.waiters.popleft()
+        waiter[1], waiter[2] = conn, True
+        waiter[0].set()
+
+    def put(self, conn):
+        """Back to the pool (or straight to whoever has waited longest)."""
+        with self.lock:
+            if self.waiters:
+                self._hand_off(conn)
+            else:
+                self.idle.append(conn)
+
+    def discard(self, conn):
+        """Broken, or the server is closing it - drop it and free its slot."""
+        conn.close()
+        with self.lock:
+            if self.waiters:
+                self._hand_off(None)    # they open a fresh one in this slot
+            else:
+                self.open -= 1
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+            self.open -= len(idle)
+        for conn in idle:
+            conn.close()
+
+
+class Transport:
+    """Pooled keep-alive HTTP client. Thread-safe; share one per process."""
+
+    def __init__(self, max_conns=16, retries=3, backoff=0.2, max_backoff=5.0, timeouts=None):
+        self.max_conns = max_conns
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeouts = timeouts or {}
+        self._pools = {}
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retried = 0
+
+    def _pool(self, scheme, host, port):
+        if self._pid != os.getpid():
+            # Forked: the parent's sockets aren't ours to share.
+            with self._lock:
+                self._pools, self._pid = {}, os.getpid()
+        key = (scheme, host, port)
+        pool = self._pools.get(key)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.setdefault(key, _HostPool(scheme, host, port, self.max_conns))
+        return pool
+
+    def _prepare(self, url, params, headers, timeout):
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        port = parts.port or (443 if scheme == "https" else 80)
+        path = parts.path or "/"
+        query = parts.query
+        if params:
+            query = (query + "&" if query else "") + urlencode(params)
+        target = path + ("?" + query if query else "")
+        if timeout is None:
+            timeout = self.timeouts.get(path) or endpoint_timeout(path)
+        hdrs = {"Connection": "keep-alive"}
+        if headers:
+            hdrs.update(headers)
+        return self._pool(scheme, parts.hostname, port), target, hdrs, timeout
+
+    def request(self, method, url, body=None, json=None, params=None, headers=None,
+                timeout=None, retries=None):
+        """Response for one call. Raises TransportError if it never got one."""
+        method = method.upper()
+        pool, target, hdrs, timeout = self._prepare(url, params, headers, timeout)
+        if json is not None:
+            body = _json.dumps(json).encode("utf-8")
+            hdrs.setdefault("Content-Type", "application/json")
+        elif isinstance(body, str):
+            body = body.encode("utf-8")
+
+        retries = self.retries if retries is None else retries
+        idempotent = method in IDEMPOTENT
+        delay = self.backoff
+        attempt = 0
+        while True:
+            conn, reused = pool.get(timeout)
+            try:
+                conn.request(method, target, body=body, headers=hdrs)
+                resp = conn.getresponse()
+                content = resp.read()
+            except (OSError, http.client.HTTPException) as e:
+                pool.discard(conn)
+                # A reused socket the server already dropped: nothing was processed.
+                stale = reused and isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError,
+                                                  BrokenPipeError))
+                refused = isinstance(e, ConnectionRefusedError)
+                safe = idempotent or stale or refused
+                if stale and attempt == 0:
+                    self.retried += 1
+                    attempt += 1
+                    continue        # straight away, on a fresh connection
+                if not safe or attempt >= retries:
+                    if isinstance(e, socket.timeout):
+                        raise TransportError(f"{method} {url} timed out after {timeout}s") from e
+                    raise TransportError(f"{method} {url} failed: {e}") from e
+            else:
+                self.requests += 1
+                if resp.will_close:
+                    pool.discard(conn)
+                else:
+                    pool.put(conn)
+                r = Response(resp.status, resp.headers, content, url)
+                if resp.status not in RETRY_STATUS or not idempotent or attempt >= retries:
+                    return r
+            attempt += 1
+            self.retried += 1
+            time.sleep(delay * (0.5 + random.random()))
+            delay = min(delay * 2, self.max_backoff)
+
+    @contextmanager
+    def stream(self, method, url, params=None, headers=None, timeout=None):
+        """
+        Response with the body still on the wire - read it with
+        r.iter_content(chunk_size). No retries: the caller knows whether
+        it can resume. The connection goes back to the pool only if the
+        body was read to the end.
+        """
+        method = method.upper()
+        pool, target, hdrs, timeout = self._prepare(url, params, headers, timeout)
+        conn, _ = pool.get(timeout)
+        try:
+            conn.request(method, target, headers=hdrs)
+            resp = conn.getresponse()
+        except (OSError, http.client.HTTPException) as e:
+            pool.discard(conn)
+            raise TransportError(f"{method} {url} failed: {e}") from e
+        self.requests += 1
+        try:
+            yield StreamResponse(resp, url)
+        finally:
+            if resp.isclosed() and not resp.will_close:
+                pool.put(conn)
+            else:
+                pool.discard(conn)
+
+    def get(self, url, **kw):
+        return self.request("GET", url, **kw)
+
+    def post(self, url, **kw):
+        return self.request("POST", url, **kw)
+
+    def get_json(self, url, **kw):
+        """GET, raise on 4xx/5xx, decode the JSON body."""
+        return self.get(url, **kw).raise_for_status().json()
+
+    def post_json(self, url, payload, **kw):
+        return self.post(url, json=payload, **kw).raise_for_status().json()
+
+    def stats(self):
+        with self._lock:
+            pools = list(self._pools.values())
+        return {
+            "requests": self.requests,
+            "retried": self.retried,
+            "connections": sum(p.created for p in pools),
+            "idle": sum(len(p.idle) for p in pools),
+        }
+
+    def close(self):
+        with self._lock:
+            pools = list(self._pools.values())
+        for p in pools:
+            p.close()
+
+
+_default = Transport()
+
+
+def default():
+    """The process-wide transport every client shares."""
+    return _default
+
+
+def request(method, url, **kw):
+    return _default.request(method, url, **kw)
+
+
+def get(url, **kw):
+    return _default.get(url, **kw)
+
+
+def stream(method, url, **kw):
+    return _default.stream(method, url, **kw)
+
+
+def post(url, **kw):
+    return _default.post(url, **kw)
+
+
+def get_json(url, **kw):
+    return _default.get_json(url, **kw)
+
+
+def post_json(url, payload, **kw):
+    return _default.post_json(url, payload, **kw)
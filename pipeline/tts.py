@@ -0,0 +1,248 @@
+"""
+Voiceover - Chatterbox TTS (POST /generate), a sentence at a time, in parallel.
+
+One long /generate call for a whole script takes as long as the script
+and comes back all at once. Here the script is split into sentences
+and up to `workers` of them are synthesized at once, so narration
+finishes in roughly the time of its slowest few sentences and is ready
+beside the video, not after it. Long sentences are split again at
+commas (Chatterbox drifts past a few hundred characters).
+
+Each sentence's WAV is cached under cache/tts/, keyed by the sha256 of
+its text, voice and generation settings: a line repeated in the script,
+or a script rerun with one sentence changed, only synthesizes what's
+new. The same line twice in one script is requested once.
+
+stream() yields each sentence's PCM in script order as soon as it and
+everything before it is done; speak() writes those chunks straight into
+one WAV track (with `pause` seconds between sentences) for assembly.
+Every sentence must come back in the same format (rate, channels,
+sample type) - one server and voice always do.
+
+Usage:
+    speak("http://localhost:8880", script, "projects/coast/audio/voiceover.wav", voice="narrator")
+    for sentence, fmt, pcm in stream(server, script): ...
+"""
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from pipeline import transport
+
+DEFAULT_DIR = Path(__file__).resolve().parent.parent / "cache" / "tts"
+WORKERS = 4         # sentences in flight at once
+TIMEOUT = 120       # seconds per /generate call
+MAX_CHARS = 280     # longer sentences are split at commas, then spaces
+PAUSE = 0.2         # seconds of silence between sentences
+
+ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "st.", "vs.", "etc.", "e.g.", "i.e.", "jr.", "sr.", "prof.", "mt."}
+_BREAK = re.compile(r"(?<=[.!?…])\s+|(?<=[.!?…][\"'”’)\]])\s+|\n\s*\n")
+_CLAUSE = re.compile(r"(?<=[,;:—])\s+")
+PCM, FLOAT = 1, 3
+
+
+class TTSError(Exception):
+    pass
+
+
+def _limit(text, max_chars):
+    """text in pieces of at most max_chars, split at clause breaks, then at spaces."""
+    if len(text) <= max_chars:
+        return [text]
+    out, current = [], ""
+    for part in _CLAUSE.split(text):
+        while len(part) > max_chars:
+            cut = part.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                out.append(current)
+                current = ""
+            out.append(part[:cut].strip())
+            part = part[cut:].strip()
+        if current and len(current) + 1 + len(part) > max_chars:
+            out.append(current)
+            current = part
+        else:
+            current = f"{current} {part}" if current else part
+    if current:
+        out.append(current)
+    return out
+
+
+def sentences(text, max_chars=MAX_CHARS):
+    """The script as a list of sentences (whitespace collapsed, none longer than max_chars)."""
+    pieces = [" ".join(p.split()) for p in _BREAK.split(text)]
+    merged = []
+    for piece in pieces:
+        if not piece:
+            continue
+        last = merged[-1].rsplit(" ", 1)[-1] if merged else ""
+        if merged and (last.lower() in ABBREVIATIONS or re.fullmatch(r"[A-Z]\.", last) or piece[0].islower()):
+            merged[-1] = f"{merged[-1]} {piece}"      # "Dr. Smith", "J. R. Tolkien", '"Done?" she asked.'
+        else:
+            merged.append(piece)
+    return [s for piece in merged for s in _limit(piece, max_chars)]
+
+
+def parse_wav(data):
+    """((format tag, channels, rate, bits), PCM bytes) of a WAV file's contents."""
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise TTSError(f"expected a WAV file, got {data[:16]!r}")
+    pos, fmt = 12, None
+    while pos + 8 <= len(data):
+        chunk, size = data[pos:pos + 4], struct.unpack_from("<I", data, pos + 4)[0]
+        body = pos + 8
+        if chunk == b"fmt ":
+            tag, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", data, body)
+            if tag == 0xFFFE:       # WAVE_FORMAT_EXTENSIBLE: the real tag opens the subformat GUID
+                tag = struct.unpack_from("<H", data, body + 24)[0]
+            fmt = (tag, channels, rate, bits)
+        elif chunk == b"data":
+            if fmt is None:
+                raise TTSError("WAV has audio before its format")
+            # streamed WAVs leave the size at 0 or 0xFFFFFFFF - the data runs to the end
+            end = len(data) if size in (0, 0xFFFFFFFF) else min(len(data), body + size)
+            return fmt, data[body:end]
+        pos = body + size + (size & 1)
+    raise TTSError("WAV has no audio data")
+
+
+def wav_header(fmt, nbytes):
+    tag, channels, rate, bits = fmt
+    align = channels * bits // 8
+    return (b"RIFF" + struct.pack("<I", 36 + nbytes) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, tag, channels, rate, rate * align, align, bits)
+            + b"data" + struct.pack("<I", nbytes))
+
+
+def silence(fmt, seconds):
+    tag, channels, rate, bits = fmt
+    frame = (b"\x80" if tag == PCM and bits == 8 else b"\x00" * (bits // 8)) * channels
+    return frame * int(rate * seconds)
+
+
+class Synth:
+    """Sentence-parallel, cached synthesis against any Chatterbox server."""
+
+    __slots__ = ("root", "workers", "timeout", "hits", "misses", "_pool", "_inflight", "_lock")
+
+    def __init__(self, root=DEFAULT_DIR, workers=WORKERS, timeout=TIMEOUT):
+        self.root = Path(root)
+        self.workers = workers
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._pool = None
+        self._inflight = {}         # key -> Future, so one line asked for twice is made once
+        self._lock = threading.Lock()
+
+    def key(self, text, voice=None, **params):
+        """Cache key for one line: its text, voice and generation settings."""
+        blob = json.dumps({"text": text, "voice": voice, **params}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:32]
+
+    def line(self, server, text, voice=None, **params):
+        """Future of (format, PCM bytes) for one sentence - from cache/tts/ or the server."""
+        key = self.key(text, voice, **params)
+        path = self.root / f"{key}.wav"
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                return fut
+            if path.is_file():
+                self.hits += 1
+                fut = Future()
+                try:
+                    fut.set_result(parse_wav(path.read_bytes()))
+                    return fut
+                except (OSError, TTSError):
+                    self.hits -= 1      # torn or foreign file - make it again
+            self.misses += 1
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tts")
+            fut = self._inflight[key] = self._pool.submit(self._generate, server, path, key, text, voice, params)
+        return fut
+
+    def _generate(self, server, path, key, text, voice, params):
+        try:
+            payload = {"text": text, **params}
+            if voice is not None:
+                payload["voice"] = voice
+            try:
+                data = transport.post(f"{server.rstrip('/')}/generate", json=payload,
+                                      timeout=self.timeout).raise_for_status().content
+            except (OSError, transport.HTTPError) as e:
+                raise TTSError(f"TTS failed for {text[:40]!r}: {e}") from e
+            audio = parse_wav(data)
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            return audio
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stream(self, server, text, voice=None, **params):
+        """(sentence, format, PCM bytes) in script order, each as soon as it and all before it are done.
+
+        Every sentence is started at once (up to `workers` run); the first chunk
+        arrives as soon as the first sentence does.
+        """
+        lines = sentences(text)
+        if not lines:
+            raise TTSError("nothing to say - the script is empty")
+        futures = [self.line(server, s, voice, **params) for s in lines]
+        first = None
+        for sentence, fut in zip(lines, futures):
+            fmt, pcm = fut.result()
+            first = first or fmt
+            if fmt != first:
+                raise TTSError(f"{sentence[:40]!r} came back as {fmt}, the rest as {first} (tag, channels, rate, bits)")
+            yield sentence, fmt, pcm
+
+    def speak(self, server, text, output, voice=None, pause=PAUSE, **params):
+        """Synthesize text into one WAV at output, written as the sentences arrive. Returns output's Path."""
+        output = Path(output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        tmp = output.with_name(f"{output.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        fmt, written = None, 0
+        try:
+            with open(tmp, "wb") as f:
+                for _, got, pcm in self.stream(server, text, voice, **params):
+                    if fmt is None:
+                        fmt = got
+                        gap = silence(fmt, pause)
+                        f.write(wav_header(fmt, 0))     # sizes filled in at the end
+                    elif gap:
+                        f.write(gap)
+                        written += len(gap)
+                    f.write(pcm)
+                    written += len(pcm)
+                f.seek(0)
+                f.write(wav_header(fmt, written))
+            os.replace(tmp, output)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        return output
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+SYNTH = Synth()
+
+
+def stream(server, text, voice=None, **params):
+    return SYNTH.stream(server, text, voice, **params)
+
+
+def speak(server, text, output, voice=None, pause=PAUSE, **params):
+    return SYNTH.speak(server, text, output, voice, pause, **params)
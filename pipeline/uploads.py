@@ -0,0 +1,212 @@
+"""
+Uploads - put files into a ComfyUI server's input folder.
+
+LoadImage only reads the server's own input (or output) folder, so a
+keyframe rendered on one GPU has to be uploaded to the one that animates
+it, and a character reference to every GPU that renders the character.
+
+upload() is content-addressed: the file is sha256'd (streamed, and
+remembered by path/size/mtime so it isn't re-read) and goes up as
+{hash}{ext}, so the name is the same on every server. Each server's
+hashes are tracked here; one that already has the file - uploaded by
+this process, or found with a HEAD /view on first sight - isn't sent it
+again, and callers asking for the same file at once share one upload.
+The multipart body is streamed from disk in CHUNK-sized pieces, never
+held in memory whole.
+
+Usage:
+    name = upload("http://localhost:8189", "refs/hero.png")     # path or bytes
+    name = upload_all(["http://gpu1:8188", "http://gpu2:8188"], "refs/hero.png")
+    workflow["20"]["inputs"]["image"] = name
+
+    upload_image(server, "kf_3.png", data)      # plain upload under a chosen name
+"""
+import hashlib
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from pipeline import transport
+
+MIME = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".webp": "image/webp",
+        ".mp4": "video/mp4", ".webm": "video/webm"}
+CHUNK = 1 << 20
+HASH_CHARS = 32         # of the sha256 hex, in the uploaded name
+
+
+class _Multipart:
+    """multipart/form-data body for one file, re-iterable so a retried POST can resend it."""
+
+    def __init__(self, fields, file_field, filename, source, content_type):
+        self.boundary = uuid.uuid4().hex
+        head = [f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+                for name, value in fields.items()]
+        head.append(f'--{self.boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+                    f'filename="{filename}"\r\nContent-Type: {content_type}\r\n\r\n')
+        self.head = "".join(head).encode()
+        self.tail = f"\r\n--{self.boundary}--\r\n".encode()
+        self.source = source
+        size = len(source) if isinstance(source, (bytes, bytearray)) else os.path.getsize(source)
+        self.length = len(self.head) + size + len(self.tail)
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __iter__(self):
+        yield self.head
+        if isinstance(self.source, (bytes, bytearray)):
+            yield self.source
+        else:
+            with open(self.source, "rb") as f:
+                while True:
+                    chunk = f.read(CHUNK)
+                    if not chunk:
+                        break
+                    yield chunk
+        yield self.tail
+
+
+def _post(server, filename, source, subfolder="", overwrite=True):
+    ext = filename[filename.rfind("."):].lower() if "." in filename else ""
+    fields = {"type": "input", "overwrite": "true" if overwrite else "false"}
+    if subfolder:
+        fields["subfolder"] = subfolder
+    body = _Multipart(fields, "image", filename, source, MIME.get(ext, "application/octet-stream"))
+    r = transport.post(f"{server.rstrip('/')}/upload/image", body=body,
+                       headers={"Content-Type": body.content_type, "Content-Length": str(body.length)})
+    info = r.raise_for_status().json()
+    name = info.get("name", filename)
+    return f"{info['subfolder']}/{name}" if info.get("subfolder") else name
+
+
+def upload_image(server, filename, data, subfolder="", overwrite=True):
+    """POST /upload/image. Returns the name to give LoadImage ("subfolder/file.png").
+
+    data: bytes, or a path to stream from.
+    """
+    return _post(server, filename, data, subfolder, overwrite)
+
+
+def view_ref(ref):
+    """LoadImage name for a file in the server's output folder: 'sub/x.png [output]'."""
+    name = f"{ref['subfolder']}/{ref['filename']}" if ref.get("subfolder") else ref["filename"]
+    return f"{name} [{ref.get('type', 'output')}]"
+
+
+class UploadCache:
+    """Which content hashes each server's input folder already holds."""
+
+    __slots__ = ("known", "pending", "hashes", "uploaded", "skipped", "_lock")
+
+    def __init__(self):
+        self.known = {}         # server -> {sha256: name}
+        self.pending = {}       # (server, sha256) -> Future of the name
+        self.hashes = {}        # path -> (size, mtime_ns, sha256)
+        self.uploaded = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def digest(self, source):
+        """sha256 hex of bytes, or of a file (hashed once per size/mtime)."""
+        if isinstance(source, (bytes, bytearray)):
+            return hashlib.sha256(source).hexdigest()
+        path = os.path.abspath(source)
+        st = os.stat(path)
+        hit = self.hashes.get(path)
+        if hit and hit[:2] == (st.st_size, st.st_mtime_ns):
+            return hit[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK)
+                if not chunk:
+                    break
+                h.update(chunk)
+        with self._lock:
+            self.hashes[path] = (st.st_size, st.st_mtime_ns, h.hexdigest())
+        return h.hexdigest()
+
+    def upload(self, server, source, filename=None):
+        """LoadImage name for source (a path, or bytes with a filename for its extension) on server."""
+        server = server.rstrip("/")
+        sha = self.digest(source)
+        ext = Path(filename or (source if not isinstance(source, (bytes, bytearray)) else "")).suffix.lower()
+        name = f"{sha[:HASH_CHARS]}{ext or '.png'}"
+        with self._lock:
+            have = self.known.get(server, {}).get(sha)
+            if have is not None:
+                self.skipped += 1
+                return have
+            fut = self.pending.get((server, sha))
+            mine = fut is None
+            if mine:
+                fut = self.pending[(server, sha)] = Future()
+            else:
+                self.skipped += 1       # someone's uploading it right now
+        if not mine:
+            return fut.result()
+        try:
+            if _exists(server, name):
+                result, sent = name, False
+            else:
+                result, sent = _post(server, name, source, overwrite=False), True
+        except BaseException as e:
+            with self._lock:
+                del self.pending[(server, sha)]
+            fut.set_exception(e)
+            raise
+        with self._lock:
+            self.known.setdefault(server, {})[sha] = result
+            del self.pending[(server, sha)]
+            if sent:
+                self.uploaded += 1
+            else:
+                self.skipped += 1
+        fut.set_result(result)
+        return result
+
+    def upload_all(self, servers, source, filename=None):
+        """upload() to every server at once. The name is the same everywhere; returns it."""
+        servers = list(dict.fromkeys(servers))
+        if len(servers) <= 1:
+            return self.upload(servers[0], source, filename) if servers else None
+        self.digest(source)     # once, not once per thread
+        with ThreadPoolExecutor(max_workers=len(servers), thread_name_prefix="upload") as pool:
+            names = list(pool.map(lambda s: self.upload(s, source, filename), servers))
+        return names[0]
+
+    def forget(self, server=None):
+        """Drop what we know about server (all servers if None) - e.g. its input folder was wiped."""
+        with self._lock:
+            if server is None:
+                self.known.clear()
+            else:
+                self.known.pop(server.rstrip("/"), None)
+
+    def stats(self):
+        with self._lock:
+            return {"uploaded": self.uploaded, "skipped": self.skipped,
+                    "files": sum(len(v) for v in self.known.values())}
+
+
+def _exists(server, name):
+    """Whether server's input folder already has name (HEAD /view, nothing downloaded)."""
+    try:
+        r = transport.request("HEAD", f"{server}/view", params={"filename": name, "type": "input"}, retries=0)
+    except transport.TransportError:
+        return False
+    return r.status == 200
+
+
+CACHE = UploadCache()
+
+
+def upload(server, source, filename=None):
+    return CACHE.upload(server, source, filename)
+
+
+def upload_all(servers, source, filename=None):
+    return CACHE.upload_all(servers, source, filename)
@@ -0,0 +1,237 @@
+"""
+Video editing with Wan 2.2 VACE - re-render only the frames an edit touches.
+
+An edit is a time (or frame) range of an existing clip plus a prompt for
+what should be there instead. windows() turns a list of edits into the
+smallest set of VACE jobs: edits close enough to share context are
+merged, each gets `context` untouched frames either side so the new
+frames continue the motion around them, and the length is padded to the
+4k+1 frames Wan wants. prepare() cuts each window out of the clip as a
+control video (context frames as they are, edited frames grey) plus a
+mask video (white where VACE should generate), which is all the
+wan_vace_edit template needs for its high -> low noise two-model pass.
+
+splice() puts the result back. The clip is cut at its keyframes: every
+GOP an edit doesn't reach is stream-copied, the GOPs it does are
+re-encoded around the new frames (context frames come from the
+original, so nothing outside an edit changes), and the clip's audio is
+laid back under the lot. A 2 second fix in a 30 second clip costs 2 seconds plus
+context of GPU time and a few GOPs of encoding.
+
+Usage:
+    wins = windows([{"start": 12.0, "end": 14.0, "prompt": "a red kite"}], fps=24, total=720)
+    control, mask = prepare("clip.mp4", wins[0], 24, 832, 480, work)
+    ... render wan_vace_edit with them ...
+    splice("clip.mp4", [(wins[0], "vace_00001_.mp4")], 24, "clip_edited.mp4")
+"""
+import shutil
+import tempfile
+from fractions import Fraction
+from pathlib import Path
+
+from pipeline import assemble
+
+CONTEXT = 8             # untouched frames kept either side of an edit
+MAX_FRAMES = 81         # longest window Wan 2.2 14B renders in one pass
+MAX_PIXELS = 1280 * 720
+ALIGN = 16
+GREY = "0x808080"       # what VACE reads as "fill this in"
+
+
+class Window:
+    """One VACE job: source frames [first, last), of which [edit_first, edit_last) are regenerated."""
+
+    __slots__ = ("first", "last", "edit_first", "edit_last", "prompt", "negative", "strength")
+
+    def __init__(self, first, last, edit_first, edit_last, prompt, negative=None, strength=1.0):
+        self.first = first
+        self.last = last
+        self.edit_first = edit_first
+        self.edit_last = edit_last
+        self.prompt = prompt
+        self.negative = negative
+        self.strength = strength
+
+    @property
+    def frames(self):
+        return self.last - self.first
+
+    def __repr__(self):
+        return f"<Window {self.first}-{self.last} edit {self.edit_first}-{self.edit_last} {self.prompt[:30]!r}>"
+
+
+def _span(edit, fps, total):
+    """[first, last) frames of one edit: {"start", "end"} seconds or {"frames": (a, b)}."""
+    if "frames" in edit:
+        a, b = edit["frames"]
+    else:
+        a = round(edit["start"] * fps)
+        b = round(edit["end"] * fps) if edit.get("end") is not None else total
+    a, b = max(0, int(a)), min(total, int(b))
+    if b <= a:
+        raise ValueError(f"edit {edit} covers no frames of a {total}-frame clip")
+    if not edit.get("prompt"):
+        raise ValueError(f"edit {edit} has no prompt")
+    return a, b
+
+
+def windows(edits, fps, total, context=CONTEXT, max_frames=MAX_FRAMES):
+    """The VACE windows for a list of edits on a clip of `total` frames, in clip order."""
+    fps = Fraction(fps)
+    spans = sorted((_span(e, fps, total) + (e,) for e in edits), key=lambda s: s[:2])
+    merged = []
+    for a, b, e in spans:
+        # close enough that their windows would overlap anyway -> one job
+        if merged and a - merged[-1][1] <= 2 * context and max(b, merged[-1][1]) - merged[-1][0] <= max_frames:
+            prev = merged[-1]
+            merged[-1] = [prev[0], max(b, prev[1]), prev[2] + [e]]
+        else:
+            merged.append([a, b, [e]])
+
+    out = []
+    for a, b, group in merged:
+        if b - a > max_frames:
+            raise ValueError(f"edit at {float(a / fps):.2f}-{float(b / fps):.2f}s is {b - a} frames; VACE renders at "
+                             f"most {max_frames} - split it into shorter edits")
+        ctx = min(context, (max_frames - (b - a)) // 2)
+        first, last = max(0, a - ctx), min(total, b + ctx)
+        # pad to 4k+1: longer if the clip allows, else give back context
+        extra = (1 - (last - first)) % 4
+        grow = min(extra, total - last)
+        last, extra = last + grow, extra - grow
+        first -= min(extra, first)
+        while (last - first) % 4 != 1 or last - first > max_frames:
+            if last - b >= a - first and last > b:
+                last -= 1
+            elif first < a:
+                first += 1
+            else:
+                raise ValueError(f"edit at frames {a}-{b} can't be padded to 4k+1 frames within the clip")
+        prompts = list(dict.fromkeys(e["prompt"] for e in group))
+        negative = next((e["negative"] for e in group if e.get("negative")), None)
+        strength = max(e.get("strength", 1.0) for e in group)
+        out.append(Window(first, last, a, b, "; ".join(prompts), negative, strength))
+    return out
+
+
+def render_size(width, height, max_pixels=MAX_PIXELS):
+    """Size to render a window at: the clip's aspect, a multiple of ALIGN, at most max_pixels."""
+    scale = min(1.0, (max_pixels / (width * height)) ** 0.5)
+    return (max(ALIGN, int(width * scale) // ALIGN * ALIGN),
+            max(ALIGN, int(height * scale) // ALIGN * ALIGN))
+
+
+def frame_index(path):
+    """(frame count, keyframe frame numbers) of the clip's video stream, from its packets."""
+    out = assemble._run([assemble.FFPROBE, "-v", "error", "-select_streams", "v:0",
+                         "-show_entries", "packet=flags", "-of", "csv=p=0", str(path)])
+    flags = [line for line in out.splitlines() if line.strip()]
+    return len(flags), [i for i, f in enumerate(flags) if "K" in f]
+
+
+def _encode_args(fps):
+    return ["-an", "-c:v", "libx264", "-preset", "fast", "-crf", "12", "-pix_fmt", "yuv420p", "-r", str(fps)]
+
+
+def prepare(src, win, fps, width, height, work, name="window"):
+    """(control.mp4, mask.mp4) for win, at width x height, under work/."""
+    work = Path(work)
+    fps = Fraction(fps)
+    a, b = win.edit_first - win.first, win.edit_last - win.first - 1
+    control, mask = work / f"{name}_control.mp4", work / f"{name}_mask.mp4"
+    assemble._run([assemble.FFMPEG, "-y", "-v", "error", "-i", str(src), "-vf",
+                   f"select='between(n,{win.first},{win.last - 1})',setpts=N/FRAME_RATE/TB,"
+                   f"scale={width}:{height},setsar=1,"
+                   f"drawbox=x=0:y=0:w=iw:h=ih:color={GREY}:t=fill:enable='between(n,{a},{b})'",
+                   "-frames:v", str(win.frames)] + _encode_args(fps) + [str(control)])
+    assemble._run([assemble.FFMPEG, "-y", "-v", "error", "-f", "lavfi", "-i",
+                   f"color=c=black:s={width}x{height}:r={fps}", "-vf",
+                   f"drawbox=x=0:y=0:w=iw:h=ih:color=white:t=fill:enable='between(n,{a},{b})'",
+                   "-frames:v", str(win.frames)] + _encode_args(fps) + [str(mask)])
+    return control, mask
+
+
+def _copy(src, first, last, fps, out):
+    """Frames [first, last) of src by stream copy. first must be a keyframe."""
+    cmd = [assemble.FFMPEG, "-y", "-v", "error"]
+    if first:
+        # half a frame past the keyframe: the seek lands on it, not the one before
+        cmd += ["-ss", f"{float((first + Fraction(1, 2)) / fps):.6f}"]
+    cmd += ["-i", str(src), "-map", "0:v:0", "-frames:v", str(last - first), "-c", "copy", "-an",
+            "-avoid_negative_ts", "make_zero", str(out)]
+    assemble._run(cmd)
+    return out
+
+
+def _audio(src, work):
+    """The clip's audio as its own file (stream copy), or None if it has none."""
+    out = assemble._run([assemble.FFPROBE, "-v", "error", "-select_streams", "a:0",
+                         "-show_entries", "stream=codec_name", "-of", "csv=p=0", str(src)]).strip()
+    if not out:
+        return None
+    ext = {"aac": ".m4a", "mp3": ".mp3", "opus": ".opus", "flac": ".flac"}.get(out, ".m4a")
+    path = Path(work) / f"audio{ext}"
+    try:
+        assemble._run([assemble.FFMPEG, "-y", "-v", "error", "-i", str(src), "-vn", "-c:a", "copy", str(path)])
+    except assemble.AssemblyError:
+        # codec that container won't take: re-encode, it's only audio
+        path = Path(work) / "audio.m4a"
+        assemble._run([assemble.FFMPEG, "-y", "-v", "error", "-i", str(src), "-vn", "-c:a", "aac", str(path)])
+    return path
+
+
+def _regions(renders, keys, total):
+    """[start, end, [(Window, path)]] frame ranges to re-encode: the GOPs holding an edit, overlapping ones merged."""
+    regions = []
+    for win, path in sorted(renders, key=lambda r: r[0].edit_first):
+        # a clip whose first packet isn't flagged as a keyframe still starts decoding at 0
+        start = max((k for k in keys if k <= win.edit_first), default=0)
+        end = min((k for k in keys if k >= win.edit_last), default=total)
+        if regions and start < regions[-1][1]:
+            regions[-1][1] = max(end, regions[-1][1])
+            regions[-1][2].append((win, path))
+        else:
+            regions.append([start, end, [(win, path)]])
+    return regions
+
+
+def splice(src, renders, fps, output):
+    """output = src with each window's edited frames replaced from its render.
+
+    renders: [(Window, rendered clip path)] - the render covers the whole
+    window, only its edited frames are used. Returns (output, report).
+    """
+    fps = Fraction(fps)
+    total, keys = frame_index(src)
+    regions = _regions(renders, keys, total)
+    sec = lambda f: float(f / fps)
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    work = Path(tempfile.mkdtemp(prefix=".splice_", dir=output.parent))
+    try:
+        timeline, pos, copied = [], 0, 0
+        for n, (start, end, group) in enumerate(regions):
+            if start > pos:
+                timeline.append(_copy(src, pos, start, fps, work / f"copy_{n:03d}.mp4"))
+                copied += start - pos
+            cur = start
+            for win, path in group:
+                if win.edit_first > cur:
+                    timeline.append(assemble.Clip(src, sec(cur), sec(win.edit_first)))
+                off = win.edit_first - win.first
+                timeline.append(assemble.Clip(path, sec(off), sec(off + win.edit_last - win.edit_first)))
+                cur = win.edit_last
+            if end > cur:
+                timeline.append(assemble.Clip(src, sec(cur), sec(end)))
+            pos = end
+        if pos < total:
+            timeline.append(_copy(src, pos, total, fps, work / "copy_end.mp4"))
+            copied += total - pos
+        audio = _audio(src, work)
+        assemble.assemble(timeline, output, audio=[audio] if audio else ())
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    edited = sum(w.edit_last - w.edit_first for w, _ in renders)
+    return output, {"frames": total, "edited": edited, "copied": copied,
+                    "reencoded": total - copied, "rendered": sum(w.frames for w, _ in renders)}
@@ -0,0 +1,272 @@
+"""
+Workflow validation - catch a bad graph before it goes to /prompt.
+
+A wrong checkpoint name or a missing input used to show up as a 400
+(or worse, an error minutes into the queue) with the first 200
+characters of ComfyUI's reply. Here the graph is checked locally
+against the server's node definitions (pipeline/schema.py: /object_info
+and /models, cached on disk, refetched after schema.TTL):
+
+    - every class_type exists on the server
+    - every required input is set
+    - every link points at an existing node and output, and the output's
+      type is what the input takes
+    - combo values (sampler, scheduler, model files) are among the
+      server's choices; numbers are within min/max. A file name annotated
+      "[output]", "[input]" or "[temp]" (a LoadLatent reading a preview's
+      latent) is left to ComfyUI - the listing only covers one folder
+    - every model a loader names is in the server's model folders
+
+Definitions are compiled per class the first time they're needed, so a
+check is a few dict lookups per node - microseconds, not a round trip.
+A server that won't say what it has (offline, or a stub) isn't checked.
+
+available() is what the Scheduler routes by: the model files a backend
+has, so a job is never sent to a GPU without its checkpoint.
+
+Usage:
+    check(workflow, "http://localhost:8188")        # raises ValidationError listing every problem
+    problems(workflow, server)                      # the same, as a list of strings
+    "ltxv-13b.safetensors" in available(server)
+"""
+import json
+import re
+import threading
+
+from pipeline import affinity, schema, transport
+
+MODEL_EXTS = (".safetensors", ".sft", ".ckpt", ".pt", ".pth", ".bin", ".gguf", ".onnx")
+UPLOAD_OPTS = ("image_upload", "video_upload", "audio_upload")
+SHOWN = 8       # problems spelled out in a ValidationError's message
+ANNOTATED = re.compile(r" \[(input|output|temp)\]$")     # folder_paths.get_annotated_filepath
+
+
+class ValidationError(Exception):
+    """The graph can't run on that server. .errors lists every problem."""
+
+    def __init__(self, errors, label=""):
+        self.errors = list(errors)
+        shown = "; ".join(self.errors[:SHOWN])
+        more = f" (+{len(self.errors) - SHOWN} more)" if len(self.errors) > SHOWN else ""
+        super().__init__(f"{label or 'Workflow'} is invalid: {shown}{more}")
+
+
+def _name(value):
+    return value.replace("\\", "/")
+
+
+def _types(kind):
+    return set(kind.split(",")) if isinstance(kind, str) else {"COMBO"}
+
+
+def _compatible(sent, want):
+    """Can an output of type sent feed an input of type want (ComfyUI's non-strict rule)."""
+    if sent == want or sent == "*" or want == "*":
+        return True
+    if want == "COMBO" or isinstance(want, list):
+        return True         # combos take whatever a node says it emits for them
+    return bool(_types(sent) & _types(want))
+
+
+class _Spec:
+    """One node class, compiled for checking."""
+
+    __slots__ = ("inputs", "required", "outputs")
+
+    def __init__(self, definition):
+        self.inputs = {}        # name -> (type, choices | None, min, max)
+        self.required = []
+        spec = definition.get("input") or {}
+        for group in ("required", "optional"):
+            for name, entry in (spec.get(group) or {}).items():
+                kind = entry[0] if entry else "*"
+                opts = entry[1] if len(entry) > 1 and isinstance(entry[1], dict) else {}
+                choices = None
+                if isinstance(kind, list) or kind == "COMBO":
+                    options = kind if isinstance(kind, list) else opts.get("options")
+                    # upload combos list the input folder as of the snapshot - newer uploads are fine
+                    if options is not None and not any(opts.get(k) for k in UPLOAD_OPTS):
+                        choices = frozenset(o for o in options if isinstance(o, str))
+                    kind = "COMBO"
+                self.inputs[name] = (kind, choices, opts.get("min"), opts.get("max"))
+                if group == "required":
+                    self.required.append(name)
+        self.outputs = list(definition.get("output") or ())
+
+
+class Validator:
+    """problems()/check() against each server's cached definitions."""
+
+    __slots__ = ("schemas", "checked", "rejected", "_specs", "_files", "_retried", "_lock")
+
+    def __init__(self, schemas=None):
+        self.schemas = schemas or schema.CACHE
+        self.checked = 0
+        self.rejected = 0
+        self._specs = {}        # server -> (object_info it was built from, {class_type: _Spec})
+        self._files = {}        # server -> (object_info, listing, frozenset of model files)
+        self._retried = {}      # server -> snapshot refetched for an unknown class (once per snapshot)
+        self._lock = threading.Lock()
+
+    def _definitions(self, server, refresh=False):
+        """(object_info, {class_type: _Spec} filled lazily) for server, (None, None) if it won't say."""
+        try:
+            nodes = self.schemas.object_info(server, refresh)
+        except (OSError, transport.HTTPError, ValueError):
+            return None, None
+        if not nodes:
+            return None, None
+        with self._lock:
+            built = self._specs.get(server)
+            if built is None or built[0] is not nodes:
+                built = self._specs[server] = (nodes, {})
+        return nodes, built[1]
+
+    def _spec(self, nodes, specs, cls):
+        spec = specs.get(cls)
+        if spec is None and cls in nodes:
+            spec = specs[cls] = _Spec(nodes[cls])
+        return spec
+
+    def available(self, server):
+        """frozenset of model files server has (/models plus loader choices), None if unknown."""
+        server = server.rstrip("/")
+        listing = self.schemas.models(server)
+        nodes, _ = self._definitions(server)
+        if listing is None and nodes is None:
+            return None
+        with self._lock:
+            have = self._files.get(server)
+            if have is not None and have[0] is nodes and have[1] is listing:
+                return have[2]
+        files = {_name(f) for folder in (listing or {}).values() for f in folder if isinstance(f, str)}
+        for definition in (nodes or {}).values():
+            for group in ("required", "optional"):
+                for entry in ((definition.get("input") or {}).get(group) or {}).values():
+                    options = entry[0] if entry and isinstance(entry[0], list) else None
+                    for o in options or ():
+                        if isinstance(o, str) and o.lower().endswith(MODEL_EXTS):
+                            files.add(_name(o))
+        files = frozenset(files)
+        with self._lock:
+            self._files[server] = (nodes, listing, files)
+        return files
+
+    def problems(self, graph, server, models=True):
+        """Everything wrong with graph for server, as strings. [] if it's fine (or server won't say)."""
+        server = server.rstrip("/")
+        nodes, specs = self._definitions(server)
+        if nodes is None:
+            return []
+        unknown = [n.get("class_type") for n in graph.values() if n.get("class_type") not in nodes]
+        if unknown and self._retried.get(server) is not nodes:
+            nodes, specs = self._definitions(server, refresh=True)     # new custom nodes since the snapshot?
+            if nodes is None:
+                return []
+            with self._lock:
+                self._retried[server] = nodes
+        errors = []
+        reported = set()
+        for nid, node in graph.items():
+            cls = node.get("class_type")
+            spec = self._spec(nodes, specs, cls)
+            where = f"node {nid} ({cls})"
+            if spec is None:
+                errors.append(f"{where}: no such node type on {server}")
+                continue
+            inputs = node.get("inputs") or {}
+            for name in spec.required:
+                if name not in inputs:
+                    errors.append(f"{where}: required input {name!r} missing")
+            for name, value in inputs.items():
+                want = spec.inputs.get(name)
+                if want is None:
+                    continue        # ComfyUI ignores inputs a node doesn't have
+                kind, choices, lo, hi = want
+                if isinstance(value, list) and len(value) == 2 and isinstance(value[0], str):
+                    src = graph.get(value[0])
+                    if src is None:
+                        errors.append(f"{where}: {name} links to missing node {value[0]}")
+                        continue
+                    src_spec = self._spec(nodes, specs, src.get("class_type"))
+                    if src_spec is None:
+                        continue    # reported as its own node
+                    if not isinstance(value[1], int) or not 0 <= value[1] < len(src_spec.outputs):
+                        errors.append(f"{where}: {name} links to output {value[1]} of node {value[0]} "
+                                      f"({src['class_type']}), which has {len(src_spec.outputs)}")
+                        continue
+                    sent = src_spec.outputs[value[1]]
+                    if not _compatible(sent, kind):
+                        errors.append(f"{where}: {name} takes {kind}, node {value[0]} ({src['class_type']}) "
+                                      f"output {value[1]} is {sent}")
+                    continue
+                if choices is not None and isinstance(value, (str, int, float)) \
+                        and not (isinstance(value, str) and ANNOTATED.search(value)):
+                    if value not in choices and not (isinstance(value, str) and _name(value) in choices):
+                        what = "model file" if isinstance(value, str) and value.lower().endswith(MODEL_EXTS) \
+                            else "value"
+                        errors.append(f"{where}: {name} = {value!r} - {what} not on {server}")
+                        reported.add(value)
+                elif kind in ("INT", "FLOAT"):
+                    try:
+                        number = float(value)
+                    except (TypeError, ValueError):
+                        errors.append(f"{where}: {name} must be a number, got {value!r}")
+                        continue
+                    if (lo is not None and number < lo) or (hi is not None and number > hi):
+                        errors.append(f"{where}: {name} = {value} outside [{lo}, {hi}]")
+        if models:
+            have = self.available(server)
+            for cls, name in sorted(affinity.model_set(graph)):
+                if have is not None and name not in reported and _name(name) not in have:
+                    errors.append(f"{cls}: model file {name!r} not on {server}")
+        with self._lock:
+            self.checked += 1
+            self.rejected += bool(errors)
+        return errors
+
+    def check(self, graph, server, label=""):
+        """Raise ValidationError if graph can't run on server."""
+        errors = self.problems(graph, server)
+        if errors:
+            raise ValidationError(errors, label)
+        return graph
+
+    def stats(self):
+        with self._lock:
+            return {"checked": self.checked, "rejected": self.rejected}
+
+
+def rejection(status, body, label=""):
+    """The exception for a /prompt that came back non-200: ComfyUI's node_errors spelled out if it sent them."""
+    try:
+        info = json.loads(body)
+    except ValueError:
+        info = None
+    errors = []
+    if isinstance(info, dict):
+        for nid, ne in (info.get("node_errors") or {}).items():
+            for e in ne.get("errors") or ():
+                detail = f" ({e['details']})" if e.get("details") else ""
+                errors.append(f"node {nid} ({ne.get('class_type')}): {e.get('message')}{detail}")
+        if not errors and isinstance(info.get("error"), dict):
+            err = info["error"]
+            errors.append(f"{err.get('message')}" + (f" ({err['details']})" if err.get("details") else ""))
+    if errors:
+        return ValidationError(errors, label)
+    return Exception(f"Queue failed ({status}): {body[:200]}")
+
+
+VALIDATOR = Validator()
+
+
+def problems(graph, server, models=True):
+    return VALIDATOR.problems(graph, server, models)
+
+
+def check(graph, server, label=""):
+    return VALIDATOR.check(graph, server, label)
+
+
+def available(server):
+    return VALIDATOR.available(server)
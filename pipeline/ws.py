@@ -0,0 +1,166 @@
+"""
+Minimal WebSocket (RFC 6455) framing over plain sockets.
+
+ComfyUI only needs text frames in, so this covers exactly that:
+a client for /ws?clientId= and the server half used by the fake
+ComfyUI in fake_comfy.py. No extra dependencies.
+"""
+import base64
+import hashlib
+import os
+import socket
+import struct
+from urllib.parse import urlparse
+
+GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONT, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+class ConnectionClosed(Exception):
+    pass
+
+
+def accept_key(key):
+    """Sec-WebSocket-Accept value for a client's Sec-WebSocket-Key."""
+    return base64.b64encode(hashlib.sha1((key + GUID).encode()).digest()).decode()
+
+
+class Reader:
+    """Exact-length reads over a socket, starting with any bytes already read."""
+
+    def __init__(self, sock, pending=b""):
+        self.sock = sock
+        self.pending = bytearray(pending)
+
+    def read(self, n):
+        while len(self.pending) < n:
+            chunk = self.sock.recv(max(65536, n - len(self.pending)))
+            if not chunk:
+                raise ConnectionClosed("socket closed")
+            self.pending += chunk
+        out = bytes(self.pending[:n])
+        del self.pending[:n]
+        return out
+
+
+def read_frame(reader):
+    """Read one frame. Returns (fin, opcode, payload)."""
+    b1, b2 = reader.read(2)
+    fin = bool(b1 & 0x80)
+    opcode = b1 & 0x0F
+    masked = b2 & 0x80
+    length = b2 & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", reader.read(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", reader.read(8))[0]
+    mask = reader.read(4) if masked else None
+    payload = reader.read(length) if length else b""
+    if mask:
+        payload = _xor(payload, mask)
+    return fin, opcode, payload
+
+
+def _xor(payload, mask):
+    # int-wide XOR is ~50x faster than a per-byte generator on big frames
+    n = len(payload)
+    key = (mask * (n // 4 + 1))[:n]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(n, "big")
+
+
+def write_frame(sock, opcode, payload, mask=False):
+    """Write one unfragmented frame. Clients must mask, servers must not."""
+    header = bytearray([0x80 | opcode])
+    n = len(payload)
+    mbit = 0x80 if mask else 0
+    if n < 126:
+        header.append(mbit | n)
+    elif n < 1 << 16:
+        header.append(mbit | 126)
+        header += struct.pack("!H", n)
+    else:
+        header.append(mbit | 127)
+        header += struct.pack("!Q", n)
+    if mask:
+        key = os.urandom(4)
+        header += key
+        payload = _xor(payload, key)
+    sock.sendall(bytes(header) + payload)
+
+
+class WebSocket:
+    """Client connection. recv() returns text messages, skipping binary previews."""
+
+    def __init__(self, sock, pending=b""):
+        self.sock = sock
+        self.reader = Reader(sock, pending)
+
+    def recv(self):
+        parts, kind = [], None
+        while True:
+            fin, opcode, payload = read_frame(self.reader)
+            if opcode == OP_PING:
+                write_frame(self.sock, OP_PONG, payload, mask=True)
+                continue
+            if opcode == OP_CLOSE:
+                raise ConnectionClosed("server closed")
+            if opcode != OP_CONT:
+                kind, parts = opcode, []
+            parts.append(payload)
+            if fin and kind == OP_TEXT:
+                return b"".join(parts).decode("utf-8")
+            # OP_BINARY = latent preview images, ignored
+
+    def send(self, text):
+        write_frame(self.sock, OP_TEXT, text.encode("utf-8"), mask=True)
+
+    def settimeout(self, timeout):
+        self.sock.settimeout(timeout)
+
+    def close(self):
+        try:
+            write_frame(self.sock, OP_CLOSE, b"", mask=True)
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def connect(url, timeout=5):
+    """Open a client WebSocket to ws://host:port/path?query."""
+    u = urlparse(url)
+    port = u.port or 80
+    path = u.path or "/"
+    if u.query:
+        path += "?" + u.query
+    sock = socket.create_connection((u.hostname, port), timeout=timeout)
+    key = base64.b64encode(os.urandom(16)).decode()
+    sock.sendall((
+        f"GET {path} HTTP/1.1\r\n"
+        f"Host: {u.hostname}:{port}\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {key}\r\n"
+        "Sec-WebSocket-Version: 13\r\n\r\n"
+    ).encode())
+
+    head = b""
+    while b"\r\n\r\n" not in head:
+        chunk = sock.recv(1024)
+        if not chunk:
+            sock.close()
+            raise ConnectionClosed("handshake failed")
+        head += chunk
+    status = head.split(b"\r\n", 1)[0]
+    if b" 101 " not in status + b" ":
+        sock.close()
+        raise ConnectionClosed(f"handshake rejected: {status.decode(errors='replace')}")
+    if accept_key(key).encode() not in head:
+        sock.close()
+        raise ConnectionClosed("bad Sec-WebSocket-Accept")
+    head, rest = head.split(b"\r\n\r\n", 1)
+    sock.settimeout(None)
+    return WebSocket(sock, rest)
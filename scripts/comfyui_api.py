@@ -4,34 +4,34 @@ ComfyUI API Client - Queue and monitor workflows.
 
 Usage:
     python comfyui_api.py test                    # Test connection
-    python comfyui_api.py run <workflow.json>     # Queue a workflow
+    python comfyui_api.py run <workflow.json>     # Queue a workflow (API format or UI export)
     python comfyui_api.py status <prompt_id>      # Check job status
+    python comfyui_api.py convert <ui.json> [out.json]  # UI export -> API format
 """
 
 import json
 import sys
 import time
-import urllib.request
-import urllib.error
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline import convert, transport
+
 COMFYUI_URL = "http://localhost:8188"
 
 
 def test_connection():
     """Test if ComfyUI is running."""
     try:
-        req = urllib.request.Request(f"{COMFYUI_URL}/system_stats")
-        with urllib.request.urlopen(req, timeout=5) as resp:
-            data = json.loads(resp.read().decode())
-            print("ComfyUI is ONLINE")
-            print(f"  Version: {data.get('system', {}).get('comfyui_version')}")
-            devices = data.get('devices', [])
-            if devices:
-                print(f"  GPU: {devices[0].get('name')}")
-                vram_free = devices[0].get('vram_free', 0) / 1e9
-                print(f"  VRAM Free: {vram_free:.2f}GB")
-            return True
+        data = transport.get_json(f"{COMFYUI_URL}/system_stats")
+        print("ComfyUI is ONLINE")
+        print(f"  Version: {data.get('system', {}).get('comfyui_version')}")
+        devices = data.get('devices', [])
+        if devices:
+            print(f"  GPU: {devices[0].get('name')}")
+            vram_free = devices[0].get('vram_free', 0) / 1e9
+            print(f"  VRAM Free: {vram_free:.2f}GB")
+        return True
     except Exception as e:
         print(f"ComfyUI is OFFLINE: {e}")
         return False
@@ -44,28 +44,22 @@ def queue_workflow(workflow_path: str):
         print(f"Error: Workflow file not found: {workflow_path}")
         return None
     
-    with open(path, 'r') as f:
-        workflow = json.load(f)
-    
+    try:
+        workflow = convert.load(path, COMFYUI_URL)     # UI exports converted (and remembered)
+    except (convert.ConvertError, transport.HTTPError, OSError) as e:
+        print(f"Error converting workflow: {e}")
+        return None
+
     payload = {"prompt": workflow}
-    data = json.dumps(payload).encode()
-    
-    req = urllib.request.Request(
-        f"{COMFYUI_URL}/prompt",
-        data=data,
-        headers={"Content-Type": "application/json"}
-    )
     
     try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            result = json.loads(resp.read().decode())
-            prompt_id = result.get("prompt_id")
-            print(f"Workflow queued successfully!")
-            print(f"  Prompt ID: {prompt_id}")
-            return prompt_id
-    except urllib.error.HTTPError as e:
-        error = e.read().decode() if e.fp else str(e)
-        print(f"Error queuing workflow: {error}")
+        result = transport.post_json(f"{COMFYUI_URL}/prompt", payload)
+        prompt_id = result.get("prompt_id")
+        print(f"Workflow queued successfully!")
+        print(f"  Prompt ID: {prompt_id}")
+        return prompt_id
+    except transport.HTTPError as e:
+        print(f"Error queuing workflow: {e.body}")
         return None
     except Exception as e:
         print(f"Error: {e}")
@@ -75,9 +69,7 @@ def queue_workflow(workflow_path: str):
 def get_history(prompt_id: str):
     """Get execution history for a prompt."""
     try:
-        req = urllib.request.Request(f"{COMFYUI_URL}/history/{prompt_id}")
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            return json.loads(resp.read().decode())
+        return transport.get_json(f"{COMFYUI_URL}/history/{prompt_id}")
     except:
         return None
 
@@ -86,10 +78,8 @@ def check_status(prompt_id: str):
     """Check the status of a queued workflow."""
     # Check queue first
     try:
-        req = urllib.request.Request(f"{COMFYUI_URL}/queue")
-        with urllib.request.urlopen(req, timeout=5) as resp:
-            queue = json.loads(resp.read().decode())
-            
+        queue = transport.get_json(f"{COMFYUI_URL}/queue")
+
         # Check if running
         for item in queue.get("queue_running", []):
             if item[1] == prompt_id:
@@ -161,6 +151,18 @@ if __name__ == "__main__":
         if prompt_id:
             wait_for_completion(prompt_id)
     
+    elif cmd == "convert":
+        if len(sys.argv) < 3:
+            print("Usage: comfyui_api.py convert <ui.json> [out.json]")
+            sys.exit(1)
+        graph = convert.load(sys.argv[2], COMFYUI_URL)
+        text = json.dumps(graph, indent=2)
+        if len(sys.argv) > 3:
+            Path(sys.argv[3]).write_text(text + "\n", encoding="utf-8")
+            print(f"Wrote {sys.argv[3]} ({len(graph)} nodes)")
+        else:
+            print(text)
+
     elif cmd == "status":
         if len(sys.argv) < 3:
             print("Usage: comfyui_api.py status <prompt_id>")
@@ -10,19 +10,27 @@ Claude uses this to:
 
 Usage:
     python dispatcher.py status              # Check all GPUs
+    python dispatcher.py monitor [--interval 2]  # Live fleet health until Ctrl-C
     python dispatcher.py test                # Test ComfyUI connection
-    python dispatcher.py generate <prompt>   # Generate video
+    python dispatcher.py backends            # ComfyUI endpoint per GPU + live load
+    python dispatcher.py run <workflow.json> [--role worker] [--count N]
+    python dispatcher.py journal             # Reconcile jobs/journal.jsonl after a crash
+    python dispatcher.py generate "<prompt>" --duration 30 [--seed N] [--project NAME]
+    python dispatcher.py metrics             # p50/p90/p99 per workflow type and GPU from jobs/trace.jsonl
 """
 
-import json
 import time
 import subprocess
-import urllib.request
-import urllib.error
 import sys
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline import convert, metrics, transport
+from pipeline.health import Monitor, Target
+from pipeline.journal import Journal
+from pipeline.scheduler import Backend, Scheduler
+
 # Fix Windows console encoding
 if sys.platform == "win32":
     sys.stdout.reconfigure(encoding='utf-8', errors='replace')
@@ -34,17 +42,23 @@ JOBS_DIR = Path(__file__).parent.parent / "jobs"
 OUTPUTS_DIR = Path(__file__).parent.parent / "outputs"
 
 # GPU Configuration (your actual hardware)
+# comfyui: the ComfyUI instance pinned to that card (CUDA_VISIBLE_DEVICES=N,
+# --port 8188+N). Cards without one show up offline and get no work.
 GPU_CONFIG = {
-    0: {"name": "RTX 5090", "role": "primary", "vram_gb": 32, "service": "comfyui"},
-    1: {"name": "RTX 3090 #1", "role": "worker", "vram_gb": 24, "service": None},
-    2: {"name": "RTX 3090 #2", "role": "worker", "vram_gb": 24, "service": None},
-    3: {"name": "RTX 3090 #3", "role": "worker", "vram_gb": 24, "service": None},
-    4: {"name": "RTX 3090 #4", "role": "worker", "vram_gb": 24, "service": "chatterbox"},
-    5: {"name": "RTX 4080 Super", "role": "control", "vram_gb": 16, "service": None},
+    0: {"name": "RTX 5090", "role": "primary", "vram_gb": 32, "service": "comfyui", "comfyui": "http://localhost:8188"},
+    1: {"name": "RTX 3090 #1", "role": "worker", "vram_gb": 24, "service": None, "comfyui": "http://localhost:8189"},
+    2: {"name": "RTX 3090 #2", "role": "worker", "vram_gb": 24, "service": None, "comfyui": "http://localhost:8190"},
+    3: {"name": "RTX 3090 #3", "role": "worker", "vram_gb": 24, "service": None, "comfyui": "http://localhost:8191"},
+    4: {"name": "RTX 3090 #4", "role": "worker", "vram_gb": 24, "service": "chatterbox", "comfyui": "http://localhost:8192"},
+    5: {"name": "RTX 4080 Super", "role": "control", "vram_gb": 16, "service": None, "comfyui": "http://localhost:8193"},
 }
 
+# Per-backend in-flight limit: one running + one waiting keeps the GPU busy
+# without burying work in a server queue we can't rebalance.
+MAX_INFLIGHT = 2
+
 
-def get_gpu_status():
+def get_gpu_status(quiet=False):
     """Get status of all GPUs via nvidia-smi."""
     try:
         result = subprocess.run(
@@ -69,22 +83,21 @@ def get_gpu_status():
                 }
         return gpus
     except Exception as e:
-        print(f"Error getting GPU status: {e}")
+        if not quiet:
+            print(f"Error getting GPU status: {e}")
         return None
 
 
 def check_comfyui():
     """Check if ComfyUI is running and responsive."""
     try:
-        req = urllib.request.Request(f"{COMFYUI_URL}/system_stats")
-        with urllib.request.urlopen(req, timeout=5) as resp:
-            data = json.loads(resp.read().decode())
-            return {
-                "online": True,
-                "version": data.get("system", {}).get("comfyui_version"),
-                "gpu": data.get("devices", [{}])[0].get("name"),
-                "vram_free_gb": round(data.get("devices", [{}])[0].get("vram_free", 0) / 1e9, 2)
-            }
+        data = transport.get_json(f"{COMFYUI_URL}/system_stats")
+        return {
+            "online": True,
+            "version": data.get("system", {}).get("comfyui_version"),
+            "gpu": data.get("devices", [{}])[0].get("name"),
+            "vram_free_gb": round(data.get("devices", [{}])[0].get("vram_free", 0) / 1e9, 2)
+        }
     except Exception as e:
         return {"online": False, "error": str(e)}
 
@@ -92,50 +105,195 @@ def check_comfyui():
 def check_comfyui_queue():
     """Check ComfyUI queue status."""
     try:
-        req = urllib.request.Request(f"{COMFYUI_URL}/queue")
-        with urllib.request.urlopen(req, timeout=5) as resp:
-            data = json.loads(resp.read().decode())
-            return {
-                "running": len(data.get("queue_running", [])),
-                "pending": len(data.get("queue_pending", []))
-            }
+        data = transport.get_json(f"{COMFYUI_URL}/queue")
+        return {
+            "running": len(data.get("queue_running", [])),
+            "pending": len(data.get("queue_pending", []))
+        }
     except:
         return {"running": 0, "pending": 0}
 
 
-def queue_workflow(workflow: dict, client_id: str = "dispatcher"):
-    """Queue a workflow to ComfyUI."""
+def queue_workflow(workflow: dict, client_id: str = "dispatcher", url: str = COMFYUI_URL):
+    """Queue a workflow to one ComfyUI. Use dispatch() to spread over all GPUs."""
     payload = {
         "prompt": workflow,
         "client_id": client_id
     }
     
-    data = json.dumps(payload).encode()
-    req = urllib.request.Request(
-        f"{COMFYUI_URL}/prompt",
-        data=data,
-        headers={"Content-Type": "application/json"}
-    )
-    
     try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            result = json.loads(resp.read().decode())
-            return {"success": True, "prompt_id": result.get("prompt_id")}
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode() if e.fp else str(e)
-        return {"success": False, "error": error_body}
+        result = transport.post_json(f"{url}/prompt", payload)
+        return {"success": True, "prompt_id": result.get("prompt_id")}
+    except transport.HTTPError as e:
+        return {"success": False, "error": e.body}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
+def make_backends(config=None):
+    """One scheduler Backend per GPU that has a ComfyUI endpoint."""
+    config = GPU_CONFIG if config is None else config
+    return [
+        Backend(f"gpu{idx}", gpu["comfyui"], role=gpu["role"], vram_gb=gpu["vram_gb"],
+                max_inflight=gpu.get("max_inflight", MAX_INFLIGHT), gpu=idx)
+        for idx, gpu in sorted(config.items()) if gpu.get("comfyui")
+    ]
+
+
+def make_monitor(config=None, interval=2.0):
+    """Health monitor over every GPU's ComfyUI, Chatterbox and nvidia-smi (not started)."""
+    config = GPU_CONFIG if config is None else config
+    targets = [Target(f"gpu{idx}", gpu["comfyui"], gpu=idx) for idx, gpu in sorted(config.items()) if gpu.get("comfyui")]
+    tts_gpu = next((idx for idx, gpu in config.items() if gpu.get("service") == "chatterbox"), None)
+    targets.append(Target("chatterbox", CHATTERBOX_URL, kind="http", path="/health", gpu=tts_gpu))
+    # nvidia-smi cross-checks /system_stats for VRAM held outside ComfyUI
+    return Monitor(targets, interval=interval, telemetry=lambda: get_gpu_status(quiet=True))
+
+
+_monitor = None
+_scheduler = None
+
+
+def get_monitor():
+    """Shared health monitor (started on first use)."""
+    global _monitor
+    if _monitor is None:
+        _monitor = make_monitor().start()
+    return _monitor
+
+
+def get_scheduler():
+    """Shared scheduler over every GPU in GPU_CONFIG (started on first use)."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler(make_backends(), monitor=get_monitor()).start()
+        if metrics.RECORDER.trace is None:
+            metrics.RECORDER.trace = Journal(JOBS_DIR / "journal.jsonl")    # timings -> jobs/trace.jsonl
+    return _scheduler
+
+
+def shutdown():
+    """Stop the shared scheduler and monitor; the next get_scheduler()/get_monitor() starts fresh ones."""
+    global _monitor, _scheduler
+    if _scheduler is not None:
+        _scheduler.close()
+        _scheduler = None
+    if _monitor is not None:
+        _monitor.close()
+        _monitor = None
+
+
+def dispatch(workflow: dict, role=None, vram_gb=0, label="", priority="normal", deadline=None):
+    """Queue a workflow on the best GPU for it. Returns a Job (job.result() waits).
+
+    priority: "interactive" (previews - jump every queue), "normal", "bulk", or an int.
+    """
+    return get_scheduler().submit(workflow, role=role, vram_gb=vram_gb, label=label,
+                                  priority=priority, deadline=deadline)
+
+
+def produce(shots, project=None, limits=None):
+    """factory.produce() across every GPU: keyframes on the 4080, scenes and audio on the 3090s."""
+    import factory
+    return factory.produce(shots, project=project, limits=limits, scheduler=get_scheduler())
+
+
+def long_video(prompt, duration=30, seed=None, project=None, chunk=97, overlap=9):
+    """factory.long_video() with its chunks on whichever 3090 is free; tails go to all of them."""
+    import factory
+    return factory.long_video(prompt, duration=duration, seed=seed, chunk=chunk, overlap=overlap,
+                              project=project, scheduler=get_scheduler())
+
+
+def edit_video(clip, edits, seed=None, project=None):
+    """factory.edit_video() with each edit window on whichever 3090 is free."""
+    import factory
+    return factory.edit_video(clip, edits, seed=seed, project=project, scheduler=get_scheduler())
+
+
+def print_backends():
+    """Print each GPU's ComfyUI endpoint and its live load."""
+    mon = make_monitor()
+    mon.poll()
+    sched = Scheduler(make_backends(), monitor=mon)
+    sched.refresh_backends()
+    print("\nCOMFYUI BACKENDS:")
+    print("-"*70)
+    for b in sched.backends:
+        state = "ONLINE " if b.online else "OFFLINE"
+        print(f"  GPU {b.gpu}: {b.url:<24} {state} [{b.role}] {b.vram_gb}GB "
+              f"- {b.server_running} running, {b.server_pending} pending"
+              + (f", {b.room():.1f}GB admissible" if b.online else ""))
+    sched.close()
+    mon.close()
+
+
+def run_workflow_file(path, role=None, count=1):
+    """Queue a workflow JSON (API or UI export) count times across the pool and wait for all of them."""
+    sched = get_scheduler()
+    # UI exports are converted with one server's node definitions - the pool runs the same nodes
+    server = next((b.url for b in sched.backends if b.online and role in (None, b.role)), COMFYUI_URL)
+    workflow = convert.load(path, server)
+    jobs = [sched.submit(workflow, role=role, label=f"{Path(path).stem}#{i}") for i in range(count)]
+    for job in jobs:
+        try:
+            job.result()
+            print(f"  {job.label}: done on {job.backend.name} ({job.elapsed:.1f}s)")
+        except Exception as e:
+            print(f"  {job.label}: FAILED - {e}")
+    print(f"  Model swaps avoided: {sched.swaps_avoided()}")
+    shutdown()
+
+
+def print_journal():
+    """Check every job the journal thinks is in flight against its server."""
+    journal = Journal(JOBS_DIR / "journal.jsonl")
+    servers = sorted({e["server"] for e in journal.in_flight() if e.get("server")})
+    print("\nJOB JOURNAL:")
+    print("-"*70)
+    for server in servers:
+        r = journal.recover(server)
+        print(f"  {server:<24} {r['done']} done, {r['error']} failed, "
+              f"{r['running']} still running, {r['lost']} lost")
+    counts = journal.summary()
+    print("  Total: " + ", ".join(f"{n} {status}" for status, n in sorted(counts.items())) if counts else "  Empty")
+    journal.close()
+
+
+def print_metrics(path=None):
+    """Latency percentiles per workflow type and per GPU, from the job trace."""
+    path = Path(path) if path else JOBS_DIR / "trace.jsonl"
+    if not path.exists():
+        print(f"No trace yet ({path}) - jobs run through the dispatcher are traced automatically")
+        return
+    rec = metrics.Recorder.load(path)
+    for title, metric, by in (("EXECUTION (s) BY WORKFLOW", "execution", "kind"),
+                              ("EXECUTION (s) BY GPU", "execution", "gpu"),
+                              ("QUEUE WAIT (s) BY GPU", "queue_wait", "gpu"),
+                              ("DOWNLOAD (s) BY GPU", "download_s", "gpu")):
+        rows = rec.percentiles(metric, by=by)
+        print(f"\n{title}:")
+        print("-"*70)
+        for key, p in rows.items():
+            print(f"  {str(key)[:40]:<40} n={p['n']:<5} p50 {p['p50']:>7}  p90 {p['p90']:>7}  p99 {p['p99']:>7}")
+    print("\nSLOWEST NODES (mean s):")
+    print("-"*70)
+    for cls, (n, mean) in list(rec.node_times().items())[:10]:
+        print(f"  {str(cls):<40} {mean:>7}  x{n}")
+
+
 def print_status():
-    """Print formatted status of all GPUs and services."""
+    """Print formatted status of all GPUs and services (one concurrent poll of everything)."""
     print("\n" + "="*70)
     print("VIDEO FACTORY STATUS")
     print("="*70)
-    
+
+    mon = make_monitor()
+    snap = mon.poll()
+    mon.close()
+
     # GPU Status
-    gpus = get_gpu_status()
+    gpus = mon.gpus()
     if gpus:
         print("\nGPU STATUS:")
         print("-"*70)
@@ -154,30 +312,53 @@ def print_status():
     else:
         print("\n  WARNING: Could not get GPU status")
     
-    # ComfyUI Status
+    # ComfyUI per GPU, then Chatterbox
     print("\nSERVICES:")
     print("-"*70)
     
-    comfy = check_comfyui()
-    if comfy["online"]:
-        queue = check_comfyui_queue()
-        print(f"  ComfyUI:    ONLINE (v{comfy['version']}) - "
-              f"Queue: {queue['running']} running, {queue['pending']} pending - "
-              f"VRAM free: {comfy['vram_free_gb']}GB")
-    else:
-        print(f"  ComfyUI:    OFFLINE - {comfy.get('error', 'Unknown error')}")
-    
-    # Check Chatterbox
-    try:
-        req = urllib.request.Request(f"{CHATTERBOX_URL}/health")
-        with urllib.request.urlopen(req, timeout=3) as resp:
-            print(f"  Chatterbox: ONLINE (TTS ready)")
-    except:
-        print(f"  Chatterbox: OFFLINE or no health endpoint")
+    for name, st in snap.items():
+        s = st.sample
+        if st.target.kind != "comfyui":
+            print(f"  {name:<11} " + ("ONLINE (TTS ready)" if st.healthy else f"OFFLINE - {s.error if s else 'not polled'}"))
+        elif st.healthy:
+            version = (s.stats or {}).get("system", {}).get("comfyui_version")
+            print(f"  {name:<11} ONLINE (v{version}) - Queue: {s.running} running, {s.pending} pending - "
+                  f"VRAM free: {s.vram_free_gb:.2f}GB - {s.latency * 1000:.0f}ms")
+        else:
+            print(f"  {name:<11} OFFLINE - {s.error if s else 'not polled'}")
     
     print("\n" + "="*70)
 
 
+def watch_fleet(interval=2.0):
+    """Live fleet health, one line per round, until Ctrl-C."""
+    mon = get_monitor()
+    mon.interval = interval
+    seen = -1
+    try:
+        while True:
+            if mon.rounds != seen:
+                seen = mon.rounds
+                parts = []
+                for name, st in mon.snapshot().items():
+                    s = st.sample
+                    if not st.healthy:
+                        parts.append(f"{name} DOWN[{st.breaker}]")
+                    elif st.target.kind == "comfyui":
+                        util = f" {s.gpu_util}%" if s.gpu_util is not None else ""
+                        parts.append(f"{name} {s.running}+{s.pending}{util}")
+                    else:
+                        parts.append(f"{name} up")
+                print(f"{datetime.now():%H:%M:%S}  " + "  ".join(parts), flush=True)
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+    print("\nUptime over the ring (share of polls answered), breaker trips, mean latency:")
+    for name, st in mon.stats().items():
+        print(f"  {name:<11} {st['uptime']}  trips={st['trips']}  {st['latency_ms']}ms")
+    shutdown()
+
+
 def test_comfyui():
     """Run a simple test on ComfyUI."""
     print("\nTesting ComfyUI connection...")
@@ -207,15 +388,52 @@ if __name__ == "__main__":
         print("Usage: dispatcher.py <command> [args]")
         print("Commands:")
         print("  status    - Show GPU and service status")
+        print("  monitor   - Live fleet health until Ctrl-C: monitor [--interval 2]")
         print("  test      - Test ComfyUI connection")
+        print("  backends  - Show ComfyUI endpoint per GPU")
+        print("  run       - Run a workflow JSON across the GPU pool")
+        print("  journal   - Reconcile the job journal with the servers")
+        print("  generate  - Render one long shot: generate \"<prompt>\" --duration 30")
+        print("  metrics   - Latency percentiles from jobs/trace.jsonl")
         sys.exit(1)
     
     cmd = sys.argv[1].lower()
     
     if cmd == "status":
         print_status()
+    elif cmd == "monitor":
+        import argparse
+        parser = argparse.ArgumentParser(prog="dispatcher.py monitor")
+        parser.add_argument("--interval", type=float, default=2.0, help="seconds between polls")
+        args = parser.parse_args(sys.argv[2:])
+        watch_fleet(args.interval)
     elif cmd == "test":
         test_comfyui()
+    elif cmd == "backends":
+        print_backends()
+    elif cmd == "journal":
+        print_journal()
+    elif cmd == "run":
+        import argparse
+        parser = argparse.ArgumentParser(prog="dispatcher.py run")
+        parser.add_argument("workflow")
+        parser.add_argument("--role", choices=["primary", "worker", "control"])
+        parser.add_argument("--count", type=int, default=1)
+        args = parser.parse_args(sys.argv[2:])
+        run_workflow_file(args.workflow, role=args.role, count=args.count)
+    elif cmd == "metrics":
+        print_metrics(sys.argv[2] if len(sys.argv) > 2 else None)
+    elif cmd == "generate":
+        import argparse
+        parser = argparse.ArgumentParser(prog="dispatcher.py generate")
+        parser.add_argument("prompt")
+        parser.add_argument("--duration", type=float, default=30, help="seconds")
+        parser.add_argument("--seed", type=int)
+        parser.add_argument("--project")
+        parser.add_argument("--chunk", type=int, default=97, help="frames per chunk (8k+1)")
+        parser.add_argument("--overlap", type=int, default=9, help="frames shared by neighbouring chunks (8k+1)")
+        args = parser.parse_args(sys.argv[2:])
+        print(f"Wrote {long_video(args.prompt, args.duration, args.seed, args.project, args.chunk, args.overlap)}")
     else:
         print(f"Unknown command: {cmd}")
         sys.exit(1)
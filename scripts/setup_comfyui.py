@@ -50,6 +50,18 @@ def install_custom_node(comfyui_path: str):
         print(f"\n[ERR] Failed to install: {e}")
         return False
 
+def install_local_nodes(comfyui_path: str):
+    """Copy this repo's custom_nodes/ (prompt encoding cache) into ComfyUI."""
+    src_root = os.path.join(REPO_ROOT, "custom_nodes")
+    dst_root = os.path.join(comfyui_path, "custom_nodes")
+    for name in sorted(os.listdir(src_root)):
+        src = os.path.join(src_root, name)
+        if not os.path.isdir(src) or name.startswith(("_", ".")):
+            continue
+        dst = os.path.join(dst_root, name)
+        shutil.copytree(src, dst, dirs_exist_ok=True, ignore=shutil.ignore_patterns("__pycache__"))
+        print(f"[OK] {name} installed")
+
 def setup_models(comfyui_path: str):
     """Copy models from repo to ComfyUI."""
     print(f"\n{'='*50}")
@@ -93,6 +105,7 @@ def main():
     
     if not args.skip_node:
         install_custom_node(args.comfyui_path)
+        install_local_nodes(args.comfyui_path)
     
     setup_models(args.comfyui_path)
     
@@ -11,67 +11,39 @@ import sys
 import json
 import time
 import argparse
-import urllib.request
-import urllib.error
 import base64
 
 COMFYUI_URL = "http://localhost:8188"
 REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+sys.path.insert(0, REPO_ROOT)
+from pipeline import transport, uploads
+
 def check_comfyui():
     """Check if ComfyUI is running."""
     try:
-        req = urllib.request.Request(f"{COMFYUI_URL}/system_stats")
-        with urllib.request.urlopen(req, timeout=5) as resp:
-            return True
+        transport.get(f"{COMFYUI_URL}/system_stats", retries=0).raise_for_status()
+        return True
     except:
         return False
 
 def upload_image(image_path: str) -> str:
-    """Upload image to ComfyUI and return filename."""
-    with open(image_path, 'rb') as f:
-        image_data = f.read()
-    
-    filename = os.path.basename(image_path)
-    
-    # Create multipart form data
-    boundary = '----WebKitFormBoundary7MA4YWxkTrZu0gW'
-    body = (
-        f'--{boundary}\r\n'
-        f'Content-Disposition: form-data; name="image"; filename="{filename}"\r\n'
-        f'Content-Type: image/jpeg\r\n\r\n'
-    ).encode() + image_data + f'\r\n--{boundary}--\r\n'.encode()
-    
-    req = urllib.request.Request(
-        f"{COMFYUI_URL}/upload/image",
-        data=body,
-        headers={'Content-Type': f'multipart/form-data; boundary={boundary}'}
-    )
-    
-    with urllib.request.urlopen(req) as resp:
-        result = json.loads(resp.read().decode())
-        return result.get('name', filename)
+    """Upload image to ComfyUI (skipped if it already has this content) and return filename."""
+    return uploads.upload(COMFYUI_URL, image_path)
 
 def queue_workflow(workflow: dict) -> str:
     """Queue workflow and return prompt_id."""
-    data = json.dumps({"prompt": workflow}).encode()
-    req = urllib.request.Request(f"{COMFYUI_URL}/prompt", data=data)
-    req.add_header('Content-Type', 'application/json')
-    
-    with urllib.request.urlopen(req) as resp:
-        result = json.loads(resp.read().decode())
-        return result.get('prompt_id')
+    result = transport.post_json(f"{COMFYUI_URL}/prompt", {"prompt": workflow})
+    return result.get('prompt_id')
 
 def wait_for_completion(prompt_id: str, timeout: int = 300) -> bool:
     """Wait for prompt to complete."""
     start = time.time()
     while time.time() - start < timeout:
-        req = urllib.request.Request(f"{COMFYUI_URL}/history/{prompt_id}")
         try:
-            with urllib.request.urlopen(req) as resp:
-                history = json.loads(resp.read().decode())
-                if prompt_id in history:
-                    return True
+            history = transport.get_json(f"{COMFYUI_URL}/history/{prompt_id}")
+            if prompt_id in history:
+                return True
         except:
             pass
         time.sleep(2)
@@ -128,10 +100,9 @@ def main():
     try:
         prompt_id = queue_workflow(workflow)
         print(f"[OK] Queued: {prompt_id}")
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode()
-        print(f"[ERR] Failed to queue: {e.code}")
-        print(f"      {error_body[:500]}")
+    except transport.HTTPError as e:
+        print(f"[ERR] Failed to queue: {e.status}")
+        print(f"      {e.body[:500]}")
         sys.exit(1)
     
     # Wait for completion
@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pipeline.fake_comfy import FakeComfy  # noqa: E402
+
+
+@pytest.fixture
+def fake():
+    """A running in-process fake ComfyUI."""
+    server = FakeComfy(exec_time=0.02).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def isolated(tmp_path, monkeypatch, fake):
+    """factory pointed at a fake server, with its caches under tmp_path."""
+    import factory
+    from pipeline.cache import ResultCache
+    from pipeline.journal import Journal
+    monkeypatch.setattr(factory, "COMFY", fake.url)
+    monkeypatch.setattr(factory, "CACHE", ResultCache(root=tmp_path / "results"))
+    monkeypatch.setattr(factory, "JOURNAL", Journal(tmp_path / "journal.jsonl"))
+    monkeypatch.setattr(factory, "PROJECT", None)
+    monkeypatch.setattr(factory, "_recovered", set())
+    yield fake
+    factory.JOURNAL.close()
+
+
+@pytest.fixture
+def remembered():
+    """wait(workflow): block until factory.CACHE has stored it (the cache is written from a done-callback)."""
+    import time
+
+    import factory
+    from pipeline.cache import workflow_key
+
+    def wait(workflow, timeout=5):
+        path = factory.CACHE.root / f"{workflow_key(workflow)}.json"
+        deadline = time.time() + timeout
+        while not path.exists() and time.time() < deadline:
+            time.sleep(0.01)
+        assert path.exists()
+    return wait
@@ -0,0 +1,130 @@
+"""
+Node definitions shaped like a real ComfyUI's /object_info (core nodes plus
+ComfyUI-MMAudio), covering every class the factory templates use, and the
+/models listing to go with them. Combo lists only hold what a server would
+list: LoadLatent's covers input/*.latent, LoadImage/LoadVideo the input folder.
+"""
+SAMPLERS = ["euler", "euler_ancestral", "heun", "dpm_2", "dpmpp_2m", "dpmpp_sde", "uni_pc", "res_multistep"]
+SCHEDULERS = ["simple", "sgm_uniform", "karras", "exponential", "ddim_uniform", "beta", "normal",
+              "linear_quadratic", "kl_optimal"]
+
+MODELS = {
+    "checkpoints": ["ltxv-13b-0.9.8-distilled-fp8.safetensors"],
+    "text_encoders": ["t5xxl_fp16.safetensors", "clip_l.safetensors", "umt5-xxl-enc-bf16.safetensors"],
+    "diffusion_models": ["flux1-dev-kontext_fp8_scaled.safetensors",
+                         "wan2.2_fun_vace_high_noise_14B_fp8_scaled.safetensors",
+                         "wan2.2_fun_vace_low_noise_14B_fp8_scaled.safetensors"],
+    "vae": ["ae.safetensors", "wan_2.1_vae.safetensors"],
+    "latent_upscale_models": ["ltxv-spatial-upscaler-0.9.8.safetensors"],
+    "mmaudio": ["mmaudio_large_44k_v2_fp16.safetensors", "mmaudio_vae_44k_fp16.safetensors",
+                "mmaudio_synchformer_fp16.safetensors", "apple_DFN5B-CLIP-ViT-H-14-384_fp16.safetensors"],
+}
+INPUT_FILES = ["example.png", "control.mp4", "mask.mp4"]
+
+SEED_MAX = 0xffffffffffffffff
+
+
+def INT(default, lo=0, hi=SEED_MAX, **kw):
+    return ["INT", {"default": default, "min": lo, "max": hi, **kw}]
+
+
+def FLOAT(default, lo=0.0, hi=100.0, **kw):
+    return ["FLOAT", {"default": default, "min": lo, "max": hi, **kw}]
+
+
+def COMBO(options, **kw):
+    return ["COMBO", {"options": list(options), **kw}]
+
+
+STRING = ["STRING", {"multiline": True, "dynamicPrompts": True}]
+PREFIX = ["STRING", {"default": "ComfyUI"}]
+BOOLEAN = ["BOOLEAN", {"default": False}]
+SEED = INT(0, control_after_generate=True)
+
+
+def node(required, outputs=(), optional=None):
+    optional = optional or {}
+    return {"input": {"required": required, "optional": optional},
+            "input_order": {"required": list(required), "optional": list(optional)},
+            "output": list(outputs), "output_name": list(outputs), "output_node": not outputs}
+
+
+OBJECT_INFO = {
+    "CheckpointLoaderSimple": node({"ckpt_name": [MODELS["checkpoints"]]}, ["MODEL", "CLIP", "VAE"]),
+    "CLIPLoader": node({"clip_name": [MODELS["text_encoders"]],
+                        "type": [["stable_diffusion", "sd3", "stable_audio", "mochi", "ltxv", "pixart",
+                                  "cosmos", "lumina2", "wan", "hidream", "chroma"]]},
+                       ["CLIP"], {"device": [["default", "cpu"], {"advanced": True}]}),
+    "DualCLIPLoader": node({"clip_name1": [MODELS["text_encoders"]], "clip_name2": [MODELS["text_encoders"]],
+                            "type": [["sdxl", "sd3", "flux", "hunyuan_video", "hidream"]]}, ["CLIP"]),
+    "UNETLoader": node({"unet_name": [MODELS["diffusion_models"]],
+                        "weight_dtype": [["default", "fp8_e4m3fn", "fp8_e4m3fn_fast", "fp8_e5m2"]]}, ["MODEL"]),
+    "VAELoader": node({"vae_name": [MODELS["vae"] + ["taesd", "taesdxl"]]}, ["VAE"]),
+    "LatentUpscaleModelLoader": node({"model_name": COMBO(MODELS["latent_upscale_models"])},
+                                     ["LATENT_UPSCALE_MODEL"]),
+    "CLIPTextEncode": node({"text": STRING, "clip": ["CLIP"]}, ["CONDITIONING"]),
+    "ModelSamplingLTXV": node({"model": ["MODEL"], "max_shift": FLOAT(2.05), "base_shift": FLOAT(0.95)},
+                              ["MODEL"], {"latent": ["LATENT"]}),
+    "ModelSamplingSD3": node({"model": ["MODEL"], "shift": FLOAT(3.0)}, ["MODEL"]),
+    "LTXVConditioning": node({"positive": ["CONDITIONING"], "negative": ["CONDITIONING"],
+                              "frame_rate": FLOAT(25.0, hi=1000.0)}, ["CONDITIONING", "CONDITIONING"]),
+    "EmptyLTXVLatentVideo": node({"width": INT(768, 64, 16384, step=32), "height": INT(512, 64, 16384, step=32),
+                                  "length": INT(97, 1, 16384, step=8), "batch_size": INT(1, 1, 4096)}, ["LATENT"]),
+    "EmptySD3LatentImage": node({"width": INT(1024, 16, 16384, step=16), "height": INT(1024, 16, 16384, step=16),
+                                 "batch_size": INT(1, 1, 4096)}, ["LATENT"]),
+    "LTXVImgToVideo": node({"positive": ["CONDITIONING"], "negative": ["CONDITIONING"], "vae": ["VAE"],
+                            "image": ["IMAGE"], "width": INT(768, 64, 16384, step=32),
+                            "height": INT(512, 64, 16384, step=32), "length": INT(97, 9, 16384, step=8),
+                            "batch_size": INT(1, 1, 4096), "strength": FLOAT(1.0, 0.0, 1.0)},
+                           ["CONDITIONING", "CONDITIONING", "LATENT"]),
+    "KSamplerSelect": node({"sampler_name": [SAMPLERS]}, ["SAMPLER"]),
+    "BasicScheduler": node({"model": ["MODEL"], "scheduler": [SCHEDULERS], "steps": INT(20, 1, 10000),
+                            "denoise": FLOAT(1.0, 0.0, 1.0)}, ["SIGMAS"]),
+    "RandomNoise": node({"noise_seed": SEED}, ["NOISE"]),
+    "CFGGuider": node({"model": ["MODEL"], "positive": ["CONDITIONING"], "negative": ["CONDITIONING"],
+                       "cfg": FLOAT(8.0)}, ["GUIDER"]),
+    "SamplerCustomAdvanced": node({"noise": ["NOISE"], "guider": ["GUIDER"], "sampler": ["SAMPLER"],
+                                   "sigmas": ["SIGMAS"], "latent_image": ["LATENT"]}, ["LATENT", "LATENT"]),
+    "KSampler": node({"model": ["MODEL"], "seed": SEED, "steps": INT(20, 1, 10000), "cfg": FLOAT(8.0),
+                      "sampler_name": [SAMPLERS], "scheduler": [SCHEDULERS], "positive": ["CONDITIONING"],
+                      "negative": ["CONDITIONING"], "latent_image": ["LATENT"],
+                      "denoise": FLOAT(1.0, 0.0, 1.0)}, ["LATENT"]),
+    "KSamplerAdvanced": node({"model": ["MODEL"], "add_noise": [["enable", "disable"]], "noise_seed": SEED,
+                              "steps": INT(20, 1, 10000), "cfg": FLOAT(8.0), "sampler_name": [SAMPLERS],
+                              "scheduler": [SCHEDULERS], "positive": ["CONDITIONING"],
+                              "negative": ["CONDITIONING"], "latent_image": ["LATENT"],
+                              "start_at_step": INT(0, 0, 10000), "end_at_step": INT(10000, 0, 10000),
+                              "return_with_leftover_noise": [["disable", "enable"]]}, ["LATENT"]),
+    "VAEDecode": node({"samples": ["LATENT"], "vae": ["VAE"]}, ["IMAGE"]),
+    "CreateVideo": node({"images": ["IMAGE"], "fps": FLOAT(30.0, 1.0, 120.0)}, ["VIDEO"], {"audio": ["AUDIO"]}),
+    "SaveVideo": node({"video": ["VIDEO"], "filename_prefix": PREFIX, "format": COMBO(["auto", "mp4"]),
+                       "codec": COMBO(["auto", "h264"])}),
+    "SaveImage": node({"images": ["IMAGE"], "filename_prefix": PREFIX}),
+    "SaveLatent": node({"samples": ["LATENT"], "filename_prefix": ["STRING", {"default": "latents/ComfyUI"}]}),
+    # Only input/*.latent is listed; "name [output]" passes ComfyUI's own VALIDATE_INPUTS
+    "LoadLatent": node({"latent": [[]]}, ["LATENT"]),
+    "LoadImage": node({"image": [INPUT_FILES[:1], {"image_upload": True}]}, ["IMAGE", "MASK"]),
+    "LoadVideo": node({"file": COMBO(INPUT_FILES[1:], video_upload=True)}, ["VIDEO"]),
+    "GetVideoComponents": node({"video": ["VIDEO"]}, ["IMAGE", "AUDIO", "FLOAT"]),
+    "ImageToMask": node({"image": ["IMAGE"], "channel": [["red", "green", "blue", "alpha"]]}, ["MASK"]),
+    "LTXVLatentUpsampler": node({"samples": ["LATENT"], "upscale_model": ["LATENT_UPSCALE_MODEL"],
+                                 "vae": ["VAE"]}, ["LATENT"]),
+    "WanVaceToVideo": node({"positive": ["CONDITIONING"], "negative": ["CONDITIONING"], "vae": ["VAE"],
+                            "width": INT(832, 16, 16384, step=16), "height": INT(480, 16, 16384, step=16),
+                            "length": INT(81, 1, 16384, step=4), "batch_size": INT(1, 1, 4096),
+                            "strength": FLOAT(1.0, 0.0, 1000.0)},
+                           ["CONDITIONING", "CONDITIONING", "LATENT", "INT"],
+                           {"control_video": ["IMAGE"], "control_masks": ["MASK"], "reference_image": ["IMAGE"]}),
+    "TrimVideoLatent": node({"samples": ["LATENT"], "trim_amount": INT(0, 0, 99999)}, ["LATENT"]),
+    "MMAudioModelLoader": node({"mmaudio_model": [MODELS["mmaudio"]],
+                                "base_precision": [["fp16", "fp32", "bf16"]]}, ["MMAUDIO_MODEL"]),
+    "MMAudioFeatureUtilsLoader": node({"vae_model": [MODELS["mmaudio"]], "synchformer_model": [MODELS["mmaudio"]],
+                                       "clip_model": [MODELS["mmaudio"]]}, ["MMAUDIO_FEATUREUTILS"],
+                                      {"mode": [["16k", "44k"]], "precision": [["fp16", "fp32", "bf16"]]}),
+    "MMAudioSampler": node({"mmaudio_model": ["MMAUDIO_MODEL"], "feature_utils": ["MMAUDIO_FEATUREUTILS"],
+                            "duration": FLOAT(8.0, 1.0, 1000.0), "steps": INT(25, 1, 1000),
+                            "cfg": FLOAT(4.5, 1.0, 100.0), "seed": SEED, "prompt": STRING,
+                            "negative_prompt": STRING, "mask_away_clip": BOOLEAN, "force_offload": BOOLEAN},
+                           ["AUDIO"], {"images": ["IMAGE"]}),
+    "SaveAudio": node({"audio": ["AUDIO"], "filename_prefix": ["STRING", {"default": "audio/ComfyUI"}]}),
+}
@@ -0,0 +1,133 @@
+import shutil
+import threading
+from pathlib import Path
+
+import pytest
+
+import factory
+from pipeline import assemble
+from pipeline.assemble import AssemblyError, Clip, Track, plan, resolve
+from pipeline.retrieve import Retriever
+
+H264 = {"codec": "h264", "profile": "High", "width": 768, "height": 512, "pix_fmt": "yuv420p",
+        "fps": "24/1", "time_base": "1/12288", "duration": 2.7}
+
+
+@pytest.fixture
+def clips(tmp_path, monkeypatch):
+    """clips(n, **odd) -> n empty .mp4 files that probe() as H264, except the names in odd."""
+    shapes = {}
+    monkeypatch.setattr(assemble, "probe", lambda path: shapes[Path(path).name])
+
+    def make(n, **odd):
+        paths = []
+        for i in range(n):
+            path = tmp_path / f"scene_{i:02d}.mp4"
+            path.touch()
+            shapes[path.name] = {**H264, **odd.get(path.stem, {})}
+            paths.append(path)
+        return paths
+    return make
+
+
+def kinds(segments):
+    return [(kind, [(c.source.stem, c.start, c.end) for c in group]) for kind, group in segments]
+
+
+# --- planning ---
+
+def test_matching_clips_are_all_copied(clips):
+    target, segments = plan(clips(60))
+    assert target == H264
+    assert {kind for kind, _ in segments} == {"copy"} and len(segments) == 60
+
+
+def test_only_trims_fades_and_odd_clips_are_encoded(clips):
+    a, b, c, d, e = clips(5, scene_03={"width": 1280, "height": 720})
+    _, segments = plan([a, Clip(b, end=1.5), Clip(c, fade_in=0.5), d, e])
+    assert [kind for kind, _ in segments] == ["copy", "encode", "encode", "encode", "copy"]
+
+
+def test_target_is_the_commonest_shape(clips):
+    paths = clips(3, scene_00={"fps": "25/1"})
+    target, segments = plan(paths)
+    assert target["fps"] == "24/1" and segments[0][0] == "encode"
+
+
+def test_crossfade_gets_its_own_segment(clips):
+    a, b, c = clips(3)
+    _, segments = plan([a, Clip(b, crossfade=0.5), c])
+    assert kinds(segments) == [
+        ("encode", [("scene_00", 0.0, 2.2)]),                           # a, minus the overlap
+        ("encode", [("scene_00", 2.2, 2.7), ("scene_01", 0.0, 0.5)]),   # a's end blended into b
+        ("encode", [("scene_01", 0.5, 2.7)]),
+        ("copy", [("scene_02", 0.0, None)]),
+    ]
+
+
+def test_impossible_timelines_are_refused(clips):
+    a, b = clips(2)
+    with pytest.raises(AssemblyError, match="nothing to crossfade"):
+        plan([Clip(a, crossfade=0.5), b])
+    with pytest.raises(AssemblyError, match="longer than the clip"):
+        plan([a, Clip(b, crossfade=3.0)])
+    with pytest.raises(AssemblyError, match="leaves nothing"):
+        plan([a, Clip(b, start=2.0, end=1.0, crossfade=0.5)])
+    with pytest.raises(AssemblyError, match="empty"):
+        plan([])
+
+
+# --- the ffmpeg calls ---
+
+def test_encodes_run_in_parallel_and_mux_copies_the_rest(clips, tmp_path, monkeypatch):
+    a, b, c, d = clips(4)
+    music = tmp_path / "music.flac"
+    music.touch()
+    calls, threads = [], set()
+
+    def run(cmd):
+        calls.append(cmd)
+        threads.add(threading.current_thread().name)
+        Path(cmd[-1]).touch()
+        return ""
+
+    monkeypatch.setattr(assemble, "_run", run)
+    out = assemble.assemble([a, Clip(b, end=1.0), Clip(c, fade_out=0.5), d], tmp_path / "cut" / "final.mp4",
+                            audio=[Track(music, start=1.5)], workers=2)
+    assert out.exists() and not list(out.parent.glob(".assemble_*"))
+    encodes, (mux,) = calls[:-1], calls[-1:]
+    assert len(encodes) == 2 and all("libx264" in cmd for cmd in encodes)
+    assert all(t.startswith("encode") for t in threads - {threading.current_thread().name})
+    assert mux[mux.index("-c:v") + 1] == "copy" and "-f" in mux and "concat" in mux
+    assert any("adelay=1500" in arg for arg in mux)
+    assert mux[mux.index("-t") + 1] == f"{2.7 * 3 + 1.0:.3f}"
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs ffmpeg")
+def test_real_clips_join_by_stream_copy(tmp_path, monkeypatch):
+    monkeypatch.setattr(assemble, "_probes", {})
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"clip_{i}.mp4"
+        assemble._run(["ffmpeg", "-y", "-v", "error", "-f", "lavfi", "-i", "testsrc=size=320x240:rate=24:d=1",
+                       "-c:v", "libx264", "-pix_fmt", "yuv420p", str(path)])
+        paths.append(path)
+    out = assemble.assemble(paths, tmp_path / "joined.mp4")
+    assert abs(assemble.probe(out)["duration"] - 3.0) < 0.1
+
+
+# --- sources ---
+
+def test_jobs_resolve_to_their_downloaded_files(isolated, tmp_path):
+    job = factory.submit(factory.build_text_to_video("a boat at dawn", seed=4))
+    job.artifacts = [str(p) for p in Retriever(isolated.url, "p", root=tmp_path).fetch(job.result(timeout=30))
+                     .result(timeout=30)]
+    video = resolve(job)
+    assert video.suffix == ".mp4" and video.exists()
+    with pytest.raises(AssemblyError, match="no audio file"):
+        resolve(job, audio=True)
+    job.artifacts = []
+    with pytest.raises(AssemblyError, match="project="):
+        resolve(job)
+    with pytest.raises(AssemblyError, match="need project="):
+        resolve(job.result())
@@ -0,0 +1,35 @@
+import factory
+from pipeline.cache import ResultCache, workflow_key
+
+
+def test_hit_without_project_checks_the_server(isolated, remembered):
+    wf = factory.build_text_to_image("a yacht", seed=21)
+    factory.queue(wf, timeout=30)
+    remembered(wf)
+    assert factory.submit(wf).cached
+    isolated.files.clear()                          # output folder wiped / server rebuilt
+    job = factory.submit(wf)
+    assert not job.cached and job.result(timeout=30)
+    assert len(isolated.history) == 2
+    assert factory.CACHE.stats()["stale"] == 1
+
+
+def test_unverifiable_entry_is_not_served(tmp_path):
+    cache = ResultCache(root=tmp_path)
+    wf = {"1": {"class_type": "SaveImage", "inputs": {"filename_prefix": "x"}}}
+    outputs = {"1": {"images": [{"filename": "x_00001_.png", "subfolder": "", "type": "output"}]}}
+    cache.put(wf, outputs)                          # no files, no server: nothing to check against
+    assert cache.get(wf) is None
+    cache.put(wf, {"1": {"text": ["done"]}})        # no files at all - nothing can go stale
+    assert cache.get(wf)["outputs"] == {"1": {"text": ["done"]}}
+
+
+def test_hit_with_local_artifacts_checks_sizes(tmp_path):
+    cache = ResultCache(root=tmp_path / "results")
+    art = tmp_path / "a.mp4"
+    art.write_bytes(b"x" * 10)
+    wf = {"1": {"class_type": "SaveVideo", "inputs": {"filename_prefix": "a"}}}
+    key = cache.put(wf, {"1": {}}, artifacts=[art])
+    assert cache.get(wf, key)["artifacts"][0]["bytes"] == 10
+    art.write_bytes(b"x" * 5)
+    assert cache.get(wf) is None and key == workflow_key(wf)
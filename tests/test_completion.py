@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from pipeline import completion, transport
+from pipeline.completion import CompletionEngine, WorkflowError
+from pipeline.fake_comfy import FakeComfy
+
+PROMPT = {"1": {"class_type": "SaveImage", "inputs": {"filename_prefix": "t"}}}
+
+
+@pytest.fixture
+def engine(fake):
+    eng = CompletionEngine(fake.url, max_poll=0.2).start()
+    assert eng.connected
+    yield eng
+    eng.close()
+
+
+def queue(fake, engine):
+    r = transport.post(f"{fake.url}/prompt", json={"prompt": PROMPT, "client_id": engine.client_id})
+    return r.json()["prompt_id"]
+
+
+def test_resolves_on_executing_none(fake, engine):
+    seen = []
+    engine.add_listener(seen.append)
+    outputs = engine.wait(queue(fake, engine), timeout=10)
+    assert outputs["1"]["images"]
+    assert any(m["type"] == "executing" and m["data"].get("node") is None for m in seen)
+    assert engine.reconnects == 0
+
+
+def test_socket_drop_falls_back_to_history(monkeypatch):
+    with FakeComfy(exec_time=0.3) as fake:
+        eng = CompletionEngine(fake.url, max_poll=0.2).start()
+        try:
+            def refuse(url, *a, **kw):
+                raise OSError("connection refused")
+
+            monkeypatch.setattr(completion.ws, "connect", refuse)     # socket stays down
+            pid = queue(fake, eng)
+            fut = eng.track(pid)
+            fake.drop_sockets()
+            outputs = fut.result(timeout=10)
+            assert outputs["1"]["images"]
+            assert not eng.connected and eng.reconnects == 1
+        finally:
+            eng.close()
+
+
+def test_completion_before_track_is_kept(fake, engine):
+    finished = []
+    engine.add_listener(lambda m: m["type"] == "executing" and m["data"].get("node") is None
+                        and finished.append(m["data"]["prompt_id"]))
+    pid = queue(fake, engine)
+    deadline = time.time() + 10
+    while pid not in finished and time.time() < deadline:
+        time.sleep(0.01)
+    assert pid in finished and pid not in engine.pending()
+    outputs = engine.track(pid).result(timeout=5)
+    assert outputs["1"]["images"]
+
+
+def test_error_raises_workflow_error(fake, engine):
+    fake.fail_rate = 1.0
+    with pytest.raises(WorkflowError):
+        engine.wait(queue(fake, engine), timeout=10)
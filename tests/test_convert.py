@@ -0,0 +1,164 @@
+import copy
+import json
+import os
+
+import pytest
+
+from pipeline import schema
+from pipeline.convert import BYPASSED, MUTED, ConvertError, Converter, convert
+from pipeline.fake_comfy import FakeComfy
+
+from object_info import MODELS, OBJECT_INFO
+
+CKPT = MODELS["checkpoints"][0]
+
+
+def ui_node(nid, kind, widgets=None, inputs=(), outputs=(), mode=0, order=None):
+    return {"id": nid, "type": kind, "mode": mode, "order": nid if order is None else order,
+            "widgets_values": widgets if widgets is not None else [],
+            "inputs": [{"name": n, "type": t, "link": link} for n, t, link in inputs],
+            "outputs": [{"name": t, "type": t} for t in outputs]}
+
+
+def export():
+    """A text-to-image graph as the editor saves it: a Reroute on the CLIP, a bypassed
+    ModelSamplingSD3 on the model, the seed driven by a PrimitiveNode, a Note and a muted loader."""
+    nodes = [
+        ui_node(1, "CheckpointLoaderSimple", [CKPT], outputs=["MODEL", "CLIP", "VAE"]),
+        ui_node(2, "CLIPTextEncode", ["a boat at dawn"], [("clip", "CLIP", 11)], ["CONDITIONING"]),
+        ui_node(3, "KSampler", [7, "randomize", 20, 6.5, "euler", "karras", 1.0],
+                [("model", "MODEL", 13), ("positive", "CONDITIONING", 3), ("negative", "CONDITIONING", 15),
+                 ("latent_image", "LATENT", 4), ("seed", "INT", 14)], ["LATENT"]),
+        ui_node(4, "EmptySD3LatentImage", [512, 768, 1], outputs=["LATENT"]),
+        ui_node(5, "VAEDecode", inputs=[("samples", "LATENT", 5), ("vae", "VAE", 6)], outputs=["IMAGE"]),
+        ui_node(6, "SaveImage", ["boat"], [("images", "IMAGE", 7)]),
+        ui_node(7, "Note", ["remember the boat"]),
+        ui_node(8, "LoadImage", ["example.png", "image"], outputs=["IMAGE", "MASK"], mode=MUTED),
+        ui_node(10, "Reroute", inputs=[("", "*", 10)], outputs=["CLIP"]),
+        ui_node(11, "ModelSamplingSD3", [3.0], [("model", "MODEL", 12)], ["MODEL"], mode=BYPASSED),
+        ui_node(12, "PrimitiveNode", [123456], outputs=["INT"]),
+    ]
+    links = [[10, 1, 1, 10, 0, "CLIP"], [11, 10, 0, 2, 0, "CLIP"], [12, 1, 0, 11, 0, "MODEL"],
+             [13, 11, 0, 3, 0, "MODEL"], [3, 2, 0, 3, 1, "CONDITIONING"], [15, 2, 0, 3, 2, "CONDITIONING"],
+             [4, 4, 0, 3, 3, "LATENT"], [14, 12, 0, 3, 4, "INT"], [5, 3, 0, 5, 0, "LATENT"],
+             [6, 1, 2, 5, 1, "VAE"], [7, 5, 0, 6, 0, "IMAGE"]]
+    return {"last_node_id": 12, "last_link_id": 15, "nodes": nodes, "links": links, "version": 0.4}
+
+
+# --- widgets ---
+
+def test_seed_control_value_is_skipped():
+    graph = convert(export(), OBJECT_INFO)
+    inputs = graph["3"]["inputs"]
+    assert (inputs["steps"], inputs["cfg"], inputs["sampler_name"], inputs["scheduler"], inputs["denoise"]) \
+        == (20, 6.5, "euler", "karras", 1.0)
+    assert graph["4"]["inputs"] == {"width": 512, "height": 768, "batch_size": 1}
+
+
+def test_upload_placeholder_is_skipped():
+    ui = {"nodes": [ui_node(1, "LoadImage", ["example.png", "image"], outputs=["IMAGE", "MASK"]),
+                    ui_node(2, "SaveImage", ["x"], [("images", "IMAGE", 1)])],
+          "links": [[1, 1, 0, 2, 0, "IMAGE"]]}
+    assert convert(ui, OBJECT_INFO)["1"]["inputs"] == {"image": "example.png"}
+
+
+def test_dict_widgets_are_matched_by_name():
+    ui = {"nodes": [ui_node(1, "LoadVideo", {"file": "control.mp4", "videopreview": {"hidden": False}},
+                            outputs=["VIDEO"]),
+                    ui_node(2, "SaveVideo", {"codec": "h264", "format": "mp4", "filename_prefix": "clip"},
+                            [("video", "VIDEO", 1)])],
+          "links": [[1, 1, 0, 2, 0, "VIDEO"]]}
+    graph = convert(ui, OBJECT_INFO)
+    assert graph["1"]["inputs"] == {"file": "control.mp4"}
+    assert graph["2"]["inputs"] == {"filename_prefix": "clip", "format": "mp4", "codec": "h264", "video": ["1", 0]}
+
+
+def test_missing_widgets_take_defaults():
+    ui = {"nodes": [ui_node(1, "EmptySD3LatentImage", [640], outputs=["LATENT"])], "links": []}
+    assert convert(ui, OBJECT_INFO)["1"]["inputs"] == {"width": 640, "height": 1024, "batch_size": 1}
+
+
+# --- links ---
+
+def test_reroute_bypass_and_primitive_resolve():
+    graph = convert(export(), OBJECT_INFO)
+    assert graph["2"]["inputs"]["clip"] == ["1", 1]            # through the Reroute
+    assert graph["3"]["inputs"]["model"] == ["1", 0]           # around the bypassed ModelSamplingSD3
+    assert graph["3"]["inputs"]["seed"] == 123456               # the PrimitiveNode's value, not the widget's 7
+    assert graph["5"]["inputs"] == {"samples": ["3", 0], "vae": ["1", 2]}
+
+
+def test_notes_muted_and_virtual_nodes_are_dropped():
+    graph = convert(export(), OBJECT_INFO)
+    assert sorted(graph, key=int) == ["1", "2", "3", "4", "5", "6"]
+    assert graph["6"]["_meta"]["title"] == "SaveImage"
+
+
+def test_unknown_node_types_are_refused():
+    ui = export()
+    ui["nodes"][3]["type"] = "EmptyHunyuanLatentVideo"
+    with pytest.raises(ConvertError, match="EmptyHunyuanLatentVideo"):
+        convert(ui, OBJECT_INFO)
+    ui["nodes"][3]["mode"] = MUTED         # muted: never sent, so it doesn't matter
+    assert "4" not in convert(ui, OBJECT_INFO)
+
+
+# --- memo ---
+
+@pytest.fixture
+def server():
+    fake = FakeComfy(object_info=copy.deepcopy(OBJECT_INFO), models=MODELS).start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def converter(tmp_path):
+    return Converter(root=tmp_path / "converted", schemas=schema.SchemaCache(root=tmp_path / "schema"))
+
+
+def saved(tmp_path, ui):
+    path = tmp_path / "boat.json"
+    path.write_text(json.dumps(ui), encoding="utf-8")
+    return path
+
+
+def test_repeat_load_is_a_hit(tmp_path, server, converter):
+    path = saved(tmp_path, export())
+    first = converter.load(path, server.url)
+    fetches = converter.schemas.fetches
+    assert converter.load(path, server.url) == first == convert(export(), OBJECT_INFO)
+    assert converter.stats() == {"hits": 1, "misses": 1} and converter.schemas.fetches == fetches
+    # a fresh Converter over the same directory reads it back too
+    again = Converter(root=converter.root, schemas=converter.schemas)
+    assert again.load(path, server.url) == first and again.stats()["hits"] == 1
+
+
+def test_touched_file_is_a_hit_edited_one_a_miss(tmp_path, server, converter):
+    path = saved(tmp_path, export())
+    converter.load(path, server.url)
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    converter.load(path, server.url)
+    assert converter.stats() == {"hits": 1, "misses": 1}        # mtime moved, sha didn't
+    ui = export()
+    ui["nodes"][1]["widgets_values"] = ["a kite at noon"]
+    path.write_text(json.dumps(ui), encoding="utf-8")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 2 * 10**9))
+    assert converter.load(path, server.url)["2"]["inputs"]["text"] == "a kite at noon"
+    assert converter.stats() == {"hits": 1, "misses": 2}
+
+
+def test_new_schema_is_a_miss(tmp_path, server, converter):
+    path = saved(tmp_path, export())
+    converter.load(path, server.url)
+    server.object_info["KSampler"]["input"]["required"]["denoise"][1]["default"] = 0.5
+    converter.schemas.refresh(server.url)
+    converter.load(path, server.url)
+    assert converter.stats() == {"hits": 0, "misses": 2}
+
+
+def test_api_format_files_pass_through(tmp_path, server, converter):
+    api = convert(export(), OBJECT_INFO)
+    assert converter.load(saved(tmp_path, api), server.url) == api
+    assert converter.stats() == {"hits": 0, "misses": 0}
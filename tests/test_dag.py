@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+import factory
+from pipeline import dag
+
+
+def loads(fake):
+    """{LoadImage input: outputs} for every prompt fake has run that loads an image."""
+    out = {}
+    for h in fake.history.values():
+        for n in h["prompt"][2].values():
+            if n["class_type"] == "LoadImage":
+                out[n["inputs"]["image"]] = h["outputs"]
+    return out
+
+
+# --- against the fake server ---
+
+def test_each_video_starts_when_its_own_keyframe_lands(isolated):
+    isolated.exec_time = 0.1
+    g = dag.Graph({"keyframe": 1, "video": 3})
+    kfs, videos = [], []
+    for i in range(3):
+        kfs.append(g.add(f"keyframe:{i}", "keyframe", lambda i=i: factory.submit(
+            factory.build_text_to_image(f"shot {i}", seed=i + 1))))
+        videos.append(g.add(f"video:{i}", "video", lambda kf, i=i: factory.submit(
+            factory.build_text_to_video(f"shot {i}", seed=i + 1)), deps=[kfs[i]]))
+    results = g.run(timeout=60)
+    assert len(results) == 6 and not g.failed()
+    assert videos[0].started_at < kfs[2].finished_at      # not held back for the whole keyframe stage
+    for kf, video in zip(kfs, videos):
+        assert video.ready_at >= kf.finished_at
+    assert [t.name for t in g.critical_path()][-1] == max(videos, key=lambda t: t.finished_at).name
+
+
+def test_produce_animates_each_scenes_own_keyframe(isolated):
+    out = factory.produce([{"prompt": "a boat", "seed": 1, "audio": "waves"}, {"prompt": "a kite", "seed": 2}],
+                          limits={"keyframe": 1}, timeout=60)
+    assert not out["failed"] and out["final"] is None
+    report = out["report"]
+    assert report["tasks"] == 5 and set(report["stages"]) == {"keyframe", "video", "audio"}
+    assert report["stages"]["keyframe"]["limit"] == 1
+    animated = loads(isolated)
+    for seed in (1, 2):
+        image = next(name for name in animated if name.startswith(f"img_{seed}_"))
+        assert next(iter(animated[image].values()))["images"][0]["filename"].startswith(f"i2v_{seed}_")
+    assert out["scenes"][0]["audio"] == [] and out["scenes"][1]["audio"] is None
+
+
+def test_failed_keyframe_fails_only_its_scene(isolated, monkeypatch):
+    submit = factory.submit
+
+    def refusing(workflow, **kw):
+        if kw.get("label") == "keyframe 0":
+            raise Exception("no room for keyframe 0")
+        return submit(workflow, **kw)
+
+    monkeypatch.setattr(factory, "submit", refusing)
+    out = factory.produce([{"prompt": "a boat", "seed": 1}, {"prompt": "a kite", "seed": 2}], timeout=60)
+    assert set(out["failed"]) == {"keyframe:0", "video:0"}
+    assert "keyframe:0 failed" in str(out["failed"]["video:0"])
+    assert out["scenes"][1]["video"] == []
+
+
+# --- scheduling ---
+
+def test_stage_limit_holds_tasks_back():
+    g = dag.Graph({"slow": 2})
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def work():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return "ok"
+
+    for i in range(6):
+        g.add(f"t{i}", "slow", work)
+    assert len(g.run(timeout=10)) == 6
+    assert peak[0] == 2
+    stage = g.report()["stages"]["slow"]
+    assert stage["tasks"] == 6 and stage["max_slot_wait_s"] >= 0.08
+
+
+def test_results_flow_to_dependents():
+    g = dag.Graph()
+    a = g.add("a", "x", lambda: 2)
+    b = g.add("b", "x", lambda: 3)
+    g.add("sum", "y", lambda x, y: x + y, deps=[a, "b"])
+    assert g.run(timeout=10)["sum"] == 5
+    with pytest.raises(ValueError):
+        g.add("a", "x", lambda: 1)
@@ -0,0 +1,109 @@
+import time
+
+import pytest
+
+import factory
+from pipeline import admission
+
+
+def history_count(fake):
+    return len(fake.history)
+
+
+def test_cache_hit_skips_admission(isolated, monkeypatch, remembered):
+    wf = factory.build_text_to_image("a yacht", seed=3)
+    factory.queue(wf, timeout=30)
+    remembered(wf)
+    calls = []
+
+    def busy(server):
+        calls.append(server)
+        return 24.0, 23.5           # card full of someone else's work
+
+    monkeypatch.setattr(admission, "server_capacity", busy)
+    monkeypatch.setattr(factory, "ADMIT_WAIT", 3)
+    started = time.time()
+    job = factory.submit(wf)
+    assert job.cached and time.time() - started < 1
+    assert calls == []
+    assert history_count(isolated) == 1
+
+
+def test_no_cache_means_regenerate_even_with_journal(isolated, monkeypatch):
+    monkeypatch.setattr(factory, "CACHE", None)
+    wf = factory.build_text_to_image("a yacht", seed=4)
+    factory.queue(wf, timeout=30)
+    job = factory.submit(wf)
+    assert not job.cached
+    job.result(timeout=30)
+    assert history_count(isolated) == 2
+
+
+def test_rerun_picks_up_job_finished_while_away(isolated, monkeypatch):
+    from pipeline import transport
+    from pipeline.cache import workflow_key
+    monkeypatch.setattr(factory, "CACHE", None)
+    wf = factory.build_text_to_image("a yacht", seed=5)
+    # an earlier process queued it and died before it finished
+    pid = transport.post_json(f"{isolated.url}/prompt", {"prompt": wf, "client_id": "gone"})["prompt_id"]
+    factory.JOURNAL.submitted(workflow_key(wf), pid, isolated.url)
+    deadline = time.time() + 10
+    while pid not in isolated.history and time.time() < deadline:
+        time.sleep(0.02)
+    job = factory.submit(wf)
+    assert job.cached and job.prompt_id == pid
+    assert history_count(isolated) == 1
+    # claimed once - asking again renders it again
+    factory.submit(wf).result(timeout=30)
+    assert history_count(isolated) == 2
+
+
+def make_busy(fake, gb):
+    """Other processes hold gb of the fake card."""
+    fake.vram_other = gb
+    fake.vram_free = fake.vram_total - int(gb * 1024**3)
+
+
+def test_busy_card_returns_job_at_once_and_posts_later(isolated, monkeypatch):
+    monkeypatch.setattr(admission, "CAPACITY_TTL", 0.0)
+    make_busy(isolated, 23.5)
+    started = time.time()
+    job = factory.submit(factory.build_text_to_image("a yacht", seed=6))
+    assert time.time() - started < 1 and job.prompt_id is None
+    time.sleep(0.3)
+    assert history_count(isolated) == 0
+    make_busy(isolated, 0.0)
+    assert job.result(timeout=30) and job.prompt_id in isolated.history
+
+
+def test_deferred_job_feeds_the_stage_graph(isolated, monkeypatch):
+    monkeypatch.setattr(admission, "CAPACITY_TTL", 0.0)
+    make_busy(isolated, 23.5)
+    out = factory._with_files(factory.submit(factory.build_text_to_image("a yacht", seed=8)), None)
+    make_busy(isolated, 0.0)
+    result = out.result(timeout=30)
+    assert result["outputs"] and result["server"] == isolated.url
+
+
+def test_admission_wait_runs_out_loudly(isolated, monkeypatch):
+    monkeypatch.setattr(factory, "ADMIT_WAIT", 0.1)
+    make_busy(isolated, 23.5)
+    job = factory.submit(factory.build_text_to_image("a yacht", seed=7))
+    with pytest.raises(Exception, match="waited"):
+        job.result(timeout=30)
+    assert history_count(isolated) == 0
+
+
+def test_capacity_read_once_per_burst(isolated, monkeypatch):
+    from pipeline import transport
+    get_json, stats = transport.get_json, []
+
+    def counting(url, **kw):
+        if url.endswith("/system_stats"):
+            stats.append(url)
+        return get_json(url, **kw)
+
+    monkeypatch.setattr(transport, "get_json", counting)
+    for job in [factory.submit(factory.build_text_to_image("a yacht", seed=10 + i)) for i in range(4)]:
+        job.result(timeout=30)
+    assert len(stats) == 1
@@ -0,0 +1,161 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import factory
+from pipeline import transport
+from pipeline.fake_comfy import FakeComfy
+from pipeline.health import CLOSED, HALF_OPEN, OPEN, Breaker, Monitor, Target
+from pipeline.scheduler import Backend, Scheduler
+
+
+class Hanging:
+    """A service that accepts connections and never answers in time."""
+
+    def __init__(self, delay=2.0):
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                time.sleep(delay)
+                self.send_response(200)
+                self.end_headers()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def outage(monkeypatch, url):
+    """Requests to url fail while the returned list is non-empty."""
+    get_json, down = transport.get_json, [True]
+
+    def failing(u, **kw):
+        if down and u.startswith(url):
+            raise OSError("connection refused")
+        return get_json(u, **kw)
+
+    monkeypatch.setattr(transport, "get_json", failing)
+    return down
+
+
+def test_snapshot_has_queue_vram_and_telemetry(fake):
+    fake.vram_other = 4.0
+    fake.vram_free = fake.vram_total - 4 * 1024**3
+    mon = Monitor([Target("gpu0", fake.url, gpu=0)],
+                  telemetry=lambda: {0: {"utilization": 87, "memory_used_mb": 4096, "memory_total_mb": 24576}})
+    try:
+        st = mon.poll()["gpu0"]
+        assert st.healthy and st.breaker == CLOSED
+        assert (st.sample.running, st.sample.pending) == (0, 0)
+        assert st.sample.vram_total_gb == 24 and st.sample.vram_free_gb == 20
+        assert st.sample.gpu_util == 87 and mon.gpus()[0]["memory_used_mb"] == 4096
+        assert mon.status(fake.url + "/") is st
+    finally:
+        mon.close()
+
+
+def test_dead_and_hanging_services_dont_stall_a_round(fake):
+    hanging = Hanging()
+    mon = Monitor([Target("gpu0", fake.url), Target("tts", hanging.url, kind="http"),
+                   Target("gone", "http://127.0.0.1:9", kind="http")], timeout=0.5)
+    try:
+        started = time.time()
+        snap = mon.poll()
+        assert time.time() - started < 1.5
+        assert snap["gpu0"].healthy and not snap["tts"].healthy and not snap["gone"].healthy
+        assert "time" in snap["tts"].sample.error                # timed out, or the round gave up on it
+    finally:
+        mon.close()
+        hanging.close()
+
+
+def test_breaker_opens_skips_polls_and_recovers(fake, monkeypatch):
+    mon = Monitor([Target("gpu0", fake.url)], fails=2, cooldown=0.3)
+    try:
+        down = outage(monkeypatch, fake.url)
+        mon.poll()
+        assert mon.snapshot()["gpu0"].breaker == CLOSED          # one miss isn't an outage
+        mon.poll()
+        assert mon.snapshot()["gpu0"].breaker == OPEN and not mon.snapshot()["gpu0"].healthy
+        down.clear()
+        requests = fake.requests
+        mon.poll()
+        assert fake.requests == requests                         # out of rotation: not even polled
+        time.sleep(0.35)
+        st = mon.poll()["gpu0"]                                   # half-open probe gets through
+        assert st.breaker == CLOSED and st.healthy and mon.stats()["gpu0"]["trips"] == 1
+    finally:
+        mon.close()
+
+
+def test_breaker_states():
+    b = Breaker(fails=2, cooldown=10, recover=2)
+    b.record(False, 0)
+    b.record(False, 1)
+    assert b.state == OPEN and not b.allow(5)
+    assert b.allow(11) and b.state == HALF_OPEN
+    b.record(True, 11)
+    assert b.state == HALF_OPEN
+    b.record(False, 12)
+    assert b.state == OPEN and b.trips == 1                      # a failed probe reopens, isn't a new trip
+    assert b.allow(22)
+    b.record(True, 22)
+    b.record(True, 23)
+    assert b.state == CLOSED
+
+
+def test_ring_keeps_the_last_samples(fake):
+    mon = Monitor([Target("gpu0", fake.url)], ring=5)
+    try:
+        for _ in range(8):
+            mon.poll()
+        assert len(mon.history("gpu0")) == 5 and len(mon.history(fake.url)) == 5
+        assert mon.history("gpu0", seconds=0) == [] and mon.stats()["gpu0"]["uptime"] == 1.0
+    finally:
+        mon.close()
+
+
+def test_failed_posts_trip_the_breaker(fake):
+    mon = Monitor([Target("gpu0", fake.url)], fails=2)
+    try:
+        mon.poll()
+        mon.failed(fake.url, OSError("reset"))
+        mon.failed(fake.url, OSError("reset"))
+        st = mon.snapshot()["gpu0"]
+        assert st.breaker == OPEN and not st.healthy and "reset" in st.sample.error
+    finally:
+        mon.close()
+
+
+def test_scheduler_routes_around_a_tripped_backend(monkeypatch):
+    fakes = [FakeComfy(exec_time=0.02).start() for _ in range(2)]
+    mon = Monitor([Target(f"gpu{i}", f.url) for i, f in enumerate(fakes)], interval=0.1, fails=1, cooldown=60)
+    sched = None
+    try:
+        mon.poll()
+        outage(monkeypatch, fakes[0].url)
+        mon.start()
+        deadline = time.time() + 10
+        while mon.snapshot()["gpu0"].healthy and time.time() < deadline:
+            time.sleep(0.02)
+        backends = [Backend(f"gpu{i}", f.url, vram_gb=24) for i, f in enumerate(fakes)]
+        sched = Scheduler(backends, refresh=0.1, monitor=mon, pin_families=False).start()
+        jobs = [sched.submit(factory.build_text_to_image(f"kite {i}", seed=i + 1)) for i in range(4)]
+        for job in jobs:
+            assert job.result(timeout=30)
+        assert not fakes[0].history and len(fakes[1].history) == 4
+    finally:
+        if sched is not None:
+            sched.close()
+        mon.close()
+        for f in fakes:
+            f.stop()
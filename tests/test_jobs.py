@@ -0,0 +1,46 @@
+from concurrent.futures import Future
+
+import pytest
+
+import factory
+from pipeline import jobs, validation
+from pipeline.jobs import Job
+
+
+def done_job(wf, label):
+    fut = Future()
+    fut.set_result({"wf": wf})
+    return Job("pid-" + str(wf), fut, wf, label)
+
+
+def test_refused_submit_is_yielded_not_raised():
+    labels = []
+
+    def submit(wf, label):
+        labels.append(label)
+        if wf == 2:
+            raise validation.ValidationError(["node 3 (KSampler): bad sampler"], label)
+        return done_job(wf, label)
+
+    out = list(jobs.gather(submit, [("a", 1), ("b", 2), ("c", 3)], window=1))
+    assert labels == ["a", "b", "c"]
+    assert sorted(j.index for j in out) == [0, 1, 2]
+    bad = next(j for j in out if j.index == 1)
+    assert bad.label == "b" and bad.prompt_id is None and repr(bad) == "<Job b done>"
+    with pytest.raises(validation.ValidationError):
+        bad.result()
+    assert sorted(j.result()["wf"] for j in out if j.index != 1) == [1, 3]
+
+
+def test_factory_gather_carries_labels(fake, monkeypatch, tmp_path):
+    monkeypatch.setattr(factory, "COMFY", fake.url)
+    monkeypatch.setattr(factory, "CACHE", None)
+    monkeypatch.setattr(factory, "JOURNAL", None)
+    monkeypatch.setattr(factory, "PROJECT", None)
+    seen = []
+    submit = factory.submit
+    monkeypatch.setattr(factory, "submit", lambda wf, label="", **kw: seen.append(label) or submit(wf, label, **kw))
+    wfs = [(f"shot {i}", factory.build_text_to_image(f"shot {i}", seed=i + 1)) for i in range(3)]
+    out = list(factory.gather(wfs, group_models=False))
+    assert sorted(seen) == ["shot 0", "shot 1", "shot 2"]
+    assert sorted(j.label for j in out) == sorted(seen) and all(j.result() for j in out)
@@ -0,0 +1,37 @@
+import pytest
+
+import factory
+from pipeline.retrieve import artifacts
+
+
+def nodes(workflow, class_type):
+    return [n["inputs"] for n in workflow.values() if n["class_type"] == class_type]
+
+
+def test_preview_is_small_and_keeps_its_latent(isolated):
+    job = factory.preview("a boat at dawn", seed=11)
+    (latent,) = nodes(job.workflow, "EmptyLTXVLatentVideo")
+    assert (latent["width"], latent["height"]) == (384, 256)
+    assert nodes(job.workflow, "BasicScheduler")[0]["steps"] == 8
+    saved = [r for r in artifacts(job.result(), include_temp=True) if r["filename"].endswith(".latent")]
+    assert saved and saved[0]["subfolder"] == "latents" and saved[0]["filename"].startswith("preview_11")
+
+
+def test_refine_starts_from_the_preview_latent(isolated):
+    draft = factory.preview("a boat at dawn", seed=12)
+    outputs = factory.refine(draft)
+    wf = isolated.history[next(reversed(isolated.history))]["prompt"][2]
+    (load,) = nodes(wf, "LoadLatent")
+    assert load["latent"].startswith("latents/preview_12") and load["latent"].endswith(" [output]")
+    assert nodes(wf, "LTXVLatentUpsampler") and not nodes(wf, "EmptyLTXVLatentVideo")
+    assert nodes(wf, "RandomNoise")[0]["noise_seed"] == 12
+    assert nodes(wf, "CLIPTextEncode")[0]["text"] == "a boat at dawn"
+    assert nodes(wf, "BasicScheduler")[0]["denoise"] == 0.45
+    assert any(r["filename"].startswith("t2v_12_refined") for r in artifacts(outputs))
+
+
+def test_refine_needs_a_preview(isolated):
+    job = factory.submit(factory.build_text_to_video("a boat at dawn", seed=13))
+    job.result(timeout=30)
+    with pytest.raises(Exception, match="preview"):
+        factory.build_refine(job)
@@ -0,0 +1,42 @@
+import json
+from concurrent.futures import wait
+
+from pipeline.fake_comfy import FakeComfy
+from pipeline.retrieve import Retriever
+
+
+def outputs(prefix, n):
+    return {"9": {"images": [{"filename": f"{prefix}_{i:05d}.png", "subfolder": "", "type": "output"}
+                             for i in range(n)]}}
+
+
+def test_retrievers_share_one_project_manifest(tmp_path):
+    """Two GPUs downloading into one project: every fetch succeeds and every file is in the manifest."""
+    servers = [FakeComfy().start() for _ in range(2)]
+    try:
+        futures = []
+        for k, server in enumerate(servers):
+            outs = outputs(f"gpu{k}", 200)
+            for item in outs["9"]["images"]:
+                server.files[("output", "", item["filename"])] = 512
+            futures.append(Retriever(server.url, "shared", root=tmp_path, workers=8).fetch(outs))
+        wait(futures, timeout=60)
+        for f in futures:
+            assert len(f.result()) == 200
+        manifest = json.loads((tmp_path / "shared" / "manifest.json").read_text())
+        assert len(manifest) == 400
+        assert not list((tmp_path / "shared").glob("*.tmp"))
+    finally:
+        for server in servers:
+            server.stop()
+
+
+def test_manifest_skips_files_already_fetched(tmp_path, fake):
+    outs = outputs("again", 3)
+    for item in outs["9"]["images"]:
+        fake.files[("output", "", item["filename"])] = 1024
+    first = Retriever(fake.url, "p", root=tmp_path)
+    first.fetch(outs).result(timeout=30)
+    second = Retriever(fake.url, "p", root=tmp_path)
+    second.fetch(outs).result(timeout=30)
+    assert first.files == 3 and second.skipped == 3
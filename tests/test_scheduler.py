@@ -0,0 +1,164 @@
+import time
+
+import pytest
+
+import factory
+from pipeline import transport
+from pipeline.fake_comfy import FakeComfy
+from pipeline.scheduler import Backend, Scheduler
+
+
+@pytest.fixture
+def fakes():
+    servers = [FakeComfy(exec_time=0.1).start() for _ in range(2)]
+    yield servers
+    for f in servers:
+        f.stop()
+
+
+def pool(fakes, **kw):
+    backends = [Backend(f"gpu{i}", f.url, vram_gb=24) for i, f in enumerate(fakes)]
+    return Scheduler(backends, refresh=0.1, **kw).start()
+
+
+def images(n, seed=0):
+    return [factory.build_text_to_image(f"keyframe {i}", seed=seed + i + 1) for i in range(n)]
+
+
+def videos(n, seed=0):
+    return [factory.build_text_to_video(f"scene {i}", seed=seed + i + 1) for i in range(n)]
+
+
+def ran(fake):
+    """class_types of every prompt fake has finished."""
+    return [{n["class_type"] for n in h["prompt"][2].values()} for h in fake.history.values()]
+
+
+def test_spreads_across_backends(fakes):
+    sched = pool(fakes, pin_families=False)
+    try:
+        for job in [sched.submit(wf) for wf in images(6)]:
+            job.result(timeout=30)
+        assert all(f.history for f in fakes)
+        assert sum(len(f.history) for f in fakes) == 6
+    finally:
+        sched.close()
+
+
+def test_families_stay_on_their_backend(fakes):
+    sched = pool(fakes, spill=100)
+    try:
+        wfs = [wf for pair in zip(images(4), videos(4)) for wf in pair]
+        for job in [sched.submit(wf) for wf in wfs]:
+            job.result(timeout=30)
+        for f in fakes:
+            kinds = {"EmptyLTXVLatentVideo" in types for types in ran(f)}
+            assert len(kinds) == 1          # only stills, or only video
+        assert all(f.history for f in fakes)
+    finally:
+        sched.close()
+
+
+def test_failover_when_a_backend_dies(fakes):
+    for f in fakes:
+        f.exec_time = 0.3
+    sched = pool(fakes, pin_families=False, dead_after=2)
+    try:
+        jobs = [sched.submit(wf) for wf in images(4)]
+        deadline = time.time() + 10
+        while not fakes[0].queue_state()["queue_running"] and time.time() < deadline:
+            time.sleep(0.01)
+        fakes[0].stop()
+        for job in jobs:
+            assert job.result(timeout=30)
+        assert not sched.stats()["gpu0"]["online"]
+        assert len(fakes[1].history) >= 3
+    finally:
+        sched.close()
+
+
+def test_garbled_prompt_reply_retries_only_that_job(fakes, monkeypatch):
+    post = transport.post
+    garbled = []
+
+    def flaky(url, **kw):
+        if url.endswith("/prompt") and not garbled:
+            garbled.append(url)
+            return transport.Response(200, {}, b"<html>502 Bad Gateway</html>", url)
+        return post(url, **kw)
+
+    monkeypatch.setattr(transport, "post", flaky)
+    sched = pool(fakes[:1])
+    try:
+        first, second = [sched.submit(wf) for wf in images(2)]
+        assert first.result(timeout=30) and second.result(timeout=30)
+        assert garbled and sched.stats()["gpu0"]["failed"] == 1
+        assert len(fakes[0].history) == 2
+    finally:
+        sched.close()
+
+
+def unconfirmed_pull_back(monkeypatch, delete=True):
+    """/queue and /history stop answering right after a /queue delete goes out (or, delete=False, is lost)."""
+    post, get_json = transport.post, transport.get_json
+    down = []
+
+    def posting(url, **kw):
+        if url.endswith("/queue") and kw.get("json", {}).get("delete"):
+            down.append(url)
+            if not delete:
+                return transport.Response(200, {}, b"", url)
+        return post(url, **kw)
+
+    def getting(url, **kw):
+        if down and ("/queue" in url or "/history/" in url):
+            raise OSError("connection reset")
+        return get_json(url, **kw)
+
+    monkeypatch.setattr(transport, "post", posting)
+    monkeypatch.setattr(transport, "get_json", getting)
+    return lambda: (monkeypatch.setattr(transport, "post", post), monkeypatch.setattr(transport, "get_json", get_json))
+
+
+def posted_behind_another(fakes):
+    fakes[0].exec_time = 0.5
+    sched = pool(fakes[:1])
+    first = sched.submit(images(1)[0])
+    second = sched.submit(images(1, seed=1)[0])
+    deadline = time.time() + 10
+    while len(fakes[0].queue_state()["queue_pending"]) < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    return sched, first, second
+
+
+def test_unconfirmed_pull_back_is_requeued(fakes, monkeypatch):
+    sched, first, second = posted_behind_another(fakes)
+    try:
+        restore = unconfirmed_pull_back(monkeypatch)
+        assert sched.deprioritize(second)
+        restore()
+        assert first.result(timeout=30) and second.result(timeout=30)
+        assert len(fakes[0].history) == 2
+        # the delete went through: nothing is left waiting on the pulled-back prompt
+        assert not sched._unconfirmed and not fakes[0].queue_state()["queue_pending"]
+        assert not sched.backends[0].engine.pending()
+    finally:
+        sched.close()
+
+
+def test_unconfirmed_pull_back_that_ran_anyway(fakes, monkeypatch):
+    sched, first, second = posted_behind_another(fakes)
+    try:
+        third = sched.submit(images(1, seed=2)[0])     # takes the freed slot; the copy waits behind it
+        restore = unconfirmed_pull_back(monkeypatch, delete=False)
+        assert sched.deprioritize(second)
+        restore()
+        for job in (first, second, third):
+            assert job.result(timeout=30)
+        deadline = time.time() + 10
+        while sched.pending() and time.time() < deadline:
+            time.sleep(0.01)        # a copy caught mid-post runs to the end; its answer is dropped
+        assert len(fakes[0].history) in (3, 4) and not sched.pending()
+        assert not sched._unconfirmed
+    finally:
+        sched.close()
@@ -0,0 +1,36 @@
+import factory
+from pipeline import admission, sweep, templates
+from pipeline.cache import ResultCache
+from pipeline.fake_comfy import FakeComfy
+
+
+def build(name):
+    template = templates.get(name)
+    return lambda n: template.instantiate(prompt="yacht at sunset", seed=1, batch=n)
+
+
+def test_batch_limit_is_what_admission_admits():
+    for name in ("ltx_t2v", "flux_t2i"):
+        for gb in (16, 24, 32):
+            n = sweep.batch_limit(None, build(name), vram_gb=gb)
+            room = gb - admission.HEADROOM_GB
+            assert n == 1 or admission.estimate(build(name)(n)) <= room
+            assert n == sweep.MAX_BATCH or admission.estimate(build(name)(n + 1)) > room
+
+
+def test_unknown_server_means_one_per_prompt():
+    assert sweep.batch_limit("http://127.0.0.1:9", build("ltx_t2v")) == 1
+
+
+def test_sweep_batches_fit_the_card(tmp_path, monkeypatch, capsys):
+    with FakeComfy(exec_time=0.01, vram_total=24 * 1024**3) as fake:
+        monkeypatch.setattr(factory, "COMFY", fake.url)
+        monkeypatch.setattr(factory, "CACHE", ResultCache(root=tmp_path))
+        monkeypatch.setattr(factory, "JOURNAL", None)
+        monkeypatch.setattr(factory, "PROJECT", None)
+        variants, report = factory.sweep("yacht at sunset", seeds=[1, 2, 3, 4])
+        assert len(variants) == 4 and all(v["outputs"] for v in variants)
+        limit = report["batch_limit"]
+        assert report["prompts"] == -(-4 // limit) == len(fake.history)
+        assert max(v["batch_index"] for v in variants) < limit
+        assert "downscaled" not in capsys.readouterr().out
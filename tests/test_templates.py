@@ -0,0 +1,91 @@
+import json
+import time
+
+import pytest
+
+from pipeline import templates, transport
+from pipeline.fake_comfy import FakeComfy
+from pipeline.templates import Template, TemplateError, load_all, validate
+
+from object_info import MODELS, OBJECT_INFO
+
+
+def test_stock_templates_load_with_their_schemas():
+    names = templates.names()
+    for name in ("ltx_t2v", "ltx_i2v", "ltx_t2v_preview", "ltx_refine", "flux_t2i", "mmaudio_t2a",
+                 "wan_vace_edit", "golden_moment"):
+        assert name in names and templates.get(name).params
+    assert templates.get("ltx_t2v") is templates.get("ltx_t2v")         # loaded once
+    with pytest.raises(TemplateError, match="No template"):
+        templates.get("no_such_graph")
+
+
+def test_instantiate_patches_only_what_changed():
+    t = templates.get("ltx_t2v")
+    before = json.dumps(t.graph, sort_keys=True)
+    wf = t.instantiate(prompt="a boat at dawn", seed=42, frames=97)
+    assert wf["4"]["inputs"]["text"] == "a boat at dawn" and wf["10"]["inputs"]["noise_seed"] == 42
+    assert wf["7"]["inputs"]["length"] == 97 and wf["7"]["inputs"]["width"] == t.defaults()["width"]
+    untouched = set(wf) - {"4", "7", "10"}
+    assert untouched and all(wf[nid] is t.graph[nid] for nid in untouched)
+    assert json.dumps(t.graph, sort_keys=True) == before
+    assert t.instantiate(seed=None) == t.graph                         # None keeps the default
+
+
+def test_shared_seed_and_steps_patch_every_target():
+    wf = templates.get("wan_vace_edit").instantiate(seed=5, steps=30, switch=12)
+    assert wf["15"]["inputs"]["noise_seed"] == wf["16"]["inputs"]["noise_seed"] == 5
+    assert (wf["15"]["inputs"]["end_at_step"], wf["16"]["inputs"]["start_at_step"]) == (12, 12)
+
+
+def test_dumps_matches_instantiate():
+    t = templates.get("ltx_i2v")
+    values = {"prompt": 'a "quoted" kite', "image": "example.png", "seed": 7, "strength": 0.8}
+    assert json.loads(t.dumps(**values)) == t.instantiate(**values)
+    assert json.loads(t.dumps()) == t.graph
+
+
+@pytest.mark.parametrize("values, match", [
+    ({"seed": "7"}, "seed must be int"),
+    ({"seed": True}, "seed must be int"),
+    ({"frames": 0}, "frames must be >= 1"),
+    ({"strength": 1}, None),
+    ({"colour": "red"}, "no parameter 'colour'"),
+])
+def test_params_are_typed(values, match):
+    t = templates.get("ltx_i2v")
+    if match is None:
+        assert t.instantiate(**values)["21"]["inputs"]["strength"] == 1
+        return
+    with pytest.raises(TemplateError, match=match):
+        t.instantiate(**values)
+
+
+def test_broken_graphs_are_refused():
+    graph = {"1": {"class_type": "VAEDecode", "inputs": {"samples": ["9", 0]}}}
+    with pytest.raises(TemplateError, match="missing node 9"):
+        validate(graph, "broken")
+    good = {"1": {"class_type": "SaveImage", "inputs": {"filename_prefix": "x"}}}
+    with pytest.raises(TemplateError, match="targets missing 2.text"):
+        Template("t", good, [templates.Param("prompt", str, [("2", "text")])])
+
+
+def test_ui_exports_and_unreadable_files_are_skipped(tmp_path):
+    (tmp_path / "api.json").write_text(json.dumps({"1": {"class_type": "SaveImage", "inputs": {}}}))
+    (tmp_path / "ui.json").write_text(json.dumps({"nodes": [], "links": []}))
+    (tmp_path / "torn.json").write_text('{"1": ')
+    loaded, skipped = load_all(tmp_path)
+    assert list(loaded) == ["api"]
+    assert skipped["ui"] == "UI-format export" and skipped["torn"].startswith("unreadable")
+
+
+def test_serialized_template_runs_on_the_server():
+    with FakeComfy(exec_time=0.01, object_info=OBJECT_INFO, models=MODELS) as fake:
+        body = '{"prompt":' + templates.get("flux_t2i").dumps(prompt="a yacht", seed=3) + "}"
+        r = transport.post(f"{fake.url}/prompt", body=body, headers={"Content-Type": "application/json"})
+        assert r.status == 200, r.text
+        pid = r.json()["prompt_id"]
+        deadline = time.time() + 10
+        while pid not in fake.history and time.time() < deadline:
+            time.sleep(0.01)
+        assert fake.history[pid]["prompt"][2] == templates.get("flux_t2i").instantiate(prompt="a yacht", seed=3)
@@ -0,0 +1,121 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from pipeline import transport
+from pipeline.fake_comfy import FakeComfy
+from pipeline.transport import HTTPError, Transport, TransportError, endpoint_timeout
+
+
+class Flaky:
+    """Answers each request with the next status in `statuses` (then 200s). Counts requests per method."""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.calls = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _answer(self):
+                stub.calls.append(self.command)
+                if self.headers.get("Content-Length"):
+                    self.rfile.read(int(self.headers["Content-Length"]))
+                status = stub.statuses.pop(0) if stub.statuses else 200
+                body = b'{"ok": true}' if status == 200 else b"busy"
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = _answer
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def client():
+    t = Transport(backoff=0.01)
+    yield t
+    t.close()
+
+
+def test_polls_reuse_one_connection(fake, client):
+    for _ in range(50):
+        assert "queue_running" in client.get_json(f"{fake.url}/queue")
+    assert client.stats()["connections"] == 1 and client.stats()["requests"] == 50
+
+
+def test_concurrent_polls_stay_within_the_pool(fake):
+    t = Transport(max_conns=4)
+    try:
+        with ThreadPoolExecutor(32) as pool:
+            replies = list(pool.map(lambda _: t.get_json(f"{fake.url}/queue"), range(200)))
+        assert len(replies) == 200
+        assert t.stats()["connections"] <= 4 and t.stats()["idle"] <= 4
+    finally:
+        t.close()
+
+
+def test_get_retries_busy_server_post_does_not(client):
+    stub = Flaky([503, 502])
+    try:
+        assert client.get_json(f"{stub.url}/queue") == {"ok": True}
+        assert stub.calls == ["GET"] * 3 and client.stats()["retried"] == 2
+        stub.statuses = [503]
+        r = client.post(f"{stub.url}/prompt", json={"prompt": {}})
+        assert r.status == 503 and stub.calls[3:] == ["POST"]
+        with pytest.raises(HTTPError):
+            r.raise_for_status()
+    finally:
+        stub.close()
+
+
+def test_gives_up_after_retries(client):
+    stub = Flaky([503] * 10)
+    try:
+        assert client.get(f"{stub.url}/queue", retries=2).status == 503
+        assert len(stub.calls) == 3
+    finally:
+        stub.close()
+
+
+def test_refused_connection_is_a_transport_error(client):
+    with pytest.raises(TransportError):
+        client.get("http://127.0.0.1:9/queue", retries=1)
+    with pytest.raises(OSError):        # callers catch it as one
+        client.post("http://127.0.0.1:9/prompt", json={}, retries=0)
+
+
+def test_stream_hands_the_connection_back(fake, client):
+    fake.files[("output", "", "clip.mp4")] = 300_000
+    with client.stream("GET", f"{fake.url}/view", params={"filename": "clip.mp4", "type": "output"}) as r:
+        assert r.status == 200
+        assert sum(len(c) for c in r.iter_content(64 * 1024)) == 300_000
+    assert client.get_json(f"{fake.url}/queue") is not None
+    assert client.stats()["connections"] == 1
+
+
+def test_endpoint_timeouts():
+    assert endpoint_timeout("/queue") == 5
+    assert endpoint_timeout("/history/abc") == 10
+    assert endpoint_timeout("/view") == 120
+    assert endpoint_timeout("/anything/else") == transport.DEFAULT_TIMEOUT
+
+
+def test_module_functions_share_one_transport():
+    with FakeComfy() as fake:
+        before = transport.default().stats()["requests"]
+        transport.get_json(f"{fake.url}/system_stats")
+        transport.post(f"{fake.url}/queue", json={"clear": True})
+        assert transport.default().stats()["requests"] == before + 2
@@ -0,0 +1,140 @@
+import json
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from pipeline import tts
+from pipeline.tts import PCM, Synth, TTSError, parse_wav, sentences, wav_header
+
+
+# --- sentences ---
+
+def test_abbreviations_and_initials_dont_split():
+    text = "Dr. Smith met Mr. Jones at St. Ives. J. R. Tolkien wrote it, e.g. the Hobbit. Done."
+    assert sentences(text) == ["Dr. Smith met Mr. Jones at St. Ives.",
+                               "J. R. Tolkien wrote it, e.g. the Hobbit.", "Done."]
+
+
+def test_quotes_close_the_sentence():
+    text = '"Is it done?" she asked. He said "Yes." Then he left!\n\nNew  paragraph'
+    assert sentences(text) == ['"Is it done?" she asked.', 'He said "Yes."', "Then he left!", "New paragraph"]
+
+
+def test_long_sentences_are_split_under_max_chars():
+    clause = "the tide rolls over the harbour wall"
+    text = ", ".join([clause] * 12) + "."
+    out = sentences(text, max_chars=80)
+    assert len(out) > 1 and all(len(s) <= 80 for s in out)
+    assert " ".join(out).replace(" ", "") == text.replace(" ", "")
+    word = "x" * 200
+    assert all(len(s) <= 80 for s in sentences(word, max_chars=80))
+
+
+# --- parse_wav ---
+
+def extensible(pcm, rate=24000, channels=1, bits=16, size=None):
+    """A WAVE_FORMAT_EXTENSIBLE file with a LIST chunk before the data, as some servers write them."""
+    guid = struct.pack("<H", PCM) + b"\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71"
+    fmt = struct.pack("<HHIIHHHHI", 0xFFFE, channels, rate, rate * channels * bits // 8, channels * bits // 8,
+                      bits, 22, bits, 0) + guid
+    info = b"INFOISFT\x05\x00\x00\x00Lavf\x00\x00"
+    body = (b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"LIST" + struct.pack("<I", len(info)) + info
+            + b"data" + struct.pack("<I", len(pcm) if size is None else size) + pcm)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def test_parse_extensible_format():
+    fmt, pcm = parse_wav(extensible(b"\x01\x02" * 100))
+    assert fmt == (PCM, 1, 24000, 16) and pcm == b"\x01\x02" * 100
+
+
+@pytest.mark.parametrize("size", [0, 0xFFFFFFFF])
+def test_parse_streamed_sizes(size):
+    data = wav_header((PCM, 1, 22050, 16), 0)[:-4] + struct.pack("<I", size) + b"\x05\x00" * 50
+    assert parse_wav(data) == ((PCM, 1, 22050, 16), b"\x05\x00" * 50)
+    assert parse_wav(extensible(b"\x07\x00" * 10, size=size))[1] == b"\x07\x00" * 10
+
+
+def test_parse_rejects_non_wav():
+    with pytest.raises(TTSError):
+        parse_wav(b"ID3\x03" + b"\x00" * 40)
+
+
+# --- Synth against a stub /generate ---
+
+class StubTTS:
+    """Chatterbox stand-in: POST /generate -> a short WAV, after `delay` seconds. Counts calls per text."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.calls.append(body["text"])
+                time.sleep(stub.delay)
+                pcm = body["text"].encode()[:8].ljust(8, b"\x00")
+                data = wav_header((PCM, 1, 24000, 16), len(pcm)) + pcm
+                self.send_response(200)
+                self.send_header("Content-Type", "audio/wav")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubTTS(delay=0.1)
+    yield server
+    server.close()
+
+
+def test_cache_hit_and_miss(stub, tmp_path):
+    synth = Synth(root=tmp_path)
+    out = synth.speak(stub.url, "First line. Second line.", tmp_path / "out" / "a.wav", pause=0)
+    assert sorted(stub.calls) == ["First line.", "Second line."]
+    assert synth.stats() == {"hits": 0, "misses": 2}
+    # one sentence changed: only it is synthesized again, by a fresh Synth over the same cache
+    synth = Synth(root=tmp_path)
+    synth.speak(stub.url, "First line. Third line.", tmp_path / "out" / "b.wav", pause=0)
+    assert stub.calls[2:] == ["Third line."]
+    assert synth.stats() == {"hits": 1, "misses": 1}
+    fmt, pcm = parse_wav(out.read_bytes())
+    assert fmt == (PCM, 1, 24000, 16) and pcm == b"First li" + b"Second l"
+
+
+def test_repeated_line_is_requested_once(stub, tmp_path):
+    synth = Synth(root=tmp_path, workers=4)
+    lines = [s for s, _, _ in synth.stream(stub.url, "Again. Again. Again. Once more.")]
+    assert lines == ["Again."] * 3 + ["Once more."]
+    assert sorted(stub.calls) == ["Again.", "Once more."]
+    assert synth.stats() == {"hits": 0, "misses": 2}
+
+
+def test_server_error_is_a_tts_error(tmp_path):
+    synth = Synth(root=tmp_path)
+    with pytest.raises(TTSError):
+        list(synth.stream("http://127.0.0.1:9", "Hello there."))
+    assert not list(tmp_path.glob("*.wav"))
+
+
+def test_module_functions_use_the_shared_synth(stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(tts, "SYNTH", Synth(root=tmp_path))
+    tts.speak(stub.url, "Hello.", tmp_path / "hello.wav")
+    assert stub.calls == ["Hello."] and tts.SYNTH.stats()["misses"] == 1
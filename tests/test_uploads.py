@@ -0,0 +1,103 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import factory
+from pipeline import transport, uploads
+from pipeline.fake_comfy import FakeComfy
+from pipeline.uploads import UploadCache, view_ref
+
+
+@pytest.fixture
+def servers():
+    fakes = [FakeComfy().start() for _ in range(3)]
+    yield fakes
+    for f in fakes:
+        f.stop()
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "hero.png"
+    path.write_bytes(b"\x89PNG" + bytes(range(256)) * 2000)       # ~500KB, several chunks
+    return path
+
+
+def test_same_file_goes_up_once_per_server(servers, image):
+    cache = UploadCache()
+    name = cache.upload_all([f.url for f in servers], image)
+    assert name.endswith(".png") and len(name) == uploads.HASH_CHARS + 4
+    for f in servers:
+        assert f.uploads[name] == image.read_bytes()
+    for _ in range(5):      # one upload per scene, but the file is already there
+        assert cache.upload(servers[0].url, image) == name
+    assert cache.stats() == {"uploaded": 3, "skipped": 5, "files": 3}
+
+
+def test_body_is_streamed_in_chunks(fake, image, monkeypatch):
+    monkeypatch.setattr(uploads, "CHUNK", 64 * 1024)
+    post, sizes = transport.post, []
+
+    def recording(url, **kw):
+        sizes.extend(len(piece) for piece in kw["body"])
+        return post(url, **kw)
+
+    monkeypatch.setattr(transport, "post", recording)
+    UploadCache().upload(fake.url, image)
+    assert max(sizes) <= 64 * 1024 and sum(sizes) > image.stat().st_size
+
+
+def test_server_that_already_has_it_is_not_sent_it(fake, image):
+    name = UploadCache().upload(fake.url, image)
+    fresh = UploadCache()       # e.g. a new process
+    requests = fake.requests
+    assert fresh.upload(fake.url, image) == name
+    assert fresh.stats()["uploaded"] == 0 and fake.requests == requests + 1      # one HEAD
+
+
+def test_concurrent_callers_share_one_upload(fake, image, monkeypatch):
+    post, posts, gate = uploads._post, [], threading.Event()
+
+    def slow(*a, **kw):
+        posts.append(a)
+        gate.wait(5)
+        return post(*a, **kw)
+
+    monkeypatch.setattr(uploads, "_post", slow)
+    cache = UploadCache()
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(cache.upload, fake.url, image) for _ in range(8)]
+        threading.Timer(0.2, gate.set).start()
+        names = {f.result(timeout=10) for f in futures}
+    assert len(names) == 1 and len(posts) == 1
+
+
+def test_changed_file_is_hashed_and_sent_again(fake, image):
+    cache = UploadCache()
+    first = cache.upload(fake.url, image)
+    image.write_bytes(b"\x89PNG other")
+    second = cache.upload(fake.url, image)
+    assert first != second and set(fake.uploads) == {first, second}
+
+
+def test_forget_rechecks_the_server(fake, image):
+    cache = UploadCache()
+    name = cache.upload(fake.url, image)
+    fake.uploads.clear()        # input folder wiped
+    cache.forget(fake.url)
+    assert cache.upload(fake.url, image) == name and name in fake.uploads
+
+
+def test_image_to_video_uploads_a_local_file(isolated, image, monkeypatch):
+    monkeypatch.setattr(uploads, "CACHE", UploadCache())
+    factory.image_to_video(str(image), "a boat", seed=5)
+    name = uploads.CACHE.upload(isolated.url, image)
+    loads = [n["inputs"]["image"] for h in isolated.history.values()
+             for n in h["prompt"][2].values() if n["class_type"] == "LoadImage"]
+    assert loads == [name] and uploads.CACHE.stats()["uploaded"] == 1
+
+
+def test_view_ref():
+    assert view_ref({"filename": "a.png", "subfolder": "", "type": "output"}) == "a.png [output]"
+    assert view_ref({"filename": "a.png", "subfolder": "kf", "type": "temp"}) == "kf/a.png [temp]"
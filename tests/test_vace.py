@@ -0,0 +1,81 @@
+import pytest
+
+from pipeline.vace import MAX_FRAMES, Window, _regions, windows
+
+
+def edit(a, b, prompt="a red kite", **kw):
+    return {"frames": (a, b), "prompt": prompt, **kw}
+
+
+# --- windows ---
+
+def test_window_gets_context_and_4k1_frames():
+    (win,) = windows([{"start": 12.0, "end": 14.0, "prompt": "a red kite"}], fps=24, total=720)
+    assert (win.edit_first, win.edit_last) == (288, 336)
+    assert win.first <= 288 - 8 and win.last >= 336 + 8
+    assert win.frames % 4 == 1 and win.frames <= MAX_FRAMES
+
+
+@pytest.mark.parametrize("a, b, total", [(0, 10, 720), (700, 720, 720), (3, 40, 45), (100, 173, 720)])
+def test_padding_stays_inside_the_clip(a, b, total):
+    (win,) = windows([edit(a, b)], fps=24, total=total)
+    assert 0 <= win.first <= a and b <= win.last <= total
+    assert win.frames % 4 == 1 and win.frames <= MAX_FRAMES
+
+
+def test_nearby_edits_merge_and_distant_ones_dont():
+    wins = windows([edit(100, 110, "a kite"), edit(120, 130, "a gull"), edit(400, 410, "a boat")], fps=24, total=720)
+    assert [(w.edit_first, w.edit_last) for w in wins] == [(100, 130), (400, 410)]
+    assert wins[0].prompt == "a kite; a gull" and wins[1].prompt == "a boat"
+
+
+def test_merge_keeps_strongest_strength_and_first_negative():
+    (win,) = windows([edit(100, 110, strength=0.6), edit(112, 120, negative="blur", strength=0.9)],
+                     fps=24, total=720)
+    assert win.prompt == "a red kite" and win.negative == "blur" and win.strength == 0.9
+
+
+def test_merge_never_outgrows_a_window():
+    wins = windows([edit(0, 70), edit(80, 100)], fps=24, total=720)
+    assert len(wins) == 2 and all(w.frames <= MAX_FRAMES for w in wins)
+
+
+def test_edit_longer_than_a_window_is_refused():
+    with pytest.raises(ValueError, match="split it"):
+        windows([edit(0, MAX_FRAMES + 1)], fps=24, total=720)
+
+
+def test_bad_edits_are_refused():
+    with pytest.raises(ValueError, match="no frames"):
+        windows([edit(800, 900)], fps=24, total=720)
+    with pytest.raises(ValueError, match="no prompt"):
+        windows([{"frames": (10, 20)}], fps=24, total=720)
+
+
+# --- splice planning ---
+
+def win(a, b):
+    return Window(max(0, a - 8), b + 8, a, b, "x")
+
+
+def test_regions_cover_whole_gops():
+    regions = _regions([(win(50, 60), "r.mp4")], keys=[0, 48, 96, 144], total=192)
+    assert [(s, e) for s, e, _ in regions] == [(48, 96)]
+
+
+def test_regions_in_one_gop_merge():
+    renders = [(win(100, 110), "b.mp4"), (win(50, 60), "a.mp4"), (win(70, 120), "c.mp4")]
+    regions = _regions(renders, keys=[0, 48, 96, 144], total=192)
+    assert [(s, e) for s, e, _ in regions] == [(48, 144)]
+    assert [p for _, p in regions[0][2]] == ["a.mp4", "c.mp4", "b.mp4"]
+
+
+def test_regions_in_separate_gops_stay_apart():
+    regions = _regions([(win(10, 20), "a.mp4"), (win(150, 160), "b.mp4")], keys=[0, 48, 96, 144], total=192)
+    assert [(s, e) for s, e, _ in regions] == [(0, 48), (144, 192)]
+
+
+def test_region_before_first_keyframe_starts_at_zero():
+    regions = _regions([(win(5, 12), "a.mp4")], keys=[24, 72], total=96)
+    assert [(s, e) for s, e, _ in regions] == [(0, 24)]
+    assert [(s, e) for s, e, _ in _regions([(win(5, 12), "a.mp4")], keys=[], total=96)] == [(0, 96)]
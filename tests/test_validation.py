@@ -0,0 +1,66 @@
+import types
+
+import pytest
+
+import factory
+from pipeline import schema, templates
+from pipeline.fake_comfy import FakeComfy
+from pipeline.validation import ValidationError, Validator
+
+from object_info import MODELS, OBJECT_INFO
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    fake = FakeComfy(object_info=OBJECT_INFO, models=MODELS).start()
+    monkeypatch.setattr(factory, "COMFY", fake.url)
+    yield fake.url, Validator(schema.SchemaCache(root=tmp_path))
+    fake.stop()
+
+
+def preview_job():
+    wf = factory.build_preview("a boat at dawn", seed=7)
+    outputs = {"16": {"latents": [{"filename": "preview_7_00001_.latent", "subfolder": "latents",
+                                   "type": "output"}]}}
+    return types.SimpleNamespace(workflow=wf, result=lambda: outputs, prompt_id="p", label="")
+
+
+def stock_graphs():
+    return {
+        "text_to_video": factory.build_text_to_video("a boat at dawn", seed=1),
+        "preview": factory.build_preview("a boat at dawn", seed=1),
+        "refine": factory.build_refine(preview_job()),
+        "image_to_video": factory.build_image_to_video("example.png", "a boat", seed=1),
+        "text_to_image": factory.build_text_to_image("a yacht", seed=1),
+        "text_to_audio": factory.build_text_to_audio("waves", seed=1),
+        "vace_edit": templates.get("wan_vace_edit").instantiate(),
+    }
+
+
+def test_stock_templates_validate(server):
+    url, validator = server
+    for name, graph in stock_graphs().items():
+        assert validator.problems(graph, url) == [], name
+
+
+def test_annotated_file_names_pass_combo_check(server):
+    url, validator = server
+    refine = factory.build_refine(preview_job())
+    assert refine["7"]["inputs"]["latent"].endswith(" [output]")
+    for folder in ("input", "temp"):
+        refine["7"]["inputs"]["latent"] = f"x.latent [{folder}]"
+        assert validator.problems(refine, url) == []
+
+
+def test_typos_are_reported(server):
+    url, validator = server
+    graph = factory.build_text_to_video("a boat", seed=1)
+    graph["8"]["inputs"]["sampler_name"] = "eulr"
+    graph["2"]["inputs"]["ckpt_name"] = "ltxv-2b.safetensors"
+    graph["7"]["inputs"]["batch_size"] = 0
+    del graph["4"]["inputs"]["clip"]
+    with pytest.raises(ValidationError) as e:
+        validator.check(graph, url)
+    text = " ".join(e.value.errors)
+    for needle in ("eulr", "ltxv-2b.safetensors", "batch_size", "'clip' missing"):
+        assert needle in text